@@ -16,6 +16,7 @@ from typing import TYPE_CHECKING, Any
 from discord.ext import commands
 
 from src.cogs.core.event_bus import Event, EventBus, EventPriority, get_global_event_bus
+from src.cogs.core.message_features import get_message_features
 
 from ..database.repository import AchievementEventRepository
 from .event_processor import EventDataProcessor
@@ -286,16 +287,17 @@ class AchievementEventListener(commands.Cog):
                 return
 
             # 建立成就事件
+            features = get_message_features(message)
             event_data = {
-                "user_id": message.author.id,
-                "guild_id": message.guild.id,
-                "channel_id": message.channel.id,
-                "message_id": message.id,
-                "content_length": len(message.content),
-                "has_attachments": len(message.attachments) > 0,
-                "has_embeds": len(message.embeds) > 0,
-                "mention_count": len(message.mentions),
-                "is_bot": message.author.bot,
+                "user_id": features.author_id,
+                "guild_id": features.guild_id,
+                "channel_id": features.channel_id,
+                "message_id": features.message_id,
+                "content_length": features.content_length,
+                "has_attachments": features.attachment_count > 0,
+                "has_embeds": features.embed_count > 0,
+                "mention_count": features.mention_count,
+                "is_bot": features.author_is_bot,
             }
 
             event = Event(
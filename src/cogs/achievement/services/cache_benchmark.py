@@ -0,0 +1,237 @@
+"""成就系統 L2 快取基準測試.
+
+比較 L2 快取在不同項目數量下的單鍵讀取延遲:
+- 原本方式:每次讀取載入整個 pickle 快取檔案
+- 鍵值儲存:SQLite 主鍵查詢,在專屬執行緒中執行
+
+可直接執行: python -m src.cogs.achievement.services.cache_benchmark
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import pickle
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+from .l2_cache_store import L2CacheStore
+
+logger = logging.getLogger(__name__)
+
+# 預設測試的項目數量
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+# 超過此數量時不測試原本方式(載入整個檔案耗時過久)
+LEGACY_MAX_SIZE = 100_000
+# 每批寫入的項目數量
+POPULATE_BATCH_SIZE = 10_000
+
+CACHE_TYPE = "achievement"
+
+
+def _sample_value(index: int) -> dict[str, Any]:
+    """產生與成就快取相近大小的測試值."""
+    return {
+        "id": index,
+        "name": f"成就 {index}",
+        "description": "基準測試用成就",
+        "category_id": index % 20,
+        "points": index % 1000,
+        "criteria": {"target_value": index % 100},
+    }
+
+
+def _percentile(samples: list[float], percentile: int) -> float:
+    """計算百分位數."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+    return ordered[index]
+
+
+async def populate(store: L2CacheStore, start: int, stop: int) -> None:
+    """寫入 [start, stop) 範圍的測試項目.
+
+    Args:
+        store: L2 快取儲存
+        start: 起始編號
+        stop: 結束編號(不包含)
+    """
+    for batch_start in range(start, stop, POPULATE_BATCH_SIZE):
+        batch_stop = min(batch_start + POPULATE_BATCH_SIZE, stop)
+        await store.set_many(
+            CACHE_TYPE,
+            (
+                (f"achievement:{i}", _sample_value(i))
+                for i in range(batch_start, batch_stop)
+            ),
+            ttl_seconds=3600,
+        )
+
+
+async def measure_store_get(
+    store: L2CacheStore, size: int, samples: int
+) -> dict[str, float]:
+    """測量鍵值儲存的單鍵讀取延遲.
+
+    Args:
+        store: 已寫入 size 個項目的 L2 快取儲存
+        size: 項目數量
+        samples: 讀取次數
+
+    Returns:
+        中位數與 P95 延遲(微秒)
+    """
+    keys = [f"achievement:{random.randrange(size)}" for _ in range(samples)]
+    latencies = []
+    for key in keys:
+        started = time.perf_counter()
+        value = await store.get(CACHE_TYPE, key)
+        latencies.append((time.perf_counter() - started) * 1_000_000)
+        assert value is not None
+
+    return {
+        "median_us": statistics.median(latencies),
+        "p95_us": _percentile(latencies, 95),
+    }
+
+
+def measure_legacy_get(directory: Path, size: int, samples: int = 3) -> float:
+    """測量原本方式(載入整個 pickle 檔案)的單鍵讀取延遲.
+
+    Args:
+        directory: 暫存目錄
+        size: 項目數量
+        samples: 讀取次數
+
+    Returns:
+        中位數延遲(微秒)
+    """
+    now = time.time()
+    cache_file = directory / f"legacy_{size}.cache"
+    with cache_file.open("wb") as f:
+        pickle.dump(
+            {
+                f"achievement:{i}": {
+                    "value": _sample_value(i),
+                    "expires_at": now + 3600,
+                    "created_at": now,
+                }
+                for i in range(size)
+            },
+            f,
+        )
+
+    latencies = []
+    for _ in range(samples):
+        key = f"achievement:{random.randrange(size)}"
+        started = time.perf_counter()
+        with cache_file.open("rb") as f:
+            cache_data = pickle.load(f)
+        assert cache_data[key]["expires_at"] > time.time()
+        latencies.append((time.perf_counter() - started) * 1_000_000)
+
+    cache_file.unlink()
+    return statistics.median(latencies)
+
+
+async def benchmark_l2_get(
+    sizes: tuple[int, ...] = DEFAULT_SIZES, samples: int = 2_000
+) -> list[dict[str, Any]]:
+    """依序增加項目數量並測量 L2 單鍵讀取延遲.
+
+    Args:
+        sizes: 遞增的項目數量
+        samples: 每個數量的讀取次數
+
+    Returns:
+        每個數量的測試結果
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        directory = Path(temp_dir)
+        store = L2CacheStore(directory / "l2_cache.db")
+        try:
+            populated = 0
+            for size in sorted(sizes):
+                started = time.perf_counter()
+                await populate(store, populated, size)
+                populate_time = time.perf_counter() - started
+                populated = size
+
+                result: dict[str, Any] = {
+                    "size": size,
+                    "populate_s": populate_time,
+                    **await measure_store_get(store, size, samples),
+                    "legacy_us": None,
+                }
+                if size <= LEGACY_MAX_SIZE:
+                    result["legacy_us"] = measure_legacy_get(directory, size)
+                results.append(result)
+        finally:
+            await store.close()
+
+    return results
+
+
+def generate_report(results: list[dict[str, Any]], samples: int) -> str:
+    """生成 L2 快取基準測試報告.
+
+    Args:
+        results: benchmark_l2_get 的結果
+        samples: 每個數量的讀取次數
+
+    Returns:
+        格式化的報告文字
+    """
+    lines = [
+        "=" * 60,
+        "成就系統 L2 快取讀取延遲基準測試 (pickle 檔案 vs SQLite 鍵值)",
+        "=" * 60,
+        "",
+        f"每個數量讀取次數: {samples}",
+        "",
+        f"{'項目數量':>10} {'中位數(µs)':>12} {'P95(µs)':>10} {'原本方式(µs)':>14}",
+    ]
+    for result in results:
+        legacy = (
+            f"{result['legacy_us']:>14.0f}" if result["legacy_us"] is not None else "-"
+        )
+        lines.append(
+            f"{result['size']:>10} {result['median_us']:>12.1f} "
+            f"{result['p95_us']:>10.1f} {legacy:>14}"
+        )
+
+    medians = [result["median_us"] for result in results]
+    lines += [
+        "",
+        f"最大/最小中位數比例: {max(medians) / min(medians):.2f}x",
+        "",
+    ]
+    return "\n".join(lines)
+
+
+def run_l2_cache_benchmark(
+    sizes: tuple[int, ...] = DEFAULT_SIZES, samples: int = 2_000
+) -> str:
+    """執行 L2 快取基準測試.
+
+    Args:
+        sizes: 遞增的項目數量
+        samples: 每個數量的讀取次數
+
+    Returns:
+        測試報告
+    """
+    results = asyncio.run(benchmark_l2_get(sizes, samples))
+    report = generate_report(results, samples)
+    logger.info(f"\n{report}")
+    return report
+
+
+if __name__ == "__main__":
+    # 直接執行基準測試
+    print(run_l2_cache_benchmark())
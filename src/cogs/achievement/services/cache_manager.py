@@ -2,8 +2,8 @@
 
 此模組提供成就系統的快取管理功能,實作多層快取策略:
 - L1 快取:記憶體快取(cachetools TTLCache)
-- L2 快取:檔案快取(持久化快取)
-- 快取失效和更新策略
+- L2 快取:SQLite 鍵值快取(持久化快取,逐鍵讀寫)
+- 快取失效和更新策略(標籤反向索引,失效成本與受影響項目數量成正比)
 - 快取效能監控
 
 根據 Story 5.1 Task 1.4 和 Task 2 的要求實作,支援完善的查詢快取機制.
@@ -14,20 +14,29 @@ from __future__ import annotations
 import asyncio
 import contextlib
 import logging
-import pickle
-import time
 from dataclasses import dataclass
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
 from typing import Any
 
-from cachetools import LRUCache, TTLCache
-
 from ..database.models import Achievement, UserAchievement
+from .cache_tags import (
+    TaggedLRUCache,
+    TaggedTTLCache,
+    achievement_tag,
+    category_tag,
+    kind_tag,
+    tags_for_key,
+    user_tag,
+)
+from .l2_cache_store import L2CacheStore
 
 logger = logging.getLogger(__name__)
 
+# L2 快取資料庫檔名
+L2_CACHE_FILENAME = "l2_cache.db"
+
 
 class CacheLevel(str, Enum):
     """快取層級."""
@@ -61,7 +70,7 @@ class CacheConfig:
     """是否啟用 L2 檔案快取"""
 
     l2_cache_path: str | None = None
-    """L2 快取檔案路徑"""
+    """L2 快取資料庫路徑(None 表示使用快取目錄下的共用資料庫)"""
 
 
 @dataclass
@@ -98,20 +107,17 @@ class CacheManager:
         self._cache_dir.mkdir(parents=True, exist_ok=True)
 
         # L1 記憶體快取
-        self._l1_caches: dict[CacheType, TTLCache | LRUCache] = {}
+        self._l1_caches: dict[CacheType, TaggedTTLCache | TaggedLRUCache] = {}
         self._init_l1_caches()
 
-        # L2 檔案快取映射
-        self._l2_cache_files: dict[CacheType, Path] = {}
-        self._init_l2_cache_files()
+        # L2 鍵值快取
+        self._l2_stores: dict[CacheType, L2CacheStore] = {}
+        self._init_l2_stores()
 
         # 快取統計
         self._stats: dict[CacheType, CacheStats] = {}
         self._init_stats()
 
-        # 快取失效追蹤
-        self._invalidation_keys: dict[str, set[str]] = {}
-
         # 背景清理任務
         self._cleanup_task: asyncio.Task | None = None
         self._is_running = False
@@ -144,7 +150,7 @@ class CacheManager:
         """
         # 先嘗試 L1 記憶體快取
         l1_cache = self._l1_caches.get(cache_type)
-        if l1_cache and key in l1_cache:
+        if l1_cache is not None and key in l1_cache:
             self._stats[cache_type].hits += 1
             logger.debug(f"L1 快取命中: {cache_type.value}:{key}")
             return l1_cache[key]
@@ -155,7 +161,7 @@ class CacheManager:
             l2_value = await self._get_from_l2_cache(cache_type, key)
             if l2_value is not None:
                 # 回填到 L1 快取
-                if l1_cache:
+                if l1_cache is not None:
                     l1_cache[key] = l2_value
                 self._stats[cache_type].hits += 1
                 logger.debug(f"L2 快取命中: {cache_type.value}:{key}")
@@ -177,22 +183,19 @@ class CacheManager:
             value: 快取值
             ttl: 自訂存活時間(覆蓋預設配置)
         """
-        # 設定到 L1 記憶體快取
+        # 設定到 L1 記憶體快取(標籤由快取的 tagger 記錄)
         l1_cache = self._l1_caches.get(cache_type)
-        if l1_cache:
+        if l1_cache is not None:
             l1_cache[key] = value
             self._stats[cache_type].size = len(l1_cache)
 
-        # 設定到 L2 檔案快取
+        # 設定到 L2 快取
         config = self._cache_configs[cache_type]
         if config.enable_l2_cache:
             await self._set_to_l2_cache(
                 cache_type, key, value, ttl or config.ttl_seconds
             )
 
-        # 記錄失效追蹤
-        self._track_invalidation_keys(cache_type, key, value)
-
         logger.debug(f"快取已設定: {cache_type.value}:{key}")
 
     async def delete(self, cache_type: CacheType, key: str) -> bool:
@@ -209,7 +212,7 @@ class CacheManager:
 
         # 從 L1 快取刪除
         l1_cache = self._l1_caches.get(cache_type)
-        if l1_cache and key in l1_cache:
+        if l1_cache is not None and key in l1_cache:
             del l1_cache[key]
             self._stats[cache_type].size = len(l1_cache)
             deleted = True
@@ -234,7 +237,7 @@ class CacheManager:
         if cache_type:
             # 清空特定類型快取
             l1_cache = self._l1_caches.get(cache_type)
-            if l1_cache:
+            if l1_cache is not None:
                 l1_cache.clear()
                 self._stats[cache_type].size = 0
 
@@ -270,14 +273,7 @@ class CacheManager:
             失效的快取項目數量
         """
         invalidated_count = 0
-
-        # 失效模式
-        patterns = [
-            f"user:{user_id}:",
-            f"user_achievements:{user_id}",
-            f"user_progress:{user_id}",
-            f"user_stats:{user_id}",
-        ]
+        tags = [user_tag(user_id)]
 
         for cache_type in [
             CacheType.USER_ACHIEVEMENT,
@@ -286,7 +282,7 @@ class CacheManager:
         ]:
             if cache_type not in self._cache_configs:
                 continue  # 跳過未配置的快取類型
-            count = await self._invalidate_by_patterns(cache_type, patterns)
+            count = await self._invalidate_by_tags(cache_type, tags)
             invalidated_count += count
 
         logger.info(f"用戶 {user_id} 相關快取已失效: {invalidated_count} 項")
@@ -302,12 +298,10 @@ class CacheManager:
             失效的快取項目數量
         """
         invalidated_count = 0
-
-        # 失效模式
-        patterns = [
-            f"achievement:{achievement_id}",
-            "achievement_list:",  # 成就列表需要重新載入
-            "leaderboard:",  # 排行榜可能受影響
+        tags = [
+            achievement_tag(achievement_id),
+            kind_tag("achievement_list"),  # 成就列表需要重新載入
+            kind_tag("leaderboard"),  # 排行榜可能受影響
         ]
 
         for cache_type in [
@@ -317,7 +311,7 @@ class CacheManager:
         ]:
             if cache_type not in self._cache_configs:
                 continue  # 跳過未配置的快取類型
-            count = await self._invalidate_by_patterns(cache_type, patterns)
+            count = await self._invalidate_by_tags(cache_type, tags)
             invalidated_count += count
 
         logger.info(f"成就 {achievement_id} 相關快取已失效: {invalidated_count} 項")
@@ -335,16 +329,16 @@ class CacheManager:
         invalidated_count = 0
 
         # 分類變更影響成就列表和統計
-        patterns = [
-            f"category:{category_id}:",
-            "achievement_list:",
-            "stats:",
+        tags = [
+            category_tag(category_id),
+            kind_tag("achievement_list"),
+            kind_tag("stats"),
         ]
 
         for cache_type in [CacheType.ACHIEVEMENT_LIST, CacheType.STATS]:
             if cache_type not in self._cache_configs:
                 continue  # 跳過未配置的快取類型
-            count = await self._invalidate_by_patterns(cache_type, patterns)
+            count = await self._invalidate_by_tags(cache_type, tags)
             invalidated_count += count
 
         logger.info(f"分類 {category_id} 相關快取已失效: {invalidated_count} 項")
@@ -480,6 +474,9 @@ class CacheManager:
                     await self._cleanup_task
             logger.info("快取管理器已停止")
 
+        for store in self._unique_l2_stores():
+            await store.close()
+
     # =============================================================================
     # 內部實作方法
     # =============================================================================
@@ -513,21 +510,38 @@ class CacheManager:
         """初始化 L1 記憶體快取."""
         for cache_type, config in self._cache_configs.items():
             if config.ttl_seconds > 0:
-                cache = TTLCache(maxsize=config.max_size, ttl=config.ttl_seconds)
+                cache = TaggedTTLCache(
+                    maxsize=config.max_size,
+                    ttl=config.ttl_seconds,
+                    tagger=self._tags_for_entry,
+                )
             else:
-                cache = LRUCache(maxsize=config.max_size)
+                cache = TaggedLRUCache(
+                    maxsize=config.max_size, tagger=self._tags_for_entry
+                )
 
             self._l1_caches[cache_type] = cache
 
         logger.debug("L1 記憶體快取初始化完成")
 
-    def _init_l2_cache_files(self) -> None:
-        """初始化 L2 檔案快取路徑."""
-        for cache_type in self._cache_configs:
-            cache_file = self._cache_dir / f"{cache_type.value}.cache"
-            self._l2_cache_files[cache_type] = cache_file
+    def _init_l2_stores(self) -> None:
+        """初始化 L2 鍵值快取(相同路徑的快取類型共用一個資料庫)."""
+        stores: dict[Path, L2CacheStore] = {}
+        for cache_type, config in self._cache_configs.items():
+            path = (
+                Path(config.l2_cache_path)
+                if config.l2_cache_path
+                else self._cache_dir / L2_CACHE_FILENAME
+            )
+            if path not in stores:
+                stores[path] = L2CacheStore(path)
+            self._l2_stores[cache_type] = stores[path]
 
-        logger.debug("L2 檔案快取路徑初始化完成")
+        logger.debug("L2 鍵值快取初始化完成")
+
+    def _unique_l2_stores(self) -> list[L2CacheStore]:
+        """取得不重複的 L2 快取實例."""
+        return list({id(store): store for store in self._l2_stores.values()}.values())
 
     def _init_stats(self) -> None:
         """初始化快取統計."""
@@ -535,175 +549,64 @@ class CacheManager:
             self._stats[cache_type] = CacheStats(last_reset=datetime.now())
 
     async def _get_from_l2_cache(self, cache_type: CacheType, key: str) -> Any:
-        """從 L2 檔案快取取得值."""
-        try:
-            cache_file = self._l2_cache_files[cache_type]
-            if not cache_file.exists():
-                return None
-
-            # 載入整個快取檔案
-            with cache_file.open("rb") as f:
-                cache_data = pickle.load(f)
-
-            # 檢查項目是否存在且未過期
-            if key in cache_data:
-                item = cache_data[key]
-                if item["expires_at"] > time.time():
-                    return item["value"]
-                else:
-                    # 項目已過期,刪除它
-                    del cache_data[key]
-                    with cache_file.open("wb") as f:
-                        pickle.dump(cache_data, f)
-
-            return None
-
-        except Exception as e:
-            logger.warning(f"L2 快取讀取失敗 {cache_type.value}:{key}: {e}")
-            return None
+        """從 L2 快取取得值."""
+        return await self._l2_stores[cache_type].get(cache_type.value, key)
 
     async def _set_to_l2_cache(
         self, cache_type: CacheType, key: str, value: Any, ttl_seconds: int
     ) -> None:
-        """設定值到 L2 檔案快取."""
-        try:
-            cache_file = self._l2_cache_files[cache_type]
-
-            # 載入現有快取資料
-            cache_data = {}
-            if cache_file.exists():
-                try:
-                    with cache_file.open("rb") as f:
-                        cache_data = pickle.load(f)
-                except Exception:
-                    cache_data = {}
-
-            # 設定新項目
-            cache_data[key] = {
-                "value": value,
-                "expires_at": time.time() + ttl_seconds,
-                "created_at": time.time(),
-            }
-
-            # 寫回檔案
-            with cache_file.open("wb") as f:
-                pickle.dump(cache_data, f)
-
-        except Exception as e:
-            logger.warning(f"L2 快取寫入失敗 {cache_type.value}:{key}: {e}")
+        """設定值到 L2 快取."""
+        await self._l2_stores[cache_type].set(
+            cache_type.value, key, value, ttl_seconds, self._tags_for_entry(key, value)
+        )
 
     async def _delete_from_l2_cache(self, cache_type: CacheType, key: str) -> bool:
-        """從 L2 檔案快取刪除項目."""
-        try:
-            cache_file = self._l2_cache_files[cache_type]
-            if not cache_file.exists():
-                return False
-
-            with cache_file.open("rb") as f:
-                cache_data = pickle.load(f)
-
-            if key in cache_data:
-                del cache_data[key]
-                with cache_file.open("wb") as f:
-                    pickle.dump(cache_data, f)
-                return True
-
-            return False
-
-        except Exception as e:
-            logger.warning(f"L2 快取刪除失敗 {cache_type.value}:{key}: {e}")
-            return False
+        """從 L2 快取刪除項目."""
+        return await self._l2_stores[cache_type].delete(cache_type.value, key)
 
     async def _clear_l2_cache(self, cache_type: CacheType) -> None:
-        """清空 L2 檔案快取."""
-        try:
-            cache_file = self._l2_cache_files[cache_type]
-            if cache_file.exists():
-                cache_file.unlink()
-        except Exception as e:
-            logger.warning(f"L2 快取清空失敗 {cache_type.value}: {e}")
-
-    async def _invalidate_by_patterns(
-        self, cache_type: CacheType, patterns: list[str]
-    ) -> int:
-        """根據模式失效快取項目."""
+        """清空 L2 快取."""
+        await self._l2_stores[cache_type].clear(cache_type.value)
+
+    async def _invalidate_by_tags(self, cache_type: CacheType, tags: list[str]) -> int:
+        """使帶有任一標籤的快取項目失效."""
         invalidated_count = 0
 
-        # L1 快取失效
+        # L1 快取失效(經由標籤索引,只處理受影響的項目)
         l1_cache = self._l1_caches.get(cache_type)
-        if l1_cache:
-            keys_to_remove = []
-            for key in l1_cache:
-                for pattern in patterns:
-                    if pattern in key:
-                        keys_to_remove.append(key)
-                        break
-
-            for key in keys_to_remove:
-                del l1_cache[key]
-                invalidated_count += 1
-
+        if l1_cache is not None:
+            invalidated_count += len(l1_cache.invalidate_tags(tags))
             self._stats[cache_type].size = len(l1_cache)
 
         # L2 快取失效
         config = self._cache_configs.get(cache_type)
         if config and config.enable_l2_cache:
-            l2_count = await self._invalidate_l2_by_patterns(cache_type, patterns)
-            invalidated_count += l2_count
+            invalidated_count += await self._l2_stores[cache_type].delete_tagged(
+                cache_type.value, tags
+            )
 
         return invalidated_count
 
-    async def _invalidate_l2_by_patterns(
-        self, cache_type: CacheType, patterns: list[str]
-    ) -> int:
-        """根據模式失效 L2 快取項目."""
-        try:
-            cache_file = self._l2_cache_files[cache_type]
-            if not cache_file.exists():
-                return 0
-
-            with cache_file.open("rb") as f:
-                cache_data = pickle.load(f)
-
-            keys_to_remove = []
-            for key in cache_data:
-                for pattern in patterns:
-                    if pattern in key:
-                        keys_to_remove.append(key)
-                        break
-
-            for key in keys_to_remove:
-                del cache_data[key]
-
-            if keys_to_remove:
-                with cache_file.open("wb") as f:
-                    pickle.dump(cache_data, f)
-
-            return len(keys_to_remove)
-
-        except Exception as e:
-            logger.warning(f"L2 快取模式失效失敗 {cache_type.value}: {e}")
-            return 0
-
-    def _track_invalidation_keys(
-        self, _cache_type: CacheType, key: str, value: Any
-    ) -> None:
-        """追蹤快取項目的失效鍵."""
-        # 根據值的類型提取失效鍵
-        invalidation_keys = set()
-
-        if isinstance(value, Achievement | dict) and hasattr(value, "id"):
-            invalidation_keys.add(f"achievement:{value.id}")
-            if hasattr(value, "category_id"):
-                invalidation_keys.add(f"category:{value.category_id}")
-
-        elif isinstance(value, UserAchievement | dict) and hasattr(value, "user_id"):
-            invalidation_keys.add(f"user:{value.user_id}")
-            if hasattr(value, "achievement_id"):
-                invalidation_keys.add(f"achievement:{value.achievement_id}")
-
-        # 記錄失效追蹤
-        self._invalidation_keys[key] = invalidation_keys
+    @staticmethod
+    def _tags_for_entry(key: str, value: Any) -> frozenset[str]:
+        """取得快取項目的標籤(來自快取鍵與值)."""
+        tags = set(tags_for_key(key))
+
+        if isinstance(value, Achievement):
+            tags.add(achievement_tag(value.id))
+            tags.add(category_tag(value.category_id))
+        elif isinstance(value, UserAchievement):
+            tags.add(user_tag(value.user_id))
+            tags.add(achievement_tag(value.achievement_id))
+        elif isinstance(value, dict):
+            if value.get("user_id") is not None:
+                tags.add(user_tag(value["user_id"]))
+            if value.get("achievement_id") is not None:
+                tags.add(achievement_tag(value["achievement_id"]))
+            if value.get("category_id") is not None:
+                tags.add(category_tag(value["category_id"]))
+
+        return frozenset(tags)
 
     def _generate_cache_key(self, *parts: Any) -> str:
         """生成快取鍵."""
@@ -724,35 +627,10 @@ class CacheManager:
                 await asyncio.sleep(60)
 
     async def _cleanup_expired_l2_cache(self) -> None:
-        """清理過期的 L2 快取項目."""
-        current_time = time.time()
+        """依批次清理過期的 L2 快取項目."""
         cleaned_count = 0
-
-        for cache_type, cache_file in self._l2_cache_files.items():
-            try:
-                if not cache_file.exists():
-                    continue
-
-                with cache_file.open("rb") as f:
-                    cache_data = pickle.load(f)
-
-                # 找出過期項目
-                expired_keys = []
-                for key, item in cache_data.items():
-                    if item["expires_at"] <= current_time:
-                        expired_keys.append(key)
-
-                # 刪除過期項目
-                if expired_keys:
-                    for key in expired_keys:
-                        del cache_data[key]
-                        cleaned_count += 1
-
-                    with cache_file.open("wb") as f:
-                        pickle.dump(cache_data, f)
-
-            except Exception as e:
-                logger.warning(f"L2 快取清理失敗 {cache_type.value}: {e}")
+        for store in self._unique_l2_stores():
+            cleaned_count += await store.purge_expired()
 
         if cleaned_count > 0:
             logger.debug(f"L2 快取清理完成: {cleaned_count} 項過期項目")
@@ -15,8 +15,6 @@ from __future__ import annotations
 import logging
 from typing import Any, TypeVar
 
-from cachetools import TTLCache
-
 from ..constants import CRITICAL_USAGE_RATE, WARNING_USAGE_RATE
 from .cache_config_manager import CacheConfigManager, CacheConfigUpdate
 from .cache_strategy import (
@@ -24,6 +22,7 @@ from .cache_strategy import (
     CacheInvalidationManager,
     PerformanceOptimizer,
 )
+from .cache_tags import TaggedTTLCache
 
 logger = logging.getLogger(__name__)
 
@@ -38,7 +37,7 @@ class AchievementCacheService:
 
     def __init__(self):
         """初始化快取服務."""
-        self._caches: dict[str, TTLCache] = {}
+        self._caches: dict[str, TaggedTTLCache] = {}
         self._strategy = AchievementCacheStrategy()
         self._invalidation_manager = CacheInvalidationManager()
         self._performance_optimizer = PerformanceOptimizer()
@@ -70,7 +69,7 @@ class AchievementCacheService:
             try:
                 config = self._strategy.get_config(cache_type)
                 if config.enabled:
-                    self._caches[cache_type] = TTLCache(
+                    self._caches[cache_type] = TaggedTTLCache(
                         maxsize=config.maxsize, ttl=config.ttl
                     )
                     initialized_count += 1
@@ -113,7 +112,7 @@ class AchievementCacheService:
             # 重新初始化
             config = self._strategy.get_config(cache_type)
             if config.enabled:
-                self._caches[cache_type] = TTLCache(
+                self._caches[cache_type] = TaggedTTLCache(
                     maxsize=config.maxsize, ttl=config.ttl
                 )
                 logger.info(f"快取重新初始化成功: {cache_type}")
@@ -306,6 +305,28 @@ class AchievementCacheService:
 
         return self._invalidation_manager.invalidate_patterns(cache, patterns)
 
+    def invalidate_by_tags(self, cache_type: str, tags: list[str]) -> int:
+        """無效化帶有任一標籤的快取項目.
+
+        Args:
+            cache_type: 快取類型
+            tags: 標籤列表(例如 user:123、achievement:45、kind:leaderboard)
+
+        Returns:
+            無效化的項目數量
+        """
+        cache = self._caches.get(cache_type)
+        if cache is None:
+            return 0
+
+        removed = cache.invalidate_tags(tags)
+        if removed:
+            logger.debug(
+                f"快取標籤無效化完成: {cache_type}",
+                extra={"tags": tags, "removed_count": len(removed)},
+            )
+        return len(removed)
+
     def clear_cache(self, cache_type: str) -> None:
         """清除特定類型的快取.
 
@@ -407,7 +428,7 @@ class AchievementCacheService:
                 old_data = dict(old_cache) if old_cache else {}
 
                 # 創建新快取
-                new_cache = TTLCache(maxsize=maxsize, ttl=ttl)
+                new_cache = TaggedTTLCache(maxsize=maxsize, ttl=ttl)
 
                 # 遷移可能的資料
                 for key, value in old_data.items():
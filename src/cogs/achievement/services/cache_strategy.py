@@ -28,6 +28,7 @@ from ..constants import (
     POOR_HIT_RATE,
 )
 from .cache_key_standard import CacheKeyStandard, CacheKeyType
+from .cache_tags import TaggedCacheMixin, tags_for_pattern
 
 logger = logging.getLogger(__name__)
 
@@ -224,6 +225,9 @@ class CacheInvalidationManager:
     def invalidate_patterns(self, cache: Any, patterns: list[str]) -> int:
         """根據模式無效化快取項目.
 
+        帶標籤索引的快取將每個模式轉換為標籤,只取得符合的項目;
+        其他快取逐一比對快取鍵值.
+
         Args:
             cache: 快取物件
             patterns: 無效化模式列表
@@ -234,12 +238,18 @@ class CacheInvalidationManager:
         if not patterns:
             return 0
 
-        keys_to_remove = []
-
-        # 尋找匹配的快取鍵值
-        for key in cache:
-            if any(pattern in key for pattern in patterns):
-                keys_to_remove.append(key)
+        if isinstance(cache, TaggedCacheMixin):
+            keys_to_remove = set()
+            for pattern in patterns:
+                keys_to_remove |= cache.tag_index.keys_with_all(
+                    tags_for_pattern(pattern)
+                )
+            keys_to_remove = list(keys_to_remove)
+        else:
+            # 尋找匹配的快取鍵值
+            keys_to_remove = [
+                key for key in cache if any(pattern in key for pattern in patterns)
+            ]
 
         # 移除匹配的項目
         removed_count = 0
@@ -1,7 +1,7 @@
 """成就系統快取同步管理器.
 
 此模組提供成就系統操作後的快取同步功能,包含:
-- 智慧快取失效策略
+- 智慧快取失效策略(依標籤失效,例如 user:123、achievement:45)
 - 操作影響分析
 - 批量快取更新
 - 快取一致性保證
@@ -11,6 +11,8 @@
 
 from __future__ import annotations
 
+import inspect
+import itertools
 import logging
 from dataclasses import dataclass, field
 from datetime import datetime
@@ -22,6 +24,13 @@ from ..constants import DEFAULT_BATCH_SIZE, MIN_BATCH_SIZE
 
 logger = logging.getLogger(__name__)
 
+# 標籤模板中的佔位符 → CacheEvent 的 ID 集合屬性
+_TAG_FIELDS = {
+    "user_id": "user_ids",
+    "achievement_id": "achievement_ids",
+    "category_id": "category_ids",
+}
+
 
 class CacheEventType(Enum):
     """快取事件類型枚舉."""
@@ -53,7 +62,7 @@ class CacheInvalidationPlan:
     """快取失效計劃."""
 
     plan_id: str
-    cache_keys_by_type: dict[str, set[str]] = field(default_factory=dict)
+    cache_tags_by_type: dict[str, set[str]] = field(default_factory=dict)
     estimated_impact: int = 0
     priority: int = 1  # 1=highest, 5=lowest
     batch_size: int = 100
@@ -100,13 +109,10 @@ class CacheSyncManager:
                     "global_stats",
                     "leaderboard",
                 ],
-                "key_patterns": [
-                    "user_achievements:{user_id}",
-                    "user_progress:{user_id}",
-                    "global_stats:total_achievements",
-                    "global_stats:users_with_achievements",
-                    "leaderboard:points",
-                    "leaderboard:achievement_count",
+                "tags": [
+                    "user:{user_id}",
+                    "kind:global_stats",
+                    "kind:leaderboard",
                 ],
                 "priority": 1,
                 "batch_friendly": True,
@@ -118,13 +124,10 @@ class CacheSyncManager:
                     "global_stats",
                     "leaderboard",
                 ],
-                "key_patterns": [
-                    "user_achievements:{user_id}",
-                    "user_progress:{user_id}",
-                    "global_stats:total_achievements",
-                    "global_stats:users_with_achievements",
-                    "leaderboard:points",
-                    "leaderboard:achievement_count",
+                "tags": [
+                    "user:{user_id}",
+                    "kind:global_stats",
+                    "kind:leaderboard",
                 ],
                 "priority": 1,
                 "batch_friendly": True,
@@ -134,10 +137,8 @@ class CacheSyncManager:
                     "user_progress",
                     "user_achievements",  # 可能觸發成就解鎖
                 ],
-                "key_patterns": [
-                    "user_progress:{user_id}",
-                    "user_progress:{user_id}:{achievement_id}",
-                    "user_achievements:{user_id}",  # 預防性失效
+                "tags": [
+                    "user:{user_id}",  # 用戶進度與成就(可能觸發成就解鎖)
                 ],
                 "priority": 2,
                 "batch_friendly": True,
@@ -149,12 +150,10 @@ class CacheSyncManager:
                     "global_stats",
                     "leaderboard",
                 ],
-                "key_patterns": [
-                    "user_achievements:{user_id}",
-                    "user_progress:{user_id}",
-                    "user_*:{user_id}",  # 通配符模式
-                    "global_stats:*",
-                    "leaderboard:*",
+                "tags": [
+                    "user:{user_id}",
+                    "kind:global_stats",
+                    "kind:leaderboard",
                 ],
                 "priority": 1,
                 "batch_friendly": False,  # 影響範圍大,不適合批量
@@ -166,11 +165,10 @@ class CacheSyncManager:
                     "global_stats",
                     "leaderboard",
                 ],
-                "key_patterns": [
-                    "user_achievements:{user_id}",
-                    "user_progress:{user_id}",
-                    "global_stats:*",
-                    "leaderboard:*",
+                "tags": [
+                    "user:{user_id}",
+                    "kind:global_stats",
+                    "kind:leaderboard",
                 ],
                 "priority": 1,
                 "batch_friendly": True,  # 專為批量操作設計
@@ -181,11 +179,11 @@ class CacheSyncManager:
                     "user_achievements",  # 可能影響已獲得的成就
                     "global_stats",
                 ],
-                "key_patterns": [
+                "tags": [
                     "achievement:{achievement_id}",
-                    "achievement:list",
-                    "achievement:by_category:{category_id}",
-                    "global_stats:achievement_count",
+                    "category:{category_id}",
+                    "kind:achievements",
+                    "kind:global_stats",
                 ],
                 "priority": 2,
                 "batch_friendly": False,
@@ -195,10 +193,9 @@ class CacheSyncManager:
                     "category",
                     "achievement",  # 分類下的成就可能受影響
                 ],
-                "key_patterns": [
+                "tags": [
                     "category:{category_id}",
-                    "category:list",
-                    "achievement:by_category:{category_id}",
+                    "kind:categories",
                 ],
                 "priority": 3,
                 "batch_friendly": False,
@@ -260,15 +257,12 @@ class CacheSyncManager:
 
         plan.priority = rule["priority"]
 
-        # 生成需要失效的快取鍵
-        for cache_type in rule["affected_cache_types"]:
-            cache_keys = self._generate_cache_keys(
-                cache_type, rule["key_patterns"], event
-            )
-
-            if cache_keys:
-                plan.cache_keys_by_type[cache_type] = cache_keys
-                plan.estimated_impact += len(cache_keys)
+        # 生成需要失效的標籤
+        cache_tags = self._generate_cache_tags(rule["tags"], event)
+        if cache_tags:
+            for cache_type in rule["affected_cache_types"]:
+                plan.cache_tags_by_type[cache_type] = cache_tags
+                plan.estimated_impact += len(cache_tags)
 
         # 設置批量大小
         if rule.get("batch_friendly", False) and len(event.user_ids) > MIN_BATCH_SIZE:
@@ -280,7 +274,7 @@ class CacheSyncManager:
             "[快取同步]快取影響分析完成",
             extra={
                 "event_type": event.event_type.value,
-                "affected_cache_types": len(plan.cache_keys_by_type),
+                "affected_cache_types": len(plan.cache_tags_by_type),
                 "estimated_impact": plan.estimated_impact,
                 "priority": plan.priority,
             },
@@ -288,60 +282,34 @@ class CacheSyncManager:
 
         return plan
 
-    def _generate_cache_keys(
-        self, _cache_type: str, key_patterns: list[str], event: CacheEvent
+    def _generate_cache_tags(
+        self, tag_templates: list[str], event: CacheEvent
     ) -> set[str]:
-        """生成需要失效的快取鍵.
+        """依事件涉及的 ID 展開標籤模板.
+
+        模板中每個佔位符以事件對應的 ID 集合展開(多個佔位符取組合);
+        事件沒有對應 ID 的模板不產生標籤.
 
         Args:
-            _cache_type: 快取類型(未使用)
-            key_patterns: 鍵值模式列表
+            tag_templates: 標籤模板列表,例如 user:{user_id}
             event: 快取事件
 
         Returns:
-            Set[str]: 快取鍵集合
+            Set[str]: 標籤集合
         """
-        cache_keys = set()
-
-        for pattern in key_patterns:
-            # 替換用戶ID
-            if "{user_id}" in pattern:
-                for user_id in event.user_ids:
-                    key = pattern.format(user_id=user_id)
-                    cache_keys.add(key)
-
-            # 替換成就ID
-            elif "{achievement_id}" in pattern:
-                for achievement_id in event.achievement_ids:
-                    key = pattern.format(achievement_id=achievement_id)
-                    cache_keys.add(key)
-
-                    # 如果還包含用戶ID,需要組合生成
-                    if "{user_id}" in key:
-                        for user_id in event.user_ids:
-                            combined_key = key.format(user_id=user_id)
-                            cache_keys.add(combined_key)
-
-            # 替換分類ID
-            elif "{category_id}" in pattern:
-                for category_id in event.category_ids:
-                    key = pattern.format(category_id=category_id)
-                    cache_keys.add(key)
-
-            # 通配符模式
-            elif "*" in pattern:
-                if "{user_id}" in pattern:
-                    for user_id in event.user_ids:
-                        base_pattern = pattern.replace("{user_id}", str(user_id))
-                        cache_keys.add(base_pattern)
-                else:
-                    cache_keys.add(pattern)
-
-            # 直接模式
-            else:
-                cache_keys.add(pattern)
+        cache_tags = set()
+
+        for template in tag_templates:
+            fields = [name for name in _TAG_FIELDS if f"{{{name}}}" in template]
+            if not fields:
+                cache_tags.add(template)
+                continue
 
-        return cache_keys
+            id_sets = [getattr(event, _TAG_FIELDS[name]) for name in fields]
+            for ids in itertools.product(*id_sets):
+                cache_tags.add(template.format(**dict(zip(fields, ids, strict=True))))
+
+        return cache_tags
 
     async def _execute_invalidation_plan(self, plan: CacheInvalidationPlan) -> None:
         """執行快取失效計劃.
@@ -356,23 +324,24 @@ class CacheSyncManager:
         total_invalidated = 0
 
         try:
-            for cache_type, cache_keys in plan.cache_keys_by_type.items():
-                if not cache_keys:
+            for cache_type, cache_tags in plan.cache_tags_by_type.items():
+                if not cache_tags:
                     continue
 
                 # 批量處理
-                key_list = list(cache_keys)
-                for i in range(0, len(key_list), plan.batch_size):
-                    batch_keys = key_list[i : i + plan.batch_size]
+                tag_list = sorted(cache_tags)
+                for i in range(0, len(tag_list), plan.batch_size):
+                    batch_tags = tag_list[i : i + plan.batch_size]
 
                     try:
-                        await self._invalidate_cache_batch(cache_type, batch_keys)
-                        total_invalidated += len(batch_keys)
+                        total_invalidated += await self._invalidate_cache_batch(
+                            cache_type, batch_tags
+                        )
 
                     except Exception as e:
                         logger.error(
                             f"[快取同步]批量失效失敗 {cache_type}: {e}",
-                            extra={"batch_keys": batch_keys},
+                            extra={"batch_tags": batch_tags},
                         )
                         # 繼續處理其他批次
 
@@ -387,7 +356,7 @@ class CacheSyncManager:
                 extra={
                     "plan_id": plan.plan_id,
                     "total_invalidated": total_invalidated,
-                    "cache_types": len(plan.cache_keys_by_type),
+                    "cache_types": len(plan.cache_tags_by_type),
                 },
             )
 
@@ -398,27 +367,38 @@ class CacheSyncManager:
             raise
 
     async def _invalidate_cache_batch(
-        self, cache_type: str, cache_keys: list[str]
-    ) -> None:
-        """批量失效快取.
+        self, cache_type: str, cache_tags: list[str]
+    ) -> int:
+        """依標籤批量失效快取.
 
         Args:
             cache_type: 快取類型
-            cache_keys: 快取鍵列表
+            cache_tags: 標籤列表
+
+        Returns:
+            int: 失效的項目數量(快取服務不支援標籤時為處理的標籤數量)
         """
         try:
-            # 檢查快取服務是否支援批量失效
-            if hasattr(self.cache_service, "invalidate_batch"):
-                await self.cache_service.invalidate_batch(cache_type, cache_keys)
+            # 優先使用標籤索引失效,只處理受影響的項目
+            if hasattr(self.cache_service, "invalidate_by_tags"):
+                removed = self.cache_service.invalidate_by_tags(cache_type, cache_tags)
+                if inspect.isawaitable(removed):
+                    removed = await removed
+                invalidated = removed if isinstance(removed, int) else len(cache_tags)
+            elif hasattr(self.cache_service, "invalidate_batch"):
+                await self.cache_service.invalidate_batch(cache_type, cache_tags)
+                invalidated = len(cache_tags)
             else:
                 # 逐個失效
-                for cache_key in cache_keys:
-                    await self.cache_service.invalidate(cache_type, cache_key)
+                for cache_tag in cache_tags:
+                    await self.cache_service.invalidate(cache_type, cache_tag)
+                invalidated = len(cache_tags)
 
             logger.debug(
                 "[快取同步]批量快取失效完成",
-                extra={"cache_type": cache_type, "keys_count": len(cache_keys)},
+                extra={"cache_type": cache_type, "tags_count": len(cache_tags)},
             )
+            return invalidated
 
         except Exception as e:
             logger.error(f"[快取同步]批量快取失效失敗 {cache_type}: {e}")
@@ -539,11 +519,9 @@ class CacheSyncManager:
             if not self.cache_service:
                 return
 
-            # 直接失效全域統計相關的快取
-            global_cache_keys = ["global_stats:*", "leaderboard:*"]
-
-            for key_pattern in global_cache_keys:
-                await self.cache_service.invalidate("global_stats", key_pattern)
+            # 直接失效全域統計與排行榜快取
+            await self._invalidate_cache_batch("global_stats", ["kind:global_stats"])
+            await self._invalidate_cache_batch("leaderboard", ["kind:leaderboard"])
 
             logger.debug("[快取同步]全域統計快取失效完成")
 
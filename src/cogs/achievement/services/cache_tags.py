@@ -0,0 +1,305 @@
+"""成就系統快取標籤索引.
+
+快取項目在寫入時依快取鍵(與值)取得標籤,例如 user:123、achievement:45、
+category:7,以及代表鍵值種類的 kind:leaderboard;標籤記錄在反向索引中,
+失效時直接取得受影響的鍵,成本與受影響的項目數量成正比,而不是掃描整個快取.
+
+TaggedTTLCache / TaggedLRUCache 在刪除、LRU 淘汰與 TTL 過期時同步移除索引.
+"""
+
+from __future__ import annotations
+
+from itertools import pairwise
+from typing import TYPE_CHECKING, Any
+
+from cachetools import LRUCache, TTLCache
+
+from .cache_key_standard import CacheKeyStandard
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Hashable, Iterable
+
+# 快取鍵中代表實體 ID 的區段名稱 → 標籤名稱
+_ENTITY_SEGMENTS = {
+    "user": "user",
+    "user_achievements": "user",
+    "user_progress": "user",
+    "user_stats": "user",
+    "achievement": "achievement",
+    "category": "category",
+}
+
+# 標準快取鍵參數 → 標籤名稱
+_ENTITY_PARAMS = {
+    "user_id": "user",
+    "achievement_id": "achievement",
+    "category_id": "category",
+}
+
+_MISSING = object()
+
+
+def user_tag(user_id: Any) -> str:
+    """用戶標籤."""
+    return f"user:{user_id}"
+
+
+def achievement_tag(achievement_id: Any) -> str:
+    """成就標籤."""
+    return f"achievement:{achievement_id}"
+
+
+def category_tag(category_id: Any) -> str:
+    """分類標籤."""
+    return f"category:{category_id}"
+
+
+def kind_tag(kind: str) -> str:
+    """鍵值種類標籤(快取鍵的類型區段)."""
+    return f"kind:{kind}"
+
+
+def tags_for_key(key: str) -> frozenset[str]:
+    """依快取鍵取得標籤.
+
+    標準快取鍵(achievement:<類型>:...)依 CacheKeyStandard 解析參數;
+    其他鍵以第一個區段為種類,並將「實體名稱:ID」相鄰區段視為實體標籤.
+
+    Args:
+        key: 快取鍵
+
+    Returns:
+        標籤集合
+    """
+    key_type, params = CacheKeyStandard.parse_cache_key(key)
+    if key_type is not None:
+        tags = {kind_tag(key_type.value)}
+        for param, entity in _ENTITY_PARAMS.items():
+            if param in params:
+                tags.add(f"{entity}:{params[param]}")
+        return frozenset(tags)
+
+    parts = key.split(CacheKeyStandard.SEPARATOR)
+    kind = parts[0]
+    if kind == CacheKeyStandard.KEY_PREFIX and len(parts) > 1:
+        # 非標準類型的前綴鍵,例如 achievement:root_categories
+        if not parts[1].isdigit():
+            kind = parts[1]
+
+    tags = {kind_tag(kind)}
+    for name, value in pairwise(parts):
+        entity = _ENTITY_SEGMENTS.get(name)
+        if entity and value and value != "None":
+            tags.add(f"{entity}:{value}")
+    return frozenset(tags)
+
+
+def tags_for_pattern(pattern: str) -> frozenset[str]:
+    """將失效模式(鍵前綴,可帶 * 萬用字元)轉換為標籤.
+
+    符合模式的項目必須包含所有回傳的標籤.
+
+    Args:
+        pattern: 失效模式,例如 achievement:user_achievements:123:*
+
+    Returns:
+        標籤集合
+    """
+    prefix = pattern.rstrip("*").rstrip(CacheKeyStandard.SEPARATOR)
+    if not prefix:
+        return frozenset()
+    return tags_for_key(prefix)
+
+
+class TagIndex:
+    """標籤反向索引.
+
+    _keys[tag] 為帶有該標籤的鍵,_tags[key] 為鍵的標籤,
+    移除鍵時只需處理該鍵自己的標籤.
+    """
+
+    __slots__ = ("_keys", "_tags")
+
+    def __init__(self):
+        self._keys: dict[str, set[Hashable]] = {}
+        self._tags: dict[Hashable, frozenset[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._tags)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tags
+
+    def set(self, key: Hashable, tags: Iterable[str]) -> None:
+        """設定鍵的標籤(取代原有標籤).
+
+        Args:
+            key: 快取鍵
+            tags: 標籤
+        """
+        tags = frozenset(tags)
+        old = self._tags.get(key)
+        if old == tags:
+            return
+        if old:
+            self._unlink(key, old - tags)
+            tags_to_add = tags - old
+        else:
+            tags_to_add = tags
+        self._tags[key] = tags
+        for tag in tags_to_add:
+            self._keys.setdefault(tag, set()).add(key)
+
+    def discard(self, key: Hashable) -> None:
+        """移除鍵與其標籤.
+
+        Args:
+            key: 快取鍵
+        """
+        tags = self._tags.pop(key, None)
+        if tags:
+            self._unlink(key, tags)
+
+    def _unlink(self, key: Hashable, tags: Iterable[str]) -> None:
+        for tag in tags:
+            keys = self._keys.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys[tag]
+
+    def clear(self) -> None:
+        """清空索引."""
+        self._keys.clear()
+        self._tags.clear()
+
+    def tags_of(self, key: Hashable) -> frozenset[str]:
+        """取得鍵的標籤."""
+        return self._tags.get(key, frozenset())
+
+    def keys_with_any(self, tags: Iterable[str]) -> set[Hashable]:
+        """取得帶有任一標籤的鍵.
+
+        Args:
+            tags: 標籤
+
+        Returns:
+            鍵集合
+        """
+        keys: set[Hashable] = set()
+        for tag in tags:
+            keys.update(self._keys.get(tag, ()))
+        return keys
+
+    def keys_with_all(self, tags: Iterable[str]) -> set[Hashable]:
+        """取得帶有所有標籤的鍵(沒有標籤時為所有鍵).
+
+        從最小的集合開始取交集.
+
+        Args:
+            tags: 標籤
+
+        Returns:
+            鍵集合
+        """
+        tags = set(tags)
+        if not tags:
+            return set(self._tags)
+        candidates = sorted((self._keys.get(tag, set()) for tag in tags), key=len)
+        return candidates[0].intersection(*candidates[1:])
+
+
+class TaggedCacheMixin:
+    """為 cachetools 快取加上標籤索引.
+
+    寫入時以 tagger(key, value) 取得標籤;所有移除路徑(刪除、pop、
+    LRU 淘汰、TTL 過期、clear)都經過 __delitem__ 或 expire,並同步移除索引.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        tagger: Callable[[Any, Any], Iterable[str]] | None = None,
+        **kwargs: Any,
+    ):
+        super().__init__(*args, **kwargs)
+        self._tagger = tagger or (lambda key, _value: tags_for_key(key))
+        self._tag_index = TagIndex()
+
+    @property
+    def tag_index(self) -> TagIndex:
+        """標籤索引."""
+        return self._tag_index
+
+    def __setitem__(self, key: Any, value: Any) -> None:
+        super().__setitem__(key, value)
+        self._tag_index.set(key, self._tagger(key, value))
+
+    def __delitem__(self, key: Any) -> None:
+        try:
+            super().__delitem__(key)
+        finally:
+            self._tag_index.discard(key)
+
+    def clear(self) -> None:
+        """清空快取與索引."""
+        super().clear()
+        self._tag_index.clear()
+
+    def remove_keys(self, keys: Iterable[Any]) -> list[Any]:
+        """移除指定的鍵.
+
+        Args:
+            keys: 快取鍵
+
+        Returns:
+            實際移除的鍵(不包含已過期的項目)
+        """
+        removed = []
+        for key in keys:
+            if self.pop(key, _MISSING) is not _MISSING:
+                removed.append(key)
+            else:
+                # 已過期但尚未清除的項目,之後由 expire 移除
+                self._tag_index.discard(key)
+        return removed
+
+    def invalidate_tags(self, tags: Iterable[str]) -> list[Any]:
+        """移除帶有任一標籤的項目.
+
+        Args:
+            tags: 標籤
+
+        Returns:
+            移除的鍵
+        """
+        return self.remove_keys(self._tag_index.keys_with_any(tags))
+
+
+class TaggedTTLCache(TaggedCacheMixin, TTLCache):
+    """帶標籤索引的 TTLCache."""
+
+    def expire(self, time: float | None = None) -> list[tuple[Any, Any]]:
+        """移除過期項目並同步移除索引."""
+        expired = super().expire(time)
+        for key, _value in expired:
+            self._tag_index.discard(key)
+        return expired
+
+
+class TaggedLRUCache(TaggedCacheMixin, LRUCache):
+    """帶標籤索引的 LRUCache."""
+
+
+__all__ = [
+    "TagIndex",
+    "TaggedCacheMixin",
+    "TaggedLRUCache",
+    "TaggedTTLCache",
+    "achievement_tag",
+    "category_tag",
+    "kind_tag",
+    "tags_for_key",
+    "tags_for_pattern",
+    "user_tag",
+]
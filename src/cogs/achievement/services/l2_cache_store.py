@@ -0,0 +1,408 @@
+"""成就系統 L2 快取儲存.
+
+以單一 SQLite 檔案(WAL 模式)保存所有快取類型的項目:
+- 主鍵為 (cache_type, key),讀取、寫入與刪除只觸及單一項目
+- 項目的標籤記錄在 l2_cache_tags,依標籤失效只觸及受影響的項目;
+  刪除項目時由觸發器同步刪除標籤
+- expires_at 欄位建立索引,過期項目依批次清除
+- 所有 SQLite 操作在專屬的單一執行緒中執行,不阻塞事件迴圈
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import pickle
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable, Iterable
+    from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 每批清除的過期項目數量
+PURGE_BATCH_SIZE = 1000
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS l2_cache (
+    cache_type TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value BLOB NOT NULL,
+    expires_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (cache_type, key)
+);
+CREATE INDEX IF NOT EXISTS idx_l2_cache_expires_at ON l2_cache (expires_at);
+CREATE TABLE IF NOT EXISTS l2_cache_tags (
+    cache_type TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (cache_type, tag, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_l2_cache_tags_key ON l2_cache_tags (cache_type, key);
+CREATE TRIGGER IF NOT EXISTS trg_l2_cache_delete_tags AFTER DELETE ON l2_cache
+BEGIN
+    DELETE FROM l2_cache_tags WHERE cache_type = OLD.cache_type AND key = OLD.key;
+END;
+"""
+
+_SELECT_SQL = "SELECT value, expires_at FROM l2_cache WHERE cache_type = ? AND key = ?"
+_UPSERT_SQL = """
+INSERT INTO l2_cache (cache_type, key, value, expires_at, created_at)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (cache_type, key) DO UPDATE SET
+    value = excluded.value,
+    expires_at = excluded.expires_at,
+    created_at = excluded.created_at
+"""
+_DELETE_SQL = "DELETE FROM l2_cache WHERE cache_type = ? AND key = ?"
+_DELETE_TAGS_SQL = "DELETE FROM l2_cache_tags WHERE cache_type = ? AND key = ?"
+_INSERT_TAG_SQL = (
+    "INSERT OR IGNORE INTO l2_cache_tags (cache_type, tag, key) VALUES (?, ?, ?)"
+)
+_DELETE_TAGGED_SQL = """
+DELETE FROM l2_cache WHERE cache_type = ? AND key IN (
+    SELECT key FROM l2_cache_tags WHERE cache_type = ? AND tag IN ({tags})
+)
+"""
+_CLEAR_SQL = "DELETE FROM l2_cache WHERE cache_type = ?"
+_PURGE_SQL = """
+DELETE FROM l2_cache WHERE rowid IN (
+    SELECT rowid FROM l2_cache WHERE expires_at <= ? LIMIT ?
+)
+"""
+
+
+class L2CacheStore:
+    """SQLite 鍵值 L2 快取.
+
+    連線在專屬執行緒中延遲建立,所有操作依序在該執行緒執行;
+    值在呼叫端序列化,反序列化在執行緒中進行.
+    """
+
+    def __init__(self, db_path: Path, purge_batch_size: int = PURGE_BATCH_SIZE):
+        """初始化 L2 快取儲存.
+
+        Args:
+            db_path: SQLite 檔案路徑
+            purge_batch_size: 每批清除的過期項目數量
+        """
+        self._db_path = db_path
+        self._purge_batch_size = purge_batch_size
+        self._conn: sqlite3.Connection | None = None
+        self._executor: ThreadPoolExecutor | None = None
+
+        self.stats = {
+            "reads": 0,
+            "hits": 0,
+            "writes": 0,
+            "deletes": 0,
+            "purged": 0,
+            "errors": 0,
+        }
+
+    # =============================================================================
+    # 執行緒與連線
+    # =============================================================================
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        """在專屬執行緒中執行 SQLite 操作."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="achievement-l2-cache"
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _connection(self) -> sqlite3.Connection:
+        """取得連線(僅在專屬執行緒中呼叫)."""
+        if self._conn is None:
+            self._db_path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(self._db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(_SCHEMA_SQL)
+            self._conn = conn
+        return self._conn
+
+    def _close_connection(self) -> None:
+        """關閉連線(僅在專屬執行緒中呼叫)."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    async def close(self) -> None:
+        """關閉連線並結束專屬執行緒."""
+        if self._executor is None:
+            return
+        try:
+            await self._run(self._close_connection)
+        finally:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    # =============================================================================
+    # 快取操作
+    # =============================================================================
+
+    async def get(self, cache_type: str, key: str) -> Any:
+        """取得未過期的項目.
+
+        Args:
+            cache_type: 快取類型
+            key: 快取鍵
+
+        Returns:
+            快取的值,不存在、已過期或無法反序列化時為 None
+        """
+        self.stats["reads"] += 1
+        try:
+            value = await self._run(self._get, cache_type, key, time.time())
+        except Exception as e:
+            self.stats["errors"] += 1
+            logger.warning(f"L2 快取讀取失敗 {cache_type}:{key}: {e}")
+            return None
+
+        if value is not None:
+            self.stats["hits"] += 1
+        return value
+
+    def _get(self, cache_type: str, key: str, now: float) -> Any:
+        row = self._connection().execute(_SELECT_SQL, (cache_type, key)).fetchone()
+        if row is None or row[1] <= now:
+            # 過期項目留給批次清除
+            return None
+        return pickle.loads(row[0])
+
+    async def set(
+        self,
+        cache_type: str,
+        key: str,
+        value: Any,
+        ttl_seconds: float,
+        tags: Iterable[str] = (),
+    ) -> bool:
+        """寫入項目.
+
+        Args:
+            cache_type: 快取類型
+            key: 快取鍵
+            value: 快取值(必須可被 pickle)
+            ttl_seconds: 存活時間(秒)
+            tags: 項目的標籤(取代原有標籤)
+
+        Returns:
+            是否成功寫入
+        """
+        tags = tuple(tags)
+        written = await self.set_many(
+            cache_type, [(key, value)], ttl_seconds, lambda _key, _value: tags
+        )
+        return written == 1
+
+    async def set_many(
+        self,
+        cache_type: str,
+        items: Iterable[tuple[str, Any]],
+        ttl_seconds: float,
+        tagger: Callable[[str, Any], Iterable[str]] | None = None,
+    ) -> int:
+        """在一個交易中寫入多個項目.
+
+        Args:
+            cache_type: 快取類型
+            items: (快取鍵, 值) 序列
+            ttl_seconds: 存活時間(秒)
+            tagger: 取得項目標籤的函數,None 表示不帶標籤
+
+        Returns:
+            成功寫入的項目數量
+        """
+        now = time.time()
+        rows = []
+        tag_rows = []
+        for key, value in items:
+            try:
+                blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            except (pickle.PicklingError, TypeError, AttributeError) as e:
+                self.stats["errors"] += 1
+                logger.warning(f"L2 快取序列化失敗 {cache_type}:{key}: {e}")
+                continue
+            rows.append((cache_type, key, blob, now + ttl_seconds, now))
+            if tagger is not None:
+                tag_rows.extend((cache_type, tag, key) for tag in tagger(key, value))
+
+        if not rows:
+            return 0
+        try:
+            await self._run(self._write_entries, rows, tag_rows)
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            logger.warning(f"L2 快取寫入失敗 {cache_type}: {e}")
+            return 0
+
+        self.stats["writes"] += len(rows)
+        return len(rows)
+
+    async def delete(self, cache_type: str, key: str) -> bool:
+        """刪除項目.
+
+        Args:
+            cache_type: 快取類型
+            key: 快取鍵
+
+        Returns:
+            是否有項目被刪除
+        """
+        return await self.delete_many(cache_type, [key]) > 0
+
+    async def delete_many(self, cache_type: str, keys: Iterable[str]) -> int:
+        """在一個交易中刪除多個項目.
+
+        Args:
+            cache_type: 快取類型
+            keys: 快取鍵
+
+        Returns:
+            被刪除的項目數量
+        """
+        rows = [(cache_type, key) for key in keys]
+        if not rows:
+            return 0
+        try:
+            deleted = await self._run(self._write, _DELETE_SQL, rows)
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            logger.warning(f"L2 快取刪除失敗 {cache_type}: {e}")
+            return 0
+
+        self.stats["deletes"] += deleted
+        return deleted
+
+    def _write(self, sql: str, rows: list[tuple]) -> int:
+        conn = self._connection()
+        with conn:
+            return conn.executemany(sql, rows).rowcount
+
+    def _write_entries(self, rows: list[tuple], tag_rows: list[tuple]) -> None:
+        conn = self._connection()
+        with conn:
+            conn.executemany(_UPSERT_SQL, rows)
+            # 覆寫項目時不會觸發刪除觸發器,先移除原有標籤
+            conn.executemany(_DELETE_TAGS_SQL, [(row[0], row[1]) for row in rows])
+            conn.executemany(_INSERT_TAG_SQL, tag_rows)
+
+    async def delete_tagged(self, cache_type: str, tags: Iterable[str]) -> int:
+        """刪除帶有任一標籤的項目.
+
+        Args:
+            cache_type: 快取類型
+            tags: 標籤
+
+        Returns:
+            被刪除的項目數量
+        """
+        tags = list(dict.fromkeys(tags))
+        if not tags:
+            return 0
+        sql = _DELETE_TAGGED_SQL.format(tags=", ".join("?" * len(tags)))
+        try:
+            deleted = await self._run(
+                self._execute, sql, (cache_type, cache_type, *tags)
+            )
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            logger.warning(f"L2 快取標籤失效失敗 {cache_type}: {e}")
+            return 0
+
+        self.stats["deletes"] += deleted
+        return deleted
+
+    async def clear(self, cache_type: str) -> None:
+        """清空快取類型的所有項目.
+
+        Args:
+            cache_type: 快取類型
+        """
+        try:
+            await self._run(self._execute, _CLEAR_SQL, (cache_type,))
+        except sqlite3.Error as e:
+            self.stats["errors"] += 1
+            logger.warning(f"L2 快取清空失敗 {cache_type}: {e}")
+
+    def _execute(self, sql: str, parameters: tuple) -> int:
+        conn = self._connection()
+        with conn:
+            return conn.execute(sql, parameters).rowcount
+
+    async def purge_expired(self) -> int:
+        """依批次清除過期項目.
+
+        每批一個交易,批次之間讓出執行緒,讀寫不需等待整個清除完成.
+
+        Returns:
+            清除的項目數量
+        """
+        now = time.time()
+        purged = 0
+        while True:
+            try:
+                deleted = await self._run(
+                    self._execute, _PURGE_SQL, (now, self._purge_batch_size)
+                )
+            except sqlite3.Error as e:
+                self.stats["errors"] += 1
+                logger.warning(f"L2 快取清理失敗: {e}")
+                break
+
+            purged += deleted
+            if deleted < self._purge_batch_size:
+                break
+
+        self.stats["purged"] += purged
+        return purged
+
+    async def count(self, cache_type: str | None = None) -> int:
+        """取得項目數量(包含尚未清除的過期項目).
+
+        Args:
+            cache_type: 快取類型,None 表示所有類型
+
+        Returns:
+            項目數量
+        """
+        if cache_type is None:
+            return await self._run(self._count, "SELECT COUNT(*) FROM l2_cache", ())
+        return await self._run(
+            self._count,
+            "SELECT COUNT(*) FROM l2_cache WHERE cache_type = ?",
+            (cache_type,),
+        )
+
+    def _count(self, sql: str, parameters: tuple) -> int:
+        return self._connection().execute(sql, parameters).fetchone()[0]
+
+    def get_stats(self) -> dict[str, Any]:
+        """取得 L2 快取統計.
+
+        Returns:
+            統計資訊
+        """
+        reads = self.stats["reads"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / max(reads, 1),
+            "path": str(self._db_path),
+        }
+
+
+__all__ = [
+    "PURGE_BATCH_SIZE",
+    "L2CacheStore",
+]
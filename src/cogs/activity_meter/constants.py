@@ -9,6 +9,13 @@ Activity Meter 模組常數定義
 CACHE_EXPIRY_SECONDS = 30  # 快取過期時間(秒)
 SECONDS_PER_HOUR = 3600  # 每小時的秒數
 PERFORMANCE_CHECK_INTERVAL = 3600  # 性能檢查間隔(秒)
+WRITE_BUFFER_FLUSH_INTERVAL = 2.0  # 寫入緩衝定時沖刷間隔(秒)
+WRITE_BUFFER_MAX_PENDING = 500  # 寫入緩衝觸發立即沖刷的用戶數
+
+# 併發與快取相關常數
+ACTIVITY_LOCK_STRIPES = 64  # 訊息處理分段鎖數量
+HOT_SCORE_CACHE_SIZE = 50000  # 熱點分數快取最大用戶數
+LEADERBOARD_SNAPSHOT_TTL = 60  # 排行榜快照有效時間(秒)
 
 # 時間驗證常數
 MAX_HOUR = 23  # 24小時制的最大小時數
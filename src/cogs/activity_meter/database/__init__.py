@@ -4,5 +4,6 @@
 """
 
 from .database import ActivityDatabase
+from .score_cache import HotScoreCache
 
-__all__ = ["ActivityDatabase"]
+__all__ = ["ActivityDatabase", "HotScoreCache"]
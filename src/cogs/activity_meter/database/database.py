@@ -14,6 +14,7 @@ from typing import Any
 from ...core.database_pool import get_global_pool
 from ..config import config
 from ..constants import CACHE_EXPIRY_SECONDS, MAX_HOUR, MAX_MINUTE
+from .score_cache import HotScoreCache
 
 logger = logging.getLogger("activity_meter")
 
@@ -44,6 +45,8 @@ class ActivityDatabase:
         self._pool = None  # 將使用全局連接池
         self._settings_cache = {}
         self._cache_time = {}
+        # meter 資料表的讀穿/寫穿熱點快取
+        self.score_cache = HotScoreCache()
 
     async def _get_pool(self):
         """獲取全局連接池實例"""
@@ -99,17 +102,23 @@ class ActivityDatabase:
         Returns:
             Tuple[float, int]: (活躍度分數, 最後訊息時間戳)
         """
+        cached = self.score_cache.get(guild_id, user_id)
+        if cached is not None:
+            return cached
+
         try:
             pool = await self._get_pool()
-            async with pool.get_connection_context(config.ACTIVITY_DB_PATH) as conn:
+            async with pool.get_connection_context(
+                config.ACTIVITY_DB_PATH, readonly=True
+            ) as conn:
                 cursor = await conn.execute(
                     "SELECT score, last_msg FROM meter WHERE guild_id=? AND user_id=?",
                     (guild_id, user_id),
                 )
                 row = await cursor.fetchone()
-                if row:
-                    return row[0], row[1]  # score, last_msg
-                return 0.0, 0
+                score, last_msg = (row[0], row[1]) if row else (0.0, 0)
+                self.score_cache.put(guild_id, user_id, score, last_msg)
+                return score, last_msg
         except Exception as e:
             logger.error(f"[活躍度]獲取用戶活躍度失敗: {e}")
             raise ActivityMeterError("E102", f"查詢用戶活躍度失敗: {e}") from e
@@ -134,6 +143,7 @@ class ActivityDatabase:
                     (guild_id, user_id, score, timestamp, score, timestamp),
                 )
                 await conn.commit()
+            self.score_cache.put(guild_id, user_id, score, timestamp)
         except Exception as e:
             logger.error(f"[活躍度]更新用戶活躍度失敗: {e}")
             raise ActivityMeterError("E102", f"更新用戶活躍度失敗: {e}") from e
@@ -177,7 +187,9 @@ class ActivityDatabase:
         """
         try:
             pool = await self._get_pool()
-            async with pool.get_connection_context(config.ACTIVITY_DB_PATH) as conn:
+            async with pool.get_connection_context(
+                config.ACTIVITY_DB_PATH, readonly=True
+            ) as conn:
                 cursor = await conn.execute(
                     "SELECT user_id, msg_cnt FROM daily WHERE ymd=? AND guild_id=? ORDER BY msg_cnt DESC LIMIT ?",
                     (ymd, guild_id, limit),
@@ -201,7 +213,9 @@ class ActivityDatabase:
         """
         try:
             pool = await self._get_pool()
-            async with pool.get_connection_context(config.ACTIVITY_DB_PATH) as conn:
+            async with pool.get_connection_context(
+                config.ACTIVITY_DB_PATH, readonly=True
+            ) as conn:
                 cursor = await conn.execute(
                     "SELECT user_id, SUM(msg_cnt) as total FROM daily "
                     "WHERE ymd LIKE ? || '%' AND guild_id=? GROUP BY user_id",
@@ -242,7 +256,9 @@ class ActivityDatabase:
         """
         try:
             pool = await self._get_pool()
-            async with pool.get_connection_context(config.ACTIVITY_DB_PATH) as conn:
+            async with pool.get_connection_context(
+                config.ACTIVITY_DB_PATH, readonly=True
+            ) as conn:
                 cursor = await conn.execute(
                     "SELECT guild_id, channel_id FROM report_channel"
                 )
@@ -263,7 +279,9 @@ class ActivityDatabase:
             month_ago = now - timedelta(days=30)
 
             pool = await self._get_pool()
-            async with pool.get_connection_context(config.ACTIVITY_DB_PATH) as conn:
+            async with pool.get_connection_context(
+                config.ACTIVITY_DB_PATH, readonly=True
+            ) as conn:
                 cursor = await conn.execute(
                     """
                 SELECT user_id, AVG(score) as avg_score, COUNT(*) as message_count
@@ -296,7 +314,9 @@ class ActivityDatabase:
             )
 
             pool = await self._get_pool()
-            async with pool.get_connection_context(config.ACTIVITY_DB_PATH) as conn:
+            async with pool.get_connection_context(
+                config.ACTIVITY_DB_PATH, readonly=True
+            ) as conn:
                 cursor = await conn.execute(
                     """
                 SELECT COUNT(*) as message_count
@@ -323,7 +343,9 @@ class ActivityDatabase:
             start_of_last_month = (start_of_month - timedelta(days=1)).replace(day=1)
 
             pool = await self._get_pool()
-            async with pool.get_connection_context(config.ACTIVITY_DB_PATH) as conn:
+            async with pool.get_connection_context(
+                config.ACTIVITY_DB_PATH, readonly=True
+            ) as conn:
                 cursor = await conn.execute(
                     """
                 SELECT COUNT(*) as message_count
@@ -718,7 +740,9 @@ class ActivityDatabase:
         """
         try:
             pool = await self._get_pool()
-            async with pool.get_connection_context(config.ACTIVITY_DB_PATH) as conn:
+            async with pool.get_connection_context(
+                config.ACTIVITY_DB_PATH, readonly=True
+            ) as conn:
                 cursor = await conn.execute(
                     "SELECT user_id, score, last_msg FROM meter WHERE guild_id=?",
                     (guild_id,),
@@ -755,6 +779,7 @@ class ActivityDatabase:
                     ],
                 )
                 await conn.commit()
+            self.score_cache.put_many(updates)
 
             logger.info(f"[活躍度]批量更新完成: {len(updates)} 筆記錄")
 
@@ -777,7 +802,9 @@ class ActivityDatabase:
         """
         try:
             pool = await self._get_pool()
-            async with pool.get_connection_context(config.ACTIVITY_DB_PATH) as conn:
+            async with pool.get_connection_context(
+                config.ACTIVITY_DB_PATH, readonly=True
+            ) as conn:
                 cursor = await conn.execute(
                     "SELECT user_id, msg_cnt FROM daily WHERE ymd=? AND guild_id=?",
                     (date_str, guild_id),
@@ -789,13 +816,14 @@ class ActivityDatabase:
             raise ActivityMeterError("E102", f"查詢每日訊息計數失敗: {e}") from e
 
     async def bulk_increment_daily_messages(
-        self, entries: list[tuple[str, int, int]]
+        self, entries: list[tuple[str, int, int] | tuple[str, int, int, int]]
     ) -> None:
         """
         批量增加每日訊息計數
 
         Args:
-            entries: 計數項目列表 [(ymd, guild_id, user_id), ...]
+            entries: 計數項目列表 [(ymd, guild_id, user_id), ...],
+                     可附帶第四個欄位作為增加的數量 (ymd, guild_id, user_id, count)
         """
         try:
             if not entries:
@@ -804,8 +832,8 @@ class ActivityDatabase:
             pool = await self._get_pool()
             async with pool.get_connection_context(config.ACTIVITY_DB_PATH) as conn:
                 await conn.executemany(
-                    "INSERT INTO daily VALUES(?,?,?,1) ON CONFLICT DO UPDATE SET msg_cnt = msg_cnt + 1",
-                    entries,
+                    "INSERT INTO daily VALUES(?,?,?,?) ON CONFLICT DO UPDATE SET msg_cnt = msg_cnt + excluded.msg_cnt",
+                    [entry if len(entry) == 4 else (*entry, 1) for entry in entries],
                 )
                 await conn.commit()
 
@@ -0,0 +1,128 @@
+"""
+活躍度熱點分數快取
+- 以 (guild_id, user_id) 為鍵保存最近使用的 (score, last_msg)
+- 由資料庫層讀穿/寫穿維護, 與 meter 資料表保持一致
+- 固定容量的 LRU, 記憶體用量有上限
+"""
+
+from collections import OrderedDict
+from typing import Any
+
+from ..constants import HOT_SCORE_CACHE_SIZE
+
+
+class HotScoreCache:
+    """
+    熱點分數 LRU 快取
+
+    功能:
+    - O(1) 查詢與更新
+    - 超過容量時淘汰最久未使用的用戶
+    - 支援依伺服器失效
+    """
+
+    def __init__(self, max_size: int = HOT_SCORE_CACHE_SIZE):
+        """
+        初始化快取
+
+        Args:
+            max_size: 最大快取用戶數
+        """
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple[int, int], tuple[float, int]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, guild_id: int, user_id: int) -> tuple[float, int] | None:
+        """
+        查詢用戶的快取分數
+
+        Args:
+            guild_id: 伺服器 ID
+            user_id: 用戶 ID
+
+        Returns:
+            tuple[float, int] | None: (活躍度分數, 最後訊息時間戳), 未命中時為 None
+        """
+        key = (guild_id, user_id)
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, guild_id: int, user_id: int, score: float, last_msg: int) -> None:
+        """
+        寫入用戶分數
+
+        Args:
+            guild_id: 伺服器 ID
+            user_id: 用戶 ID
+            score: 活躍度分數
+            last_msg: 最後訊息時間戳
+        """
+        key = (guild_id, user_id)
+        self._entries[key] = (score, last_msg)
+        self._entries.move_to_end(key)
+
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def put_many(self, updates: list[tuple[int, int, float, int]]) -> None:
+        """
+        批量寫入用戶分數
+
+        Args:
+            updates: 更新資料列表 [(guild_id, user_id, score, timestamp), ...]
+        """
+        for guild_id, user_id, score, last_msg in updates:
+            self.put(guild_id, user_id, score, last_msg)
+
+    def invalidate(self, guild_id: int, user_id: int | None = None) -> int:
+        """
+        使快取失效
+
+        Args:
+            guild_id: 伺服器 ID
+            user_id: 用戶 ID, 為 None 時使整個伺服器失效
+
+        Returns:
+            int: 移除的項目數
+        """
+        if user_id is not None:
+            return 1 if self._entries.pop((guild_id, user_id), None) else 0
+
+        keys = [key for key in self._entries if key[0] == guild_id]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        """清除所有快取"""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        獲取快取統計
+
+        Returns:
+            Dict[str, Any]: 快取統計資訊
+        """
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits / total * 100) if total else 0.0,
+            "evictions": self.evictions,
+        }
@@ -15,9 +15,11 @@ from discord.ext import commands
 # 使用統一的核心模塊
 from ...core import create_error_handler, setup_module_logger
 from ..config import config
+from ..constants import ACTIVITY_LOCK_STRIPES
 from ..database.database import ActivityDatabase, ActivityMeterError
 from ..panel.main_view import ActivityPanelView
 from ..service.batch_service import BatchCalculationService
+from ..service.write_buffer import ActivityWriteBuffer
 from .calculator import ActivityCalculator
 from .renderer import ActivityRenderer
 from .tasks import ActivityTasks
@@ -58,7 +60,8 @@ class ActivityMeter(commands.Cog):
             bot: Discord 機器人實例
         """
         self.bot = bot
-        self.lock = asyncio.Lock()  # 全域鎖,避免資料競爭
+        # 分段鎖: 同一用戶的訊息依序處理, 不同伺服器/用戶互不阻塞
+        self.locks = [asyncio.Lock() for _ in range(ACTIVITY_LOCK_STRIPES)]
 
         # 初始化子模組
         self.db = ActivityDatabase()
@@ -69,9 +72,25 @@ class ActivityMeter(commands.Cog):
         # 初始化 NumPy 優化服務
         self.batch_service = BatchCalculationService(self.db)
 
+        # 訊息活躍度寫入緩衝, 批量寫回資料庫
+        self.write_buffer = ActivityWriteBuffer(self.db, self.calculator)
+
         # 啟動初始化和背景任務
         bot.loop.create_task(self._init_module())
 
+    def _get_lock(self, guild_id: int, user_id: int) -> asyncio.Lock:
+        """
+        取得 (伺服器, 用戶) 對應的分段鎖
+
+        Args:
+            guild_id: 伺服器 ID
+            user_id: 用戶 ID
+
+        Returns:
+            asyncio.Lock: 分段鎖
+        """
+        return self.locks[hash((guild_id, user_id)) % len(self.locks)]
+
     async def handle_error(self, interaction: discord.Interaction, error: Exception):
         """統一錯誤處理方法"""
         error_code = self._get_error_code(error)
@@ -130,6 +149,7 @@ class ActivityMeter(commands.Cog):
         """模組初始化"""
         try:
             await self.db.init_db()
+            self.write_buffer.start()
             self.tasks.start()
             logger.info("[活躍度]模組初始化完成")
         except Exception as e:
@@ -139,6 +159,7 @@ class ActivityMeter(commands.Cog):
         """模組卸載時的清理工作"""
         try:
             self.tasks.stop()
+            await self.write_buffer.stop()
             await self.batch_service.shutdown()
             await self.db.close()
             logger.info("[活躍度]模組已卸載")
@@ -165,19 +186,33 @@ class ActivityMeter(commands.Cog):
             return
 
         try:
-            # 獲取活躍度資料
-            score, last_msg = await self.db.get_user_activity(
-                getattr(inter.guild, "id", 0), getattr(member, "id", 0)
+            guild_id = getattr(inter.guild, "id", 0)
+
+            user_id = getattr(member, "id", 0)
+
+            # 獲取活躍度資料(包含尚未寫回資料庫的部分)
+            score, last_msg = await self.write_buffer.get_user_activity(
+                guild_id, user_id
             )
 
             # 計算衰減後的活躍度
             current_score = self.calculator.decay(score, int(time.time()) - last_msg)
 
+            # 以即時分數查詢排行榜快照中的排名
+            content = None
+            rank_info = await self.batch_service.get_user_rank(
+                guild_id, user_id, current_score
+            )
+            if rank_info:
+                content = f"排名 #{rank_info['rank']}/{rank_info['total']}"
+
             # 生成並發送進度條圖片
             activity_bar = self.renderer.render_progress_bar(
                 getattr(member, "display_name", "未知用戶"), current_score
             )
-            await inter.followup.send(file=activity_bar, ephemeral=True)
+            await inter.followup.send(
+                content=content, file=activity_bar, ephemeral=True
+            )
         except ActivityMeterError as e:
             await inter.followup.send(
                 f"[{e.error_code}] {e.message}", ephemeral=True
@@ -221,8 +256,8 @@ class ActivityMeter(commands.Cog):
             return
 
         try:
-            # 獲取活躍度資料
-            score, last_msg = await self.db.get_user_activity(
+            # 獲取活躍度資料(包含尚未寫回資料庫的部分)
+            score, last_msg = await self.write_buffer.get_user_activity(
                 getattr(inter.guild, "id", 0), getattr(member, "id", 0)
             )
 
@@ -263,6 +298,9 @@ class ActivityMeter(commands.Cog):
             # 獲取今日日期
             ymd = datetime.now(UTC).astimezone(config.TW_TZ).strftime(config.DAY_FMT)
 
+            # 先寫回緩衝中的訊息計數, 確保排行榜包含最新資料
+            await self.write_buffer.flush()
+
             # 獲取排行榜資料
             rankings = await self.db.get_daily_rankings(
                 ymd, getattr(inter.guild, "id", 0), limit=rank_limit
@@ -451,28 +489,11 @@ class ActivityMeter(commands.Cog):
             now: 當前時間戳
             ymd: 日期字串
         """
-        # 使用鎖確保資料一致性
-        async with self.lock:
+        # 使用分段鎖確保同一用戶的資料一致性
+        async with self._get_lock(guild_id, user_id):
             try:
-                # 獲取當前活躍度
-                score, last_msg = await self.db.get_user_activity(guild_id, user_id)
-
-                if not self.calculator.should_update(last_msg, now):
-                    # 只增加訊息計數,不更新活躍度
-                    await self.db.increment_daily_message_count(ymd, guild_id, user_id)
-                    return
-
-                # 使用 run_in_executor 進行計算密集型操作
-                loop = asyncio.get_event_loop()
-                new_score = await loop.run_in_executor(
-                    None, self.calculator.calculate_new_score, score, last_msg, now
-                )
-
-                # 更新活躍度
-                await self.db.update_user_activity(guild_id, user_id, new_score, now)
-
-                # 更新訊息計數
-                await self.db.increment_daily_message_count(ymd, guild_id, user_id)
+                # 寫入緩衝區, 由緩衝區定時批量寫回資料庫
+                await self.write_buffer.record_message(guild_id, user_id, now, ymd)
 
             except ActivityMeterError as e:
                 logger.error(f"[活躍度]處理訊息時發生錯誤: {e}")
@@ -1,20 +1,105 @@
 """
 活躍度計算性能基準測試套件
 - 比較標準計算與 NumPy 優化計算的性能
+- 比較訊息處理管線(全域鎖 vs 分段鎖 + 寫入緩衝 + 熱點快取)的吞吐量
 - 提供詳細的性能報告和分析
 """
 
+import asyncio
 import logging
 import random
 import time
 from typing import Any
 
+from ..constants import ACTIVITY_LOCK_STRIPES
+from ..database.score_cache import HotScoreCache
+
 # 標準庫計算
 from ..main.calculator import ActivityCalculator
+from ..service.write_buffer import ActivityWriteBuffer
 
 logger = logging.getLogger("activity_meter")
 
 
+class SimulatedActivityDatabase:
+    """
+    模擬活躍度資料庫
+
+    以字典保存資料, 每次往返以 asyncio.sleep 模擬 SQLite I/O 延遲,
+    並記錄往返次數, 用於訊息處理管線的吞吐量比較
+    """
+
+    def __init__(self, io_latency: float = 0.0005, use_score_cache: bool = False):
+        """
+        初始化模擬資料庫
+
+        Args:
+            io_latency: 每次資料庫往返的模擬延遲(秒)
+            use_score_cache: 是否啟用熱點分數快取(與 ActivityDatabase 相同行為)
+        """
+        self.io_latency = io_latency
+        self.score_cache = HotScoreCache() if use_score_cache else None
+        self.meter: dict[tuple[int, int], tuple[float, int]] = {}
+        self.daily: dict[tuple[str, int, int], int] = {}
+        self.round_trips = 0
+
+    async def _round_trip(self) -> None:
+        """模擬一次資料庫往返"""
+        self.round_trips += 1
+        await asyncio.sleep(self.io_latency)
+
+    async def get_user_activity(self, guild_id: int, user_id: int) -> tuple[float, int]:
+        """獲取用戶活躍度"""
+        if self.score_cache is not None:
+            cached = self.score_cache.get(guild_id, user_id)
+            if cached is not None:
+                return cached
+
+        await self._round_trip()
+        score, last_msg = self.meter.get((guild_id, user_id), (0.0, 0))
+        if self.score_cache is not None:
+            self.score_cache.put(guild_id, user_id, score, last_msg)
+        return score, last_msg
+
+    async def update_user_activity(
+        self, guild_id: int, user_id: int, score: float, timestamp: int
+    ) -> None:
+        """更新用戶活躍度"""
+        await self._round_trip()
+        self.meter[(guild_id, user_id)] = (score, timestamp)
+
+    async def increment_daily_message_count(
+        self, ymd: str, guild_id: int, user_id: int
+    ) -> None:
+        """增加每日訊息計數"""
+        await self._round_trip()
+        key = (ymd, guild_id, user_id)
+        self.daily[key] = self.daily.get(key, 0) + 1
+
+    async def bulk_update_user_activities(
+        self, updates: list[tuple[int, int, float, int]]
+    ) -> None:
+        """批量更新用戶活躍度"""
+        if not updates:
+            return
+        await self._round_trip()
+        for guild_id, user_id, score, timestamp in updates:
+            self.meter[(guild_id, user_id)] = (score, timestamp)
+        if self.score_cache is not None:
+            self.score_cache.put_many(updates)
+
+    async def bulk_increment_daily_messages(
+        self, entries: list[tuple[str, int, int, int]]
+    ) -> None:
+        """批量增加每日訊息計數"""
+        if not entries:
+            return
+        await self._round_trip()
+        for ymd, guild_id, user_id, count in entries:
+            key = (ymd, guild_id, user_id)
+            self.daily[key] = self.daily.get(key, 0) + count
+
+
 class PerformanceBenchmark:
     """
     性能基準測試類別
@@ -249,6 +334,171 @@ class PerformanceBenchmark:
 
         return "\n".join(report_lines)
 
+    async def benchmark_message_throughput(
+        self,
+        guild_count: int,
+        users_per_guild: int,
+        messages_per_user: int = 5,
+        io_latency: float = 0.0005,
+    ) -> dict[str, Any]:
+        """
+        基準測試訊息處理管線吞吐量
+
+        以 N 個伺服器 x M 個用戶的合成訊息重播, 比較原本的全域鎖逐筆寫入
+        與分段鎖 + 寫入緩衝 + 熱點快取的處理速度
+
+        Args:
+            guild_count: 伺服器數量
+            users_per_guild: 每個伺服器的用戶數
+            messages_per_user: 每個用戶的訊息數
+            io_latency: 每次資料庫往返的模擬延遲(秒)
+
+        Returns:
+            Dict[str, Any]: 吞吐量測試結果
+        """
+        messages = self._generate_message_stream(
+            guild_count, users_per_guild, messages_per_user
+        )
+
+        # 原始管線: 全域鎖 + 每則訊息 2~3 次資料庫往返
+        legacy_db = SimulatedActivityDatabase(io_latency)
+        global_lock = asyncio.Lock()
+
+        async def legacy_process(guild_id: int, user_id: int, now: int, ymd: str):
+            async with global_lock:
+                score, last_msg = await legacy_db.get_user_activity(guild_id, user_id)
+                if self.standard_calculator.should_update(last_msg, now):
+                    new_score = self.standard_calculator.calculate_new_score(
+                        score, last_msg, now
+                    )
+                    await legacy_db.update_user_activity(
+                        guild_id, user_id, new_score, now
+                    )
+                await legacy_db.increment_daily_message_count(ymd, guild_id, user_id)
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*(legacy_process(*message) for message in messages))
+        legacy_time = time.perf_counter() - start_time
+
+        # 優化管線: 分段鎖 + 寫入緩衝 + 熱點快取
+        buffered_db = SimulatedActivityDatabase(io_latency, use_score_cache=True)
+        buffer = ActivityWriteBuffer(buffered_db, self.standard_calculator)
+        locks = [asyncio.Lock() for _ in range(ACTIVITY_LOCK_STRIPES)]
+
+        async def buffered_process(guild_id: int, user_id: int, now: int, ymd: str):
+            async with locks[hash((guild_id, user_id)) % len(locks)]:
+                await buffer.record_message(guild_id, user_id, now, ymd)
+
+        start_time = time.perf_counter()
+        await asyncio.gather(*(buffered_process(*message) for message in messages))
+        await buffer.flush()
+        buffered_time = time.perf_counter() - start_time
+
+        total = len(messages)
+        return {
+            "test_name": "message_throughput",
+            "guild_count": guild_count,
+            "users_per_guild": users_per_guild,
+            "total_messages": total,
+            "io_latency": io_latency,
+            "legacy_time": legacy_time,
+            "buffered_time": buffered_time,
+            "legacy_throughput": total / legacy_time if legacy_time > 0 else 0,
+            "buffered_throughput": total / buffered_time if buffered_time > 0 else 0,
+            "legacy_round_trips": legacy_db.round_trips,
+            "buffered_round_trips": buffered_db.round_trips,
+            "improvement_ratio": (
+                legacy_time / buffered_time if buffered_time > 0 else float("inf")
+            ),
+            "consistent": legacy_db.daily == buffered_db.daily,
+        }
+
+    def _generate_message_stream(
+        self, guild_count: int, users_per_guild: int, messages_per_user: int
+    ) -> list[tuple[int, int, int, str]]:
+        """
+        生成合成訊息串流
+
+        Args:
+            guild_count: 伺服器數量
+            users_per_guild: 每個伺服器的用戶數
+            messages_per_user: 每個用戶的訊息數
+
+        Returns:
+            List[Tuple[int, int, int, str]]: (guild_id, user_id, timestamp, ymd)
+        """
+        base = int(time.time())
+        ymd = time.strftime("%Y%m%d", time.localtime(base))
+        messages = []
+        for guild_id in range(1, guild_count + 1):
+            for user_id in range(1, users_per_guild + 1):
+                # 同一用戶的訊息時間遞增, 部分落在冷卻期內
+                offset = 0
+                for _ in range(messages_per_user):
+                    offset += random.randint(1, 120)
+                    messages.append((guild_id, user_id, base + offset, ymd))
+
+        # 依時間排序, 模擬多個伺服器交錯的訊息流
+        messages.sort(key=lambda item: item[2])
+        return messages
+
+    def generate_throughput_report(self, result: dict[str, Any]) -> str:
+        """
+        生成吞吐量測試報告
+
+        Args:
+            result: benchmark_message_throughput 的結果
+
+        Returns:
+            str: 格式化的報告文字
+        """
+        return "\n".join([
+            "=" * 60,
+            "活躍度訊息處理吞吐量測試報告",
+            "=" * 60,
+            "",
+            f"伺服器 x 用戶: {result['guild_count']} x {result['users_per_guild']}",
+            f"訊息總數: {result['total_messages']}",
+            f"模擬 I/O 延遲: {result['io_latency'] * 1000:.2f} ms",
+            "",
+            f"{'管線':<12} {'耗時(秒)':<12} {'訊息/秒':<12} {'資料庫往返':<10}",
+            "-" * 50,
+            f"{'全域鎖':<12} {result['legacy_time']:<12.4f} "
+            f"{result['legacy_throughput']:<12.0f} {result['legacy_round_trips']:<10}",
+            f"{'分段鎖+緩衝':<12} {result['buffered_time']:<12.4f} "
+            f"{result['buffered_throughput']:<12.0f} "
+            f"{result['buffered_round_trips']:<10}",
+            "",
+            f"吞吐量改善: {result['improvement_ratio']:.2f}x",
+            f"每日計數一致: {'是' if result['consistent'] else '否'}",
+            "",
+        ])
+
+
+def run_message_throughput_benchmark(
+    guild_count: int = 20, users_per_guild: int = 50, messages_per_user: int = 5
+) -> str:
+    """
+    執行訊息處理吞吐量基準測試
+
+    Args:
+        guild_count: 伺服器數量
+        users_per_guild: 每個伺服器的用戶數
+        messages_per_user: 每個用戶的訊息數
+
+    Returns:
+        str: 測試報告
+    """
+    benchmark = PerformanceBenchmark()
+    result = asyncio.run(
+        benchmark.benchmark_message_throughput(
+            guild_count, users_per_guild, messages_per_user
+        )
+    )
+    report = benchmark.generate_throughput_report(result)
+    logger.info(f"\n{report}")
+    return report
+
 
 def run_comprehensive_benchmark() -> str:
     """
@@ -288,3 +538,4 @@ if __name__ == "__main__":
     # 直接執行基準測試
     report = run_comprehensive_benchmark()
     print(report)
+    print(run_message_throughput_benchmark())
@@ -2,6 +2,7 @@
 活躍度批量計算服務
 - 處理大規模背景計算任務
 - 整合 NumPy 優化計算器
+- 維護各伺服器的排行榜快照
 """
 
 import asyncio
@@ -10,11 +11,14 @@ import time
 from concurrent.futures import ThreadPoolExecutor
 from typing import Any
 
+import numpy as np
+
 from ..config import config
-from ..constants import PERFORMANCE_CHECK_INTERVAL
+from ..constants import LEADERBOARD_SNAPSHOT_TTL, PERFORMANCE_CHECK_INTERVAL
 from ..database.database import ActivityDatabase
 from ..main.calculator import ActivityCalculator
 from ..main.numpy_calculator import OptimizedActivityCalculator
+from .leaderboard import GuildActivitySnapshot
 
 logger = logging.getLogger("activity_meter")
 
@@ -28,15 +32,22 @@ class BatchCalculationService:
     - 批量分數更新
     - 非同步背景處理
     - 自動性能優化
+    - 排行榜快照(排名/百分位查詢)
     """
 
-    def __init__(self, db: ActivityDatabase, max_workers: int = 4):
+    def __init__(
+        self,
+        db: ActivityDatabase,
+        max_workers: int = 4,
+        snapshot_ttl: float = LEADERBOARD_SNAPSHOT_TTL,
+    ):
         """
         初始化批量計算服務
 
         Args:
             db: 資料庫實例
             max_workers: 最大工作執行緒數
+            snapshot_ttl: 排行榜快照有效時間(秒)
         """
         self.db = db
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
@@ -54,8 +65,15 @@ class BatchCalculationService:
             "fallback_calculations": 0,
             "average_improvement": 0.0,
             "last_performance_check": 0,
+            "snapshot_builds": 0,
+            "snapshot_hits": 0,
         }
 
+        # 排行榜快照
+        self.snapshot_ttl = snapshot_ttl
+        self._snapshots: dict[int, GuildActivitySnapshot] = {}
+        self._snapshot_locks: dict[int, asyncio.Lock] = {}
+
         logger.info("批量計算服務已初始化")
 
     async def bulk_decay_all_users(self, guild_id: int) -> dict[str, Any]:
@@ -110,6 +128,16 @@ class BatchCalculationService:
             if updates:
                 await self.db.bulk_update_user_activities(updates)
 
+            # 以本次計算結果刷新排行榜快照, 與資料庫內容一致
+            changed = np.asarray(new_scores) != np.asarray(scores)
+            self._snapshots[guild_id] = GuildActivitySnapshot(
+                guild_id,
+                user_ids,
+                new_scores,
+                np.where(changed, now, last_msg_times),
+            )
+            self.stats["snapshot_builds"] += 1
+
             # 更新統計
             self.stats["total_calculations"] += len(scores)
 
@@ -129,6 +157,87 @@ class BatchCalculationService:
             logger.error(f"批量衰減計算失敗: {e}")
             raise
 
+    async def get_guild_snapshot(
+        self, guild_id: int, max_age: float | None = None
+    ) -> GuildActivitySnapshot:
+        """
+        獲取伺服器排行榜快照, 過期時重新建立
+
+        Args:
+            guild_id: 伺服器 ID
+            max_age: 可接受的最大快照存在時間(秒), 預設為 snapshot_ttl
+
+        Returns:
+            GuildActivitySnapshot: 排行榜快照
+        """
+        max_age = self.snapshot_ttl if max_age is None else max_age
+
+        snapshot = self._snapshots.get(guild_id)
+        if snapshot is not None and snapshot.age() < max_age:
+            self.stats["snapshot_hits"] += 1
+            return snapshot
+
+        lock = self._snapshot_locks.setdefault(guild_id, asyncio.Lock())
+        async with lock:
+            # 等待期間其他協程可能已完成刷新
+            snapshot = self._snapshots.get(guild_id)
+            if snapshot is not None and snapshot.age() < max_age:
+                self.stats["snapshot_hits"] += 1
+                return snapshot
+
+            snapshot = await self._build_snapshot(guild_id)
+            self._snapshots[guild_id] = snapshot
+            self.stats["snapshot_builds"] += 1
+            return snapshot
+
+    async def _build_snapshot(self, guild_id: int) -> GuildActivitySnapshot:
+        """
+        從資料庫讀取伺服器所有用戶並建立快照
+
+        Args:
+            guild_id: 伺服器 ID
+
+        Returns:
+            GuildActivitySnapshot: 排行榜快照
+        """
+        users_data = await self.db.get_all_user_activities(guild_id)
+        now = int(time.time())
+
+        user_ids = np.fromiter((data["user_id"] for data in users_data), dtype=np.int64)
+        scores = np.fromiter((data["score"] for data in users_data), dtype=np.float64)
+        last_msgs = np.fromiter(
+            (data["last_msg_time"] for data in users_data), dtype=np.int64
+        )
+        deltas = np.maximum(now - last_msgs, 0)
+
+        loop = asyncio.get_event_loop()
+        decayed = await loop.run_in_executor(
+            self.executor, self._calculate_bulk_decay, scores, deltas
+        )
+        return GuildActivitySnapshot(guild_id, user_ids, decayed, last_msgs)
+
+    async def get_user_rank(
+        self, guild_id: int, user_id: int, score: float | None = None
+    ) -> dict[str, Any] | None:
+        """
+        查詢用戶在伺服器中的活躍度排名
+
+        Args:
+            guild_id: 伺服器 ID
+            user_id: 用戶 ID
+            score: 即時活躍度分數(例如尚未寫回資料庫的分數), 預設使用快照分數
+
+        Returns:
+            Dict[str, Any] | None: 排名資訊 (rank, total, score, percentile),
+            用戶沒有活躍度記錄或查詢失敗時為 None
+        """
+        try:
+            snapshot = await self.get_guild_snapshot(guild_id)
+            return snapshot.get_user_rank(user_id, score)
+        except Exception as e:
+            logger.error(f"查詢用戶排名失敗: {e}")
+            return None
+
     async def bulk_update_rankings(
         self, guild_id: int, date_str: str
     ) -> dict[str, Any]:
@@ -315,6 +424,7 @@ class BatchCalculationService:
         return {
             **self.stats,
             "numpy_usage_ratio": numpy_ratio,
+            "cached_snapshots": len(self._snapshots),
             "calculator_status": self.optimized_calculator.get_status(),
         }
 
@@ -0,0 +1,112 @@
+"""
+活躍度排行榜快照
+- 以 NumPy 陣列保存單一伺服器的欄式資料 (user_id, 衰減後分數, last_msg)
+- 建立時一次排序, 之後的排名/百分位查詢只需二分搜尋
+"""
+
+import time
+from typing import Any
+
+import numpy as np
+
+
+class GuildActivitySnapshot:
+    """
+    單一伺服器的活躍度排行榜快照
+
+    功能:
+    - 依用戶 ID 以 O(log n) 查詢排名與百分位
+    - 可用即時分數排名, 不受快照中的舊分數影響
+    - 快照不可變, 刷新時整體替換
+    """
+
+    __slots__ = (
+        "_id_order",
+        "_sorted_ids",
+        "_sorted_scores",
+        "built_at",
+        "guild_id",
+        "last_msgs",
+        "scores",
+        "user_ids",
+    )
+
+    def __init__(
+        self,
+        guild_id: int,
+        user_ids: "np.ndarray | list[int]",
+        scores: "np.ndarray | list[float]",
+        last_msgs: "np.ndarray | list[int]",
+        built_at: float | None = None,
+    ):
+        """
+        建立快照
+
+        Args:
+            guild_id: 伺服器 ID
+            user_ids: 用戶 ID 陣列
+            scores: 已套用衰減的分數陣列
+            last_msgs: 最後訊息時間戳陣列
+            built_at: 建立時間, 預設為現在
+        """
+        self.guild_id = guild_id
+        self.user_ids = np.asarray(user_ids, dtype=np.int64)
+        self.scores = np.asarray(scores, dtype=np.float64)
+        self.last_msgs = np.asarray(last_msgs, dtype=np.int64)
+        self.built_at = time.time() if built_at is None else built_at
+
+        # 分數由低到高, 供 searchsorted 計算排名
+        self._sorted_scores = np.sort(self.scores)
+        # 用戶 ID 索引, 供 searchsorted 定位用戶
+        self._id_order = np.argsort(self.user_ids, kind="stable")
+        self._sorted_ids = self.user_ids[self._id_order]
+
+    def __len__(self) -> int:
+        return int(self.user_ids.size)
+
+    def age(self) -> float:
+        """快照已存在的秒數"""
+        return time.time() - self.built_at
+
+    def _index_of(self, user_id: int) -> int | None:
+        """以二分搜尋找出用戶在原始陣列中的位置"""
+        pos = int(np.searchsorted(self._sorted_ids, user_id))
+        if pos < self._sorted_ids.size and self._sorted_ids[pos] == user_id:
+            return int(self._id_order[pos])
+        return None
+
+    def get_user_rank(
+        self, user_id: int, score: float | None = None
+    ) -> dict[str, Any] | None:
+        """
+        查詢用戶排名
+
+        提供即時分數時改以該分數排名, 並略過用戶在快照中的舊分數;
+        不在快照中的用戶也會計入總人數.
+
+        Args:
+            user_id: 用戶 ID
+            score: 即時活躍度分數, 預設使用快照中的分數
+
+        Returns:
+            dict[str, Any] | None: 排名資訊, 未提供分數且用戶不在快照中時為 None
+        """
+        index = self._index_of(user_id)
+        if score is None:
+            if index is None:
+                return None
+            score = float(self.scores[index])
+
+        higher = self._sorted_scores.size - int(
+            np.searchsorted(self._sorted_scores, score, side="right")
+        )
+        if index is not None and self.scores[index] > score:
+            higher -= 1
+        total = len(self) + (index is None)
+        return {
+            "user_id": user_id,
+            "score": score,
+            "rank": higher + 1,
+            "total": total,
+            "percentile": (total - higher) / total * 100,
+        }
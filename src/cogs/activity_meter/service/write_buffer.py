@@ -0,0 +1,252 @@
+"""
+活躍度寫入緩衝服務
+- 在記憶體中聚合每個 (伺服器, 用戶) 的訊息活躍度
+- 定時或達到數量門檻時透過批量 API 寫回資料庫
+- 查詢時優先讀取緩衝區, 保證讀取到自己的寫入
+"""
+
+import asyncio
+import contextlib
+import logging
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any
+
+from ..constants import WRITE_BUFFER_FLUSH_INTERVAL, WRITE_BUFFER_MAX_PENDING
+
+if TYPE_CHECKING:
+    from ..database.database import ActivityDatabase
+    from ..main.calculator import ActivityCalculator
+
+logger = logging.getLogger("activity_meter")
+
+
+@dataclass
+class PendingActivity:
+    """單一用戶尚未寫回資料庫的活躍度狀態"""
+
+    score: float
+    last_msg: int
+    dirty: bool = False
+    daily_counts: dict[str, int] = field(default_factory=dict)
+
+
+class ActivityWriteBuffer:
+    """
+    活躍度寫入緩衝區
+
+    功能:
+    - 以 (guild_id, user_id) 為鍵累積活躍度分數與每日訊息計數
+    - 背景定時沖刷, 或在待寫入用戶數達到門檻時立即沖刷
+    - 沖刷失敗時將資料合併回緩衝區, 下次重試
+    - 關閉時保證完成最後一次沖刷
+    """
+
+    def __init__(
+        self,
+        db: "ActivityDatabase",
+        calculator: "ActivityCalculator",
+        flush_interval: float = WRITE_BUFFER_FLUSH_INTERVAL,
+        max_pending: int = WRITE_BUFFER_MAX_PENDING,
+    ):
+        """
+        初始化寫入緩衝區
+
+        Args:
+            db: 資料庫實例
+            calculator: 活躍度計算器
+            flush_interval: 定時沖刷間隔(秒)
+            max_pending: 觸發立即沖刷的待寫入用戶數
+        """
+        self.db = db
+        self.calculator = calculator
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+
+        self._pending: dict[tuple[int, int], PendingActivity] = {}
+        # 正在寫入資料庫的快照, 寫入完成前仍可供讀取
+        self._flushing: dict[tuple[int, int], PendingActivity] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+        self._threshold_task: asyncio.Task | None = None
+
+        self.stats = {
+            "messages_buffered": 0,
+            "flushes": 0,
+            "rows_written": 0,
+            "flush_failures": 0,
+        }
+
+    # -------- 生命週期 --------
+    def start(self) -> None:
+        """啟動背景定時沖刷任務"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """停止背景任務並沖刷所有剩餘資料"""
+        for task in (self._flush_task, self._threshold_task):
+            if task and not task.done():
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        self._flush_task = None
+        self._threshold_task = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        """定時沖刷迴圈"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"[活躍度]定時沖刷寫入緩衝失敗: {e}")
+
+    # -------- 讀寫 --------
+    def _lookup(self, key: tuple[int, int]) -> PendingActivity | None:
+        """依序在緩衝區與沖刷中的快照查找狀態"""
+        return self._pending.get(key) or self._flushing.get(key)
+
+    async def _load_entry(self, guild_id: int, user_id: int) -> PendingActivity:
+        """取得用戶的緩衝狀態, 不存在時從資料庫載入"""
+        key = (guild_id, user_id)
+        entry = self._pending.get(key)
+        if entry is not None:
+            return entry
+
+        base = self._flushing.get(key)
+        if base is not None:
+            score, last_msg = base.score, base.last_msg
+        else:
+            score, last_msg = await self.db.get_user_activity(guild_id, user_id)
+
+        # 等待資料庫期間可能已有其他訊息建立了同一個鍵
+        return self._pending.setdefault(key, PendingActivity(score, last_msg))
+
+    async def record_message(
+        self, guild_id: int, user_id: int, now: int, ymd: str
+    ) -> float:
+        """
+        記錄一則訊息
+
+        Args:
+            guild_id: 伺服器 ID
+            user_id: 用戶 ID
+            now: 當前時間戳
+            ymd: 日期字串 (YYYYMMDD)
+
+        Returns:
+            float: 記錄後的活躍度分數
+        """
+        entry = await self._load_entry(guild_id, user_id)
+
+        # 以下皆為同步操作, 不會與其他協程交錯
+        if self.calculator.should_update(entry.last_msg, now):
+            entry.score = self.calculator.calculate_new_score(
+                entry.score, entry.last_msg, now
+            )
+            entry.last_msg = now
+            entry.dirty = True
+        entry.daily_counts[ymd] = entry.daily_counts.get(ymd, 0) + 1
+        self.stats["messages_buffered"] += 1
+
+        if len(self._pending) >= self.max_pending:
+            self._schedule_threshold_flush()
+
+        return entry.score
+
+    async def get_user_activity(self, guild_id: int, user_id: int) -> tuple[float, int]:
+        """
+        獲取用戶活躍度(包含尚未寫回的資料)
+
+        Args:
+            guild_id: 伺服器 ID
+            user_id: 用戶 ID
+
+        Returns:
+            Tuple[float, int]: (活躍度分數, 最後訊息時間戳)
+        """
+        entry = self._lookup((guild_id, user_id))
+        if entry is not None:
+            return entry.score, entry.last_msg
+        return await self.db.get_user_activity(guild_id, user_id)
+
+    def pending_count(self) -> int:
+        """目前待寫入的用戶數"""
+        return len(self._pending)
+
+    # -------- 沖刷 --------
+    def _schedule_threshold_flush(self) -> None:
+        """達到門檻時排程一次沖刷(同一時間最多一個)"""
+        if self._threshold_task is None or self._threshold_task.done():
+            self._threshold_task = asyncio.create_task(self.flush())
+            # 確保異常不會被忽略
+            self._threshold_task.add_done_callback(
+                lambda t: t.cancelled() or t.exception()
+            )
+
+    async def flush(self) -> int:
+        """
+        將緩衝區資料批量寫回資料庫
+
+        Returns:
+            int: 本次寫回的用戶數
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+
+            self._flushing, self._pending = self._pending, {}
+            snapshot = self._flushing
+
+            updates = [
+                (guild_id, user_id, entry.score, entry.last_msg)
+                for (guild_id, user_id), entry in snapshot.items()
+                if entry.dirty
+            ]
+            daily_entries = [
+                (ymd, guild_id, user_id, count)
+                for (guild_id, user_id), entry in snapshot.items()
+                for ymd, count in entry.daily_counts.items()
+            ]
+
+            try:
+                await self.db.bulk_update_user_activities(updates)
+                await self.db.bulk_increment_daily_messages(daily_entries)
+            except Exception as e:
+                self.stats["flush_failures"] += 1
+                self._restore(snapshot)
+                logger.error(f"[活躍度]寫入緩衝沖刷失敗, 將於下次重試: {e}")
+                raise
+            finally:
+                self._flushing = {}
+
+            self.stats["flushes"] += 1
+            self.stats["rows_written"] += len(updates) + len(daily_entries)
+            return len(snapshot)
+
+    def _restore(self, snapshot: dict[tuple[int, int], PendingActivity]) -> None:
+        """沖刷失敗時將快照合併回緩衝區"""
+        for key, old in snapshot.items():
+            current = self._pending.get(key)
+            if current is None:
+                self._pending[key] = old
+                continue
+            # 新狀態以快照為基礎計算, 分數以新狀態為準, 計數需累加
+            current.dirty = current.dirty or old.dirty
+            for ymd, count in old.daily_counts.items():
+                current.daily_counts[ymd] = current.daily_counts.get(ymd, 0) + count
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        獲取緩衝區統計資訊
+
+        Returns:
+            Dict[str, Any]: 統計資訊
+        """
+        return {
+            **self.stats,
+            "pending_users": len(self._pending),
+            "flush_interval": self.flush_interval,
+            "max_pending": self.max_pending,
+        }
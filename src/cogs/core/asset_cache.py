@@ -0,0 +1,342 @@
+"""
+共用 Discord 資源位元組快取
+
+此模組提供頭像與附件等 Discord 資源的共用快取,包括:
+- 以資源雜湊與尺寸為鍵, 保存下載的壓縮位元組而非解碼後的圖片
+- 以位元組總量為上限的 LRU 淘汰
+- 可選的磁碟層, 重新啟動後仍可命中
+- 相同鍵的並發未命中合併為單次下載 (single-flight)
+- 命中、未命中與位元組用量指標
+
+作者: Discord ADR Bot Team
+版本: 1.6.0
+"""
+
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from pathlib import Path
+from typing import Any
+
+# 配置日誌
+logger = logging.getLogger(__name__)
+
+# 預設記憶體層上限 (32 MiB)
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+# 預設磁碟層上限 (256 MiB)
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+
+Fetcher = Callable[[], Awaitable[bytes | None]]
+
+
+def avatar_key(asset: Any, size: int) -> str:
+    """
+    產生頭像快取鍵
+
+    Discord 資源的 key 是內容雜湊, 用戶更換頭像後鍵會改變, 不需另行失效.
+
+    Args:
+        asset: discord.Asset (例如 member.display_avatar)
+        size: 請求的尺寸
+
+    Returns:
+        str: 快取鍵
+    """
+    return f"asset:{asset.key}:{size}"
+
+
+def attachment_key(attachment: Any) -> str:
+    """
+    產生附件快取鍵
+
+    附件內容在上傳後不會改變, 以附件 ID 與大小為鍵.
+
+    Args:
+        attachment: discord.Attachment
+
+    Returns:
+        str: 快取鍵
+    """
+    return f"attachment:{attachment.id}:{attachment.size}"
+
+
+class AssetCache:
+    """
+    資源位元組快取
+
+    功能:
+    - get_or_fetch 依序查詢記憶體層、磁碟層, 都未命中才呼叫下載函數
+    - 同一鍵同時只會有一個下載, 其他呼叫者等待同一結果;
+      呼叫者被取消只停止自己的等待, 不會中斷共用的下載
+    - 下載失敗 (None 或例外) 不會被快取
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        disk_path: str | os.PathLike | None = None,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+    ):
+        """
+        初始化資源快取
+
+        Args:
+            max_bytes: 記憶體層位元組上限
+            disk_path: 磁碟層目錄, None 表示不使用磁碟層
+            max_disk_bytes: 磁碟層位元組上限
+        """
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_path = Path(disk_path) if disk_path is not None else None
+
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._disk_bytes: int | None = None  # 首次寫入磁碟時才掃描
+
+        if self.disk_path is not None:
+            self.disk_path.mkdir(parents=True, exist_ok=True)
+
+        self.stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "fetch_failures": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+        }
+
+    # -------- 查詢 --------
+    async def get_or_fetch(self, key: str, fetch: Fetcher) -> bytes | None:
+        """
+        取得快取位元組, 未命中時下載
+
+        Args:
+            key: 快取鍵
+            fetch: 下載位元組的協程函數, 失敗時回傳 None
+
+        Returns:
+            bytes | None: 資源位元組, 下載失敗時為 None
+        """
+        data = self.get(key)
+        if data is not None:
+            return data
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            # 下載在共用的任務中執行, 發起者被取消時其他等待者仍會收到結果
+            task = asyncio.create_task(self._load(key, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._on_load_done(key, done))
+        return await asyncio.shield(task)
+
+    def _on_load_done(self, key: str, task: asyncio.Task):
+        """下載任務完成後移除進行中記錄, 記錄例外"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled() and task.exception() is not None:
+            # 取用例外, 沒有等待者時避免未取用的例外警告
+            self.stats["fetch_failures"] += 1
+
+    def get(self, key: str) -> bytes | None:
+        """
+        只查詢記憶體層
+
+        Args:
+            key: 快取鍵
+
+        Returns:
+            bytes | None: 資源位元組, 未命中時為 None
+        """
+        data = self._entries.get(key)
+        if data is not None:
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+        return data
+
+    async def _load(self, key: str, fetch: Fetcher) -> bytes | None:
+        """由磁碟層或下載函數載入並寫入快取"""
+        if self.disk_path is not None:
+            data = await asyncio.to_thread(self._read_disk, key)
+            if data is not None:
+                self.stats["disk_hits"] += 1
+                self._store(key, data)
+                return data
+
+        self.stats["misses"] += 1
+        data = await fetch()
+        if not data:
+            self.stats["fetch_failures"] += 1
+            return None
+
+        self._store(key, data)
+        if self.disk_path is not None:
+            await asyncio.to_thread(self._write_disk, key, data)
+        return data
+
+    # -------- 記憶體層 --------
+    def _store(self, key: str, data: bytes):
+        """寫入記憶體層並依位元組上限淘汰最舊項目"""
+        if len(data) > self.max_bytes:
+            return
+
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old)
+        self._entries[key] = data
+        self._bytes += len(data)
+
+        while self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+            self.stats["evictions"] += 1
+
+    def invalidate(self, key: str):
+        """
+        移除單一鍵 (記憶體層與磁碟層)
+
+        Args:
+            key: 快取鍵
+        """
+        data = self._entries.pop(key, None)
+        if data is not None:
+            self._bytes -= len(data)
+        if self.disk_path is not None:
+            path = self._disk_file(key)
+            try:
+                size = path.stat().st_size
+                path.unlink()
+                if self._disk_bytes is not None:
+                    self._disk_bytes -= size
+            except FileNotFoundError:
+                pass
+
+    def clear(self):
+        """清空記憶體層"""
+        self._entries.clear()
+        self._bytes = 0
+
+    # -------- 磁碟層 --------
+    def _disk_file(self, key: str) -> Path:
+        """鍵對應的磁碟檔案"""
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return self.disk_path / f"{digest}.bin"
+
+    def _read_disk(self, key: str) -> bytes | None:
+        """讀取磁碟層, 命中時更新修改時間作為 LRU 依據"""
+        path = self._disk_file(key)
+        try:
+            data = path.read_bytes()
+            os.utime(path)
+            return data
+        except FileNotFoundError:
+            return None
+        except OSError as exc:
+            logger.warning(f"讀取資源快取檔案失敗 {path}: {exc}")
+            return None
+
+    def _write_disk(self, key: str, data: bytes):
+        """寫入磁碟層並依位元組上限淘汰最久未使用的檔案"""
+        if len(data) > self.max_disk_bytes:
+            return
+        path = self._disk_file(key)
+        try:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(
+                    file.stat().st_size for file in self.disk_path.glob("*.bin")
+                )
+            # 先寫入暫存檔再改名, 避免讀到寫到一半的檔案
+            tmp_path = path.with_suffix(".tmp")
+            tmp_path.write_bytes(data)
+            tmp_path.replace(path)
+            self._disk_bytes += len(data)
+
+            if self._disk_bytes > self.max_disk_bytes:
+                self._prune_disk()
+        except OSError as exc:
+            logger.warning(f"寫入資源快取檔案失敗 {path}: {exc}")
+
+    def _prune_disk(self):
+        """淘汰磁碟層最久未使用的檔案直到低於上限"""
+        files = []
+        for file in self.disk_path.glob("*.bin"):
+            try:
+                stat = file.stat()
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, file))
+        files.sort()
+
+        total = sum(size for _, size, _ in files)
+        for _, size, file in files:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                file.unlink()
+            except FileNotFoundError:
+                pass
+            total -= size
+            self.stats["disk_evictions"] += 1
+        self._disk_bytes = total
+
+    # -------- 指標 --------
+    def get_stats(self) -> dict[str, Any]:
+        """
+        取得快取指標
+
+        Returns:
+            Dict[str, Any]: 指標資料
+        """
+        lookups = self.stats["hits"] + self.stats["disk_hits"] + self.stats["misses"]
+        hit_rate = (
+            (self.stats["hits"] + self.stats["disk_hits"]) / lookups if lookups else 0.0
+        )
+        return {
+            **self.stats,
+            "hit_rate": hit_rate,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "disk_bytes": self._disk_bytes,
+            "inflight": len(self._inflight),
+            "timestamp": time.time(),
+        }
+
+
+_global_cache: AssetCache | None = None
+
+
+def get_asset_cache() -> AssetCache:
+    """獲取全域資源快取"""
+    global _global_cache
+    if _global_cache is None:
+        _global_cache = AssetCache()
+    return _global_cache
+
+
+def configure_asset_cache(
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    disk_path: str | os.PathLike | None = None,
+    max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+) -> AssetCache:
+    """
+    以指定設定重建全域資源快取
+
+    Args:
+        max_bytes: 記憶體層位元組上限
+        disk_path: 磁碟層目錄, None 表示不使用磁碟層
+        max_disk_bytes: 磁碟層位元組上限
+
+    Returns:
+        AssetCache: 新的全域資源快取
+    """
+    global _global_cache
+    _global_cache = AssetCache(max_bytes, disk_path, max_disk_bytes)
+    return _global_cache
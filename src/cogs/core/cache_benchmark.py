@@ -0,0 +1,209 @@
+"""
+多級緩存 L1 讀取吞吐量基準測試
+
+測量內存緩存後端(L1)命中路徑在每秒 100,000 次讀取下的成本:
+- get_nowait: 同步熱路徑(dict + OrderedDict, 無鎖無等待)
+- MultiLevelCache.get: 經由多級緩存的命中路徑
+- 寫入: 增量維護總大小, 每次寫入成本不隨條目數量增加
+
+可直接執行: python -m src.cogs.core.cache_benchmark
+"""
+
+import asyncio
+import logging
+import os
+import statistics
+import tempfile
+import time
+from typing import Any
+
+from .cache_manager import (
+    CacheEntry,
+    CacheStrategy,
+    MemoryCacheBackend,
+    MultiLevelCache,
+)
+
+logger = logging.getLogger(__name__)
+
+# 目標讀取速率(次/秒)
+TARGET_GETS_PER_SECOND = 100_000
+
+
+def _sample_value(index: int) -> dict[str, Any]:
+    """產生與排行榜/成就查詢結果相近的測試值"""
+    return {
+        "id": index,
+        "name": f"項目 {index}",
+        "scores": list(range(20)),
+    }
+
+
+async def measure_set(backend: MemoryCacheBackend, entries: int) -> float:
+    """
+    測量寫入吞吐量
+
+    Args:
+        backend: 內存緩存後端
+        entries: 寫入的條目數量
+
+    Returns:
+        float: 每秒寫入次數
+    """
+    started = time.perf_counter()
+    for i in range(entries):
+        key = f"key:{i}"
+        await backend.set(key, CacheEntry(key, _sample_value(i)))
+    return entries / (time.perf_counter() - started)
+
+
+async def measure_get_paced(
+    cache: MultiLevelCache,
+    keys: list[str],
+    rate: int = TARGET_GETS_PER_SECOND,
+    ticks_per_second: int = 100,
+) -> dict[str, float]:
+    """
+    以固定速率讀取一秒並測量每次讀取的 CPU 成本
+
+    Args:
+        cache: 多級緩存(所有鍵已在 L1)
+        keys: 讀取的鍵
+        rate: 每秒讀取次數
+        ticks_per_second: 每秒分為幾個批次
+
+    Returns:
+        dict[str, float]: 每次讀取耗時(微秒)與佔用單核比例
+    """
+    per_tick = rate // ticks_per_second
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    busy = 0.0
+    tick_times = []
+
+    for tick in range(ticks_per_second):
+        tick_started = time.perf_counter()
+        offset = tick * per_tick
+        for i in range(per_tick):
+            await cache.get(keys[(offset + i) % len(keys)])
+        elapsed = time.perf_counter() - tick_started
+        busy += elapsed
+        tick_times.append(elapsed)
+
+        next_tick = started + (tick + 1) / ticks_per_second
+        await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+    return {
+        "per_get_us": busy / rate * 1_000_000,
+        "median_tick_ms": statistics.median(tick_times) * 1000,
+        "cpu_share": busy / (loop.time() - started),
+    }
+
+
+def measure_get_nowait(backend: MemoryCacheBackend, keys: list[str]) -> float:
+    """
+    測量同步熱路徑的每次讀取耗時
+
+    Args:
+        backend: 內存緩存後端(所有鍵已寫入)
+        keys: 讀取的鍵
+
+    Returns:
+        float: 每次讀取耗時(微秒)
+    """
+    started = time.perf_counter()
+    for key in keys:
+        backend.get_nowait(key)
+    return (time.perf_counter() - started) / len(keys) * 1_000_000
+
+
+async def benchmark_l1_get(
+    entries: int = 10_000, rate: int = TARGET_GETS_PER_SECOND
+) -> dict[str, float]:
+    """
+    執行 L1 讀寫基準測試
+
+    Args:
+        entries: 緩存條目數量
+        rate: 每秒讀取次數
+
+    Returns:
+        dict[str, float]: 測試結果
+    """
+    keys = [f"key:{i % entries}" for i in range(rate)]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        cache = MultiLevelCache(
+            l1_max_size=entries,
+            l1_strategy=CacheStrategy.LRU,
+            db_path=os.path.join(temp_dir, "cache.db"),
+            enable_preloading=False,
+        )
+        try:
+            set_rate = await measure_set(cache.l1_backend, entries)
+            nowait_us = measure_get_nowait(cache.l1_backend, keys)
+            paced = await measure_get_paced(cache, keys, rate)
+        finally:
+            await cache.shutdown()
+
+    return {
+        "entries": entries,
+        "rate": rate,
+        "sets_per_second": set_rate,
+        "get_nowait_us": nowait_us,
+        **paced,
+        "hit_rate": cache.l1_backend.stats.hit_rate,
+    }
+
+
+def generate_report(result: dict[str, float]) -> str:
+    """
+    生成 L1 讀取基準測試報告
+
+    Args:
+        result: benchmark_l1_get 的結果
+
+    Returns:
+        str: 格式化的報告文字
+    """
+    report_lines = [
+        "=" * 60,
+        "多級緩存 L1 讀取吞吐量基準測試",
+        "=" * 60,
+        "",
+        f"緩存條目數量: {result['entries']}",
+        f"寫入吞吐量: {result['sets_per_second']:.0f} 次/秒",
+        f"get_nowait 每次讀取: {result['get_nowait_us']:.2f} µs",
+        "",
+        f"以 {result['rate']} 次/秒讀取 MultiLevelCache.get:",
+        f"  每次讀取: {result['per_get_us']:.2f} µs",
+        f"  每批次(10 毫秒)中位數耗時: {result['median_tick_ms']:.2f} ms",
+        f"  佔用單核比例: {result['cpu_share']:.1%}",
+        f"  命中率: {result['hit_rate']:.1%}",
+        "",
+    ]
+    return "\n".join(report_lines)
+
+
+def run_l1_cache_benchmark(
+    entries: int = 10_000, rate: int = TARGET_GETS_PER_SECOND
+) -> str:
+    """
+    執行 L1 讀取基準測試
+
+    Args:
+        entries: 緩存條目數量
+        rate: 每秒讀取次數
+
+    Returns:
+        str: 測試報告
+    """
+    result = asyncio.run(benchmark_l1_get(entries, rate))
+    report = generate_report(result)
+    logger.info(f"\n{report}")
+    return report
+
+
+if __name__ == "__main__":
+    # 直接執行基準測試
+    print(run_l1_cache_benchmark())
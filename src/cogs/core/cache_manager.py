@@ -20,17 +20,21 @@ import functools
 import hashlib
 import json
 import logging
+import math
 import pickle
+import random
 import sqlite3
-import threading
+import sys
 import time
 import weakref
 from abc import ABC, abstractmethod
 from collections import OrderedDict, defaultdict, deque
-from collections.abc import Callable
+from collections.abc import Awaitable, Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import asynccontextmanager, suppress
 from dataclasses import dataclass, field
 from enum import Enum
+from itertools import islice
 from typing import (
     Any,
     TypeVar,
@@ -43,6 +47,50 @@ logger = logging.getLogger(__name__)
 K = TypeVar("K")  # Key type
 V = TypeVar("V")  # Value type
 
+# 估算容器大小時抽樣的元素數量
+SIZE_SAMPLE_ITEMS = 8
+# L1 命中時每隔多少次記錄一次到分析器
+ANALYZER_SAMPLE_EVERY = 16
+
+_SCALAR_TYPES = (str, bytes, bytearray, int, float, bool, type(None))
+
+
+def estimate_size(value: Any, sample_items: int = SIZE_SAMPLE_ITEMS) -> int:
+    """估算值的大小(位元組)
+
+    不序列化整個值: 標量直接取 sys.getsizeof, 容器只抽樣前幾個元素
+    並依元素數量推算, 成本與值的大小無關
+
+    Args:
+        value: 要估算的值
+        sample_items: 容器抽樣的元素數量
+
+    Returns:
+        int: 估算大小
+    """
+    size = sys.getsizeof(value, 0)
+    if isinstance(value, _SCALAR_TYPES):
+        return size
+
+    if isinstance(value, dict):
+        count = len(value)
+        items: Iterable = (
+            sys.getsizeof(k, 0) + sys.getsizeof(v, 0)
+            for k, v in islice(value.items(), sample_items)
+        )
+    elif isinstance(value, list | tuple | set | frozenset | deque):
+        count = len(value)
+        items = (sys.getsizeof(item, 0) for item in islice(value, sample_items))
+    elif hasattr(value, "__dict__"):
+        return size + estimate_size(vars(value), sample_items)
+    else:
+        return size
+
+    sampled = list(items)
+    if sampled:
+        size += sum(sampled) * count // len(sampled)
+    return size
+
 
 class CacheStrategy(Enum):
     """緩存策略枚舉"""
@@ -104,21 +152,18 @@ class CacheEntry:
             self.size = self._calculate_size()
 
     def _calculate_size(self) -> int:
-        """計算條目大小"""
-        try:
-            return len(pickle.dumps(self.value))
-        except (pickle.PicklingError, TypeError, AttributeError):
-            return len(str(self.value).encode("utf-8"))
+        """計算條目大小(抽樣估算, 不序列化)"""
+        return estimate_size(self.value)
 
-    def is_expired(self) -> bool:
+    def is_expired(self, now: float | None = None) -> bool:
         """檢查是否過期"""
         if self.ttl is None:
             return False
-        return time.time() - self.timestamp > self.ttl
+        return (time.time() if now is None else now) - self.timestamp > self.ttl
 
-    def touch(self):
+    def touch(self, now: float | None = None):
         """更新訪問時間"""
-        self.last_access = time.time()
+        self.last_access = time.time() if now is None else now
         self.access_count += 1
         self.hit_count += 1
 
@@ -189,20 +234,31 @@ class CacheAnalyzer:
 
     async def record_access(self, key: str, operation: CacheOperation, hit: bool):
         """記錄訪問"""
-        async with self._lock:
-            access_time = time.time()
-            self.access_history.append({
-                "key": key,
-                "operation": operation.value,
-                "hit": hit,
-                "timestamp": access_time,
-            })
-
-            # 更新熱點鍵統計
-            if hit:
-                self.hot_keys[key] += 1
-            else:
-                self.cold_keys.add(key)
+        self.record(key, operation, hit)
+
+    def record(
+        self, key: str, operation: CacheOperation, hit: bool, weight: int = 1
+    ) -> None:
+        """同步記錄訪問(不等待鎖, 供快取熱路徑使用)
+
+        Args:
+            key: 緩存鍵
+            operation: 緩存操作
+            hit: 是否命中
+            weight: 抽樣記錄時代表的訪問次數
+        """
+        self.access_history.append({
+            "key": key,
+            "operation": operation.value,
+            "hit": hit,
+            "timestamp": time.time(),
+        })
+
+        # 更新熱點鍵統計
+        if hit:
+            self.hot_keys[key] += weight
+        else:
+            self.cold_keys.add(key)
 
     async def analyze_patterns(self) -> dict[str, Any]:
         """分析訪問模式"""
@@ -403,44 +459,68 @@ class CacheBackend(ABC):
 
 
 class MemoryCacheBackend(CacheBackend):
-    """內存緩存後端(L1)"""
+    """內存緩存後端(L1)
+
+    讀取路徑為同步的 dict/OrderedDict 操作, 不取鎖也不等待:
+    事件迴圈中兩個 await 之間的程式碼不會交錯執行, 讀取無需加鎖.
+    總大小隨寫入與移除增量維護; 命中只每隔 analyzer_sample_every 次
+    記錄一次到分析器(以權重補償), 未命中一律記錄.
+    """
 
     def __init__(
-        self, max_size: int = 1000, strategy: CacheStrategy = CacheStrategy.LRU
+        self,
+        max_size: int = 1000,
+        strategy: CacheStrategy = CacheStrategy.LRU,
+        size_estimator: Callable[[Any], int] | None = None,
+        analyzer_sample_every: int = ANALYZER_SAMPLE_EVERY,
     ):
         self.max_size = max_size
         self.strategy = strategy
+        self.size_estimator = size_estimator
+        self.analyzer_sample_every = max(1, analyzer_sample_every)
         self._cache: dict[str, CacheEntry] = {}
         self._access_order: OrderedDict[str, float] = OrderedDict()
         self._lock = asyncio.Lock()
+        self._hits_until_sample = self.analyzer_sample_every
         self.stats = CacheStats()
         self.analyzer = CacheAnalyzer()
         self.smart_strategy = SmartCacheStrategy(self.analyzer)
 
+    def get_nowait(self, key: str) -> CacheEntry | None:
+        """同步獲取緩存條目(L1 熱路徑)"""
+        entry = self._cache.get(key)
+        if entry is None:
+            self.stats.misses += 1
+            self.analyzer.record(key, CacheOperation.GET, False)
+            return None
+
+        now = time.time()
+        # 檢查過期
+        if entry.is_expired(now):
+            self._remove_entry(key)
+            self.stats.misses += 1
+            self.stats.expired += 1
+            self.analyzer.record(key, CacheOperation.GET, False)
+            return None
+
+        # 更新訪問信息
+        entry.touch(now)
+        self._access_order[key] = now
+        self._access_order.move_to_end(key)
+        self.stats.hits += 1
+
+        self._hits_until_sample -= 1
+        if self._hits_until_sample <= 0:
+            self._hits_until_sample = self.analyzer_sample_every
+            self.analyzer.record(
+                key, CacheOperation.GET, True, self.analyzer_sample_every
+            )
+
+        return entry
+
     async def get(self, key: str) -> CacheEntry | None:
         """獲取緩存條目"""
-        async with self._lock:
-            entry = self._cache.get(key)
-            if entry is None:
-                self.stats.misses += 1
-                await self.analyzer.record_access(key, CacheOperation.GET, False)
-                return None
-
-            # 檢查過期
-            if entry.is_expired():
-                await self._remove_entry(key)
-                self.stats.misses += 1
-                self.stats.expired += 1
-                await self.analyzer.record_access(key, CacheOperation.GET, False)
-                return None
-
-            # 更新訪問信息
-            entry.touch()
-            self._update_access_order(key)
-            self.stats.hits += 1
-            await self.analyzer.record_access(key, CacheOperation.GET, True)
-
-            return entry
+        return self.get_nowait(key)
 
     async def set(self, key: str, entry: CacheEntry) -> bool:
         """設置緩存條目"""
@@ -449,20 +529,24 @@ class MemoryCacheBackend(CacheBackend):
             if key not in self._cache and len(self._cache) >= self.max_size:
                 await self._evict_entries()
 
+            if self.size_estimator is not None:
+                entry.size = self.size_estimator(entry.value)
+
             # 設置條目
             old_entry = self._cache.get(key)
             self._cache[key] = entry
             self._update_access_order(key)
 
-            # 更新統計
+            # 更新統計(增量維護總大小)
             if old_entry is None:
                 self.stats.sets += 1
                 self.stats.entry_count += 1
-
-            self.stats.total_size = sum(e.size for e in self._cache.values())
+                self.stats.total_size += entry.size
+            else:
+                self.stats.total_size += entry.size - old_entry.size
             self.stats.peak_size = max(self.stats.peak_size, self.stats.total_size)
 
-            await self.analyzer.record_access(key, CacheOperation.SET, True)
+            self.analyzer.record(key, CacheOperation.SET, True)
 
             return True
 
@@ -470,9 +554,9 @@ class MemoryCacheBackend(CacheBackend):
         """刪除緩存條目"""
         async with self._lock:
             if key in self._cache:
-                await self._remove_entry(key)
+                self._remove_entry(key)
                 self.stats.deletes += 1
-                await self.analyzer.record_access(key, CacheOperation.DELETE, True)
+                self.analyzer.record(key, CacheOperation.DELETE, True)
                 return True
             return False
 
@@ -487,23 +571,36 @@ class MemoryCacheBackend(CacheBackend):
 
     async def keys(self) -> list[str]:
         """獲取所有鍵"""
-        async with self._lock:
-            return list(self._cache.keys())
+        return list(self._cache.keys())
 
     async def size(self) -> int:
         """獲取緩存大小"""
-        async with self._lock:
-            return len(self._cache)
+        return len(self._cache)
+
+    def purge_expired(self) -> int:
+        """移除所有過期條目
+
+        Returns:
+            int: 移除的條目數量
+        """
+        now = time.time()
+        expired_keys = [
+            key for key, entry in self._cache.items() if entry.is_expired(now)
+        ]
+        for key in expired_keys:
+            self._remove_entry(key)
+        self.stats.expired += len(expired_keys)
+        return len(expired_keys)
 
     def _update_access_order(self, key: str):
         """更新訪問順序"""
         self._access_order[key] = time.time()
         self._access_order.move_to_end(key)
 
-    async def _remove_entry(self, key: str):
+    def _remove_entry(self, key: str):
         """移除條目"""
-        if key in self._cache:
-            entry = self._cache.pop(key)
+        entry = self._cache.pop(key, None)
+        if entry is not None:
             self._access_order.pop(key, None)
             self.stats.entry_count -= 1
             self.stats.total_size -= entry.size
@@ -516,20 +613,20 @@ class MemoryCacheBackend(CacheBackend):
                 self._cache, self.max_size - 1
             )
             for key in keys_to_evict:
-                await self._remove_entry(key)
+                self._remove_entry(key)
                 self.stats.evictions += 1
         # 使用傳統策略
         elif self.strategy == CacheStrategy.LRU:
             # 移除最近最少使用的
             oldest_key = next(iter(self._access_order))
-            await self._remove_entry(oldest_key)
+            self._remove_entry(oldest_key)
             self.stats.evictions += 1
         elif self.strategy == CacheStrategy.LFU:
             # 移除最不常用的
             min_freq_key = min(
                 self._cache.keys(), key=lambda k: self._cache[k].access_count
             )
-            await self._remove_entry(min_freq_key)
+            self._remove_entry(min_freq_key)
             self.stats.evictions += 1
 
     async def get_detailed_stats(self) -> dict[str, Any]:
@@ -559,24 +656,47 @@ class MemoryCacheBackend(CacheBackend):
 
 
 class PersistentCacheBackend(CacheBackend):
-    """持久化緩存後端(L2)"""
+    """持久化緩存後端(L2)
+
+    所有 SQLite 操作在專屬的單一執行緒中以同一個連線執行, 不阻塞事件迴圈.
+    命中時的訪問統計先在記憶體中合併, 定期或累積到上限時批次寫入;
+    條目數量在記憶體中維護(stats.entry_count), 寫入前不需要 COUNT(*);
+    過期條目依已建立索引的 expires_at 欄位批次清除.
+    """
 
     # 常數定義
-    MAX_CONNECTION_POOL_SIZE = 10  # 連接池最大大小
+    ACCESS_FLUSH_INTERVAL = 5.0  # 訪問統計寫入間隔(秒)
+    ACCESS_FLUSH_THRESHOLD = 500  # 累積多少個鍵的訪問統計時立即寫入
+    PURGE_BATCH_SIZE = 1000  # 每批清除的過期條目數量
+
+    _COLUMNS = (
+        "key, value, timestamp, access_count, last_access, ttl, size, metadata, "
+        "hit_count, load_time"
+    )
 
-    def __init__(self, db_path: str = "cache.db", max_size: int = 10000):
+    def __init__(
+        self,
+        db_path: str = "cache.db",
+        max_size: int = 10000,
+        access_flush_interval: float = ACCESS_FLUSH_INTERVAL,
+    ):
         self.db_path = db_path
         self.max_size = max_size
+        self.access_flush_interval = access_flush_interval
         self.stats = CacheStats()
-        self._connection_pool: list[sqlite3.Connection] = []
-        self._pool_lock = threading.Lock()
-        self._lock = asyncio.Lock()
-        self._initialize_db()
+        self._conn: sqlite3.Connection | None = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="cache-l2"
+        )
+        # 尚未寫入的訪問統計: 鍵 -> (access_count, last_access, hit_count)
+        self._pending_access: dict[str, tuple[int, float, int]] = {}
+        self._flush_task: asyncio.Task | None = None
+        self._executor.submit(self._initialize_db).result()
 
     def _initialize_db(self):
-        """初始化資料庫"""
+        """初始化資料庫(在專屬執行緒中執行)"""
         try:
-            conn = sqlite3.connect(self.db_path)
+            conn = self._connection()
             conn.execute("""
                 CREATE TABLE IF NOT EXISTS cache_entries (
                     key TEXT PRIMARY KEY,
@@ -588,10 +708,22 @@ class PersistentCacheBackend(CacheBackend):
                     size INTEGER,
                     metadata TEXT,
                     hit_count INTEGER DEFAULT 0,
-                    load_time REAL DEFAULT 0.0
+                    load_time REAL DEFAULT 0.0,
+                    expires_at REAL
                 )
             """)
 
+            # 舊版資料表沒有 expires_at 欄位
+            columns = {
+                row[1] for row in conn.execute("PRAGMA table_info(cache_entries)")
+            }
+            if "expires_at" not in columns:
+                conn.execute("ALTER TABLE cache_entries ADD COLUMN expires_at REAL")
+                conn.execute(
+                    "UPDATE cache_entries SET expires_at = timestamp + ttl "
+                    "WHERE ttl IS NOT NULL"
+                )
+
             # 添加索引以提升性能
             conn.execute(
                 "CREATE INDEX IF NOT EXISTS idx_last_access ON cache_entries(last_access)"
@@ -602,151 +734,272 @@ class PersistentCacheBackend(CacheBackend):
             conn.execute(
                 "CREATE INDEX IF NOT EXISTS idx_timestamp ON cache_entries(timestamp)"
             )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_expires_at ON cache_entries(expires_at)"
+            )
 
             conn.commit()
-            conn.close()
+            self.stats.entry_count = conn.execute(
+                "SELECT COUNT(*) FROM cache_entries"
+            ).fetchone()[0]
         except Exception as e:
             logger.error(f"資料庫初始化失敗: {e}")
 
-    def _get_connection(self) -> sqlite3.Connection:
-        """獲取資料庫連接"""
-        with self._pool_lock:
-            if self._connection_pool:
-                return self._connection_pool.pop()
-            else:
-                return sqlite3.connect(self.db_path)
+    def _connection(self) -> sqlite3.Connection:
+        """獲取資料庫連接(僅在專屬執行緒中呼叫)"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.db_path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn = conn
+        return self._conn
 
-    def _return_connection(self, conn: sqlite3.Connection):
-        """歸還資料庫連接"""
-        with self._pool_lock:
-            if len(self._connection_pool) < self.MAX_CONNECTION_POOL_SIZE:
-                self._connection_pool.append(conn)
-            else:
-                conn.close()
+    async def _run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """在專屬執行緒中執行 SQLite 操作"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
 
     async def get(self, key: str) -> CacheEntry | None:
         """獲取緩存條目"""
-        async with self._lock:
-            conn = self._get_connection()
-            try:
-                cursor = conn.execute(
-                    "SELECT * FROM cache_entries WHERE key = ?", (key,)
-                )
-                row = cursor.fetchone()
+        now = time.time()
+        entry = await self._run(self._get_entry, key, now)
+        if entry is None:
+            self.stats.misses += 1
+            return None
+
+        # 檢查過期(過期條目已在執行緒中刪除)
+        if entry.is_expired(now):
+            self._pending_access.pop(key, None)
+            self.stats.misses += 1
+            self.stats.expired += 1
+            return None
+
+        # 合併尚未寫入的訪問統計
+        pending = self._pending_access.get(key)
+        if pending is not None:
+            entry.access_count, entry.last_access, entry.hit_count = pending
+
+        # 更新訪問信息(延後批次寫入)
+        entry.touch()
+        self.stats.hits += 1
+        await self._record_access(entry)
 
-                if row is None:
-                    self.stats.misses += 1
-                    return None
-
-                entry = self._row_to_entry(row)
-
-                # 檢查過期
-                if entry.is_expired():
-                    await self._delete_entry(key, conn)
-                    self.stats.misses += 1
-                    self.stats.expired += 1
-                    return None
-
-                # 更新訪問信息
-                entry.touch()
-                await self._update_entry(entry, conn)
-                self.stats.hits += 1
+        return entry
 
-                return entry
+    def _get_entry(self, key: str, now: float) -> CacheEntry | None:
+        """讀取條目, 過期時直接刪除(在專屬執行緒中執行)"""
+        conn = self._connection()
+        row = conn.execute(
+            f"SELECT {self._COLUMNS} FROM cache_entries WHERE key = ?",
+            (key,),
+        ).fetchone()
+        if row is None:
+            return None
+
+        entry = self._row_to_entry(row)
+        if entry.is_expired(now):
+            self._delete_sync(key)
+        return entry
 
-            finally:
-                self._return_connection(conn)
+    async def _record_access(self, entry: CacheEntry):
+        """記錄訪問統計, 累積到上限時寫入"""
+        self._pending_access[entry.key] = (
+            entry.access_count,
+            entry.last_access,
+            entry.hit_count,
+        )
+        if len(self._pending_access) >= self.ACCESS_FLUSH_THRESHOLD:
+            await self.flush_access_stats()
+        elif self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _flush_loop(self):
+        """定期寫入訪問統計"""
+        while self._pending_access:
+            await asyncio.sleep(self.access_flush_interval)
+            try:
+                await self.flush_access_stats()
+            except Exception as e:
+                logger.error(f"寫入訪問統計失敗: {e}")
+
+    async def flush_access_stats(self) -> int:
+        """在一個交易中寫入累積的訪問統計
+
+        Returns:
+            int: 寫入的鍵數量
+        """
+        if not self._pending_access:
+            return 0
+        pending, self._pending_access = self._pending_access, {}
+        rows = [
+            (access_count, last_access, hit_count, key)
+            for key, (access_count, last_access, hit_count) in pending.items()
+        ]
+        await self._run(self._update_entries, rows)
+        return len(rows)
+
+    def _update_entries(self, rows: list[tuple]):
+        """批次更新訪問統計(在專屬執行緒中執行)"""
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                """
+                UPDATE cache_entries
+                SET access_count = ?, last_access = ?, hit_count = ?
+                WHERE key = ?
+            """,
+                rows,
+            )
 
     async def set(self, key: str, entry: CacheEntry) -> bool:
         """設置緩存條目"""
-        async with self._lock:
-            conn = self._get_connection()
-            try:
-                # 檢查是否需要淘汰
-                entry_count = await self._get_entry_count(conn)
-                if entry_count >= self.max_size:
-                    await self._evict_entries(conn)
+        try:
+            # 序列化數據
+            row = (
+                key,
+                pickle.dumps(entry.value),
+                entry.timestamp,
+                entry.access_count,
+                entry.last_access,
+                entry.ttl,
+                entry.size,
+                json.dumps(entry.metadata),
+                entry.hit_count,
+                entry.load_time,
+                entry.timestamp + entry.ttl if entry.ttl is not None else None,
+            )
+            # 覆寫時捨棄舊條目尚未寫入的訪問統計
+            self._pending_access.pop(key, None)
 
-                # 序列化數據
-                value_blob = pickle.dumps(entry.value)
-                metadata_json = json.dumps(entry.metadata)
+            # 淘汰依 last_access 排序, 先寫入訪問統計
+            if self.stats.entry_count >= self.max_size:
+                await self.flush_access_stats()
 
-                # 插入或更新
-                conn.execute(
-                    """
-                    INSERT OR REPLACE INTO cache_entries
-                    (key, value, timestamp, access_count, last_access, ttl, size, metadata, hit_count, load_time)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                    (
-                        key,
-                        value_blob,
-                        entry.timestamp,
-                        entry.access_count,
-                        entry.last_access,
-                        entry.ttl,
-                        entry.size,
-                        metadata_json,
-                        entry.hit_count,
-                        entry.load_time,
-                    ),
-                )
+            await self._run(self._set_entry, row)
+            self.stats.sets += 1
 
-                conn.commit()
-                self.stats.sets += 1
+            return True
 
-                return True
+        except Exception as e:
+            logger.error(f"設置緩存條目失敗: {e}")
+            return False
 
-            except Exception as e:
-                logger.error(f"設置緩存條目失敗: {e}")
-                return False
-            finally:
-                self._return_connection(conn)
+    def _set_entry(self, row: tuple):
+        """寫入條目並維護條目數量(在專屬執行緒中執行)"""
+        conn = self._connection()
+        key = row[0]
+        exists = (
+            conn.execute("SELECT 1 FROM cache_entries WHERE key = ?", (key,)).fetchone()
+            is not None
+        )
+
+        # 檢查是否需要淘汰
+        if not exists and self.stats.entry_count >= self.max_size:
+            self._evict_entries(conn)
+
+        with conn:
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO cache_entries
+                (key, value, timestamp, access_count, last_access, ttl, size,
+                 metadata, hit_count, load_time, expires_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                row,
+            )
+        if not exists:
+            self.stats.entry_count += 1
 
     async def delete(self, key: str) -> bool:
         """刪除緩存條目"""
-        async with self._lock:
-            conn = self._get_connection()
-            try:
-                result = await self._delete_entry(key, conn)
-                if result:
-                    self.stats.deletes += 1
-                return result
-            finally:
-                self._return_connection(conn)
+        self._pending_access.pop(key, None)
+        result = await self._run(self._delete_sync, key)
+        if result:
+            self.stats.deletes += 1
+        return result
 
     async def clear(self) -> bool:
         """清空緩存"""
-        async with self._lock:
-            conn = self._get_connection()
-            try:
-                conn.execute("DELETE FROM cache_entries")
-                conn.commit()
-                return True
-            except Exception as e:
-                logger.error(f"清空緩存失敗: {e}")
-                return False
-            finally:
-                self._return_connection(conn)
+        self._pending_access.clear()
+        try:
+            await self._run(self._clear_sync)
+            return True
+        except Exception as e:
+            logger.error(f"清空緩存失敗: {e}")
+            return False
+
+    def _clear_sync(self):
+        """清空資料表(在專屬執行緒中執行)"""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM cache_entries")
+        self.stats.entry_count = 0
 
     async def keys(self) -> list[str]:
         """獲取所有鍵"""
-        async with self._lock:
-            conn = self._get_connection()
-            try:
-                cursor = conn.execute("SELECT key FROM cache_entries")
-                return [row[0] for row in cursor.fetchall()]
-            finally:
-                self._return_connection(conn)
+        return await self._run(self._keys_sync)
+
+    def _keys_sync(self) -> list[str]:
+        """讀取所有鍵(在專屬執行緒中執行)"""
+        cursor = self._connection().execute("SELECT key FROM cache_entries")
+        return [row[0] for row in cursor.fetchall()]
 
     async def size(self) -> int:
         """獲取緩存大小"""
-        async with self._lock:
-            conn = self._get_connection()
-            try:
-                return await self._get_entry_count(conn)
-            finally:
-                self._return_connection(conn)
+        return self.stats.entry_count
+
+    async def purge_expired(self) -> int:
+        """依 expires_at 索引批次清除過期條目
+
+        每批一個交易, 批次之間讓出執行緒, 讀寫不需等待整個清除完成.
+
+        Returns:
+            int: 清除的條目數量
+        """
+        now = time.time()
+        purged = 0
+        while True:
+            deleted = await self._run(self._purge_batch, now)
+            purged += deleted
+            if deleted < self.PURGE_BATCH_SIZE:
+                break
+
+        self.stats.expired += purged
+        return purged
+
+    def _purge_batch(self, now: float) -> int:
+        """清除一批過期條目(在專屬執行緒中執行)"""
+        conn = self._connection()
+        with conn:
+            deleted = conn.execute(
+                """
+                DELETE FROM cache_entries WHERE rowid IN (
+                    SELECT rowid FROM cache_entries WHERE expires_at < ? LIMIT ?
+                )
+            """,
+                (now, self.PURGE_BATCH_SIZE),
+            ).rowcount
+        self.stats.entry_count -= deleted
+        return deleted
+
+    async def close(self):
+        """寫入訪問統計, 關閉連接並結束專屬執行緒"""
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._flush_task
+        try:
+            await self.flush_access_stats()
+        except Exception as e:
+            logger.error(f"寫入訪問統計失敗: {e}")
+        await self._run(self._close_connection)
+        self._executor.shutdown(wait=False)
+
+    def _close_connection(self):
+        """關閉連接(在專屬執行緒中執行)"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
 
     def _row_to_entry(self, row: tuple) -> CacheEntry:
         """將資料庫行轉換為緩存條目"""
@@ -785,45 +1038,33 @@ class PersistentCacheBackend(CacheBackend):
 
         return entry
 
-    async def _delete_entry(self, key: str, conn: sqlite3.Connection) -> bool:
-        """刪除條目"""
-        cursor = conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
-        conn.commit()
-        return cursor.rowcount > 0
-
-    async def _update_entry(self, entry: CacheEntry, conn: sqlite3.Connection):
-        """更新條目"""
-        conn.execute(
-            """
-            UPDATE cache_entries
-            SET access_count = ?, last_access = ?, hit_count = ?
-            WHERE key = ?
-        """,
-            (entry.access_count, entry.last_access, entry.hit_count, entry.key),
-        )
-        conn.commit()
-
-    async def _get_entry_count(self, conn: sqlite3.Connection) -> int:
-        """獲取條目數量"""
-        cursor = conn.execute("SELECT COUNT(*) FROM cache_entries")
-        return cursor.fetchone()[0]
+    def _delete_sync(self, key: str) -> bool:
+        """刪除條目(在專屬執行緒中執行)"""
+        conn = self._connection()
+        with conn:
+            cursor = conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+        if cursor.rowcount > 0:
+            self.stats.entry_count -= cursor.rowcount
+            return True
+        return False
 
-    async def _evict_entries(self, conn: sqlite3.Connection):
-        """淘汰條目"""
+    def _evict_entries(self, conn: sqlite3.Connection):
+        """淘汰條目(在專屬執行緒中執行)"""
         # 移除最舊的條目
-        conn.execute(
-            """
-            DELETE FROM cache_entries
-            WHERE key IN (
-                SELECT key FROM cache_entries
-                ORDER BY last_access ASC
-                LIMIT ?
-            )
-        """,
-            (max(1, self.max_size // 10),),
-        )  # 一次淘汰10%
-        conn.commit()
-        self.stats.evictions += conn.total_changes
+        with conn:
+            cursor = conn.execute(
+                """
+                DELETE FROM cache_entries
+                WHERE key IN (
+                    SELECT key FROM cache_entries
+                    ORDER BY last_access ASC
+                    LIMIT ?
+                )
+            """,
+                (max(1, self.max_size // 10),),
+            )  # 一次淘汰10%
+        self.stats.evictions += cursor.rowcount
+        self.stats.entry_count -= cursor.rowcount
 
 
 class MultiLevelCache:
@@ -837,8 +1078,11 @@ class MultiLevelCache:
         default_ttl: float | None = None,
         db_path: str = "cache.db",
         enable_preloading: bool = True,
+        l1_size_estimator: Callable[[Any], int] | None = None,
     ):
-        self.l1_backend = MemoryCacheBackend(l1_max_size, l1_strategy)
+        self.l1_backend = MemoryCacheBackend(
+            l1_max_size, l1_strategy, size_estimator=l1_size_estimator
+        )
         self.l2_backend = PersistentCacheBackend(db_path, l2_max_size)
         self.default_ttl = default_ttl
         self.enable_preloading = enable_preloading
@@ -849,6 +1093,9 @@ class MultiLevelCache:
         else:
             self.preloader = None
 
+        # 進行中的載入: 同一個鍵的並發未命中共用一次載入
+        self._inflight: dict[str, asyncio.Task] = {}
+
         # 啟動清理任務
         self._cleanup_task = None
         self._start_cleanup_task()
@@ -878,31 +1125,136 @@ class MultiLevelCache:
     async def _cleanup_expired(self):
         """清理過期條目"""
         # 清理 L1 過期條目
-        l1_keys = await self.l1_backend.keys()
-        for key in l1_keys:
-            entry = await self.l1_backend.get(key)
-            if entry and entry.is_expired():
-                await self.l1_backend.delete(key)
+        self.l1_backend.purge_expired()
 
-        # 清理 L2 過期條目(通過資料庫查詢)
-        # 這裡可以添加更高效的批量清理邏輯
+        # 清理 L2 過期條目(依 expires_at 索引批次刪除)
+        await self.l2_backend.purge_expired()
+        await self.l2_backend.flush_access_stats()
 
     async def get(self, key: str) -> Any | None:
         """獲取緩存值"""
-        # 先從 L1 獲取
-        entry = await self.l1_backend.get(key)
+        entry = await self._get_entry(key)
+        return entry.value if entry else None
+
+    async def _get_entry(self, key: str) -> CacheEntry | None:
+        """獲取緩存條目(L1 未命中時從 L2 提升)"""
+        # 先從 L1 獲取(同步熱路徑)
+        entry = self.l1_backend.get_nowait(key)
         if entry:
-            return entry.value
+            return entry
 
         # 再從 L2 獲取
         entry = await self.l2_backend.get(key)
         if entry:
             # 提升到 L1
             await self.l1_backend.set(key, entry)
-            return entry.value
+            return entry
 
         return None
 
+    async def get_or_set(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float | None = None,
+        stale_ttl: float = 0.0,
+        early_expiration_beta: float = 0.0,
+    ) -> Any:
+        """獲取緩存值, 未命中時載入並緩存
+
+        同一個鍵的並發未命中共用一次載入(single-flight).
+
+        Args:
+            key: 緩存鍵
+            loader: 載入函數(回傳 None 時不緩存)
+            ttl: 新鮮時間(秒)
+            stale_ttl: 過了新鮮時間後仍可回傳舊值的時間(秒), 期間在背景重新載入
+            early_expiration_beta: 提前過期(XFetch)係數, 0 表示停用;
+                越大越早在背景重新載入, 載入越慢的值也越早
+
+        Returns:
+            Any: 緩存值或載入結果
+        """
+        if ttl is None:
+            ttl = self.default_ttl
+
+        entry = await self._get_entry(key)
+        if entry is not None:
+            fresh_until = entry.metadata.get("fresh_until")
+            if fresh_until is not None:
+                now = time.time()
+                if now >= fresh_until or (
+                    early_expiration_beta > 0
+                    and self._should_refresh_early(
+                        now, fresh_until, entry.load_time, early_expiration_beta
+                    )
+                ):
+                    # 回傳目前的值, 在背景重新載入
+                    self._load_shared(key, loader, ttl, stale_ttl)
+            return entry.value
+
+        # 不因單一呼叫者取消而取消共用的載入
+        return await asyncio.shield(self._load_shared(key, loader, ttl, stale_ttl))
+
+    @staticmethod
+    def _should_refresh_early(
+        now: float, fresh_until: float, load_time: float, beta: float
+    ) -> bool:
+        """XFetch: 依載入耗時與隨機數決定是否提前重新載入"""
+        return now - load_time * beta * math.log(1.0 - random.random()) >= fresh_until
+
+    def _load_shared(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float | None,
+        stale_ttl: float,
+    ) -> asyncio.Task:
+        """取得鍵的進行中載入, 沒有時建立"""
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._load(key, loader, ttl, stale_ttl))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._on_load_done, key))
+        return task
+
+    def _on_load_done(self, key: str, task: asyncio.Task):
+        """載入完成後移除進行中記錄"""
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 背景重新載入沒有呼叫者等待, 在此記錄錯誤
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"緩存載入失敗 {key}: {task.exception()}")
+
+    async def _load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl: float | None,
+        stale_ttl: float,
+    ) -> Any:
+        """執行載入並緩存結果"""
+        start_time = time.perf_counter()
+        value = await loader()
+        load_time = time.perf_counter() - start_time
+
+        if value is not None:
+            now = time.time()
+            metadata = {}
+            if ttl is not None:
+                metadata["fresh_until"] = now + ttl
+            entry = CacheEntry(
+                key=key,
+                value=value,
+                timestamp=now,
+                ttl=ttl + stale_ttl if ttl is not None else None,
+                metadata=metadata,
+                load_time=load_time,
+            )
+            await self._store(entry, CacheLevel.BOTH)
+
+        return value
+
     async def set(
         self,
         key: str,
@@ -915,7 +1267,11 @@ class MultiLevelCache:
             ttl = self.default_ttl
 
         entry = CacheEntry(key=key, value=value, ttl=ttl, load_time=0.0)
+        return await self._store(entry, level)
 
+    async def _store(self, entry: CacheEntry, level: CacheLevel) -> bool:
+        """將條目寫入指定級別"""
+        key = entry.key
         success = True
 
         # 根據級別設置緩存
@@ -962,6 +1318,7 @@ class MultiLevelCache:
         if entry:
             entry.ttl = ttl
             entry.timestamp = time.time()
+            entry.metadata.pop("fresh_until", None)
             await self.l1_backend.set(key, entry)
 
         # 更新 L2
@@ -969,6 +1326,7 @@ class MultiLevelCache:
         if entry:
             entry.ttl = ttl
             entry.timestamp = time.time()
+            entry.metadata.pop("fresh_until", None)
             await self.l2_backend.set(key, entry)
 
         return True
@@ -1028,11 +1386,14 @@ class MultiLevelCache:
             with suppress(asyncio.CancelledError):
                 await self._cleanup_task
 
-        # 清理連接池
-        with self.l2_backend._pool_lock:
-            for conn in self.l2_backend._connection_pool:
-                conn.close()
-            self.l2_backend._connection_pool.clear()
+        # 取消進行中的載入
+        inflight = list(self._inflight.values())
+        for task in inflight:
+            task.cancel()
+        await asyncio.gather(*inflight, return_exceptions=True)
+
+        # 寫入訪問統計並關閉 L2 連接
+        await self.l2_backend.close()
 
 
 class GlobalCacheManager:
@@ -1089,6 +1450,18 @@ async def cache_delete(key: str) -> bool:
     return await cache.delete(key)
 
 
+async def cache_get_or_set(
+    key: str,
+    loader: Callable[[], Awaitable[Any]],
+    ttl: float | None = None,
+    stale_ttl: float = 0.0,
+    early_expiration_beta: float = 0.0,
+) -> Any:
+    """獲取緩存值, 未命中時載入並緩存(並發未命中共用一次載入)"""
+    cache = await get_global_cache_manager()
+    return await cache.get_or_set(key, loader, ttl, stale_ttl, early_expiration_beta)
+
+
 def cache_key(*args, **kwargs) -> str:
     """生成緩存鍵"""
     # 創建一個唯一的緩存鍵
@@ -1110,8 +1483,22 @@ def cache_key(*args, **kwargs) -> str:
     return hashlib.sha256(key_string.encode()).hexdigest()
 
 
-def cached(ttl: float | None = None, key_func: Callable | None = None):
-    """緩存裝飾器"""
+def cached(
+    ttl: float | None = None,
+    key_func: Callable | None = None,
+    stale_ttl: float = 0.0,
+    early_expiration_beta: float = 0.0,
+):
+    """緩存裝飾器
+
+    並發的未命中共用一次函數執行, 參數見 MultiLevelCache.get_or_set
+
+    Args:
+        ttl: 新鮮時間(秒)
+        key_func: 緩存鍵生成函數
+        stale_ttl: 過期後仍回傳舊值並在背景重新執行的時間(秒)
+        early_expiration_beta: 提前過期(XFetch)係數, 0 表示停用
+    """
 
     def decorator(func):
         @functools.wraps(func)
@@ -1122,23 +1509,24 @@ def cached(ttl: float | None = None, key_func: Callable | None = None):
             else:
                 cache_key_str = f"{func.__name__}:{cache_key(*args, **kwargs)}"
 
-            # 嘗試從緩存獲取
-            cached_result = await cache_get(cache_key_str)
-            if cached_result is not None:
-                return cached_result
+            async def load():
+                # 執行函數
+                start_time = time.time()
+                result = await func(*args, **kwargs)
+                execution_time = time.time() - start_time
 
-            # 執行函數並緩存結果
-            start_time = time.time()
-            result = await func(*args, **kwargs)
-            execution_time = time.time() - start_time
-
-            # 設置緩存
-            await cache_set(cache_key_str, result, ttl)
+                # 記錄性能指標
+                logger.debug(f"函數 {func.__name__} 執行耗時: {execution_time:.3f}s")
 
-            # 記錄性能指標
-            logger.debug(f"函數 {func.__name__} 執行耗時: {execution_time:.3f}s")
+                return result
 
-            return result
+            return await cache_get_or_set(
+                cache_key_str,
+                load,
+                ttl,
+                stale_ttl=stale_ttl,
+                early_expiration_beta=early_expiration_beta,
+            )
 
         return wrapper
 
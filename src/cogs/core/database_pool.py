@@ -10,6 +10,7 @@
 - 智能負載均衡
 - 連接預熱機制
 - 自動故障恢復
+- 單一寫入連接 + 多個 WAL 讀取連接
 
 作者: Discord ADR Bot Team
 創建時間: 2025-01-24
@@ -132,6 +133,9 @@ class PoolMetrics:
         self.total_query_time = 0.0
         self.connection_errors = 0
         self.health_check_failures = 0
+        self.checkout_waits = 0
+        self.checkout_timeouts = 0
+        self.total_checkout_wait = 0.0
         self.created_at = time.time()
         self.peak_active_connections = 0
         self.query_history: deque = deque(maxlen=1000)  # 最近1000次查詢記錄
@@ -183,6 +187,14 @@ class PoolMetrics:
         async with self._lock:
             self.health_check_failures += 1
 
+    async def record_checkout_wait(self, duration: float, timed_out: bool = False):
+        """記錄等待可用連接的時間"""
+        async with self._lock:
+            self.checkout_waits += 1
+            self.total_checkout_wait += duration
+            if timed_out:
+                self.checkout_timeouts += 1
+
     async def get_metrics_summary(self) -> dict[str, Any]:
         """獲取指標摘要"""
         async with self._lock:
@@ -223,6 +235,13 @@ class PoolMetrics:
                 "recent_success_rate": recent_success_rate,
                 "connection_errors": self.connection_errors,
                 "health_check_failures": self.health_check_failures,
+                "checkout_waits": self.checkout_waits,
+                "checkout_timeouts": self.checkout_timeouts,
+                "avg_checkout_wait_ms": (
+                    self.total_checkout_wait / self.checkout_waits * 1000
+                    if self.checkout_waits > 0
+                    else 0.0
+                ),
                 "queries_per_second": self.total_queries / uptime
                 if uptime > 0
                 else 0.0,
@@ -345,6 +364,9 @@ class ConnectionPrewarmer:
 
         try:
             for _i in range(self.config.warmup_connections):
+                if not pool._can_add_reader(db_path):
+                    break
+
                 conn = await pool._create_connection(db_path)
                 if conn:
                     conn.metrics.status = ConnectionStatus.WARMING
@@ -425,6 +447,9 @@ class AutoRecovery:
 
             # 重新創建最小數量的連接
             for _ in range(pool.config.min_connections):
+                if not pool._can_add_reader(db_path):
+                    break
+
                 conn = await pool._create_connection(db_path)
                 if conn:
                     logger.debug(f"恢復連接成功: {conn.connection_id}")
@@ -446,17 +471,25 @@ class PooledConnection:
     MAX_ERROR_COUNT = 10  # 連接失效的最大錯誤次數
 
     def __init__(
-        self, connection: aiosqlite.Connection, db_path: str, pool_ref: weakref.ref
+        self,
+        connection: aiosqlite.Connection,
+        db_path: str,
+        pool_ref: weakref.ref,
+        is_writer: bool = False,
     ):
         self.connection = connection
         self.db_path = db_path
         self.pool_ref = pool_ref
+        self.is_writer = is_writer
         self.connection_id = hashlib.sha256(
             f"{db_path}_{time.time()}_{id(self)}".encode()
         ).hexdigest()[:8]
         self.metrics = ConnectionMetrics(self.connection_id)
         self.is_healthy = True
         self.in_use = False
+        # 寫入連接可由同一任務重複取得, 記錄持有任務與巢狀層數
+        self.owner: asyncio.Task | None = None
+        self.checkout_depth = 0
         self._lock = asyncio.Lock()
         self._query_lock = asyncio.Lock()  # 防止並發查詢
 
@@ -696,7 +729,11 @@ class ConnectionHealthMonitor:
         for db_path, connections in pool._connections.items():
             connections_to_remove = []
 
-            for conn in connections:
+            for conn in list(connections):
+                # 使用中的連接由持有者負責, 不在此檢查
+                if conn.in_use:
+                    continue
+
                 # 檢查是否過期
                 if conn.is_expired(self.config):
                     connections_to_remove.append(conn)
@@ -717,7 +754,11 @@ class ConnectionHealthMonitor:
             # 確保最小連接數
             current_count = len(pool._connections.get(db_path, []))
             if current_count < self.config.min_connections:
-                needed = self.config.min_connections - current_count
+                # 補充的連接為讀取連接, 不可超過讀取連接上限
+                needed = min(
+                    self.config.min_connections - current_count,
+                    pool.max_readers - len(pool._get_readers(db_path)),
+                )
                 for _ in range(needed):
                     try:
                         new_conn = await pool._create_connection(db_path)
@@ -729,12 +770,22 @@ class ConnectionHealthMonitor:
 
 
 class DatabaseConnectionPool:
-    """資料庫連接池"""
+    """
+    資料庫連接池
+
+    每個 SQLite 檔案使用一個專用寫入連接與最多 max_connections - 1 個讀取連接.
+    寫入在程序內依序進行, 不會互相觸發 "database is locked";
+    WAL 模式下讀取不會阻塞寫入, 讀取吞吐量隨讀取連接數增加.
+    沒有可用連接時, 請求會在 asyncio.Condition 上等待直到逾時.
+    """
 
     def __init__(self, config: PoolConfiguration | None = None):
         self.config = config or PoolConfiguration()
         self._connections: dict[str, list[PooledConnection]] = defaultdict(list)
-        self._locks: dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._conditions: dict[str, asyncio.Condition] = defaultdict(asyncio.Condition)
+        # 正在建立中(已預留名額)的連接數, 鍵為 (db_path, is_writer)
+        self._pending_creations: dict[tuple[str, bool], int] = defaultdict(int)
+        self._waiting: dict[str, int] = defaultdict(int)
         self.metrics = PoolMetrics()
 
         # 初始化組件
@@ -765,58 +816,222 @@ class DatabaseConnectionPool:
                 await conn.close()
 
         self._connections.clear()
-        self._locks.clear()
+        self._conditions.clear()
+        self._pending_creations.clear()
+        self._waiting.clear()
         self._initialized = False
 
         logger.info("[連接池]連接池已關閉")
 
-    async def get_connection(self, db_path: str) -> PooledConnection:
-        """獲取連接"""
+    @property
+    def max_readers(self) -> int:
+        """每個資料庫檔案的讀取連接上限(其餘一個名額留給寫入連接)"""
+        return max(self.config.max_connections - 1, 0)
+
+    def _get_writer(self, db_path: str) -> PooledConnection | None:
+        """取得資料庫檔案的寫入連接"""
+        for conn in self._connections.get(db_path, []):
+            if conn.is_writer:
+                return conn
+        return None
+
+    def _get_readers(self, db_path: str) -> list[PooledConnection]:
+        """取得資料庫檔案的所有讀取連接"""
+        return [
+            conn for conn in self._connections.get(db_path, []) if not conn.is_writer
+        ]
+
+    def _can_add_reader(self, db_path: str) -> bool:
+        """檢查是否還能為資料庫檔案建立讀取連接"""
+        reserved = self._pending_creations[(db_path, False)]
+        return len(self._get_readers(db_path)) + reserved < self.max_readers
+
+    async def get_connection(
+        self, db_path: str, readonly: bool = False, timeout: float | None = None
+    ) -> PooledConnection:
+        """
+        獲取連接
+
+        Args:
+            db_path: 資料庫檔案路徑
+            readonly: 是否只需讀取; 讀取使用讀取連接, 其餘使用唯一的寫入連接
+            timeout: 等待可用連接的秒數, 預設為 connection_timeout
+
+        Returns:
+            PooledConnection: 已標記為使用中的連接
+
+        Raises:
+            RuntimeError: 在逾時前無法取得連接
+        """
         if not self._initialized:
             await self.initialize()
 
-        async with self._locks[db_path]:
-            # 嘗試從現有連接中選擇
-            connections = self._connections[db_path]
-
-            # 使用負載均衡器選擇連接
-            if self.config.enable_load_balancing:
-                connection = await self.load_balancer.select_connection(connections)
-                if connection:
-                    connection.in_use = True
-                    return connection
-            else:
-                # 簡單選擇第一個可用連接
-                for conn in connections:
-                    if conn.is_healthy and not conn.in_use:
-                        conn.in_use = True
-                        return conn
-
-            # 如果沒有可用連接且未達到最大數量,創建新連接
-            if len(connections) < self.config.max_connections:
-                new_conn = await self._create_connection(db_path)
-                if new_conn:
-                    new_conn.in_use = True
-
-                    # 當創建第一個連接時啟動連接預熱機制
-                    if len(connections) == 1:
-                        await self.prewarmer.start_prewarming(db_path)
-
-                    return new_conn
-
-            # 如果仍然沒有可用連接,等待或拋出異常
+        # 沒有讀取名額時, 讀取也使用寫入連接
+        use_writer = not readonly or self.max_readers == 0
+        if use_writer and (writer := self._reenter_writer(db_path)):
+            return writer
+
+        timeout = self.config.connection_timeout if timeout is None else timeout
+        condition = self._conditions[db_path]
+        wait_start: float | None = None
+
+        try:
+            async with asyncio.timeout(timeout), condition:
+                while True:
+                    connection = await self._checkout_locked(db_path, use_writer)
+                    if connection is not None:
+                        break
+
+                    # 預留名額, 在鎖外建立新連接
+                    if self._reserve_slot_locked(db_path, use_writer):
+                        connection = None
+                        break
+
+                    if wait_start is None:
+                        wait_start = time.time()
+                    self._waiting[db_path] += 1
+                    try:
+                        await condition.wait()
+                    finally:
+                        self._waiting[db_path] -= 1
+        except TimeoutError:
+            if wait_start is not None and self.config.enable_metrics:
+                await self.metrics.record_checkout_wait(
+                    time.time() - wait_start, timed_out=True
+                )
+            role = "寫入" if use_writer else "讀取"
+            total = len(self._connections[db_path])
             raise RuntimeError(
-                f"無法獲取資料庫連接: {db_path} (活躍連接: {len(connections)}/{self.config.max_connections})"
+                f"無法獲取資料庫{role}連接: {db_path} "
+                f"(等待 {timeout} 秒後逾時, "
+                f"連接數: {total}/{self.config.max_connections})"
+            ) from None
+
+        if wait_start is not None and self.config.enable_metrics:
+            await self.metrics.record_checkout_wait(time.time() - wait_start)
+
+        if connection is None:
+            connection = await self._create_reserved(db_path, use_writer)
+
+        if use_writer:
+            connection.owner = asyncio.current_task()
+            connection.checkout_depth = 1
+        return connection
+
+    def _reenter_writer(self, db_path: str) -> PooledConnection | None:
+        """同一任務巢狀取得寫入連接時直接沿用, 避免等待自己歸還而死結"""
+        writer = self._get_writer(db_path)
+        if (
+            writer is None
+            or not writer.in_use
+            or writer.owner is not asyncio.current_task()
+        ):
+            return None
+        writer.checkout_depth += 1
+        return writer
+
+    async def _checkout_locked(
+        self, db_path: str, use_writer: bool
+    ) -> PooledConnection | None:
+        """在持有條件鎖時選出並標記一個閒置連接"""
+        if use_writer:
+            writer = self._get_writer(db_path)
+            candidates = [writer] if writer is not None else []
+        else:
+            candidates = self._get_readers(db_path)
+
+        # 查詢失敗會將連接標記為不健康; 閒置時重新檢查, 仍失效則移除以釋放名額
+        for conn in candidates:
+            if (
+                not conn.in_use
+                and not conn.is_healthy
+                and not await conn.health_check()
+            ):
+                await self._remove_connection(db_path, conn)
+
+        if use_writer:
+            writer = self._get_writer(db_path)
+            if writer is None or writer.in_use or not writer.is_healthy:
+                return None
+            writer.in_use = True
+            return writer
+
+        readers = self._get_readers(db_path)
+        if self.config.enable_load_balancing:
+            connection = await self.load_balancer.select_connection(readers)
+        else:
+            # 簡單選擇第一個可用連接
+            connection = next(
+                (conn for conn in readers if conn.is_healthy and not conn.in_use),
+                None,
             )
 
+        if connection is not None:
+            connection.in_use = True
+        return connection
+
+    def _reserve_slot_locked(self, db_path: str, use_writer: bool) -> bool:
+        """在持有條件鎖時為新連接預留名額"""
+        if use_writer:
+            if (
+                self._get_writer(db_path) is not None
+                or self._pending_creations[(db_path, True)]
+            ):
+                return False
+        elif not self._can_add_reader(db_path):
+            return False
+
+        self._pending_creations[(db_path, use_writer)] += 1
+        return True
+
+    async def _create_reserved(
+        self, db_path: str, use_writer: bool
+    ) -> PooledConnection:
+        """為已預留的名額建立連接, 完成或失敗後釋放名額並喚醒等待者"""
+        condition = self._conditions[db_path]
+        first_connection = not self._connections[db_path]
+        try:
+            connection = await self._create_connection(
+                db_path, is_writer=use_writer, in_use=True
+            )
+        finally:
+            async with condition:
+                self._pending_creations[(db_path, use_writer)] -= 1
+                condition.notify_all()
+
+        # 當創建第一個連接時啟動連接預熱機制
+        if first_connection:
+            await self.prewarmer.start_prewarming(db_path)
+
+        return connection
+
     async def return_connection(self, connection: PooledConnection):
-        """歸還連接"""
+        """歸還連接並喚醒等待中的請求"""
         if connection:
-            connection.in_use = False
+            # 巢狀取得的寫入連接只在最外層歸還時釋放
+            if connection.checkout_depth > 1:
+                connection.checkout_depth -= 1
+                return
+
+            condition = self._conditions[connection.db_path]
+            async with condition:
+                connection.owner = None
+                connection.checkout_depth = 0
+                connection.in_use = False
+                condition.notify_all()
             logger.debug(f"[連接池]連接 {connection.connection_id} 已歸還")
 
-    async def _create_connection(self, db_path: str) -> PooledConnection:
-        """創建新連接"""
+    async def _create_connection(
+        self, db_path: str, is_writer: bool = False, in_use: bool = False
+    ) -> PooledConnection:
+        """
+        創建新連接
+
+        Args:
+            db_path: 資料庫檔案路徑
+            is_writer: 是否為寫入連接
+            in_use: 加入連接列表前是否先標記為使用中
+        """
         retry_count = 0
         last_error = None
 
@@ -841,8 +1056,15 @@ class DatabaseConnectionPool:
                 await connection.execute("PRAGMA temp_store=memory")
                 await connection.execute("PRAGMA mmap_size=268435456")  # 256MB
 
+                # 讀取連接禁止寫入, 避免繞過唯一的寫入連接
+                if not is_writer:
+                    await connection.execute("PRAGMA query_only=ON")
+
                 # 創建池化連接包裝器
-                pooled_conn = PooledConnection(connection, db_path, weakref.ref(self))
+                pooled_conn = PooledConnection(
+                    connection, db_path, weakref.ref(self), is_writer=is_writer
+                )
+                pooled_conn.in_use = in_use
 
                 # 添加到連接列表
                 self._connections[db_path].append(pooled_conn)
@@ -897,19 +1119,28 @@ class DatabaseConnectionPool:
             logger.error(f"[連接池]移除連接失敗: {e}")
 
     @asynccontextmanager
-    async def get_connection_context(self, db_path: str):
-        """連接上下文管理器"""
-        connection = await self.get_connection(db_path)
+    async def get_connection_context(
+        self, db_path: str, readonly: bool = False, timeout: float | None = None
+    ):
+        """
+        連接上下文管理器
+
+        Args:
+            db_path: 資料庫檔案路徑
+            readonly: 是否只需讀取(使用讀取連接)
+            timeout: 等待可用連接的秒數
+        """
+        connection = await self.get_connection(db_path, readonly, timeout)
         try:
             yield connection
         finally:
             await self.return_connection(connection)
 
     async def execute(
-        self, db_path: str, query: str, params: tuple = ()
+        self, db_path: str, query: str, params: tuple = (), readonly: bool = False
     ) -> aiosqlite.Cursor:
         """執行查詢的便捷方法"""
-        async with self.get_connection_context(db_path) as conn:
+        async with self.get_connection_context(db_path, readonly) as conn:
             return await conn.execute(query, params)
 
     async def get_pool_status(self) -> dict[str, Any]:
@@ -941,9 +1172,12 @@ class DatabaseConnectionPool:
                 "active_connections": active_count,
                 "idle_connections": idle_count,
                 "healthy_connections": healthy_count,
+                "reader_connections": len(self._get_readers(db_path)),
+                "waiting_requests": self._waiting.get(db_path, 0),
                 "connections": [
                     {
                         "id": conn.connection_id,
+                        "role": "writer" if conn.is_writer else "reader",
                         "status": conn.metrics.status.value,
                         "is_healthy": conn.is_healthy,
                         "in_use": conn.in_use,
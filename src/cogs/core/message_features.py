@@ -0,0 +1,271 @@
+"""
+共用訊息特徵分析
+
+此模組在每則訊息進入時只分析一次, 供所有保護模組與事件監聽器共用,包括:
+- 內容中的 URL 與嵌入連結, 以及各連結的網域
+- 附件檔名與副檔名
+- 提及數量、貼圖數量等計數
+- 小寫與標準化內容, 以及內容雜湊
+
+ADRBot.on_message 在分派給各 Cog 前先計算特徵, Cog 以 get_message_features
+取得同一個不可變物件; 未經 ADRBot 分派時 (例如測試) 會在第一次取得時計算.
+
+作者: Discord ADR Bot Team
+版本: 1.6.0
+"""
+
+import hashlib
+import re
+import unicodedata
+import urllib.parse as up
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any
+
+# URL 匹配模式 (反惡意連結與反可執行檔案共用)
+URL_PATTERN = re.compile(r"https?://[A-Za-z0-9\.\-_%]+\.[A-Za-z]{2,}[^ <]*", re.I)
+
+# 預設保留最近的訊息特徵數量
+DEFAULT_CACHE_SIZE = 1024
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def url_domain(url: str) -> str:
+    """
+    從 URL 中提取網域 (小寫、移除連接埠與 www. 前綴)
+
+    Args:
+        url: 要解析的 URL
+
+    Returns:
+        str: 網域名稱, 解析失敗時為空字串
+    """
+    try:
+        if not url.startswith(("http://", "https://")):
+            url = "http://" + url
+
+        domain = up.urlparse(url).netloc.lower()
+        if ":" in domain:
+            domain = domain.split(":")[0]
+        if domain.startswith("www."):
+            domain = domain[4:]
+        return domain
+    except Exception:
+        return ""
+
+
+def normalize_content(content: str) -> str:
+    """
+    標準化訊息內容: NFKC、大小寫摺疊並合併空白
+
+    Args:
+        content: 原始內容
+
+    Returns:
+        str: 標準化內容
+    """
+    normalized = unicodedata.normalize("NFKC", content).casefold()
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+def _content_hash(content: str) -> str:
+    """內容雜湊 (16 位十六進位)"""
+    return hashlib.blake2b(content.encode(), digest_size=8).hexdigest()
+
+
+def _unique(items: list[str]) -> tuple[str, ...]:
+    """保留順序去重"""
+    return tuple(dict.fromkeys(items))
+
+
+@dataclass(frozen=True, slots=True)
+class MessageFeatures:
+    """單則訊息的分析結果 (不可變)"""
+
+    message_id: int
+    guild_id: int | None
+    channel_id: int
+    author_id: int
+    author_is_bot: bool
+
+    content: str
+    content_lower: str
+    normalized_content: str
+    content_hash: str
+    normalized_hash: str
+
+    urls: tuple[str, ...]  # 內容中的 URL
+    embed_urls: tuple[str, ...]  # 嵌入中的 URL
+    domains: Mapping[str, str]  # URL → 網域
+
+    attachment_names: tuple[str, ...]  # 小寫檔名
+    attachment_extensions: tuple[str, ...]  # 小寫副檔名, 無副檔名時為空字串
+
+    mention_count: int
+    role_mention_count: int
+    mentions_everyone: bool
+    sticker_count: int
+    embed_count: int
+
+    @property
+    def content_length(self) -> int:
+        """內容長度"""
+        return len(self.content)
+
+    @property
+    def attachment_count(self) -> int:
+        """附件數量"""
+        return len(self.attachment_names)
+
+    @property
+    def all_urls(self) -> tuple[str, ...]:
+        """內容與嵌入中的所有 URL (去重)"""
+        return _unique([*self.urls, *self.embed_urls])
+
+
+def _embed_urls(embeds: list[Any]) -> list[str]:
+    """收集嵌入中的連結"""
+    urls = []
+    for embed in embeds:
+        if embed.url:
+            urls.append(embed.url)
+        if embed.author and embed.author.url:
+            urls.append(embed.author.url)
+        if embed.footer and embed.footer.icon_url:
+            urls.append(embed.footer.icon_url)
+        for field in embed.fields:
+            if field.value:
+                urls.extend(URL_PATTERN.findall(field.value))
+    return urls
+
+
+def extract_message_features(message: Any) -> MessageFeatures:
+    """
+    分析訊息
+
+    Args:
+        message: discord.Message
+
+    Returns:
+        MessageFeatures: 分析結果
+    """
+    content = message.content or ""
+    normalized = normalize_content(content)
+
+    urls = _unique(URL_PATTERN.findall(content)) if content else ()
+    embed_urls = _unique(_embed_urls(message.embeds)) if message.embeds else ()
+    domains = {url: url_domain(url) for url in (*urls, *embed_urls)}
+
+    names = tuple(attachment.filename.lower() for attachment in message.attachments)
+    extensions = tuple(name.rsplit(".", 1)[1] if "." in name else "" for name in names)
+
+    return MessageFeatures(
+        message_id=message.id,
+        guild_id=message.guild.id if message.guild else None,
+        channel_id=message.channel.id,
+        author_id=message.author.id,
+        author_is_bot=message.author.bot,
+        content=content,
+        content_lower=content.lower(),
+        normalized_content=normalized,
+        content_hash=_content_hash(content),
+        normalized_hash=_content_hash(normalized),
+        urls=urls,
+        embed_urls=embed_urls,
+        domains=MappingProxyType(domains),
+        attachment_names=names,
+        attachment_extensions=extensions,
+        mention_count=len(message.mentions),
+        role_mention_count=len(message.role_mentions),
+        mentions_everyone=message.mention_everyone,
+        sticker_count=len(message.stickers),
+        embed_count=len(message.embeds),
+    )
+
+
+class MessageFeatureCache:
+    """
+    訊息特徵快取
+
+    以訊息 ID 與編輯時間為鍵, 保留最近的分析結果, 同一則訊息的所有監聽器
+    共用同一個 MessageFeatures.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE):
+        """
+        初始化快取
+
+        Args:
+            max_size: 最多保留的訊息數量
+        """
+        self.max_size = max_size
+        self._entries: OrderedDict[tuple[int, Any], MessageFeatures] = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, message: Any) -> MessageFeatures:
+        """
+        取得訊息特徵, 未命中時分析並快取
+
+        Args:
+            message: discord.Message
+
+        Returns:
+            MessageFeatures: 分析結果
+        """
+        key = (message.id, message.edited_at)
+        features = self._entries.get(key)
+        if features is not None:
+            self.stats["hits"] += 1
+            return features
+
+        self.stats["misses"] += 1
+        features = extract_message_features(message)
+        self._entries[key] = features
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return features
+
+    def clear(self):
+        """清空快取"""
+        self._entries.clear()
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        取得快取指標
+
+        Returns:
+            Dict[str, Any]: 指標資料
+        """
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+
+_global_cache: MessageFeatureCache | None = None
+
+
+def get_message_feature_cache() -> MessageFeatureCache:
+    """獲取全域訊息特徵快取"""
+    global _global_cache
+    if _global_cache is None:
+        _global_cache = MessageFeatureCache()
+    return _global_cache
+
+
+def get_message_features(message: Any) -> MessageFeatures:
+    """
+    取得訊息特徵 (同一則訊息只分析一次)
+
+    Args:
+        message: discord.Message
+
+    Returns:
+        MessageFeatures: 分析結果
+    """
+    return get_message_feature_cache().get(message)
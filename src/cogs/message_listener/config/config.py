@@ -23,10 +23,19 @@ TW_TZ = timezone(timedelta(hours=8))
 
 # 訊息保留設定
 MESSAGE_RETENTION_DAYS = 30  # 訊息保留天數
+MESSAGE_PURGE_CHUNK_SIZE = 2000  # 每批刪除的訊息數 (每批為獨立交易)
+MESSAGE_PURGE_CHUNK_PAUSE = 0.05  # 批次之間讓出寫入鎖的時間 (秒)
+MESSAGE_PURGE_VACUUM_PAGES = 500  # 每次 incremental_vacuum 歸還的頁面數
 
 # 訊息搜尋設定
 MAX_SEARCH_RESULTS = 50  # 最大搜尋結果數
 
+# 訊息寫入佇列設定 (群組提交)
+MESSAGE_WRITE_BATCH_SIZE = 200  # 每批最多寫入的訊息數
+MESSAGE_WRITE_FLUSH_INTERVAL = 0.05  # 收到訊息後最多等待多久再寫入 (秒)
+MESSAGE_WRITE_QUEUE_SIZE = 10000  # 佇列容量上限, 已滿時寫入者需等待
+MESSAGE_WRITE_MAX_RETRIES = 3  # 批次寫入失敗的最大重試次數
+
 # 訊息緩存設定
 MAX_CACHED_MESSAGES = 10  # 每頻道最大緩存訊息數
 MAX_CACHE_TIME = 600  # 緩存最大時間 (10分鐘)
@@ -38,6 +47,9 @@ AVATAR_SIZE = 40  # 頭像大小
 MESSAGE_PADDING = 8  # 訊息間距 (優化為 8px)
 CONTENT_PADDING = 62  # 內容左側留白 (優化為 62px)
 
+# 渲染程序池設定
+RENDER_PROCESS_WORKERS = 2  # 渲染工作程序數, 0 = 在執行緒中渲染
+
 # Discord 官方顏色系統 (更新為 2024 年最新的 Discord 風格)
 DISCORD_COLORS = {
     # 主要背景顏色 (Discord 2024 新版本)
@@ -6,19 +6,52 @@
 """
 
 import asyncio
+import contextlib
+import inspect
 import json
 import logging
+import time
 from datetime import datetime, timedelta
 from typing import Any
 
 import discord
 
 from ...core.database_pool import get_global_pool
-from ..config.config import MAX_SEARCH_RESULTS, MESSAGE_DB_PATH, MESSAGE_RETENTION_DAYS
+from ..config.config import (
+    MAX_SEARCH_RESULTS,
+    MESSAGE_DB_PATH,
+    MESSAGE_PURGE_CHUNK_PAUSE,
+    MESSAGE_PURGE_CHUNK_SIZE,
+    MESSAGE_PURGE_VACUUM_PAGES,
+    MESSAGE_RETENTION_DAYS,
+)
+from .fulltext import (
+    FTS_EXISTS_SQL,
+    FTS_REBUILD_SQL,
+    FTS_SCHEMA,
+    FTS_TABLE,
+    build_fts_query,
+)
+from .retention import (
+    AUTO_VACUUM_INCREMENTAL,
+    CHUNK_UPPER_BOUND_SQL,
+    DELETE_CHUNK_SQL,
+    EXPIRED_RANGE_SQL,
+    RETENTION_INDEX_SCHEMA,
+    ProgressCallback,
+    PurgeProgress,
+)
+from .write_queue import MessageWriteQueue
 
 # 常量定義
 MESSAGE_TABLE_COLUMN_COUNT = 8  # messages 表的欄位數量
 
+SAVE_MESSAGE_SQL = """
+    INSERT OR REPLACE INTO messages
+    (message_id, channel_id, guild_id, author_id, content, timestamp, attachments)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
 logger = logging.getLogger("message_listener")
 
 
@@ -31,6 +64,9 @@ class MessageListenerDB:
     - 使用專業級連接池管理
     - 完整的錯誤處理
     - 提供所有訊息監聽系統所需的資料庫操作
+    - 訊息以群組提交方式批量寫入
+    - 以 FTS5 全文索引搜尋訊息內容
+    - 分批清理過期訊息並以 incremental_vacuum 歸還空間
     """
 
     def __init__(self, db_path: str = MESSAGE_DB_PATH):
@@ -38,6 +74,9 @@ class MessageListenerDB:
         self.db_path = db_path
         self._pool = None  # 將使用全局連接池
         self._cleanup_task = None  # 存儲清理任務的引用
+        self.write_queue = MessageWriteQueue(self._write_message_batch)
+        self.fts_enabled = False  # 全文索引是否可用
+        self.incremental_vacuum = False  # 是否啟用 auto_vacuum=INCREMENTAL
 
     async def _get_pool(self):
         """獲取全局連接池實例"""
@@ -46,7 +85,8 @@ class MessageListenerDB:
         return self._pool
 
     async def close(self):
-        """關閉資料庫連接(現在由全局連接池管理)"""
+        """寫完佇列中的訊息後關閉(連接由全局連接池管理)"""
+        await self.write_queue.stop()
         # 連接池由全局管理器處理,這裡不需要手動關閉
         logger.info("[訊息監聽]資料庫連接已由全局連接池管理")
 
@@ -55,6 +95,9 @@ class MessageListenerDB:
         try:
             pool = await self._get_pool()
             async with pool.get_connection_context(self.db_path) as conn:
+                # 必須在建立資料表前設定, 新資料庫才會直接啟用
+                self.incremental_vacuum = await self._init_auto_vacuum(conn)
+
                 await conn.execute("""
                     CREATE TABLE IF NOT EXISTS messages (
                         message_id INTEGER PRIMARY KEY,
@@ -75,12 +118,11 @@ class MessageListenerDB:
                 await conn.execute(
                     "CREATE INDEX IF NOT EXISTS idx_channel_id ON messages (channel_id)"
                 )
-                await conn.execute(
-                    "CREATE INDEX IF NOT EXISTS idx_guild_id ON messages (guild_id)"
-                )
                 await conn.execute(
                     "CREATE INDEX IF NOT EXISTS idx_author_id ON messages (author_id)"
                 )
+                for statement in RETENTION_INDEX_SCHEMA:
+                    await conn.execute(statement)
 
                 # 創建設定表
                 await conn.execute("""
@@ -98,15 +140,100 @@ class MessageListenerDB:
                 """)
 
                 await conn.commit()
+
+                self.fts_enabled = await self._init_fulltext_index(conn)
             logger.info("[訊息監聽]資料庫表格初始化完成")
 
             # 啟動定期清理過期訊息
             self._cleanup_task = asyncio.create_task(self._cleanup_old_messages())
 
+            # 啟動訊息批量寫入器
+            self.write_queue.start()
+
         except Exception as exc:
             logger.error(f"[訊息監聽]資料庫初始化失敗: {exc}")
             raise
 
+    async def _init_auto_vacuum(self, conn) -> bool:
+        """
+        設定 auto_vacuum=INCREMENTAL, 讓清理後的空閒頁面可以分批歸還
+
+        Args:
+            conn: 資料庫連接
+
+        Returns:
+            bool: 是否已啟用 incremental auto_vacuum
+        """
+        try:
+            if await self._auto_vacuum_enabled(conn):
+                return True
+
+            await conn.execute(f"PRAGMA auto_vacuum = {AUTO_VACUUM_INCREMENTAL}")
+            if await self._auto_vacuum_enabled(conn):
+                return True
+
+            # 連接池開啟連接時設定 journal_mode=WAL 已寫入檔頭, 新資料庫的
+            # auto_vacuum 也要經過 VACUUM 才會生效; 尚無資料表時 VACUUM 幾乎不耗時
+            cursor = await conn.execute("SELECT COUNT(*) FROM sqlite_master")
+            if (await cursor.fetchone())[0] == 0:
+                await conn.execute("VACUUM")
+                if await self._auto_vacuum_enabled(conn):
+                    return True
+
+            # 既有資料庫的 auto_vacuum 模式要在下一次 VACUUM 後才會生效
+            logger.info(
+                "[訊息監聽]既有資料庫需執行一次 VACUUM 才會啟用 incremental auto_vacuum"
+            )
+            return False
+        except Exception as exc:
+            logger.warning(f"[訊息監聽]設定 auto_vacuum 失敗: {exc}")
+            return False
+
+    async def _auto_vacuum_enabled(self, conn) -> bool:
+        """檢查資料庫是否已使用 incremental auto_vacuum"""
+        cursor = await conn.execute("PRAGMA auto_vacuum")
+        row = await cursor.fetchone()
+        return bool(row) and row[0] == AUTO_VACUUM_INCREMENTAL
+
+    async def _init_fulltext_index(self, conn) -> bool:
+        """
+        建立全文索引, 首次建立時由既有訊息回填
+
+        Args:
+            conn: 資料庫連接
+
+        Returns:
+            bool: 全文索引是否可用
+        """
+        try:
+            cursor = await conn.execute(FTS_EXISTS_SQL, (FTS_TABLE,))
+            existed = await cursor.fetchone() is not None
+
+            for statement in FTS_SCHEMA:
+                await conn.execute(statement)
+            if not existed:
+                await conn.execute(FTS_REBUILD_SQL)
+                logger.info("[訊息監聽]已為既有訊息建立全文索引")
+
+            await conn.commit()
+            return True
+        except Exception as exc:
+            # SQLite 未編譯 FTS5 或版本過舊不支援 trigram 時退回 LIKE 搜尋
+            with contextlib.suppress(Exception):
+                await conn.rollback()
+            logger.warning(f"[訊息監聽]全文索引不可用, 改用 LIKE 搜尋: {exc}")
+            return False
+
+    async def rebuild_search_index(self):
+        """由 messages 表重建全文索引"""
+        if not self.fts_enabled:
+            return
+        try:
+            await self.execute(FTS_REBUILD_SQL)
+            logger.info("[訊息監聽]全文索引重建完成")
+        except Exception as exc:
+            logger.error(f"[訊息監聽]重建全文索引失敗: {exc}")
+
     async def execute(self, query: str, *args):
         """
         執行 SQL 查詢(INSERT、UPDATE、DELETE 等)
@@ -141,7 +268,7 @@ class MessageListenerDB:
         """
         try:
             pool = await self._get_pool()
-            async with pool.get_connection_context(self.db_path) as conn:
+            async with pool.get_connection_context(self.db_path, readonly=True) as conn:
                 cursor = await conn.execute(query, params)
                 rows = await cursor.fetchall()
 
@@ -181,10 +308,30 @@ class MessageListenerDB:
             logger.error(f"[訊息監聽]執行 SELECT 查詢失敗: {exc}")
             return []
 
+    async def _write_message_batch(self, rows: list[tuple]):
+        """
+        在單一交易中批量寫入訊息
+
+        Args:
+            rows: 訊息資料列列表
+        """
+        pool = await self._get_pool()
+        async with pool.get_connection_context(self.db_path) as conn:
+            try:
+                await conn.executemany(SAVE_MESSAGE_SQL, rows)
+                await conn.commit()
+            except Exception:
+                with contextlib.suppress(Exception):
+                    await conn.rollback()
+                raise
+
     async def save_message(self, message: discord.Message | None):
         """
         儲存訊息到資料庫
 
+        寫入器執行中時只將訊息放入寫入佇列, 由背景批量寫入;
+        佇列已滿時會等待. 寫入器未啟動時直接寫入.
+
         Args:
             message: Discord 訊息
         """
@@ -206,13 +353,7 @@ class MessageListenerDB:
                     })
                 attachments_json = json.dumps(attachments_data)
 
-            # 儲存訊息
-            await self.execute(
-                """
-                INSERT OR REPLACE INTO messages
-                (message_id, channel_id, guild_id, author_id, content, timestamp, attachments)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-                """,
+            row = (
                 message.id,
                 message.channel.id if message.channel else 0,
                 message.guild.id if message.guild else 0,
@@ -221,6 +362,12 @@ class MessageListenerDB:
                 message.created_at.timestamp(),
                 attachments_json,
             )
+
+            # 儲存訊息
+            if self.write_queue.running:
+                await self.write_queue.enqueue(row)
+            else:
+                await self.execute(SAVE_MESSAGE_SQL, *row)
         except Exception as exc:
             logger.error(f"[訊息監聽]儲存訊息失敗: {exc}")
             raise
@@ -231,15 +378,20 @@ class MessageListenerDB:
         channel_id: int | None = None,
         hours: int = 24,
         limit: int = 50,
+        guild_id: int | None = None,
     ) -> list[dict[str, Any]]:
         """
         搜尋訊息
 
+        有關鍵字且全文索引可用時使用 FTS5 查詢, 結果依相關度排序;
+        關鍵字支援 "片語" 與 前綴* 查詢, 多個詞須全部出現.
+
         Args:
             keyword: 搜尋關鍵字
             channel_id: 頻道 ID
             hours: 搜尋時間範圍(小時)
             limit: 結果數量限制
+            guild_id: 伺服器 ID
 
         Returns:
             List[Dict[str, Any]]: 搜尋結果列表
@@ -249,24 +401,47 @@ class MessageListenerDB:
             start_time = (datetime.now() - timedelta(hours=hours)).timestamp()
 
             # 構建查詢條件
-            conditions = ["timestamp >= ?", "deleted = 0"]
+            conditions = ["m.timestamp >= ?", "m.deleted = 0"]
             params: list[float | int | str] = [start_time]
 
-            if keyword:
-                conditions.append("content LIKE ?")
-                params.append(f"%{keyword}%")
+            match_query = None
+            like_terms = []
+            if keyword and self.fts_enabled:
+                match_query, like_terms = build_fts_query(keyword)
+            elif keyword:
+                like_terms = [keyword]
+
+            for term in like_terms:
+                conditions.append("m.content LIKE ?")
+                params.append(f"%{term}%")
 
             if channel_id:
-                conditions.append("channel_id = ?")
+                conditions.append("m.channel_id = ?")
                 params.append(channel_id)
 
+            if guild_id:
+                conditions.append("m.guild_id = ?")
+                params.append(guild_id)
+
+            if match_query:
+                source = (
+                    f"{FTS_TABLE} JOIN messages m ON m.message_id = {FTS_TABLE}.rowid"
+                )
+                conditions.insert(0, f"{FTS_TABLE} MATCH ?")
+                params.insert(0, match_query)
+                order_by = f"{FTS_TABLE}.rank, m.timestamp DESC"
+            else:
+                source = "messages m"
+                order_by = "m.timestamp DESC"
+
             query = """
-                SELECT message_id, channel_id, guild_id, author_id, content, timestamp, attachments, deleted
-                FROM messages
+                SELECT m.message_id, m.channel_id, m.guild_id, m.author_id, m.content,
+                       m.timestamp, m.attachments, m.deleted
+                FROM {}
                 WHERE {}
-                ORDER BY timestamp DESC
+                ORDER BY {}
                 LIMIT ?
-            """.format(" AND ".join(conditions))
+            """.format(source, " AND ".join(conditions), order_by)
             params.append(min(limit, MAX_SEARCH_RESULTS))
 
             return await self.select(query, tuple(params))
@@ -275,26 +450,125 @@ class MessageListenerDB:
             logger.error(f"[訊息監聽]搜尋訊息失敗: {exc}")
             return []
 
-    async def purge_old_messages(self, days: int = MESSAGE_RETENTION_DAYS):
+    async def purge_old_messages(
+        self,
+        days: int = MESSAGE_RETENTION_DAYS,
+        chunk_size: int = MESSAGE_PURGE_CHUNK_SIZE,
+        pause: float = MESSAGE_PURGE_CHUNK_PAUSE,
+        progress: ProgressCallback | None = None,
+    ) -> PurgeProgress:
         """
         清理過期訊息
 
+        以 message_id 區間分批刪除, 每批為獨立的短交易, 批次之間讓出事件迴圈,
+        避免單一 DELETE 長時間持有寫入鎖而阻塞 save_message.
+        刪除完成後以 incremental_vacuum 分批歸還空閒頁面.
+
         Args:
             days: 保留天數
+            chunk_size: 每批刪除的訊息數
+            pause: 批次之間的等待時間(秒)
+            progress: 每批完成後呼叫的進度回呼(可為協程函數)
+
+        Returns:
+            PurgeProgress: 清理結果
         """
+        result = PurgeProgress(total=0, started_at=time.monotonic())
         try:
             cutoff_time = (datetime.now() - timedelta(days=days)).timestamp()
+            pool = await self._get_pool()
 
-            cursor = await self.execute(
-                "DELETE FROM messages WHERE timestamp < ?", cutoff_time
+            async with pool.get_connection_context(self.db_path, readonly=True) as conn:
+                cursor = await conn.execute(EXPIRED_RANGE_SQL, (cutoff_time,))
+                first_id, last_id, result.total = await cursor.fetchone()
+
+            start_id = first_id
+            while start_id is not None and start_id <= last_id:
+                async with pool.get_connection_context(self.db_path) as conn:
+                    try:
+                        cursor = await conn.execute(
+                            CHUNK_UPPER_BOUND_SQL, (start_id, chunk_size)
+                        )
+                        row = await cursor.fetchone()
+                        end_id = min(row[0], last_id + 1) if row else last_id + 1
+
+                        cursor = await conn.execute(
+                            DELETE_CHUNK_SQL, (start_id, end_id, cutoff_time)
+                        )
+                        await conn.commit()
+                    except Exception:
+                        with contextlib.suppress(Exception):
+                            await conn.rollback()
+                        raise
+
+                result.deleted += max(cursor.rowcount, 0)
+                result.chunks += 1
+                start_id = end_id
+                await self._report_purge_progress(progress, result)
+                await asyncio.sleep(pause)
+
+            if result.deleted and self.incremental_vacuum:
+                result.vacuumed_pages = await self._incremental_vacuum(pause)
+
+            result.done = True
+            await self._report_purge_progress(progress, result)
+            logger.info(
+                f"[訊息監聽]清理了 {result.deleted} 條過期訊息"
+                f"({result.chunks} 批, 歸還 {result.vacuumed_pages} 頁,"
+                f" 耗時 {result.elapsed:.2f} 秒)"
             )
 
-            deleted_count = cursor.rowcount
-            logger.info(f"[訊息監聽]清理了 {deleted_count} 條過期訊息")
-
         except Exception as exc:
             logger.error(f"[訊息監聽]清理過期訊息失敗: {exc}")
 
+        return result
+
+    async def _incremental_vacuum(self, pause: float) -> int:
+        """
+        分批執行 incremental_vacuum 直到沒有空閒頁面
+
+        Args:
+            pause: 批次之間的等待時間(秒)
+
+        Returns:
+            int: 歸還的頁面數
+        """
+        pool = await self._get_pool()
+        reclaimed = 0
+        while True:
+            async with pool.get_connection_context(self.db_path) as conn:
+                cursor = await conn.execute("PRAGMA freelist_count")
+                before = (await cursor.fetchone())[0]
+                if not before:
+                    return reclaimed
+
+                # 每次 step 只歸還一頁, 讀完所有結果列才會執行到完成
+                cursor = await conn.execute(
+                    f"PRAGMA incremental_vacuum({MESSAGE_PURGE_VACUUM_PAGES})"
+                )
+                await cursor.fetchall()
+                cursor = await conn.execute("PRAGMA freelist_count")
+                after = (await cursor.fetchone())[0]
+
+            if after >= before:
+                return reclaimed
+            reclaimed += before - after
+            await asyncio.sleep(pause)
+
+    @staticmethod
+    async def _report_purge_progress(
+        progress: ProgressCallback | None, result: PurgeProgress
+    ):
+        """呼叫進度回呼, 回呼失敗不影響清理"""
+        if progress is None:
+            return
+        try:
+            outcome = progress(result)
+            if inspect.isawaitable(outcome):
+                await outcome
+        except Exception as exc:
+            logger.warning(f"[訊息監聽]清理進度回呼失敗: {exc}")
+
     async def _cleanup_old_messages(self):
         """定期清理過期訊息的背景任務"""
         while True:
@@ -317,7 +591,7 @@ class MessageListenerDB:
         """
         try:
             pool = await self._get_pool()
-            async with pool.get_connection_context(self.db_path) as conn:
+            async with pool.get_connection_context(self.db_path, readonly=True) as conn:
                 cursor = await conn.execute(
                     "SELECT setting_value FROM settings WHERE setting_name = ?", (key,)
                 )
@@ -353,7 +627,7 @@ class MessageListenerDB:
         """
         try:
             pool = await self._get_pool()
-            async with pool.get_connection_context(self.db_path) as conn:
+            async with pool.get_connection_context(self.db_path, readonly=True) as conn:
                 cursor = await conn.execute("SELECT channel_id FROM monitored_channels")
                 rows = await cursor.fetchall()
                 return [row[0] for row in rows]
@@ -0,0 +1,103 @@
+"""
+訊息監聽系統全文檢索索引
+- 以 FTS5 外部內容表索引 messages.content, 由觸發器保持同步
+- 使用 trigram 分詞器, 中文與英文皆可做子字串比對
+- 將使用者關鍵字轉換為 FTS5 查詢(支援片語與前綴)
+"""
+
+import re
+
+# FTS5 虛擬表名稱
+FTS_TABLE = "messages_fts"
+
+# trigram 分詞器無法比對少於 3 個字元的詞, 這類詞改用 LIKE 過濾
+MIN_FTS_TERM_LENGTH = 3
+
+# 建立全文索引與同步觸發器
+# messages 以 INSERT OR REPLACE 寫入, 而 REPLACE 刪除舊資料列時
+# 不會觸發 DELETE 觸發器, 因此在 BEFORE INSERT 先移除舊索引
+FTS_SCHEMA = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        content,
+        content='messages',
+        content_rowid='message_id',
+        tokenize='trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS messages_fts_before_insert
+    BEFORE INSERT ON messages BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content)
+        SELECT 'delete', message_id, content FROM messages
+        WHERE message_id = new.message_id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS messages_fts_after_insert
+    AFTER INSERT ON messages BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.message_id, new.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS messages_fts_after_delete
+    AFTER DELETE ON messages BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content)
+        VALUES ('delete', old.message_id, old.content);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS messages_fts_after_update
+    AFTER UPDATE OF content ON messages BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, content)
+        VALUES ('delete', old.message_id, old.content);
+        INSERT INTO {FTS_TABLE}(rowid, content) VALUES (new.message_id, new.content);
+    END
+    """,
+]
+
+# 由 messages 表重建整個索引(既有資料庫的一次性回填)
+FTS_REBUILD_SQL = f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"
+
+# 檢查索引是否已存在
+FTS_EXISTS_SQL = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+
+# 雙引號內為片語, 其餘以空白分隔
+_KEYWORD_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def build_fts_query(keyword: str) -> tuple[str | None, list[str]]:
+    """
+    將使用者輸入的關鍵字轉換為 FTS5 查詢
+
+    以空白分隔的詞必須全部出現; "雙引號" 內為片語, 詞尾加 * 為前綴查詢.
+    短於 MIN_FTS_TERM_LENGTH 的詞無法由 trigram 索引比對, 另外回傳以 LIKE 過濾.
+
+    Args:
+        keyword: 搜尋關鍵字
+
+    Returns:
+        Tuple[Optional[str], List[str]]: (FTS5 MATCH 查詢, 需以 LIKE 過濾的短詞)
+    """
+    match_terms = []
+    like_terms = []
+
+    for phrase, word in _KEYWORD_PATTERN.findall(keyword):
+        is_prefix = False
+        if phrase:
+            term = phrase.strip()
+        else:
+            term = word.replace('"', "")
+            if term.endswith("*"):
+                term = term.rstrip("*")
+                is_prefix = True
+
+        if not term:
+            continue
+        if len(term) < MIN_FTS_TERM_LENGTH:
+            like_terms.append(term)
+            continue
+
+        match_terms.append(f'"{term}"' + ("*" if is_prefix else ""))
+
+    return (" ".join(match_terms) or None), like_terms
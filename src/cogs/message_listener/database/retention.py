@@ -0,0 +1,71 @@
+"""
+訊息監聽系統過期訊息清理
+- 以 message_id (rowid) 區間分批刪除, 每批為獨立的短交易
+- 批次之間讓出事件迴圈, 讓群組提交寫入器可以穿插寫入
+- 刪除後以 incremental_vacuum 分批歸還空閒頁面
+"""
+
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+# 設定後需執行 VACUUM 才會生效 (連接池啟用 WAL 時已寫入檔頭);
+# 新資料庫在建立資料表前自動執行, 既有資料庫需手動執行一次
+AUTO_VACUUM_INCREMENTAL = 2
+
+# 同時服務搜尋 (伺服器/頻道/時間範圍) 的複合索引
+# 取代以 guild_id 為前綴、已成為多餘的 idx_guild_id
+RETENTION_INDEX_SCHEMA = [
+    """
+    CREATE INDEX IF NOT EXISTS idx_guild_channel_timestamp
+    ON messages (guild_id, channel_id, timestamp)
+    """,
+    "DROP INDEX IF EXISTS idx_guild_id",
+]
+
+# 由 idx_timestamp 覆蓋掃描取得過期訊息的 message_id 範圍
+EXPIRED_RANGE_SQL = """
+    SELECT MIN(message_id), MAX(message_id), COUNT(*)
+    FROM messages WHERE timestamp < ?
+"""
+
+# 從 start_id 起沿主鍵往後數 chunk_size 筆, 取得本批的 (不含) 上界
+CHUNK_UPPER_BOUND_SQL = """
+    SELECT message_id FROM messages
+    WHERE message_id >= ?
+    ORDER BY message_id
+    LIMIT 1 OFFSET ?
+"""
+
+# 刪除單一 rowid 區間內的過期訊息
+DELETE_CHUNK_SQL = """
+    DELETE FROM messages
+    WHERE message_id >= ? AND message_id < ? AND timestamp < ?
+"""
+
+
+@dataclass
+class PurgeProgress:
+    """過期訊息清理進度"""
+
+    total: int  # 開始時估計的過期訊息數
+    deleted: int = 0  # 已刪除的訊息數
+    chunks: int = 0  # 已完成的批次數
+    vacuumed_pages: int = 0  # incremental_vacuum 歸還的頁面數
+    started_at: float = 0.0
+    done: bool = False
+
+    @property
+    def percent(self) -> float:
+        """完成百分比"""
+        if self.done or self.total <= 0:
+            return 100.0
+        return min(100.0, self.deleted * 100.0 / self.total)
+
+    @property
+    def elapsed(self) -> float:
+        """已耗時(秒)"""
+        return time.monotonic() - self.started_at if self.started_at else 0.0
+
+
+ProgressCallback = Callable[[PurgeProgress], Awaitable[None] | None]
@@ -0,0 +1,208 @@
+"""
+訊息監聽系統群組提交寫入佇列
+- 訊息先放入有界佇列, 由背景寫入器批量寫入
+- 每批使用單一交易與 executemany, 大幅減少提交次數
+- 佇列已滿時讓呼叫者等待(背壓), 關閉時保證寫完所有訊息
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from ..config.config import (
+    MESSAGE_WRITE_BATCH_SIZE,
+    MESSAGE_WRITE_FLUSH_INTERVAL,
+    MESSAGE_WRITE_MAX_RETRIES,
+    MESSAGE_WRITE_QUEUE_SIZE,
+)
+
+logger = logging.getLogger("message_listener")
+
+BatchWriter = Callable[[list[tuple]], Awaitable[None]]
+
+# 放入佇列以通知背景寫入器在寫完先前資料後結束
+_STOP = object()
+
+
+class MessageWriteQueue:
+    """
+    群組提交寫入佇列
+
+    功能:
+    - 收集 flush_interval 內(或達到 batch_size 筆)的訊息後一次寫入
+    - 佇列容量有上限, 寫入跟不上時 enqueue 會等待
+    - 寫入失敗的批次會重試, 超過重試次數才放棄
+    - stop() 會先寫完佇列中所有資料
+    """
+
+    def __init__(
+        self,
+        write_batch: BatchWriter,
+        batch_size: int = MESSAGE_WRITE_BATCH_SIZE,
+        flush_interval: float = MESSAGE_WRITE_FLUSH_INTERVAL,
+        max_queue_size: int = MESSAGE_WRITE_QUEUE_SIZE,
+        max_retries: int = MESSAGE_WRITE_MAX_RETRIES,
+    ):
+        """
+        初始化寫入佇列
+
+        Args:
+            write_batch: 在單一交易中寫入一批資料列的協程函數
+            batch_size: 每批最多寫入的資料列數
+            flush_interval: 收到第一筆資料後最多等待多久再寫入(秒)
+            max_queue_size: 佇列容量上限
+            max_retries: 批次寫入失敗的最大重試次數
+        """
+        self._write_batch = write_batch
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+
+        self._queue: asyncio.Queue[Any] = asyncio.Queue(maxsize=max_queue_size)
+        self._writer_task: asyncio.Task | None = None
+
+        self.stats = {
+            "enqueued": 0,
+            "batches": 0,
+            "rows_written": 0,
+            "write_failures": 0,
+            "rows_dropped": 0,
+            "backpressure_waits": 0,
+        }
+
+    # -------- 生命週期 --------
+    @property
+    def running(self) -> bool:
+        """背景寫入器是否正在執行"""
+        return self._writer_task is not None and not self._writer_task.done()
+
+    def start(self) -> None:
+        """啟動背景寫入器"""
+        if not self.running:
+            self._writer_task = asyncio.create_task(self._writer_loop())
+
+    async def stop(self) -> None:
+        """寫完佇列中所有資料後停止背景寫入器"""
+        if self.running:
+            await self._queue.put(_STOP)
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._writer_task
+        self._writer_task = None
+
+        # 寫入器結束後才進入佇列的資料直接寫入
+        leftover = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            self._queue.task_done()
+            if item is not _STOP:
+                leftover.append(item)
+        for start in range(0, len(leftover), self.batch_size):
+            await self._write_with_retry(leftover[start : start + self.batch_size])
+
+    # -------- 讀寫 --------
+    async def enqueue(self, row: tuple) -> None:
+        """
+        將一筆資料列放入佇列
+
+        Args:
+            row: 資料列參數
+        """
+        if self._queue.full():
+            self.stats["backpressure_waits"] += 1
+        await self._queue.put(row)
+        self.stats["enqueued"] += 1
+
+    async def flush(self) -> None:
+        """等待目前佇列中的資料全部處理完成"""
+        if self.running:
+            await self._queue.join()
+
+    def pending_count(self) -> int:
+        """佇列中尚未寫入的資料列數"""
+        return self._queue.qsize()
+
+    # -------- 背景寫入 --------
+    async def _collect_batch(self) -> tuple[list[tuple], bool]:
+        """
+        等待第一筆資料, 再於 flush_interval 內盡量收集到 batch_size 筆
+
+        Returns:
+            Tuple[List[tuple], bool]: (批次資料, 是否收到停止通知)
+        """
+        item = await self._queue.get()
+        if item is _STOP:
+            return [], True
+
+        batch = [item]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            # 先取走已在佇列中的資料, 不必等待
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), remaining)
+                except TimeoutError:
+                    break
+
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+
+        return batch, False
+
+    async def _writer_loop(self) -> None:
+        """背景寫入迴圈"""
+        while True:
+            batch, stopping = await self._collect_batch()
+            try:
+                if batch:
+                    await self._write_with_retry(batch)
+            finally:
+                for _ in range(len(batch) + stopping):
+                    self._queue.task_done()
+            if stopping:
+                return
+
+    async def _write_with_retry(self, batch: list[tuple]) -> None:
+        """寫入一個批次, 失敗時以遞增延遲重試"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                await self._write_batch(batch)
+            except Exception as exc:
+                self.stats["write_failures"] += 1
+                logger.warning(
+                    f"[訊息監聽]批量寫入失敗 (嘗試 {attempt + 1}/"
+                    f"{self.max_retries + 1}): {exc}"
+                )
+                if attempt < self.max_retries:
+                    await asyncio.sleep(self.flush_interval * (attempt + 1))
+                continue
+
+            self.stats["batches"] += 1
+            self.stats["rows_written"] += len(batch)
+            return
+
+        self.stats["rows_dropped"] += len(batch)
+        logger.error(f"[訊息監聽]批量寫入重試耗盡, 放棄 {len(batch)} 筆訊息")
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        獲取寫入佇列統計資訊
+
+        Returns:
+            Dict[str, Any]: 統計資訊
+        """
+        batches = self.stats["batches"]
+        return {
+            **self.stats,
+            "pending": self._queue.qsize(),
+            "avg_batch_size": self.stats["rows_written"] / batches if batches else 0.0,
+            "running": self.running,
+        }
@@ -19,6 +19,7 @@ from ..database.database import MessageListenerDB
 from ..panel.main_view import SettingsView
 from . import utils
 from .cache import MessageCache
+from .render_worker import RenderProcessPool
 from .renderer import EnhancedMessageRenderer as MessageRenderer
 
 # 常量定義
@@ -47,7 +48,7 @@ class MessageListenerCog(commands.Cog):
         self.bot = bot
         self.db = MessageListenerDB()
         self.message_cache = MessageCache()
-        self.renderer = MessageRenderer()
+        self.renderer = MessageRenderer(render_pool=RenderProcessPool())
         self._settings_cache = {}
         self.monitored_channels = []
         self._views = []  # 追蹤所有活動的視圖
@@ -72,6 +73,7 @@ class MessageListenerCog(commands.Cog):
             self.purge_task.cancel()  # 停止清理任務
             self.check_cache_task.cancel()  # 停止緩存檢查任務
             await self.db.close()
+            await self.renderer.close()
             logger.info("[訊息監聽]Cog 卸載完成")
         except Exception as exc:
             logger.error(f"[訊息監聽]Cog 卸載失敗: {exc}")
@@ -256,7 +258,7 @@ class MessageListenerCog(commands.Cog):
         name="搜尋訊息", description="查詢最近訊息(支援關鍵字、頻道篩選和截圖搜尋)"
     )
     @app_commands.describe(
-        keyword="關鍵字(可空)",
+        keyword='關鍵字(可空, "片語" 完整比對, 詞尾加 * 為前綴)',
         channel="限制搜尋的頻道(可空)",
         hours="搜尋時間範圍(小時,預設24)",
         render_image="是否渲染為截圖(預設為否)",
@@ -293,6 +295,7 @@ class MessageListenerCog(commands.Cog):
                 channel_id=channel.id if channel else None,
                 hours=hours,
                 limit=100,
+                guild_id=interaction.guild_id,
             )
 
             if not results:
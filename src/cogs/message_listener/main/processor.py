@@ -14,6 +14,7 @@ from typing import Any
 
 import discord
 
+from ...core.message_features import MessageFeatures, get_message_features
 from ..config.config import setup_logger
 from ..database.database import MessageListenerDB
 
@@ -150,12 +151,15 @@ class SmartBatchProcessor:
         # 基礎批量大小
         base_batch_size = self.current_batch_size
 
+        # 共用訊息特徵 (每則訊息只分析一次)
+        features = [get_message_features(message) for message in messages]
+
         # 1. 基於內容複雜度調整
-        content_complexity = self._analyze_content_complexity(messages)
+        content_complexity = self._analyze_content_complexity(features)
         content_factor = self._calculate_content_factor_enhanced(content_complexity)
 
         # 2. 基於附件和媒體調整
-        media_complexity = self._analyze_media_complexity(messages)
+        media_complexity = self._analyze_media_complexity(features)
         media_factor = self._calculate_media_factor(media_complexity)
 
         # 3. 基於頻道活躍度調整
@@ -202,43 +206,44 @@ class SmartBatchProcessor:
         return optimal_batch_size
 
     def _analyze_content_complexity(
-        self, messages: list[discord.Message]
+        self, features: list[MessageFeatures]
     ) -> dict[str, float]:
         """分析內容複雜度"""
-        if not messages:
+        if not features:
             return {"avg_length": 0, "mentions": 0, "emojis": 0, "urls": 0}
 
-        total_length = sum(len(msg.content) for msg in messages)
+        total_length = sum(item.content_length for item in features)
         total_mentions = sum(
-            len(msg.mentions) + len(msg.role_mentions) for msg in messages
+            item.mention_count + item.role_mention_count for item in features
         )
         total_emojis = sum(
-            len([c for c in msg.content if c in "😀😃😄😁😆😅😂🤣"]) for msg in messages
+            len([c for c in item.content if c in "😀😃😄😁😆😅😂🤣"])
+            for item in features
         )
-        total_urls = sum(msg.content.count("http") for msg in messages)
+        total_urls = sum(len(item.urls) for item in features)
 
         return {
-            "avg_length": total_length / len(messages),
-            "mentions": total_mentions / len(messages),
-            "emojis": total_emojis / len(messages),
-            "urls": total_urls / len(messages),
+            "avg_length": total_length / len(features),
+            "mentions": total_mentions / len(features),
+            "emojis": total_emojis / len(features),
+            "urls": total_urls / len(features),
         }
 
     def _analyze_media_complexity(
-        self, messages: list[discord.Message]
+        self, features: list[MessageFeatures]
     ) -> dict[str, float]:
         """分析媒體複雜度"""
-        if not messages:
+        if not features:
             return {"attachments": 0, "embeds": 0, "stickers": 0}
 
-        total_attachments = sum(len(msg.attachments) for msg in messages)
-        total_embeds = sum(len(msg.embeds) for msg in messages)
-        total_stickers = sum(len(msg.stickers) for msg in messages)
+        total_attachments = sum(item.attachment_count for item in features)
+        total_embeds = sum(item.embed_count for item in features)
+        total_stickers = sum(item.sticker_count for item in features)
 
         return {
-            "attachments": total_attachments / len(messages),
-            "embeds": total_embeds / len(messages),
-            "stickers": total_stickers / len(messages),
+            "attachments": total_attachments / len(features),
+            "embeds": total_embeds / len(features),
+            "stickers": total_stickers / len(features),
         }
 
     def _calculate_content_factor_enhanced(self, complexity: dict[str, float]) -> float:
@@ -733,6 +738,7 @@ class MessageProcessor:
         channel_id: int | None = None,
         hours: int = 24,
         limit: int = 50,
+        guild_id: int | None = None,
     ) -> list[dict[str, Any]]:
         """
         搜尋訊息
@@ -742,12 +748,15 @@ class MessageProcessor:
             channel_id: 頻道 ID
             hours: 搜尋時間範圍(小時)
             limit: 最大結果數量
+            guild_id: 伺服器 ID
 
         Returns:
             List[Dict[str, Any]]: 搜尋結果列表
         """
         try:
-            return await self.db.search_messages(keyword, channel_id, hours, limit)
+            return await self.db.search_messages(
+                keyword, channel_id, hours, limit, guild_id
+            )
         except Exception as exc:
             logger.error(f"[訊息監聽]搜尋訊息失敗:{exc}")
             return []
@@ -0,0 +1,534 @@
+"""
+訊息渲染工作程序模組
+- 將渲染所需資料整理為可序列化的渲染規格(文字、頭像位元組、時間戳)
+- 在 ProcessPoolExecutor 中完成 Pillow 排版、頭像合成與 PNG 編碼
+- 每個工作程序啟動時載入一次字型並重複使用
+- 程序池無法使用時退回執行緒內渲染, 不阻塞事件迴圈
+"""
+
+import asyncio
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Any
+
+from PIL import Image, ImageDraw, ImageFont
+
+from ..config.config import (
+    AVATAR_SIZE,
+    CHAT_WIDTH,
+    CONTENT_PADDING,
+    DEFAULT_FONT_SIZE,
+    DISCORD_COLORS,
+    MAX_HEIGHT,
+    MESSAGE_PADDING,
+    RENDER_CONFIG,
+    RENDER_PROCESS_WORKERS,
+    TIMESTAMP_FONT_SIZE,
+    USERNAME_FONT_SIZE,
+    setup_logger,
+)
+from . import utils
+
+# 設定日誌記錄器
+logger = setup_logger()
+
+# 回覆與時間戳使用的灰色
+MUTED_TEXT_COLOR = (114, 118, 125)
+
+
+# ══════════════════════════════════════════════════════════════════════════════════════
+# 渲染規格
+# ══════════════════════════════════════════════════════════════════════════════════════
+
+
+@dataclass
+class AvatarSpec:
+    """頭像渲染規格"""
+
+    data: bytes | None  # 原始頭像圖片位元組, None 時使用預設頭像
+    status: str | None = None  # 成員狀態 (online/idle/dnd/offline), 非成員為 None
+
+
+@dataclass
+class MessageRenderSpec:
+    """單則訊息渲染規格"""
+
+    username: str
+    timestamp: str
+    content: str
+    avatar_key: str
+    reply_text: str | None = None
+    attachments: list[bytes] = field(default_factory=list)  # 原始圖片附件位元組
+
+
+@dataclass
+class RenderSpec:
+    """整張聊天圖片的渲染規格, 訊息已依時間排序"""
+
+    messages: list[MessageRenderSpec]
+    avatars: dict[str, AvatarSpec]
+
+
+# ══════════════════════════════════════════════════════════════════════════════════════
+# 字型
+# ══════════════════════════════════════════════════════════════════════════════════════
+
+
+class RenderFonts:
+    """渲染使用的三種字型"""
+
+    def __init__(self, font, username_font, timestamp_font):
+        self.font = font
+        self.username_font = username_font
+        self.timestamp_font = timestamp_font
+
+    @classmethod
+    def load(cls) -> "RenderFonts":
+        """載入字型, 失敗時使用預設字型"""
+        try:
+            font_path = utils.find_available_font()
+            return cls(
+                ImageFont.truetype(font_path, DEFAULT_FONT_SIZE),
+                ImageFont.truetype(font_path, USERNAME_FONT_SIZE),
+                ImageFont.truetype(font_path, TIMESTAMP_FONT_SIZE),
+            )
+        except Exception as exc:
+            logger.error(f"[訊息監聽]渲染程序載入字型失敗:{exc}")
+            default = ImageFont.load_default()
+            return cls(default, default, default)
+
+
+# 每個程序各自持有的字型 (工作程序啟動時預先載入)
+_fonts: RenderFonts | None = None
+
+
+def init_worker():
+    """工作程序初始化: 預先載入字型"""
+    global _fonts
+    _fonts = RenderFonts.load()
+
+
+def _get_fonts() -> RenderFonts:
+    """取得本程序的字型, 尚未載入時載入"""
+    global _fonts
+    if _fonts is None:
+        _fonts = RenderFonts.load()
+    return _fonts
+
+
+# ══════════════════════════════════════════════════════════════════════════════════════
+# 頭像與附件
+# ══════════════════════════════════════════════════════════════════════════════════════
+
+
+def default_avatar() -> Image.Image:
+    """
+    建立預設頭像
+
+    Returns:
+        Image.Image: 灰色圓形預設頭像
+    """
+    default = Image.new("RGBA", (AVATAR_SIZE, AVATAR_SIZE), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(default)
+
+    # 繪製灰色圓形
+    draw.ellipse((0, 0, AVATAR_SIZE, AVATAR_SIZE), fill=(128, 128, 128, 255))
+
+    center = AVATAR_SIZE // 2
+    head_radius = AVATAR_SIZE // 6
+    body_width = AVATAR_SIZE // 3
+    body_height = AVATAR_SIZE // 4
+
+    # 頭部
+    draw.ellipse(
+        (
+            center - head_radius,
+            center - AVATAR_SIZE // 3,
+            center + head_radius,
+            center - AVATAR_SIZE // 3 + head_radius * 2,
+        ),
+        fill=(200, 200, 200, 255),
+    )
+
+    # 身體
+    draw.ellipse(
+        (
+            center - body_width // 2,
+            center - body_height // 4,
+            center + body_width // 2,
+            center + body_height,
+        ),
+        fill=(200, 200, 200, 255),
+    )
+
+    return default
+
+
+def add_avatar_border(
+    avatar: Image.Image, border_color: tuple[int, int, int]
+) -> Image.Image:
+    """
+    為頭像添加邊框
+
+    Args:
+        avatar: 頭像圖片
+        border_color: 邊框顏色
+
+    Returns:
+        Image.Image: 帶邊框的頭像
+    """
+    border_width = RENDER_CONFIG["avatar_border_width"]
+    size = AVATAR_SIZE + border_width * 2
+
+    bordered = Image.new("RGBA", (size, size), (0, 0, 0, 0))
+    draw = ImageDraw.Draw(bordered)
+    draw.ellipse((0, 0, size - 1, size - 1), fill=(*border_color, 255), outline=None)
+    bordered.paste(avatar, (border_width, border_width), avatar)
+
+    return bordered
+
+
+def add_status_indicator(avatar: Image.Image, status: str) -> Image.Image:
+    """
+    為頭像添加狀態指示器
+
+    Args:
+        avatar: 頭像圖片
+        status: 用戶狀態名稱 (online/idle/dnd/offline)
+
+    Returns:
+        Image.Image: 帶狀態指示器的頭像
+    """
+    if status not in ("online", "idle", "dnd", "offline"):
+        status = "offline"
+    status_color = DISCORD_COLORS[status]
+    indicator_size = RENDER_CONFIG["status_indicator_size"]
+
+    avatar_size = avatar.size[0]
+    indicator_x = avatar_size - indicator_size
+    indicator_y = avatar_size - indicator_size
+
+    # 在副本上繪製狀態指示器
+    result = avatar.copy()
+    draw = ImageDraw.Draw(result)
+
+    draw.ellipse(
+        (
+            indicator_x - 1,
+            indicator_y - 1,
+            indicator_x + indicator_size + 1,
+            indicator_y + indicator_size + 1,
+        ),
+        fill=DISCORD_COLORS["main_bg"] + (255,),
+    )
+    draw.ellipse(
+        (
+            indicator_x,
+            indicator_y,
+            indicator_x + indicator_size,
+            indicator_y + indicator_size,
+        ),
+        fill=(*status_color, 255),
+    )
+
+    return result
+
+
+def create_enhanced_avatar(avatar: Image.Image, status: str | None) -> Image.Image:
+    """
+    創建增強版頭像 (圓形裁剪 + 邊框 + 狀態指示器)
+
+    Args:
+        avatar: 原始頭像圖片
+        status: 成員狀態名稱, None 表示不繪製狀態指示器
+
+    Returns:
+        Image.Image: 增強版頭像
+    """
+    avatar = avatar.resize((AVATAR_SIZE, AVATAR_SIZE), Image.Resampling.LANCZOS)
+
+    # 圓形遮罩
+    mask = Image.new("L", (AVATAR_SIZE, AVATAR_SIZE), 0)
+    ImageDraw.Draw(mask).ellipse((0, 0, AVATAR_SIZE, AVATAR_SIZE), fill=255)
+
+    circular_avatar = Image.new("RGBA", (AVATAR_SIZE, AVATAR_SIZE), (0, 0, 0, 0))
+    circular_avatar.paste(avatar, (0, 0))
+    circular_avatar.putalpha(mask)
+
+    if RENDER_CONFIG["avatar_border_width"] > 0:
+        circular_avatar = add_avatar_border(
+            circular_avatar, RENDER_CONFIG["avatar_border_color"]
+        )
+
+    if status is not None:
+        return add_status_indicator(circular_avatar, status)
+    return circular_avatar
+
+
+def fit_attachment(img: Image.Image) -> Image.Image:
+    """
+    等比例縮小附件圖片至內容區寬度
+
+    Args:
+        img: 附件圖片
+
+    Returns:
+        Image.Image: 調整後的圖片
+    """
+    max_width = CHAT_WIDTH - CONTENT_PADDING - 20
+    if img.width > max_width:
+        ratio = max_width / img.width
+        img = img.resize((max_width, int(img.height * ratio)))
+    return img
+
+
+def _decode_avatar(avatar: AvatarSpec) -> Image.Image:
+    """將頭像規格解碼並合成為增強版頭像"""
+    if not avatar.data:
+        return default_avatar()
+    try:
+        image = Image.open(io.BytesIO(avatar.data))
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+        return create_enhanced_avatar(image, avatar.status)
+    except Exception as exc:
+        logger.error(f"[訊息監聽]解碼頭像失敗:{exc}")
+        return default_avatar()
+
+
+# ══════════════════════════════════════════════════════════════════════════════════════
+# 排版
+# ══════════════════════════════════════════════════════════════════════════════════════
+
+
+def draw_message_text(
+    draw: ImageDraw.ImageDraw,
+    fonts: Any,
+    y_pos: int,
+    username: str,
+    timestamp: str,
+    content: str,
+    reply_text: str | None = None,
+) -> int:
+    """
+    繪製單則訊息的回覆、用戶名、時間戳與內容
+
+    Args:
+        draw: PIL 繪圖物件
+        fonts: 具有 font / username_font / timestamp_font 屬性的物件
+        y_pos: 起始 Y 座標
+        username: 用戶顯示名稱
+        timestamp: 已格式化的時間戳
+        content: 已處理表情符號的訊息內容
+        reply_text: 回覆提示文字, None 表示不是回覆
+
+    Returns:
+        int: 內容結束後的 Y 座標
+    """
+    if reply_text is not None:
+        # 繪製回覆線
+        draw.line(
+            [
+                (CONTENT_PADDING - 20, y_pos + 10),
+                (CONTENT_PADDING - 10, y_pos + 10),
+                (CONTENT_PADDING - 10, y_pos + 25),
+            ],
+            fill=MUTED_TEXT_COLOR,
+            width=2,
+        )
+        draw.text(
+            (CONTENT_PADDING, y_pos + 10),
+            reply_text,
+            fill=MUTED_TEXT_COLOR,
+            font=fonts.timestamp_font,
+        )
+        y_pos += 30
+
+    # 繪製用戶名和時間戳
+    draw.text(
+        (CONTENT_PADDING, y_pos),
+        username,
+        fill=(255, 255, 255),
+        font=fonts.username_font,
+    )
+    draw.text(
+        (
+            CONTENT_PADDING + draw.textlength(username, font=fonts.username_font) + 10,
+            y_pos + 2,
+        ),
+        timestamp,
+        fill=MUTED_TEXT_COLOR,
+        font=fonts.timestamp_font,
+    )
+
+    if not content:
+        # 沒有內容,只有附件
+        return y_pos + 25
+
+    y_offset = y_pos + 25
+    for line in content.split("\n"):
+        draw.text(
+            (CONTENT_PADDING, y_offset),
+            line,
+            fill=DISCORD_COLORS["text_primary"],
+            font=fonts.font,
+        )
+        y_offset += DEFAULT_FONT_SIZE + 5
+    return y_offset
+
+
+def render_spec(spec: RenderSpec) -> bytes:
+    """
+    依渲染規格繪製聊天圖片
+
+    在工作程序或執行緒中執行, 不可存取 Discord 物件.
+
+    Args:
+        spec: 渲染規格
+
+    Returns:
+        bytes: PNG 圖片位元組
+    """
+    fonts = _get_fonts()
+    avatars = {key: _decode_avatar(avatar) for key, avatar in spec.avatars.items()}
+
+    bg = Image.new("RGB", (CHAT_WIDTH, MAX_HEIGHT), DISCORD_COLORS["main_bg"])
+    draw = ImageDraw.Draw(bg)
+
+    y_pos = 10
+    placed_avatars = []  # (image, position)
+    placed_attachments = []  # (image, y)
+
+    for message in spec.messages:
+        y_pos = draw_message_text(
+            draw,
+            fonts,
+            y_pos,
+            message.username,
+            message.timestamp,
+            message.content,
+            message.reply_text,
+        )
+
+        for data in message.attachments:
+            try:
+                img = fit_attachment(Image.open(io.BytesIO(data)))
+            except Exception as exc:
+                logger.error(f"[訊息監聽]解碼附件失敗:{exc}")
+                continue
+            placed_attachments.append((img, y_pos))
+            y_pos += img.height + 10
+
+        avatar = avatars.get(message.avatar_key) or default_avatar()
+        placed_avatars.append((avatar, (10, y_pos - avatar.height)))
+        y_pos += MESSAGE_PADDING
+
+    bg = bg.crop((0, 0, CHAT_WIDTH, min(y_pos, MAX_HEIGHT)))
+
+    for avatar, pos in placed_avatars:
+        bg.paste(avatar, pos, avatar)
+    for attachment, y in placed_attachments:
+        bg.paste(attachment, (CONTENT_PADDING, y))
+
+    output = io.BytesIO()
+    bg.save(output, format="PNG")
+    return output.getvalue()
+
+
+# ══════════════════════════════════════════════════════════════════════════════════════
+# 程序池
+# ══════════════════════════════════════════════════════════════════════════════════════
+
+
+class RenderProcessPool:
+    """
+    渲染程序池
+
+    功能:
+    - 在獨立程序中執行 render_spec, 避免 Pillow 工作阻塞事件迴圈
+    - 工作程序於第一次渲染時啟動, 並預先載入字型
+    - workers 為 0 或程序池故障時改在執行緒中渲染
+    """
+
+    def __init__(self, workers: int = RENDER_PROCESS_WORKERS):
+        """
+        初始化渲染程序池
+
+        Args:
+            workers: 工作程序數, 0 表示只在執行緒中渲染
+        """
+        self.workers = max(0, workers)
+        self._executor: ProcessPoolExecutor | None = None
+        self._disabled = self.workers == 0
+
+        self.stats = {
+            "process_renders": 0,
+            "thread_renders": 0,
+            "pool_failures": 0,
+        }
+
+    @property
+    def using_processes(self) -> bool:
+        """是否使用程序池渲染"""
+        return not self._disabled
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """取得程序池, 尚未建立時建立"""
+        if self._executor is None:
+            # 使用 spawn 避免複製事件迴圈與資料庫執行緒的狀態
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=init_worker,
+            )
+        return self._executor
+
+    async def render(self, spec: RenderSpec) -> bytes:
+        """
+        渲染聊天圖片
+
+        Args:
+            spec: 渲染規格
+
+        Returns:
+            bytes: PNG 圖片位元組
+        """
+        if not self._disabled:
+            try:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(
+                    self._get_executor(), render_spec, spec
+                )
+                self.stats["process_renders"] += 1
+                return result
+            except (BrokenProcessPool, OSError, RuntimeError) as exc:
+                self.stats["pool_failures"] += 1
+                logger.warning(f"[訊息監聽]渲染程序池無法使用, 改在執行緒中渲染:{exc}")
+                self.shutdown()
+                self._disabled = True
+
+        result = await asyncio.to_thread(render_spec, spec)
+        self.stats["thread_renders"] += 1
+        return result
+
+    def shutdown(self):
+        """關閉程序池"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        取得渲染統計
+
+        Returns:
+            Dict[str, Any]: 統計資料
+        """
+        return {
+            **self.stats,
+            "workers": self.workers,
+            "using_processes": self.using_processes,
+        }
@@ -16,8 +16,8 @@ import aiohttp
 import discord
 from PIL import Image, ImageDraw, ImageFont
 
+from ...core.asset_cache import attachment_key, avatar_key, get_asset_cache
 from ..config.config import (
-    AVATAR_SIZE,
     CHAT_WIDTH,
     CONTENT_PADDING,
     DEFAULT_FONT_SIZE,
@@ -26,17 +26,31 @@ from ..config.config import (
     MAX_HEIGHT,
     MAX_REPLY_CONTENT_LENGTH,
     MESSAGE_PADDING,
-    RENDER_CONFIG,
     REPLY_CONTENT_TRUNCATE_SUFFIX,
     TIMESTAMP_FONT_SIZE,
     USERNAME_FONT_SIZE,
     setup_logger,
 )
 from . import utils
+from .render_worker import (
+    AvatarSpec,
+    MessageRenderSpec,
+    RenderProcessPool,
+    RenderSpec,
+    add_avatar_border,
+    add_status_indicator,
+    create_enhanced_avatar,
+    default_avatar,
+    draw_message_text,
+    fit_attachment,
+)
 
 # 設定日誌記錄器
 logger = setup_logger()
 
+# 下載頭像的尺寸 (渲染時再縮放)
+AVATAR_DOWNLOAD_SIZE = 256
+
 
 class EnhancedMessageRenderer:
     """
@@ -48,18 +62,26 @@ class EnhancedMessageRenderer:
     - 處理中文字型載入和渲染
     - 實現完美的頭像處理和狀態指示器
     - 支援訊息氣泡效果和陰影
+    - 可將排版與編碼交由渲染程序池執行, 不阻塞事件迴圈
     """
 
-    def __init__(self):
-        """初始化訊息渲染器"""
+    def __init__(self, render_pool: RenderProcessPool | None = None):
+        """
+        初始化訊息渲染器
+
+        Args:
+            render_pool: 渲染程序池, None 時在事件迴圈執行緒中渲染
+        """
+        self.render_pool = render_pool
+
         # 字型設定
         self.font = None
         self.username_font = None
         self.timestamp_font = None
         self.session = None
 
-        # 頭像快取
-        self.avatar_cache = {}
+        # 頭像與附件位元組快取 (與其他渲染器共用)
+        self.asset_cache = get_asset_cache()
 
         # 嘗試載入字型
         self._load_fonts()
@@ -86,6 +108,13 @@ class EnhancedMessageRenderer:
             self.username_font = ImageFont.load_default()
             self.timestamp_font = ImageFont.load_default()
 
+    async def close(self):
+        """關閉 HTTP 會話與渲染程序池"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        if self.render_pool is not None:
+            self.render_pool.shutdown()
+
     async def get_session(self) -> aiohttp.ClientSession:
         """
         獲取或創建 HTTP 會話
@@ -109,23 +138,12 @@ class EnhancedMessageRenderer:
         Returns:
             Image.Image: 處理後的頭像圖片
         """
-        cache_key = f"{user.id}_{getattr(user, 'status', 'offline')}"
-
-        # 檢查快取
-        if cache_key in self.avatar_cache:
-            return self.avatar_cache[cache_key].copy()
-
         try:
             # 獲取基礎頭像
             base_avatar = await self._download_avatar(user)
 
             # 創建帶邊框和狀態指示器的頭像
-            enhanced_avatar = self._create_enhanced_avatar(base_avatar, user)
-
-            # 快取結果
-            self.avatar_cache[cache_key] = enhanced_avatar.copy()
-
-            return enhanced_avatar
+            return self._create_enhanced_avatar(base_avatar, user)
 
         except Exception as exc:
             logger.error(f"[訊息監聽]獲取增強頭像失敗:{exc}")
@@ -144,21 +162,15 @@ class EnhancedMessageRenderer:
             Image.Image: 原始頭像圖片
         """
         try:
-            # 獲取高品質頭像 URL
-            avatar_url = user.display_avatar.replace(format="png", size=256).url
-
-            # 下載頭像
-            session = await self.get_session()
-            async with session.get(str(avatar_url)) as resp:
-                if resp.status == HTTP_OK:
-                    data = await resp.read()
-                    avatar = Image.open(io.BytesIO(data))
+            data = await self._get_avatar_bytes(user)
+            if data:
+                avatar = Image.open(io.BytesIO(data))
 
-                    # 確保為 RGBA 模式
-                    if avatar.mode != "RGBA":
-                        avatar = avatar.convert("RGBA")
+                # 確保為 RGBA 模式
+                if avatar.mode != "RGBA":
+                    avatar = avatar.convert("RGBA")
 
-                    return avatar
+                return avatar
         except Exception as exc:
             logger.error(f"[訊息監聽]下載頭像失敗:{exc}")
 
@@ -177,33 +189,14 @@ class EnhancedMessageRenderer:
         Returns:
             Image.Image: 增強版頭像
         """
-        # 調整頭像大小
-        avatar = avatar.resize((AVATAR_SIZE, AVATAR_SIZE), Image.Resampling.LANCZOS)
-
-        # 創建完美圓形遮罩
-        mask = Image.new("L", (AVATAR_SIZE, AVATAR_SIZE), 0)
-        draw = ImageDraw.Draw(mask)
-        draw.ellipse((0, 0, AVATAR_SIZE, AVATAR_SIZE), fill=255)
-
-        # 應用圓形遮罩
-        circular_avatar = Image.new("RGBA", (AVATAR_SIZE, AVATAR_SIZE), (0, 0, 0, 0))
-        circular_avatar.paste(avatar, (0, 0))
-        circular_avatar.putalpha(mask)
-
-        # 添加邊框
-        if RENDER_CONFIG["avatar_border_width"] > 0:
-            border_color = RENDER_CONFIG["avatar_border_color"]
-            bordered_avatar = self._add_avatar_border(circular_avatar, border_color)
-        else:
-            bordered_avatar = circular_avatar
+        return create_enhanced_avatar(avatar, self._get_status_name(user))
 
-        # 添加狀態指示器 (只對 Member 類型)
+    @staticmethod
+    def _get_status_name(user: discord.Member | discord.User) -> str | None:
+        """取得成員狀態名稱, 只有 Member 會顯示狀態指示器"""
         if isinstance(user, discord.Member) and hasattr(user, "status"):
-            final_avatar = self._add_status_indicator(bordered_avatar, user.status)
-        else:
-            final_avatar = bordered_avatar
-
-        return final_avatar
+            return str(user.status)
+        return None
 
     def _add_avatar_border(
         self, avatar: Image.Image, border_color: tuple[int, int, int]
@@ -218,22 +211,7 @@ class EnhancedMessageRenderer:
         Returns:
             Image.Image: 帶邊框的頭像
         """
-        border_width = RENDER_CONFIG["avatar_border_width"]
-        size = AVATAR_SIZE + border_width * 2
-
-        # 創建邊框背景
-        bordered = Image.new("RGBA", (size, size), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(bordered)
-
-        # 繪製邊框圓形
-        draw.ellipse(
-            (0, 0, size - 1, size - 1), fill=(*border_color, 255), outline=None
-        )
-
-        # 貼上原始頭像
-        bordered.paste(avatar, (border_width, border_width), avatar)
-
-        return bordered
+        return add_avatar_border(avatar, border_color)
 
     def _add_status_indicator(
         self, avatar: Image.Image, status: discord.Status
@@ -248,47 +226,7 @@ class EnhancedMessageRenderer:
         Returns:
             Image.Image: 帶狀態指示器的頭像
         """
-        # 狀態顏色映射
-        status_colors = {
-            discord.Status.online: DISCORD_COLORS["online"],
-            discord.Status.idle: DISCORD_COLORS["idle"],
-            discord.Status.dnd: DISCORD_COLORS["dnd"],
-            discord.Status.offline: DISCORD_COLORS["offline"],
-        }
-
-        status_color = status_colors.get(status, DISCORD_COLORS["offline"])
-        indicator_size = RENDER_CONFIG["status_indicator_size"]
-
-        avatar_size = avatar.size[0]
-        indicator_x = avatar_size - indicator_size
-        indicator_y = avatar_size - indicator_size
-
-        # 在副本上繪製狀態指示器
-        result = avatar.copy()
-        draw = ImageDraw.Draw(result)
-
-        draw.ellipse(
-            (
-                indicator_x - 1,
-                indicator_y - 1,
-                indicator_x + indicator_size + 1,
-                indicator_y + indicator_size + 1,
-            ),
-            fill=DISCORD_COLORS["main_bg"] + (255,),
-        )
-
-        # 繪製狀態指示器
-        draw.ellipse(
-            (
-                indicator_x,
-                indicator_y,
-                indicator_x + indicator_size,
-                indicator_y + indicator_size,
-            ),
-            fill=(*status_color, 255),
-        )
-
-        return result
+        return add_status_indicator(avatar, str(status))
 
     def _get_default_avatar(self) -> Image.Image:
         """
@@ -297,41 +235,7 @@ class EnhancedMessageRenderer:
         Returns:
             Image.Image: 預設頭像
         """
-        # 創建灰色圓形預設頭像
-        default = Image.new("RGBA", (AVATAR_SIZE, AVATAR_SIZE), (0, 0, 0, 0))
-        draw = ImageDraw.Draw(default)
-
-        # 繪製灰色圓形
-        draw.ellipse((0, 0, AVATAR_SIZE, AVATAR_SIZE), fill=(128, 128, 128, 255))
-
-        center = AVATAR_SIZE // 2
-        head_radius = AVATAR_SIZE // 6
-        body_width = AVATAR_SIZE // 3
-        body_height = AVATAR_SIZE // 4
-
-        # 頭部
-        draw.ellipse(
-            (
-                center - head_radius,
-                center - AVATAR_SIZE // 3,
-                center + head_radius,
-                center - AVATAR_SIZE // 3 + head_radius * 2,
-            ),
-            fill=(200, 200, 200, 255),
-        )
-
-        # 身體
-        draw.ellipse(
-            (
-                center - body_width // 2,
-                center - body_height // 4,
-                center + body_width // 2,
-                center + body_height,
-            ),
-            fill=(200, 200, 200, 255),
-        )
-
-        return default
+        return default_avatar()
 
     async def download_attachment(
         self, attachment: discord.Attachment
@@ -351,20 +255,10 @@ class EnhancedMessageRenderer:
                 return None
 
             # 下載附件
-            session = await self.get_session()
-            async with session.get(attachment.url) as resp:
-                if resp.status == HTTP_OK:
-                    data = await resp.read()
-                    img = Image.open(io.BytesIO(data))
-
-                    # 調整大小,保持比例
-                    max_width = CHAT_WIDTH - CONTENT_PADDING - 20
-                    if img.width > max_width:
-                        ratio = max_width / img.width
-                        new_height = int(img.height * ratio)
-                        img = img.resize((max_width, new_height))
-
-                    return img
+            data = await self._get_attachment_bytes(attachment)
+            if data:
+                # 調整大小,保持比例
+                return fit_attachment(Image.open(io.BytesIO(data)))
         except Exception as exc:
             utils.log_error_with_context(
                 exc, "下載附件失敗", {"attachment_url": attachment.url}
@@ -411,99 +305,19 @@ class EnhancedMessageRenderer:
         # 獲取頭像
         avatar = await self.get_enhanced_avatar(message.author)
 
-        # 計算文字寬度的函數
-        def get_text_width(text, font):
-            return draw.textlength(text, font=font)
-
         # 處理用戶名和時間戳
         username = utils.get_user_display_name(message.author)
         timestamp = self.format_timestamp(message.created_at)
+        reply_text = self._format_reply_text(message) if show_reply else None
 
-        # 處理回覆
-        reply_height = 0
-        if (
-            show_reply
-            and message.reference
-            and isinstance(message.reference.resolved, discord.Message)
-        ):
-            replied_msg = message.reference.resolved
-            replied_user = replied_msg.author.display_name
-            replied_content = replied_msg.content
-
-            # 截斷過長的回覆內容
-            if len(replied_content) > MAX_REPLY_CONTENT_LENGTH:
-                truncate_length = MAX_REPLY_CONTENT_LENGTH - len(
-                    REPLY_CONTENT_TRUNCATE_SUFFIX
-                )
-                replied_content = (
-                    replied_content[:truncate_length] + REPLY_CONTENT_TRUNCATE_SUFFIX
-                )
-
-            reply_text = f"回覆 @{replied_user}:{replied_content}"
-            get_text_width(reply_text, self.timestamp_font)
-
-            # 繪製回覆線
-            reply_line_start = (CONTENT_PADDING - 20, y_pos + 10)
-            reply_line_mid = (CONTENT_PADDING - 10, y_pos + 10)
-            reply_line_end = (CONTENT_PADDING - 10, y_pos + 25)
-            draw.line(
-                [reply_line_start, reply_line_mid, reply_line_end],
-                fill=(114, 118, 125),
-                width=2,
-            )
-
-            # 繪製回覆文字
-            draw.text(
-                (CONTENT_PADDING, y_pos + 10),
-                reply_text,
-                fill=(114, 118, 125),
-                font=self.timestamp_font,
-            )
-            reply_height = 30
-
-        # 調整 Y 座標
-        y_pos += reply_height
-
-        # 繪製用戶名和時間戳
-        draw.text(
-            (CONTENT_PADDING, y_pos),
-            username,
-            fill=(255, 255, 255),
-            font=self.username_font,
-        )
-        get_text_width(timestamp, self.timestamp_font)
-        draw.text(
-            (
-                CONTENT_PADDING + get_text_width(username, self.username_font) + 10,
-                y_pos + 2,
-            ),
-            timestamp,
-            fill=(114, 118, 125),
-            font=self.timestamp_font,
-        )
-
-        # 處理訊息內容
+        # 繪製回覆、用戶名、時間戳與內容
         content = message.content
         if content:
             # 處理外部表情符號
             content = self._sanitize_external_emoji(content, message.guild)
-
-            # 分行處理
-            y_offset = y_pos + 25
-            for line in content.split("\n"):
-                draw.text(
-                    (CONTENT_PADDING, y_offset),
-                    line,
-                    fill=DISCORD_COLORS["text_primary"],
-                    font=self.font,
-                )
-                y_offset += DEFAULT_FONT_SIZE + 5
-
-            # 更新 Y 座標
-            y_pos = y_offset
-        else:
-            # 沒有內容,只有附件
-            y_pos += 25
+        y_pos = draw_message_text(
+            draw, self, y_pos, username, timestamp, content, reply_text
+        )
 
         # 處理附件
         attachments = []
@@ -517,6 +331,35 @@ class EnhancedMessageRenderer:
         # 返回結果
         return y_pos, avatar, (10, y_pos - avatar.height), attachments
 
+    def _format_reply_text(self, message: discord.Message) -> str | None:
+        """
+        產生回覆提示文字
+
+        Args:
+            message: Discord 訊息
+
+        Returns:
+            str | None: 回覆提示文字, 不是回覆時為 None
+        """
+        if not message.reference or not isinstance(
+            message.reference.resolved, discord.Message
+        ):
+            return None
+
+        replied_msg = message.reference.resolved
+        replied_content = replied_msg.content
+
+        # 截斷過長的回覆內容
+        if len(replied_content) > MAX_REPLY_CONTENT_LENGTH:
+            truncate_length = MAX_REPLY_CONTENT_LENGTH - len(
+                REPLY_CONTENT_TRUNCATE_SUFFIX
+            )
+            replied_content = (
+                replied_content[:truncate_length] + REPLY_CONTENT_TRUNCATE_SUFFIX
+            )
+
+        return f"回覆 @{replied_msg.author.display_name}:{replied_content}"
+
     def _sanitize_external_emoji(self, text: str, _guild: discord.Guild | None) -> str:
         """
         處理外部表情符號
@@ -537,10 +380,124 @@ class EnhancedMessageRenderer:
 
         return re.sub(pattern, repl, text)
 
+    async def _download_bytes(self, url: str) -> bytes | None:
+        """
+        下載原始位元組
+
+        Args:
+            url: 資源網址
+
+        Returns:
+            bytes | None: 下載內容, 失敗時為 None
+        """
+        try:
+            session = await self.get_session()
+            async with session.get(url) as resp:
+                if resp.status == HTTP_OK:
+                    return await resp.read()
+        except Exception as exc:
+            utils.log_error_with_context(exc, "下載渲染資源失敗", {"url": url})
+        return None
+
+    async def _get_avatar_bytes(
+        self, user: discord.Member | discord.User
+    ) -> bytes | None:
+        """經由共用快取取得用戶頭像位元組"""
+        asset = user.display_avatar
+        url = str(asset.replace(format="png", size=AVATAR_DOWNLOAD_SIZE).url)
+        return await self.asset_cache.get_or_fetch(
+            avatar_key(asset, AVATAR_DOWNLOAD_SIZE), lambda: self._download_bytes(url)
+        )
+
+    async def _get_attachment_bytes(
+        self, attachment: discord.Attachment
+    ) -> bytes | None:
+        """經由共用快取取得附件位元組"""
+        return await self.asset_cache.get_or_fetch(
+            attachment_key(attachment), lambda: self._download_bytes(attachment.url)
+        )
+
+    async def build_render_spec(self, messages: list[discord.Message]) -> RenderSpec:
+        """
+        將訊息整理為可交給渲染程序的渲染規格
+
+        只在事件迴圈中下載頭像與附件的原始位元組, 解碼與合成交給渲染程序.
+
+        Args:
+            messages: 已依時間排序的 Discord 訊息列表
+
+        Returns:
+            RenderSpec: 渲染規格
+        """
+        avatars: dict[str, AvatarSpec] = {}
+        specs = []
+
+        for i, message in enumerate(messages):
+            author = message.author
+            status = self._get_status_name(author)
+            avatar_id = f"{author.id}_{status}"
+            if avatar_id not in avatars:
+                avatars[avatar_id] = AvatarSpec(
+                    await self._get_avatar_bytes(author), status
+                )
+
+            content = message.content
+            if content:
+                content = self._sanitize_external_emoji(content, message.guild)
+
+            attachments = []
+            for attachment in message.attachments:
+                if utils.is_image_attachment(attachment):
+                    data = await self._get_attachment_bytes(attachment)
+                    if data:
+                        attachments.append(data)
+
+            specs.append(
+                MessageRenderSpec(
+                    username=utils.get_user_display_name(author),
+                    timestamp=self.format_timestamp(message.created_at),
+                    content=content or "",
+                    avatar_key=avatar_id,
+                    reply_text=self._format_reply_text(message) if i > 0 else None,
+                    attachments=attachments,
+                )
+            )
+
+        return RenderSpec(messages=specs, avatars=avatars)
+
+    def _create_output_path(self) -> str:
+        """建立輸出圖片的臨時檔案路徑"""
+        path = utils.create_temp_file(suffix=".png", prefix="msg_render_")
+        if not path:
+            # 如果創建臨時文件失敗,使用原來的方法
+            fd, path = tempfile.mkstemp(suffix=".png")
+            os.close(fd)
+        return path
+
+    async def _render_with_pool(self, messages: list[discord.Message]) -> str:
+        """
+        以渲染程序池渲染訊息
+
+        Args:
+            messages: 已依時間排序的 Discord 訊息列表
+
+        Returns:
+            str: 圖片檔案路徑
+        """
+        spec = await self.build_render_spec(messages)
+        png = await self.render_pool.render(spec)
+
+        path = self._create_output_path()
+        with open(path, "wb") as file:
+            file.write(png)
+        return path
+
     async def render_messages(self, messages: list[discord.Message]) -> str | None:
         """
         渲染多個訊息為圖片
 
+        設定渲染程序池時, 排版與 PNG 編碼在程序池中執行.
+
         Args:
             messages: Discord 訊息列表
 
@@ -554,6 +511,9 @@ class EnhancedMessageRenderer:
             # 按時間排序
             messages = sorted(messages, key=lambda m: m.created_at)
 
+            if self.render_pool is not None:
+                return await self._render_with_pool(messages)
+
             # 創建背景圖片
             bg = Image.new("RGB", (CHAT_WIDTH, MAX_HEIGHT), DISCORD_COLORS["main_bg"])
             draw = ImageDraw.Draw(bg)
@@ -587,16 +547,9 @@ class EnhancedMessageRenderer:
                 bg.paste(attachment, (CONTENT_PADDING, pos))
 
             # 保存圖片
-            path = utils.create_temp_file(suffix=".png", prefix="msg_render_")
-            if path:
-                bg.save(path)
-                return path
-            else:
-                # 如果創建臨時文件失敗,使用原來的方法
-                fd, path = tempfile.mkstemp(suffix=".png")
-                os.close(fd)
-                bg.save(path)
-                return path
+            path = self._create_output_path()
+            bg.save(path)
+            return path
         except Exception as exc:
             logger.error(f"[訊息監聽]渲染訊息失敗:{exc}")
             return None
@@ -0,0 +1,250 @@
+"""
+訊息搜尋性能基準測試
+- 在合成的大量訊息表上比較 LIKE 掃描與 FTS5 全文索引的查詢耗時
+- 驗證兩種查詢的結果筆數一致
+"""
+
+import logging
+import random
+import sqlite3
+import time
+from typing import Any
+
+from ..database.fulltext import (
+    FTS_REBUILD_SQL,
+    FTS_SCHEMA,
+    FTS_TABLE,
+    build_fts_query,
+)
+
+logger = logging.getLogger("message_listener")
+
+# 合成訊息使用的詞彙
+_VOCABULARY = [
+    "今天", "天氣", "很好", "活動", "公告", "伺服器", "維護", "更新", "測試", "訊息",
+    "hello", "world", "discord", "update", "server", "event", "meeting", "patch",
+    "release", "deploy", "ranking", "leaderboard", "welcome", "music", "stream",
+]
+
+# 基準測試使用的關鍵字(皆為 3 字元以上, LIKE 與 FTS5 結果可直接比較)
+_DEFAULT_KEYWORDS = ["伺服器", "leaderboard", "deploy", "天氣很好", "zzzz"]
+
+
+class MessageSearchBenchmark:
+    """
+    訊息搜尋基準測試
+
+    以標準庫 sqlite3 建立與 MessageListenerDB 相同結構的訊息表與全文索引,
+    在同一份資料上分別以 LIKE 與 FTS5 MATCH 查詢
+    """
+
+    def __init__(self, db_path: str = ":memory:", seed: int = 42):
+        """
+        初始化基準測試
+
+        Args:
+            db_path: 資料庫路徑(預設為記憶體資料庫)
+            seed: 隨機種子
+        """
+        self.db_path = db_path
+        self.random = random.Random(seed)
+        self.conn: sqlite3.Connection | None = None
+
+    def setup(self, row_count: int, batch_size: int = 50000) -> float:
+        """
+        建立合成訊息表並建立全文索引
+
+        Args:
+            row_count: 訊息數量
+            batch_size: 每批寫入數量
+
+        Returns:
+            float: 建立全文索引耗時(秒)
+        """
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS messages (
+                message_id INTEGER PRIMARY KEY,
+                channel_id INTEGER NOT NULL,
+                guild_id INTEGER NOT NULL,
+                author_id INTEGER NOT NULL,
+                content TEXT,
+                timestamp REAL,
+                attachments TEXT,
+                deleted INTEGER DEFAULT 0
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_timestamp ON messages (timestamp)"
+        )
+
+        now = time.time()
+        for start in range(0, row_count, batch_size):
+            rows = [
+                self._generate_row(message_id, now)
+                for message_id in range(start, min(start + batch_size, row_count))
+            ]
+            self.conn.executemany(
+                "INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, '[]', 0)", rows
+            )
+        self.conn.commit()
+
+        # 與既有資料庫升級時相同: 先有資料, 再建立索引並一次性回填
+        index_start = time.perf_counter()
+        for statement in FTS_SCHEMA:
+            self.conn.execute(statement)
+        self.conn.execute(FTS_REBUILD_SQL)
+        self.conn.commit()
+        return time.perf_counter() - index_start
+
+    def _generate_row(self, message_id: int, now: float) -> tuple:
+        """生成一筆合成訊息"""
+        word_count = self.random.randint(3, 12)
+        content = " ".join(self.random.choices(_VOCABULARY, k=word_count))
+        return (
+            message_id,
+            self.random.randint(1, 50),
+            self.random.randint(1, 5),
+            self.random.randint(1, 2000),
+            content,
+            now - self.random.uniform(0, 30 * 86400),
+        )
+
+    def _time_query(self, query: str, params: tuple, repeats: int) -> tuple[float, int]:
+        """執行查詢數次, 回傳平均耗時與結果筆數"""
+        assert self.conn is not None
+        count = 0
+        start = time.perf_counter()
+        for _ in range(repeats):
+            count = len(self.conn.execute(query, params).fetchall())
+        return (time.perf_counter() - start) / repeats, count
+
+    def benchmark_keyword(
+        self, keyword: str, hours: int = 24 * 30, repeats: int = 3
+    ) -> dict[str, Any]:
+        """
+        比較單一關鍵字的 LIKE 與 FTS5 查詢
+
+        兩者皆回傳所有符合的訊息(不設 LIMIT), 以比較完整掃描成本
+
+        Args:
+            keyword: 搜尋關鍵字
+            hours: 搜尋時間範圍(小時)
+            repeats: 重複次數
+
+        Returns:
+            Dict[str, Any]: 測試結果
+        """
+        start_time = time.time() - hours * 3600
+
+        like_time, like_count = self._time_query(
+            """
+            SELECT message_id FROM messages
+            WHERE timestamp >= ? AND deleted = 0 AND content LIKE ?
+            """,
+            (start_time, f"%{keyword}%"),
+            repeats,
+        )
+
+        match_query, _ = build_fts_query(keyword)
+        fts_time, fts_count = self._time_query(
+            f"""
+            SELECT m.message_id FROM {FTS_TABLE}
+            JOIN messages m ON m.message_id = {FTS_TABLE}.rowid
+            WHERE {FTS_TABLE} MATCH ? AND m.timestamp >= ? AND m.deleted = 0
+            ORDER BY {FTS_TABLE}.rank
+            """,
+            (match_query, start_time),
+            repeats,
+        )
+
+        return {
+            "keyword": keyword,
+            "like_time": like_time,
+            "fts_time": fts_time,
+            "like_count": like_count,
+            "fts_count": fts_count,
+            "improvement_ratio": like_time / fts_time if fts_time > 0 else 0.0,
+        }
+
+    def close(self) -> None:
+        """關閉資料庫連接"""
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def generate_report(
+        self, row_count: int, index_time: float, results: list[dict[str, Any]]
+    ) -> str:
+        """
+        生成搜尋基準測試報告
+
+        Args:
+            row_count: 訊息數量
+            index_time: 建立全文索引耗時(秒)
+            results: benchmark_keyword 的結果列表
+
+        Returns:
+            str: 格式化的報告文字
+        """
+        report_lines = [
+            "=" * 60,
+            "訊息搜尋性能基準測試報告 (LIKE vs FTS5)",
+            "=" * 60,
+            "",
+            f"訊息數量: {row_count}",
+            f"建立全文索引耗時: {index_time:.2f} 秒",
+            "",
+            f"{'關鍵字':<14} {'LIKE(ms)':<10} {'FTS5(ms)':<10} "
+            f"{'結果數':<10} {'改善倍數':<10}",
+            "-" * 60,
+        ]
+
+        for result in results:
+            count = (
+                str(result["fts_count"])
+                if result["like_count"] == result["fts_count"]
+                else f"{result['like_count']}/{result['fts_count']}"
+            )
+            report_lines.append(
+                f"{result['keyword']:<14} {result['like_time'] * 1000:<10.1f} "
+                f"{result['fts_time'] * 1000:<10.1f} {count:<10} "
+                f"{result['improvement_ratio']:<10.1f}x"
+            )
+
+        consistent = all(r["like_count"] == r["fts_count"] for r in results)
+        report_lines.extend(["", f"結果筆數一致: {'是' if consistent else '否'}", ""])
+        return "\n".join(report_lines)
+
+
+def run_search_benchmark(
+    row_count: int = 1_000_000, keywords: list[str] | None = None
+) -> str:
+    """
+    執行訊息搜尋基準測試
+
+    Args:
+        row_count: 合成訊息數量
+        keywords: 搜尋關鍵字列表
+
+    Returns:
+        str: 測試報告
+    """
+    benchmark = MessageSearchBenchmark()
+    try:
+        index_time = benchmark.setup(row_count)
+        results = [
+            benchmark.benchmark_keyword(keyword)
+            for keyword in keywords or _DEFAULT_KEYWORDS
+        ]
+    finally:
+        benchmark.close()
+
+    report = benchmark.generate_report(row_count, index_time, results)
+    logger.info(f"\n{report}")
+    return report
+
+
+if __name__ == "__main__":
+    # 直接執行基準測試
+    print(run_search_benchmark())
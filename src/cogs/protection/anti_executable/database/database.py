@@ -14,10 +14,33 @@ from src.cogs.core.error_handler import create_error_handler
 from src.cogs.core.logger import setup_module_logger
 from src.core.config import get_settings
 
+from ...write_buffer import StatRow
+
 # 設置模組日誌記錄器
 logger = setup_module_logger("anti_executable.database")
 error_handler = create_error_handler("anti_executable.database", logger)
 
+# 寫入緩衝區沖刷時累加統計
+_UPSERT_STAT_SQL = """
+    INSERT INTO stats (guild_id, stat_type, count, last_updated)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(guild_id, stat_type) DO UPDATE SET
+        count = count + excluded.count,
+        last_updated = excluded.last_updated
+"""
+
+_INSERT_ACTION_LOG_SQL = """
+    INSERT INTO action_logs (guild_id, user_id, action, details, timestamp)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+_INSERT_FILE_DETECTION_SQL = """
+    INSERT INTO file_detections
+    (guild_id, user_id, filename, file_extension,
+     risk_level, action_taken, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+"""
+
 
 class AntiExecutableDatabase:
     """反可執行檔案保護資料庫管理器"""
@@ -352,6 +375,37 @@ class AntiExecutableDatabase:
                 exc, f"添加統計 - {guild_id}:{stat_type}", "STATS_ADD_ERROR"
             )
 
+    async def write_batch(
+        self, stats: list[StatRow], rows: dict[str, list[tuple]]
+    ) -> None:
+        """
+        將寫入緩衝區累積的統計、操作日誌與檢測記錄在一個交易中寫入資料庫
+
+        失敗時拋出例外, 由寫入緩衝區重試.
+
+        Args:
+            stats: (伺服器ID, 統計類型, 增加數量) 列表
+            rows: 日誌種類與欄位值
+                - "action_log": (伺服器ID, 用戶ID, 操作類型, 詳細資訊, 時間)
+                - "file_detection": (伺服器ID, 用戶ID, 檔案名稱, 副檔名,
+                  風險等級, 採取的行動, 時間)
+        """
+        now = datetime.now()
+        async with self._lock, aiosqlite.connect(self.db_path) as db:
+            if stats:
+                await db.executemany(
+                    _UPSERT_STAT_SQL,
+                    [
+                        (guild_id, stat_type, count, now)
+                        for guild_id, stat_type, count in stats
+                    ],
+                )
+            if rows.get("action_log"):
+                await db.executemany(_INSERT_ACTION_LOG_SQL, rows["action_log"])
+            if rows.get("file_detection"):
+                await db.executemany(_INSERT_FILE_DETECTION_SQL, rows["file_detection"])
+            await db.commit()
+
     async def get_stats(self, guild_id: int) -> dict[str, int]:
         """
         獲取統計資料
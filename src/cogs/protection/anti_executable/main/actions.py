@@ -4,10 +4,13 @@
 """
 
 import logging
+from datetime import datetime
 from typing import TYPE_CHECKING
 
 import discord
 
+from ..config.config import get_file_extension, get_file_risk_level
+
 if TYPE_CHECKING:
     from .main import AntiExecutable
 
@@ -56,7 +59,7 @@ class ExecutableActions:
                 await self._notify_admins(message, filename, violation_type, settings)
 
             # 記錄違規
-            await self._log_violation(message, filename, violation_type)
+            self._log_violation(message, filename, violation_type, settings)
 
         except Exception as exc:
             logger.error(f"處理違規失敗: {exc}")
@@ -194,16 +197,21 @@ class ExecutableActions:
         except Exception as exc:
             logger.error(f"通知管理員失敗: {exc}")
 
-    async def _log_violation(
-        self, message: discord.Message, filename: str, violation_type: str
+    def _log_violation(
+        self,
+        message: discord.Message,
+        filename: str,
+        violation_type: str,
+        settings: dict,
     ):
         """
-        記錄違規行為
+        記錄違規行為 (操作日誌與檢測記錄寫入緩衝區, 定期寫入資料庫)
 
         Args:
             message: 原始訊息
             filename: 檔案名稱
             violation_type: 違規類型
+            settings: 設定
         """
         try:
             # 記錄到日誌
@@ -213,5 +221,24 @@ class ExecutableActions:
                 f"頻道: {message.channel.id}"
             )
 
+            now = datetime.now()
+            guild_id, user_id = message.guild.id, message.author.id
+            self.cog.write_buffer.add_row(
+                "action_log",
+                (guild_id, user_id, f"{violation_type}_blocked", filename, now),
+            )
+            self.cog.write_buffer.add_row(
+                "file_detection",
+                (
+                    guild_id,
+                    user_id,
+                    filename,
+                    get_file_extension(filename),
+                    get_file_risk_level(filename, settings.get("strict_mode", False)),
+                    settings.get("action", "delete"),
+                    now,
+                ),
+            )
+
         except Exception as exc:
             logger.error(f"記錄違規失敗: {exc}")
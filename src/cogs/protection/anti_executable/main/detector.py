@@ -4,25 +4,24 @@
 """
 
 import logging
-import re
+from collections.abc import Iterable, Sequence
 from typing import TYPE_CHECKING
 from urllib.parse import unquote, urlparse
 
-import aiohttp
 import discord
 
-from ..config.config import (
-    DANGEROUS_EXTENSIONS,
-    MAGIC_SIGNATURES,
-    MAX_FILE_SIZE,
-    STRICT_EXTENSIONS,
-)
+from ..config.config import MAX_FILE_SIZE
+from .policy import ExtensionPolicy
 
 if TYPE_CHECKING:
+    from ....core.message_features import MessageFeatures
     from .main import AntiExecutable
 
 logger = logging.getLogger("anti_executable")
 
+# URL 結尾常見的標點 (例如以括號包住的連結), 判斷副檔名前先移除
+_TRAILING_PUNCTUATION = ")]}>.,;:!?'\""
+
 
 class ExecutableDetector:
     """可執行檔案檢測器"""
@@ -36,12 +35,6 @@ class ExecutableDetector:
         """
         self.cog = cog
 
-        # URL 匹配模式
-        self.url_pattern = re.compile(
-            r"https?://(?:[-\w.])+(?:[:\d]+)?(?:/(?:[\w/_.])*)?(?:\?(?:[\w&=%.])*)?(?:#(?:[\w.])*)?",
-            re.IGNORECASE,
-        )
-
     async def is_dangerous_attachment(
         self, attachment: discord.Attachment, guild_id: int
     ) -> bool:
@@ -55,132 +48,121 @@ class ExecutableDetector:
         Returns:
             是否為危險檔案
         """
-        try:
-            filename = attachment.filename.lower()
-
-            # 檢查檔案大小限制
-            if attachment.size > MAX_FILE_SIZE * 1024 * 1024:
-                return False
-
-            # 檢查白名單
-            whitelist = await self.cog.get_whitelist(guild_id)
-            if any(pattern in filename for pattern in whitelist):
-                return False
-
-            # 檢查副檔名
-            if self._is_dangerous_extension(filename, guild_id):
-                return True
-
-            # 檢查檔案特徵
-            return await self._check_file_signature(attachment)
-
-        except Exception as exc:
-            logger.error(f"檢查附件失敗: {exc}")
-            return False
-
-    def _is_dangerous_extension(self, filename: str, guild_id: int) -> bool:
+        return await self.find_dangerous_attachment([attachment], guild_id) is not None
+
+    async def find_dangerous_attachment(
+        self,
+        attachments: Sequence[discord.Attachment],
+        guild_id: int,
+        features: "MessageFeatures | None" = None,
+    ) -> discord.Attachment | None:
         """
-        檢查副檔名是否危險
+        在訊息附件中尋找第一個危險檔案
+
+        先以檔案大小、白名單與副檔名篩選 (伺服器檢測策略, 只在記憶體中查詢),
+        副檔名已判定危險時不需下載; 其餘附件的檔案特徵並行擷取, 共用一個期限.
 
         Args:
-            filename: 檔案名稱
+            attachments: Discord 附件物件序列
             guild_id: 伺服器ID
+            features: 共用訊息特徵, 提供時沿用已解析的小寫檔名與副檔名
 
         Returns:
-            是否為危險副檔名
+            第一個危險附件, 沒有時為 None
         """
         try:
-            # 獲取副檔名
-            if "." not in filename:
-                return False
+            policy = await self.cog.get_policy(guild_id)
+            to_sniff: list[discord.Attachment] = []
 
-            extension = filename.split(".")[-1].lower()
+            if features is not None:
+                names = features.attachment_names
+                extensions: Sequence[str | None] = features.attachment_extensions
+            else:
+                names = tuple(attachment.filename.lower() for attachment in attachments)
+                extensions = (None,) * len(names)
 
-            # 檢查基本危險副檔名
-            if extension in DANGEROUS_EXTENSIONS:
-                return True
+            for attachment, filename, extension in zip(
+                attachments, names, extensions, strict=True
+            ):
+                # 檢查檔案大小限制
+                if attachment.size > MAX_FILE_SIZE * 1024 * 1024:
+                    continue
 
-            # 檢查自定義格式
-            custom_formats = self.cog._custom_formats_cache.get(guild_id, set())
-            if extension in custom_formats:
-                return True
+                # 檢查白名單
+                if policy.is_whitelisted(filename):
+                    continue
 
-            # 檢查嚴格模式
-            settings = self.cog.db.get_settings(guild_id)  # 這裡可能需要改為異步
-            return bool(
-                settings.get("strict_mode", False) and extension in STRICT_EXTENSIONS
+                # 檢查副檔名
+                if self._is_dangerous_extension(filename, policy, extension):
+                    return attachment
+
+                to_sniff.append(attachment)
+
+            # 檢查檔案特徵
+            if not to_sniff:
+                return None
+            verdicts = await self.cog.sniffer.check_many(to_sniff)
+            return next(
+                (
+                    attachment
+                    for attachment, dangerous in zip(to_sniff, verdicts, strict=True)
+                    if dangerous
+                ),
+                None,
             )
 
         except Exception as exc:
-            logger.error(f"檢查副檔名失敗: {exc}")
-            return False
+            logger.error(f"檢查附件失敗: {exc}")
+            return None
 
-    async def _check_file_signature(self, attachment: discord.Attachment) -> bool:
+    def _is_dangerous_extension(
+        self, filename: str, policy: ExtensionPolicy, extension: str | None = None
+    ) -> bool:
         """
-        檢查檔案特徵
+        檢查副檔名是否危險
 
         Args:
-            attachment: Discord 附件物件
+            filename: 檔案名稱
+            policy: 伺服器檢測策略
+            extension: 已解析的小寫副檔名, 預設由檔名解析
 
         Returns:
-            是否為可執行檔案
+            是否為危險副檔名
         """
         try:
-            # 下載檔案前幾個位元組
-            async with aiohttp.ClientSession() as session:
-                headers = {"Range": "bytes=0-15"}
-                async with session.get(attachment.url, headers=headers) as resp:
-                    if resp.status not in [200, 206]:
-                        return False
-
-                    content = await resp.read()
-                    header = content[:8]
-
-                    # 檢查魔術數字
-                    for signature in MAGIC_SIGNATURES:
-                        if header.startswith(signature):
-                            return True
-
-                    return False
-
+            return policy.is_dangerous_extension(filename.lower(), extension)
         except Exception as exc:
-            logger.error(f"檢查檔案特徵失敗: {exc}")
+            logger.error(f"檢查副檔名失敗: {exc}")
             return False
 
-    async def find_dangerous_links(self, content: str, guild_id: int) -> list[str]:
+    async def find_dangerous_links(
+        self, urls: Iterable[str], guild_id: int
+    ) -> list[str]:
         """
-        在文字中尋找危險連結
+        在連結中尋找危險連結
 
         Args:
-            content: 訊息內容
+            urls: 訊息中的 URL (由共用訊息特徵分析取得)
             guild_id: 伺服器ID
 
         Returns:
             危險連結列表
         """
         try:
-            dangerous_links = []
-
-            # 尋找所有 URL
-            urls = self.url_pattern.findall(content)
-
-            for url in urls:
-                if await self._is_dangerous_url(url, guild_id):
-                    dangerous_links.append(url)
-
-            return dangerous_links
+            policy = await self.cog.get_policy(guild_id)
+            return [url for url in urls if self._is_dangerous_url(url, policy)]
 
         except Exception as exc:
             logger.error(f"檢查連結失敗: {exc}")
             return []
 
-    async def _is_dangerous_url(self, url: str, guild_id: int) -> bool:
+    def _is_dangerous_url(self, url: str, policy: ExtensionPolicy) -> bool:
         """
-        檢查 URL 是否指向危險檔案
+        檢查 URL 是否指向危險檔案 (白名單同樣套用於連結的檔名)
 
         Args:
             url: 要檢查的 URL
-            guild_id: 伺服器ID
+            policy: 伺服器檢測策略
 
         Returns:
             是否為危險 URL
@@ -193,15 +175,16 @@ class ExecutableDetector:
             # 提取檔案名稱
             filename = path.split("/")[-1] if "/" in path else path
 
-            # 移除查詢參數
+            # 移除查詢參數與結尾標點
             if "?" in filename:
                 filename = filename.split("?")[0]
+            filename = filename.rstrip(_TRAILING_PUNCTUATION)
 
             if not filename or "." not in filename:
                 return False
 
-            # 檢查副檔名
-            return self._is_dangerous_extension(filename.lower(), guild_id)
+            # 檢查白名單與副檔名
+            return policy.is_dangerous(filename.lower())
 
         except Exception as exc:
             logger.error(f"檢查 URL 失敗: {exc}")
@@ -3,18 +3,21 @@
 """
 
 import logging
-from collections import defaultdict
 from typing import Any
 
 import discord
 from discord import app_commands
 from discord.ext import commands
 
+from ....core.message_features import MessageFeatures, get_message_features
 from ...base import ProtectionCog
+from ...write_buffer import ProtectionWriteBuffer
 from ..database.database import AntiExecutableDatabase
 from ..panel.main_view import AntiExecutableMainView
 from .actions import ExecutableActions
 from .detector import ExecutableDetector
+from .policy import ExtensionPolicy
+from .sniffer import SignatureSniffer
 
 logger = logging.getLogger("anti_executable")
 
@@ -42,20 +45,23 @@ class AntiExecutable(ProtectionCog):
         super().__init__(bot)
         self.db = AntiExecutableDatabase(self)
         self.detector = ExecutableDetector(self)
+        self.sniffer = SignatureSniffer()  # 共用 HTTP 會話與檔案特徵判定快取
         self.actions = ExecutableActions(self)
 
         # 快取管理
         self._whitelist_cache: dict[int, set[str]] = {}
         self._blacklist_cache: dict[int, set[str]] = {}
-        self._custom_formats_cache: dict[int, set[str]] = {}
+        # 伺服器檢測策略 (設定與白名單編譯後的結果)
+        self._policies: dict[int, ExtensionPolicy] = {}
 
-        # 統計資料
-        self.stats: dict[int, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        # 統計資料、操作日誌與檢測記錄先寫入緩衝區, 定期一批寫入資料庫
+        self.write_buffer = ProtectionWriteBuffer(self.db, "反可執行檔案")
 
     async def cog_load(self):
         """Cog 載入時的初始化"""
         try:
             await self.db.init_db()
+            self.write_buffer.start()
             logger.info("[反可執行檔案]模組載入完成")
         except Exception as exc:
             logger.error(f"[反可執行檔案]模組載入失敗: {exc}")
@@ -64,6 +70,8 @@ class AntiExecutable(ProtectionCog):
     async def cog_unload(self):
         """Cog 卸載時的清理"""
         try:
+            await self.sniffer.close()
+            await self.write_buffer.stop()
             logger.info("[反可執行檔案]模組卸載完成")
         except Exception as exc:
             logger.error(f"[反可執行檔案]模組卸載失敗: {exc}")
@@ -81,54 +89,61 @@ class AntiExecutable(ProtectionCog):
             return
 
         # 檢查是否啟用
-        settings = await self.db.get_settings(message.guild.id)
-        if not settings.get("enabled", False):
+        policy = await self.get_policy(message.guild.id)
+        if not policy.enabled:
             return
 
+        features = get_message_features(message)
+
         # 檢查附件
-        if message.attachments:
-            await self._check_attachments(message)
+        if features.attachment_count:
+            await self._check_attachments(message, features)
 
         # 檢查連結中的檔案
-        if settings.get("check_links", True):
-            await self._check_links_in_message(message)
+        if features.urls and policy.check_links:
+            await self._check_links_in_message(message, features.urls)
 
-    async def _check_attachments(self, message: discord.Message):
+    async def _check_attachments(
+        self, message: discord.Message, features: MessageFeatures
+    ):
         """
         檢查訊息附件
 
         Args:
             message: Discord 訊息物件
+            features: 共用訊息特徵 (小寫檔名與副檔名)
         """
         try:
-            for attachment in message.attachments:
-                if await self.detector.is_dangerous_attachment(
-                    attachment, message.guild.id
-                ):
-                    await self.actions.handle_violation(
-                        message, attachment.filename, "attachment"
-                    )
-                    # 記錄統計
-                    self.stats[message.guild.id]["attachments_blocked"] += 1
-                    break  # 只需要處理一次
+            attachment = await self.detector.find_dangerous_attachment(
+                message.attachments, message.guild.id, features
+            )
+            if attachment is not None:  # 只需要處理一次
+                await self.actions.handle_violation(
+                    message, attachment.filename, "attachment"
+                )
+                # 記錄統計
+                self.write_buffer.add_stat(message.guild.id, "attachments_blocked")
         except Exception as exc:
             logger.error(f"檢查附件失敗: {exc}")
 
-    async def _check_links_in_message(self, message: discord.Message):
+    async def _check_links_in_message(
+        self, message: discord.Message, urls: tuple[str, ...]
+    ):
         """
         檢查訊息中的連結
 
         Args:
             message: Discord 訊息物件
+            urls: 訊息中的 URL
         """
         try:
             dangerous_links = await self.detector.find_dangerous_links(
-                message.content, message.guild.id
+                urls, message.guild.id
             )
             if dangerous_links:
                 await self.actions.handle_violation(message, dangerous_links[0], "link")
                 # 記錄統計
-                self.stats[message.guild.id]["links_blocked"] += 1
+                self.write_buffer.add_stat(message.guild.id, "links_blocked")
         except Exception as exc:
             logger.error(f"檢查連結失敗: {exc}")
 
@@ -177,7 +192,7 @@ class AntiExecutable(ProtectionCog):
             embed.add_field(name="🔧 模組狀態", value=status, inline=True)
 
             # 統計資訊
-            stats = self.stats.get(interaction.guild_id, {})
+            stats = await self.get_stats(interaction.guild_id)
             embed.add_field(
                 name="📊 攔截統計",
                 value=(
@@ -239,7 +254,41 @@ class AntiExecutable(ProtectionCog):
         Returns:
             是否成功
         """
-        return await self.db.update_settings(guild_id, settings)
+        success = await self.db.update_settings(guild_id, settings)
+        self.invalidate_policy(guild_id)
+        return success
+
+    async def get_policy(self, guild_id: int) -> ExtensionPolicy:
+        """
+        獲取伺服器檢測策略, 未快取時由設定與白名單建立
+
+        Args:
+            guild_id: 伺服器ID
+
+        Returns:
+            檢測策略
+        """
+        policy = self._policies.get(guild_id)
+        if policy is not None:
+            return policy
+
+        settings = await self.db.get_settings(guild_id)
+        whitelist = await self.get_whitelist(guild_id)
+        policy = ExtensionPolicy.build(settings, whitelist)
+        self._policies[guild_id] = policy
+        return policy
+
+    def invalidate_policy(self, guild_id: int | None = None):
+        """
+        使檢測策略失效, 下次檢查時重建
+
+        Args:
+            guild_id: 伺服器ID, 為 None 時清除所有伺服器
+        """
+        if guild_id is None:
+            self._policies.clear()
+        else:
+            self._policies.pop(guild_id, None)
 
     async def get_whitelist(self, guild_id: int) -> set[str]:
         """
@@ -274,6 +323,7 @@ class AntiExecutable(ProtectionCog):
         success = await self.db.add_to_whitelist(guild_id, item)
         if success and guild_id in self._whitelist_cache:
             self._whitelist_cache[guild_id].add(item)
+        self.invalidate_policy(guild_id)
         return success
 
     async def remove_from_whitelist(self, guild_id: int, item: str) -> bool:
@@ -290,6 +340,7 @@ class AntiExecutable(ProtectionCog):
         success = await self.db.remove_from_whitelist(guild_id, item)
         if success and guild_id in self._whitelist_cache:
             self._whitelist_cache[guild_id].discard(item)
+        self.invalidate_policy(guild_id)
         return success
 
     async def get_blacklist(self, guild_id: int) -> set[str]:
@@ -353,23 +404,17 @@ class AntiExecutable(ProtectionCog):
         Returns:
             統計資料字典
         """
-        # 從記憶體統計獲取
-        memory_stats = self.stats.get(guild_id, {})
+        # 合併資料庫統計與尚未寫入的計數
+        stats = await self.write_buffer.read_stats(guild_id, self.db.get_stats)
 
-        # 從資料庫獲取歷史統計
-        db_stats = await self.db.get_stats(guild_id)
-
-        # 合併統計資料
-        combined_stats = {
-            "total_blocked": memory_stats.get("attachments_blocked", 0)
-            + memory_stats.get("links_blocked", 0),
-            "files_blocked": memory_stats.get("attachments_blocked", 0),
-            "links_blocked": memory_stats.get("links_blocked", 0),
-            **db_stats,
+        return {
+            "total_blocked": stats.get("attachments_blocked", 0)
+            + stats.get("links_blocked", 0),
+            "files_blocked": stats.get("attachments_blocked", 0),
+            "links_blocked": stats.get("links_blocked", 0),
+            **stats,
         }
 
-        return combined_stats
-
     async def clear_stats(self, guild_id: int) -> bool:
         """
         清空統計資料
@@ -381,9 +426,8 @@ class AntiExecutable(ProtectionCog):
             是否成功
         """
         try:
-            # 清空記憶體統計
-            if guild_id in self.stats:
-                del self.stats[guild_id]
+            # 捨棄尚未寫入的統計
+            await self.write_buffer.discard_stats(guild_id)
 
             # 清空資料庫統計
             success = await self.db.clear_stats(guild_id)
@@ -430,6 +474,7 @@ class AntiExecutable(ProtectionCog):
             success = await self.db.clear_whitelist(guild_id)
             if success and guild_id in self._whitelist_cache:
                 self._whitelist_cache[guild_id].clear()
+            self.invalidate_policy(guild_id)
             return success
         except Exception as exc:
             logger.error(f"清空白名單失敗: {exc}")
@@ -447,8 +492,7 @@ class AntiExecutable(ProtectionCog):
         """
         try:
             success = await self.db.reset_custom_formats(guild_id)
-            if success and guild_id in self._custom_formats_cache:
-                del self._custom_formats_cache[guild_id]
+            self.invalidate_policy(guild_id)
             return success
         except Exception as exc:
             logger.error(f"重置格式失敗: {exc}")
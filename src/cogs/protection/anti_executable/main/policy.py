@@ -0,0 +1,202 @@
+"""
+反可執行檔案保護模組 - 伺服器檢測策略
+- 將危險副檔名、嚴格模式副檔名與自訂副檔名合併為一個 frozenset
+- 白名單 (檔名子字串) 編譯為 Aho-Corasick 自動機, 一次走訪檔名即可判定
+- 策略由 AntiExecutable 依伺服器快取, 設定或白名單改變時重建;
+  附件與連結的副檔名檢查只在記憶體中查詢
+"""
+
+from collections import deque
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass
+from typing import Any
+
+from ..config.config import DANGEROUS_EXTENSIONS, STRICT_EXTENSIONS
+
+
+class SubstringMatcher:
+    """
+    Aho-Corasick 子字串比對器
+
+    節點以整數編號, _goto[n] 為字元 → 子節點, _fail[n] 為失敗連結;
+    _match[n] 在節點 n 或其失敗連結上任一節點為模式結尾時為 True,
+    因此 search 不需沿失敗連結回溯輸出.
+    """
+
+    __slots__ = ("_fail", "_goto", "_match", "_size")
+
+    def __init__(self, patterns: Iterable[str] = ()):
+        """
+        建立比對器
+
+        Args:
+            patterns: 要比對的子字串
+        """
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._match: list[bool] = [False]
+        self._size = 0
+
+        for pattern in set(patterns):
+            self._add(pattern)
+        self._link()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _add(self, pattern: str):
+        """將模式加入字典樹"""
+        node = 0
+        for char in pattern:
+            child = self._goto[node].get(char)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][char] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._match.append(False)
+            node = child
+        self._match[node] = True
+        self._size += 1
+
+    def _link(self):
+        """以廣度優先順序建立失敗連結"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                link = self._goto[fail].get(char, 0)
+                self._fail[child] = link
+                self._match[child] = self._match[child] or self._match[link]
+                queue.append(child)
+
+    def search(self, text: str) -> bool:
+        """
+        檢查文字是否包含任一模式
+
+        Args:
+            text: 要檢查的文字
+
+        Returns:
+            bool: 是否包含
+        """
+        if self._match[0]:  # 空字串模式符合任何文字
+            return True
+        goto, fail, match = self._goto, self._fail, self._match
+        node = 0
+        for char in text:
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if match[node]:
+                return True
+        return False
+
+
+# 沒有白名單時共用的比對器
+EMPTY_WHITELIST = SubstringMatcher()
+
+
+def normalize_extension(extension: str) -> str:
+    """
+    標準化自訂副檔名 (去除空白與開頭的點, 轉為小寫)
+
+    Args:
+        extension: 副檔名
+
+    Returns:
+        str: 標準化的副檔名
+    """
+    return extension.strip().lstrip(".").lower()
+
+
+@dataclass(frozen=True, slots=True)
+class ExtensionPolicy:
+    """伺服器的檢測策略 (唯讀)"""
+
+    enabled: bool = False
+    check_links: bool = True
+    extensions: frozenset[str] = frozenset(DANGEROUS_EXTENSIONS)
+    whitelist: SubstringMatcher = EMPTY_WHITELIST
+
+    @classmethod
+    def build(
+        cls, settings: Mapping[str, Any], whitelist: Iterable[str] = ()
+    ) -> "ExtensionPolicy":
+        """
+        由伺服器設定與白名單建立策略
+
+        Args:
+            settings: AntiExecutableDatabase.get_settings 的結果
+            whitelist: 白名單 (檔名子字串)
+
+        Returns:
+            ExtensionPolicy: 策略
+        """
+        extensions = set(DANGEROUS_EXTENSIONS)
+        if settings.get("strict_mode", False):
+            extensions |= STRICT_EXTENSIONS
+        extensions.update(
+            normalize_extension(extension)
+            for extension in settings.get("custom_extensions", ())
+        )
+        extensions.discard("")
+
+        return cls(
+            enabled=bool(settings.get("enabled", False)),
+            check_links=bool(settings.get("check_links", True)),
+            extensions=frozenset(extensions),
+            whitelist=SubstringMatcher(pattern.lower() for pattern in whitelist),
+        )
+
+    def is_whitelisted(self, filename: str) -> bool:
+        """
+        檢查檔名是否符合白名單
+
+        Args:
+            filename: 小寫檔名
+
+        Returns:
+            bool: 是否符合
+        """
+        return self.whitelist.search(filename)
+
+    def is_dangerous_extension(
+        self, filename: str, extension: str | None = None
+    ) -> bool:
+        """
+        檢查副檔名是否危險, 同時檢查最後一段與最後兩段 (如 tar.gz)
+
+        Args:
+            filename: 小寫檔名
+            extension: 已解析的小寫副檔名 (共用訊息特徵分析), 預設由檔名解析
+
+        Returns:
+            bool: 是否為危險副檔名
+        """
+        if extension is None:
+            extension = filename.rpartition(".")[2] if "." in filename else ""
+        if not extension:
+            return False
+        if extension in self.extensions:
+            return True
+        stem = filename[: -len(extension) - 1]
+        _, dot, previous = stem.rpartition(".")
+        return bool(dot) and f"{previous}.{extension}" in self.extensions
+
+    def is_dangerous(self, filename: str) -> bool:
+        """
+        檢查檔名是否危險 (不在白名單且副檔名危險)
+
+        Args:
+            filename: 小寫檔名
+
+        Returns:
+            bool: 是否危險
+        """
+        return not self.is_whitelisted(filename) and self.is_dangerous_extension(
+            filename
+        )
@@ -0,0 +1,258 @@
+"""
+反可執行檔案保護模組 - 檔案特徵擷取
+- 模組共用一個保持連線的 HTTP 會話, 多個附件重複使用同一組 TLS 連線
+- 以 Semaphore 限制同時進行的範圍請求數量
+- 以附件 ID (沒有 ID 時為 URL) 快取判定結果 (LRU), 附件內容上傳後不會改變
+- 同一則訊息的多個附件並行擷取, 共用一個期限
+"""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from collections.abc import Hashable, Sequence
+from typing import Any
+
+import aiohttp
+
+from ..config.config import MAGIC_SIGNATURES
+
+logger = logging.getLogger("anti_executable")
+
+# 同時進行的範圍請求上限 (亦為連線池大小)
+DEFAULT_MAX_CONCURRENCY = 8
+# 判定結果快取數量
+DEFAULT_CACHE_SIZE = 4096
+# 一則訊息所有附件擷取的期限(秒)
+DEFAULT_DEADLINE = 5.0
+# 閒置連線保留時間(秒)
+KEEPALIVE_TIMEOUT = 60.0
+
+# 只下載檔案開頭的位元組, 比對其中的前 8 個位元組
+_RANGE_HEADER = {"Range": "bytes=0-15"}
+_HEADER_SIZE = 8
+
+
+def match_signature(content: bytes) -> bool:
+    """
+    檢查檔案開頭是否符合可執行檔案的魔術數字
+
+    Args:
+        content: 檔案開頭的位元組
+
+    Returns:
+        bool: 是否符合
+    """
+    header = content[:_HEADER_SIZE]
+    return any(header.startswith(signature) for signature in MAGIC_SIGNATURES)
+
+
+def attachment_cache_key(attachment: Any) -> Hashable:
+    """
+    附件判定結果的快取鍵
+
+    Args:
+        attachment: discord.Attachment
+
+    Returns:
+        Hashable: 附件 ID, 沒有 ID 時為 URL
+    """
+    attachment_id = getattr(attachment, "id", None)
+    return attachment_id if attachment_id else attachment.url
+
+
+class SignatureSniffer:
+    """
+    附件檔案特徵擷取器
+
+    只快取實際取得檔案內容後的判定; 請求失敗、非 200/206 回應或逾時
+    視為未偵測到 (與原本的行為相同), 但不快取, 之後的訊息會重新擷取.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        deadline: float = DEFAULT_DEADLINE,
+    ):
+        """
+        初始化擷取器
+
+        Args:
+            max_concurrency: 同時進行的範圍請求上限
+            cache_size: 判定結果快取數量
+            deadline: 一則訊息所有附件擷取的期限(秒)
+        """
+        self.max_concurrency = max_concurrency
+        self.cache_size = cache_size
+        self.deadline = deadline
+
+        self.session: aiohttp.ClientSession | None = None
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._verdicts: OrderedDict[Hashable, bool] = OrderedDict()
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "fetch_failures": 0,
+            "timeouts": 0,
+        }
+
+    # -------- HTTP 會話 --------
+    async def get_session(self) -> aiohttp.ClientSession:
+        """
+        取得或建立共用的 HTTP 會話
+
+        Returns:
+            aiohttp.ClientSession: HTTP 會話
+        """
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.max_concurrency, keepalive_timeout=KEEPALIVE_TIMEOUT
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.deadline),
+            )
+        return self.session
+
+    async def close(self):
+        """關閉 HTTP 會話"""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    # -------- 判定結果快取 --------
+    def get_cached(self, key: Hashable) -> bool | None:
+        """
+        查詢快取的判定結果
+
+        Args:
+            key: 快取鍵
+
+        Returns:
+            bool | None: 判定結果, 未命中時為 None
+        """
+        verdict = self._verdicts.get(key)
+        if verdict is not None:
+            self._verdicts.move_to_end(key)
+        return verdict
+
+    def _store(self, key: Hashable, verdict: bool):
+        """寫入判定結果並淘汰最舊的項目"""
+        self._verdicts[key] = verdict
+        self._verdicts.move_to_end(key)
+        while len(self._verdicts) > self.cache_size:
+            self._verdicts.popitem(last=False)
+
+    def clear(self):
+        """清空判定結果快取"""
+        self._verdicts.clear()
+
+    # -------- 擷取 --------
+    async def is_executable(self, attachment: Any) -> bool:
+        """
+        檢查單一附件的檔案特徵
+
+        Args:
+            attachment: discord.Attachment
+
+        Returns:
+            bool: 是否為可執行檔案
+        """
+        return (await self.check_many([attachment]))[0]
+
+    async def check_many(
+        self, attachments: Sequence[Any], deadline: float | None = None
+    ) -> list[bool]:
+        """
+        並行檢查多個附件的檔案特徵
+
+        Args:
+            attachments: discord.Attachment 序列
+            deadline: 所有附件共用的期限(秒), 預設為 self.deadline
+
+        Returns:
+            List[bool]: 與 attachments 順序相同的判定結果,
+            期限內未完成的附件為 False
+        """
+        results = [False] * len(attachments)
+        pending: dict[asyncio.Task, int] = {}
+
+        for position, attachment in enumerate(attachments):
+            verdict = self.get_cached(attachment_cache_key(attachment))
+            if verdict is not None:
+                self.stats["hits"] += 1
+                results[position] = verdict
+                continue
+            self.stats["misses"] += 1
+            task = asyncio.create_task(self._sniff(attachment))
+            pending[task] = position
+
+        if not pending:
+            return results
+
+        done, not_done = await asyncio.wait(
+            pending, timeout=self.deadline if deadline is None else deadline
+        )
+        for task in not_done:
+            task.cancel()
+        if not_done:
+            self.stats["timeouts"] += len(not_done)
+            await asyncio.gather(*not_done, return_exceptions=True)
+
+        for task in done:
+            results[pending[task]] = task.result()
+        return results
+
+    async def _sniff(self, attachment: Any) -> bool:
+        """下載附件開頭並比對魔術數字, 成功取得內容時快取結果"""
+        content = await self._fetch_header(attachment.url)
+        if content is None:
+            return False
+        verdict = match_signature(content)
+        self._store(attachment_cache_key(attachment), verdict)
+        return verdict
+
+    async def _fetch_header(self, url: str) -> bytes | None:
+        """
+        以範圍請求下載檔案開頭
+
+        Args:
+            url: 檔案 URL
+
+        Returns:
+            bytes | None: 檔案開頭的位元組, 失敗時為 None
+        """
+        try:
+            async with self._semaphore:
+                session = await self.get_session()
+                async with session.get(url, headers=_RANGE_HEADER) as resp:
+                    if resp.status not in (200, 206):
+                        self.stats["fetch_failures"] += 1
+                        return None
+                    if resp.status == 206:
+                        # 讀完回應內容, 連線才會回到連線池
+                        return await resp.read()
+                    # 伺服器忽略 Range 時只讀取需要的部分 (連線隨後關閉)
+                    content = b""
+                    while len(content) < _HEADER_SIZE:
+                        chunk = await resp.content.read(_HEADER_SIZE - len(content))
+                        if not chunk:
+                            break
+                        content += chunk
+                    return content
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            self.stats["fetch_failures"] += 1
+            logger.error(f"檢查檔案特徵失敗: {exc}")
+            return None
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        取得擷取指標
+
+        Returns:
+            Dict[str, Any]: 指標資料
+        """
+        return {**self.stats, "cached": len(self._verdicts)}
@@ -5,6 +5,7 @@
 
 import re
 import urllib.parse as up
+from dataclasses import dataclass
 from typing import Any
 
 try:
@@ -12,6 +13,9 @@ try:
 except ImportError:
     tldextract = None
 
+from ....core.message_features import url_domain
+from ...config_snapshot import ConfigSnapshot
+
 # 常數定義
 MIN_TLD_LENGTH = 2
 
@@ -29,12 +33,25 @@ DEFAULTS = {
     "auto_update": "true",
 }
 
+
+@dataclass(frozen=True, slots=True)
+class AntiLinkConfig(ConfigSnapshot):
+    """
+    反惡意連結配置快照
+
+    白名單與黑名單編譯於網域比對器, 自動更新為全域設定, 不在快照中.
+    """
+
+    enabled: bool = DEFAULTS["enabled"] == "true"
+    delete_message: str = DEFAULTS["delete_message"]
+    notify_channel: str = DEFAULTS["notify_channel"]
+    whitelist_admins: bool = DEFAULTS["whitelist_admins"] == "true"
+    check_embeds: bool = DEFAULTS["check_embeds"] == "true"
+
+
 # ────────────────────────────
 # 常數定義
 # ────────────────────────────
-# URL 檢測正則表達式
-URL_PATTERN = re.compile(r"https?://[A-Za-z0-9\.\-_%]+\.[A-Za-z]{2,}[^ <]*", re.I)
-
 DEFAULT_WHITELIST = {
     "discord.com",
     "discord.gg",
@@ -117,25 +134,7 @@ def extract_domain(url: str) -> str:
     Returns:
         str: 網域名稱,如果解析失敗返回空字串
     """
-    try:
-        # 確保 URL 有協議
-        if not url.startswith(("http://", "https://")):
-            url = "http://" + url
-
-        parsed = up.urlparse(url)
-        domain = parsed.netloc.lower()
-
-        # 移除端口號
-        if ":" in domain:
-            domain = domain.split(":")[0]
-
-        # 移除 www. 前綴
-        if domain.startswith("www."):
-            domain = domain[4:]
-
-        return domain
-    except Exception:
-        return ""
+    return url_domain(url)
 
 
 def normalize_domain(domain: str) -> str:
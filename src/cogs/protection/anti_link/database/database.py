@@ -6,18 +6,58 @@
 - 統計和日誌記錄
 """
 
+import asyncio
 import datetime as dt
 import logging
+from pathlib import Path
 from typing import TYPE_CHECKING, Any
 
 import aiosqlite
 
 from src.core.config import get_settings
 
+from ...write_buffer import StatRow
+from ..main.feed_ingest import FeedState
+from ..main.feed_store import DomainSnapshotBuilder
+
 if TYPE_CHECKING:
     from ..main.main import AntiLink
 
 
+# 黑名單快取每個 (網域, 來源) 一列, 網域只要仍有任一來源列出就保持封鎖
+_BLACKLIST_CACHE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS blacklist_cache (
+        domain TEXT NOT NULL,
+        source TEXT NOT NULL,
+        added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (domain, source)
+    )
+"""
+
+# 來源再次列出網域時保留既有的 added_at
+_UPSERT_BLACKLIST_SQL = """
+    INSERT INTO blacklist_cache (domain, source, added_at, last_seen)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(domain, source) DO UPDATE SET
+        last_seen = excluded.last_seen
+"""
+
+# 寫入緩衝區沖刷時累加統計
+_UPSERT_STAT_SQL = """
+    INSERT INTO stats (guild_id, stat_type, count, last_updated)
+    VALUES (?, ?, ?, ?)
+    ON CONFLICT(guild_id, stat_type) DO UPDATE SET
+        count = count + excluded.count,
+        last_updated = excluded.last_updated
+"""
+
+_INSERT_ACTION_LOG_SQL = """
+    INSERT INTO action_logs (guild_id, user_id, action, details, timestamp)
+    VALUES (?, ?, ?, ?, ?)
+"""
+
+
 class AntiLinkDatabase:
     """
     反惡意連結資料庫管理器
@@ -47,11 +87,16 @@ class AntiLinkDatabase:
         db_path.parent.mkdir(parents=True, exist_ok=True)
 
         self._db_path = str(db_path)
+        self._feed_snapshot_path = db_path.with_name("anti_link_feed.bin")
 
     def _get_db_path(self) -> str:
         """獲取資料庫路徑"""
         return self._db_path
 
+    def get_feed_snapshot_path(self) -> Path:
+        """獲取威脅情資映像檔路徑"""
+        return self._feed_snapshot_path
+
     async def init_db(self):
         """初始化資料庫表格"""
         try:
@@ -68,12 +113,22 @@ class AntiLinkDatabase:
                 """)
 
                 # 創建黑名單快取表
+                await self._migrate_blacklist_cache(db)
+                await db.execute(_BLACKLIST_CACHE_SCHEMA)
+
+                await db.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_blacklist_source "
+                    "ON blacklist_cache(source)"
+                )
+
+                # 創建情資來源狀態表
                 await db.execute("""
-                    CREATE TABLE IF NOT EXISTS blacklist_cache (
-                        domain TEXT PRIMARY KEY,
-                        source TEXT,
-                        added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    CREATE TABLE IF NOT EXISTS feed_state (
+                        source TEXT PRIMARY KEY,
+                        etag TEXT,
+                        last_modified TEXT,
+                        content_hash TEXT,
+                        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
 
@@ -121,6 +176,32 @@ class AntiLinkDatabase:
             self.logger.error(f"[反惡意連結]資料庫初始化失敗: {exc}")
             raise
 
+    async def _migrate_blacklist_cache(self, db: aiosqlite.Connection):
+        """
+        將以網域為主鍵的舊黑名單快取表轉為 (網域, 來源) 主鍵
+
+        舊表每個網域只記錄一個來源, 多個來源重疊的網域只保留其中一個,
+        因此同時清除情資擷取狀態, 讓所有來源下次更新時完整寫入一次
+
+        Args:
+            db: 資料庫連接
+        """
+        async with db.execute("PRAGMA table_info(blacklist_cache)") as cursor:
+            primary_key = [row[1] for row in await cursor.fetchall() if row[5]]
+        if primary_key != ["domain"]:
+            return
+
+        await db.execute("ALTER TABLE blacklist_cache RENAME TO blacklist_cache_old")
+        await db.execute(_BLACKLIST_CACHE_SCHEMA)
+        await db.execute("""
+            INSERT INTO blacklist_cache (domain, source, added_at, last_seen)
+            SELECT domain, COALESCE(source, ''), added_at, last_seen
+            FROM blacklist_cache_old
+        """)
+        await db.execute("DROP TABLE blacklist_cache_old")
+        await db.execute("DROP TABLE IF EXISTS feed_state")
+        self.logger.info("[反惡意連結]黑名單快取已轉為依來源記錄")
+
     # ───────── 配置管理 ─────────
     async def get_config(
         self, guild_id: int, key: str, default: str | None = None
@@ -199,6 +280,26 @@ class AntiLinkDatabase:
             self.logger.error(f"[反惡意連結]取得所有配置失敗 {guild_id}: {exc}")
             return {}
 
+    async def get_config_version(self, guild_id: int) -> tuple[int, str | None]:
+        """
+        取得伺服器配置版本, 用於判斷其他程序是否修改過配置
+
+        Args:
+            guild_id: 伺服器 ID
+
+        Returns:
+            Tuple[int, Optional[str]]: (配置數量, 最後更新時間)
+        """
+        async with (
+            aiosqlite.connect(self._get_db_path()) as db,
+            db.execute(
+                "SELECT COUNT(*), MAX(updated_at) FROM config WHERE guild_id = ?",
+                (guild_id,),
+            ) as cursor,
+        ):
+            row = await cursor.fetchone()
+            return (row[0], row[1]) if row else (0, None)
+
     # ───────── 黑名單管理 ─────────
     async def update_blacklist_cache(self, domains: set[str], source: str):
         """
@@ -213,17 +314,10 @@ class AntiLinkDatabase:
                 now = dt.datetime.now()
 
                 # 批次插入或更新
-                for domain in domains:
-                    await db.execute(
-                        """
-                        INSERT OR REPLACE INTO blacklist_cache
-                        (domain, source, added_at, last_seen)
-                        VALUES (?, ?,
-                            COALESCE((SELECT added_at FROM blacklist_cache WHERE domain = ?), ?),
-                            ?)
-                    """,
-                        (domain, source, domain, now, now),
-                    )
+                await db.executemany(
+                    _UPSERT_BLACKLIST_SQL,
+                    ((domain, source, now, now) for domain in domains),
+                )
 
                 await db.commit()
                 self.logger.info(
@@ -253,7 +347,7 @@ class AntiLinkDatabase:
                         rows = await cursor.fetchall()
                 else:
                     async with db.execute(
-                        "SELECT domain FROM blacklist_cache"
+                        "SELECT DISTINCT domain FROM blacklist_cache"
                     ) as cursor:
                         rows = await cursor.fetchall()
 
@@ -263,6 +357,139 @@ class AntiLinkDatabase:
             self.logger.error(f"[反惡意連結]取得黑名單快取失敗: {exc}")
             return set()
 
+    async def apply_blacklist_diff(
+        self, source: str, domains: set[str]
+    ) -> tuple[int, int]:
+        """
+        以差異更新單一來源的黑名單快取
+
+        只寫入新增與移除的網域, 其餘網域只更新 last_seen;
+        移除只刪除此來源的列, 其他來源仍列出的網域保持封鎖
+
+        Args:
+            source: 來源名稱
+            domains: 來源目前的完整網域集合
+
+        Returns:
+            Tuple[int, int]: (新增數量, 移除數量)
+        """
+        async with aiosqlite.connect(self._get_db_path()) as db:
+            async with db.execute(
+                "SELECT domain FROM blacklist_cache WHERE source = ?", (source,)
+            ) as cursor:
+                previous = {row[0] for row in await cursor.fetchall()}
+
+            added = domains - previous
+            removed = previous - domains
+            now = dt.datetime.now()
+
+            await db.executemany(
+                _UPSERT_BLACKLIST_SQL,
+                ((domain, source, now, now) for domain in added),
+            )
+            await db.executemany(
+                "DELETE FROM blacklist_cache WHERE domain = ? AND source = ?",
+                ((domain, source) for domain in removed),
+            )
+            await db.execute(
+                "UPDATE blacklist_cache SET last_seen = ? WHERE source = ?",
+                (now, source),
+            )
+            await db.commit()
+
+        return len(added), len(removed)
+
+    async def touch_blacklist_source(self, source: str):
+        """
+        來源內容未變更時更新 last_seen, 避免被過期清理刪除
+
+        Args:
+            source: 來源名稱
+        """
+        async with aiosqlite.connect(self._get_db_path()) as db:
+            await db.execute(
+                "UPDATE blacklist_cache SET last_seen = ? WHERE source = ?",
+                (dt.datetime.now(), source),
+            )
+            await db.commit()
+
+    async def get_feed_state(self, source: str) -> FeedState:
+        """
+        取得情資來源上次成功擷取的狀態
+
+        Args:
+            source: 來源名稱
+
+        Returns:
+            FeedState: 擷取狀態, 從未擷取時各欄位為 None
+        """
+        try:
+            async with (
+                aiosqlite.connect(self._get_db_path()) as db,
+                db.execute(
+                    """
+                    SELECT etag, last_modified, content_hash
+                    FROM feed_state WHERE source = ?
+                    """,
+                    (source,),
+                ) as cursor,
+            ):
+                row = await cursor.fetchone()
+                return FeedState(source, *row) if row else FeedState(source)
+
+        except Exception as exc:
+            self.logger.error(f"[反惡意連結]取得情資狀態失敗 {source}: {exc}")
+            return FeedState(source)
+
+    async def save_feed_state(self, state: FeedState):
+        """
+        保存情資來源擷取狀態
+
+        Args:
+            state: 擷取狀態
+        """
+        async with aiosqlite.connect(self._get_db_path()) as db:
+            await db.execute(
+                """
+                INSERT OR REPLACE INTO feed_state
+                (source, etag, last_modified, content_hash, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (
+                    state.source,
+                    state.etag,
+                    state.last_modified,
+                    state.content_hash,
+                    dt.datetime.now(),
+                ),
+            )
+            await db.commit()
+
+    async def build_blacklist_snapshot(self, batch_size: int = 5000) -> bytes:
+        """
+        將黑名單快取打包為精簡映像
+
+        依主鍵順序分批讀取網域, 不在記憶體中建立完整的字串集合
+
+        Args:
+            batch_size: 每批讀取數量
+
+        Returns:
+            bytes: 威脅情資映像
+        """
+        builder = DomainSnapshotBuilder()
+        async with (
+            aiosqlite.connect(self._get_db_path()) as db,
+            db.execute(
+                "SELECT DISTINCT domain FROM blacklist_cache ORDER BY domain"
+            ) as cursor,
+        ):
+            while rows := await cursor.fetchmany(batch_size):
+                builder.extend(row[0] for row in rows)
+
+        # 建立 Bloom 過濾器需要雜湊所有網域, 移到執行緒中
+        return await asyncio.to_thread(builder.finish)
+
     async def cleanup_blacklist_cache(self, days: int = 30):
         """
         清理過期的黑名單快取
@@ -320,6 +547,34 @@ class AntiLinkDatabase:
         except Exception as exc:
             self.logger.error(f"[反惡意連結]添加統計失敗: {exc}")
 
+    async def write_batch(
+        self, stats: list[StatRow], rows: dict[str, list[tuple]]
+    ) -> None:
+        """
+        將寫入緩衝區累積的統計與操作日誌在一個交易中寫入資料庫
+
+        失敗時拋出例外, 由寫入緩衝區重試.
+
+        Args:
+            stats: (伺服器ID, 統計類型, 增加數量) 列表
+            rows: 日誌種類與欄位值, "action_log" 為
+                (伺服器ID, 用戶ID, 操作類型, 詳細資訊, 時間)
+        """
+        now = dt.datetime.now()
+        async with aiosqlite.connect(self._get_db_path()) as db:
+            if stats:
+                await db.executemany(
+                    _UPSERT_STAT_SQL,
+                    [
+                        (guild_id, stat_type, count, now)
+                        for guild_id, stat_type, count in stats
+                    ],
+                )
+            action_logs = rows.get("action_log")
+            if action_logs:
+                await db.executemany(_INSERT_ACTION_LOG_SQL, action_logs)
+            await db.commit()
+
     async def get_stats(self, guild_id: int) -> dict[str, int]:
         """
         取得統計資料
@@ -0,0 +1,165 @@
+"""
+反惡意連結威脅情資串流擷取
+- 以條件式請求 (ETag / Last-Modified) 略過未變更的情資來源
+- 回應以固定大小區塊串流寫入暫存檔並計算內容雜湊, 內容未變更時不解析
+- 逐行解析在執行緒中進行, 不阻塞事件迴圈
+"""
+
+import asyncio
+import csv
+import hashlib
+import io
+import logging
+import tempfile
+from dataclasses import dataclass, replace
+from typing import IO, Any
+
+import aiohttp
+
+from ..config.config import extract_domain, normalize_domain
+
+logger = logging.getLogger("anti_link")
+
+HTTP_OK_STATUS = 200
+HTTP_NOT_MODIFIED_STATUS = 304
+MIN_CSV_COLUMNS = 2
+
+# 串流讀取區塊大小
+FEED_CHUNK_SIZE = 64 * 1024
+# 回應超過此大小才寫入磁碟暫存檔
+FEED_SPOOL_MAX_SIZE = 1024 * 1024
+
+
+@dataclass(frozen=True)
+class FeedState:
+    """情資來源上次成功擷取的狀態"""
+
+    source: str
+    etag: str | None = None
+    last_modified: str | None = None
+    content_hash: str | None = None
+
+
+@dataclass
+class FeedFetchResult:
+    """
+    情資擷取結果
+
+    domains 為 None 表示內容與上次相同 (304 或雜湊相同), 不需更新資料庫
+    """
+
+    state: FeedState
+    domains: set[str] | None
+    bytes_read: int = 0
+
+    @property
+    def unchanged(self) -> bool:
+        """內容是否與上次相同"""
+        return self.domains is None
+
+
+def parse_feed_line(line: str, format_type: str) -> str | None:
+    """
+    解析情資的一行
+
+    Args:
+        line: 原始行 (不含換行)
+        format_type: 情資格式 (text / csv)
+
+    Returns:
+        str | None: 標準化後的網域, 無法解析時為 None
+    """
+    line = line.strip()
+    if not line or line.startswith("#"):
+        return None
+
+    if format_type == "csv":
+        row = next(csv.reader([line]), [])
+        if len(row) <= MIN_CSV_COLUMNS or not row[2]:  # 假設 URL 在第三列
+            return None
+        line = row[2]
+    elif format_type != "text":
+        return None
+
+    domain = extract_domain(line)
+    return normalize_domain(domain) if domain else None
+
+
+def parse_feed_stream(stream: IO[bytes], format_type: str) -> set[str]:
+    """
+    逐行解析情資內容
+
+    Args:
+        stream: 二進位內容 (會從開頭讀取)
+        format_type: 情資格式
+
+    Returns:
+        Set[str]: 網域集合
+    """
+    stream.seek(0)
+    text = io.TextIOWrapper(stream, encoding="utf-8", errors="replace", newline="")
+    try:
+        domains = set()
+        for line in text:
+            domain = parse_feed_line(line, format_type)
+            if domain:
+                domains.add(domain)
+        return domains
+    finally:
+        # 暫存檔由呼叫者關閉
+        text.detach()
+
+
+async def fetch_threat_feed(
+    session: aiohttp.ClientSession,
+    feed_config: dict[str, Any],
+    state: FeedState,
+) -> FeedFetchResult | None:
+    """
+    串流擷取單一情資來源
+
+    Args:
+        session: HTTP 會話
+        feed_config: 情資來源配置 (url, format)
+        state: 上次成功擷取的狀態
+
+    Returns:
+        FeedFetchResult | None: 擷取結果, 請求失敗時為 None
+    """
+    headers = {}
+    if state.etag:
+        headers["If-None-Match"] = state.etag
+    if state.last_modified:
+        headers["If-Modified-Since"] = state.last_modified
+
+    async with session.get(feed_config["url"], headers=headers) as response:
+        if response.status == HTTP_NOT_MODIFIED_STATUS:
+            return FeedFetchResult(state, None)
+        if response.status != HTTP_OK_STATUS:
+            logger.warning(f"[反惡意連結]{state.source} 回應狀態: {response.status}")
+            return None
+
+        new_state = replace(
+            state,
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+        )
+
+        digest = hashlib.sha256()
+        bytes_read = 0
+        with tempfile.SpooledTemporaryFile(max_size=FEED_SPOOL_MAX_SIZE) as spool:
+            async for chunk in response.content.iter_chunked(FEED_CHUNK_SIZE):
+                digest.update(chunk)
+                spool.write(chunk)
+                bytes_read += len(chunk)
+
+            content_hash = digest.hexdigest()
+            new_state = replace(new_state, content_hash=content_hash)
+            if content_hash == state.content_hash:
+                return FeedFetchResult(new_state, None, bytes_read)
+
+            domains = await asyncio.to_thread(
+                parse_feed_stream, spool, feed_config.get("format", "text")
+            )
+
+    return FeedFetchResult(new_state, domains, bytes_read)
@@ -0,0 +1,357 @@
+"""
+反惡意連結威脅情資精簡儲存
+- 將遠端威脅情資網域存為排序、去重的唯讀位元組映像, 以二分搜尋查詢
+- 可選的 Bloom 過濾器, 大多數不在情資中的查詢不需二分搜尋
+- 映像寫入磁碟後以 mmap 開啟, 網域不再以 Python 字串物件常駐記憶體
+
+映像格式 (整數皆為 little-endian uint32):
+    header   magic "ALF1"、網域數量、Bloom 位元數、Bloom 雜湊數
+    bloom    Bloom 位元陣列 (位元數 / 8 位元組)
+    offsets  網域數量 + 1 個位移, 第 i 個網域為 blob[offsets[i]:offsets[i + 1]]
+    blob     依位元組排序串接的 UTF-8 網域
+"""
+
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger("anti_link")
+
+# 預設每個網域 10 位元、7 個雜湊, 誤判率約 1%
+DEFAULT_BLOOM_BITS_PER_DOMAIN = 10
+DEFAULT_BLOOM_HASHES = 7
+
+_MAGIC = b"ALF1"
+_HEADER = struct.Struct("<4sIII")
+_SPAN = struct.Struct("<II")
+_HASH = struct.Struct("<QQ")
+
+
+def _bloom_positions(key: bytes, bits: int, hashes: int) -> Iterator[int]:
+    """以雙重雜湊產生 Bloom 位元位置 (跨程序穩定, 可寫入磁碟)"""
+    h1, h2 = _HASH.unpack(hashlib.blake2b(key, digest_size=16).digest())
+    for i in range(hashes):
+        yield (h1 + i * h2) % bits
+
+
+class DomainSnapshotBuilder:
+    """
+    威脅情資映像建立器
+
+    網域須依 UTF-8 位元組順序加入 (例如 SQLite 的 ORDER BY domain),
+    可分批加入, 不需先在記憶體中建立完整的字串集合.
+    """
+
+    def __init__(
+        self,
+        bloom_bits_per_domain: int = DEFAULT_BLOOM_BITS_PER_DOMAIN,
+        bloom_hashes: int = DEFAULT_BLOOM_HASHES,
+    ):
+        """
+        初始化建立器
+
+        Args:
+            bloom_bits_per_domain: 每個網域的 Bloom 位元數, 0 表示不使用 Bloom 過濾器
+            bloom_hashes: Bloom 雜湊數
+        """
+        self.bloom_bits_per_domain = bloom_bits_per_domain
+        self.bloom_hashes = bloom_hashes
+        self._offsets = array("I", [0])
+        self._blob = bytearray()
+        self._previous = b""
+
+    def add(self, domain: str):
+        """
+        加入網域, 重複與空字串會被略過
+
+        Args:
+            domain: 已標準化的網域
+
+        Raises:
+            ValueError: 網域未依順序加入
+        """
+        key = domain.encode()
+        if not key or key == self._previous:
+            return
+        if key < self._previous:
+            raise ValueError(f"網域未依順序加入: {domain}")
+        self._blob += key
+        self._offsets.append(len(self._blob))
+        self._previous = key
+
+    def extend(self, domains: Iterable[str]):
+        """
+        批量加入網域
+
+        Args:
+            domains: 已排序的網域
+        """
+        for domain in domains:
+            self.add(domain)
+
+    def finish(self) -> bytes:
+        """
+        產生映像
+
+        Returns:
+            bytes: 映像位元組
+        """
+        offsets = self._offsets
+        blob = self._blob
+        count = len(offsets) - 1
+
+        bloom_bits = 0
+        bloom_hashes = 0
+        if self.bloom_bits_per_domain > 0 and count:
+            bloom_bits = -(-count * self.bloom_bits_per_domain // 8) * 8
+            bloom_hashes = self.bloom_hashes
+        bloom = bytearray(bloom_bits // 8)
+        for index in range(count if bloom_bits else 0):
+            key = bytes(blob[offsets[index] : offsets[index + 1]])
+            for position in _bloom_positions(key, bloom_bits, bloom_hashes):
+                bloom[position >> 3] |= 1 << (position & 7)
+
+        packed_offsets = array("I", offsets)
+        if sys.byteorder == "big":
+            packed_offsets.byteswap()
+
+        return b"".join(
+            (
+                _HEADER.pack(_MAGIC, count, bloom_bits, bloom_hashes),
+                bloom,
+                packed_offsets.tobytes(),
+                blob,
+            )
+        )
+
+
+def pack_domains(
+    domains: Iterable[str],
+    bloom_bits_per_domain: int = DEFAULT_BLOOM_BITS_PER_DOMAIN,
+    bloom_hashes: int = DEFAULT_BLOOM_HASHES,
+) -> bytes:
+    """
+    將任意順序的網域打包為映像
+
+    Args:
+        domains: 網域
+        bloom_bits_per_domain: 每個網域的 Bloom 位元數, 0 表示不使用 Bloom 過濾器
+        bloom_hashes: Bloom 雜湊數
+
+    Returns:
+        bytes: 映像位元組
+    """
+    builder = DomainSnapshotBuilder(bloom_bits_per_domain, bloom_hashes)
+    # UTF-8 位元組順序與 Unicode 碼位順序一致
+    builder.extend(sorted(set(domains)))
+    return builder.finish()
+
+
+class CompactDomainSet:
+    """
+    唯讀的精簡網域集合
+
+    支援 len() 與 in, 查詢先檢查 Bloom 過濾器, 再於排序的網域中二分搜尋.
+    內容可以是記憶體中的 bytes, 或以 mmap 開啟的映像檔.
+    """
+
+    __slots__ = (
+        "_blob_start",
+        "_bloom_bits",
+        "_bloom_hashes",
+        "_bloom_start",
+        "_buffer",
+        "_count",
+        "_offsets_start",
+        "path",
+    )
+
+    def __init__(self, buffer: bytes | mmap.mmap, path: Path | None = None):
+        """
+        由映像建立集合
+
+        Args:
+            buffer: 映像位元組或 mmap
+            path: 映像檔路徑 (以 mmap 開啟時)
+
+        Raises:
+            ValueError: 映像格式錯誤
+        """
+        if len(buffer) < _HEADER.size:
+            raise ValueError("威脅情資映像不完整")
+        magic, count, bloom_bits, bloom_hashes = _HEADER.unpack_from(buffer, 0)
+        if magic != _MAGIC:
+            raise ValueError("不是威脅情資映像")
+
+        self._buffer = buffer
+        self._count = count
+        self._bloom_bits = bloom_bits
+        self._bloom_hashes = bloom_hashes
+        self._bloom_start = _HEADER.size
+        self._offsets_start = self._bloom_start + bloom_bits // 8
+        self._blob_start = self._offsets_start + (count + 1) * 4
+        self.path = path
+
+        if len(buffer) < self._blob_start:
+            raise ValueError("威脅情資映像不完整")
+        blob_size = self._span(count - 1)[1] if count else 0
+        if len(buffer) != self._blob_start + blob_size:
+            raise ValueError("威脅情資映像不完整")
+
+    @classmethod
+    def empty(cls) -> "CompactDomainSet":
+        """建立空集合"""
+        return cls(pack_domains(()))
+
+    @classmethod
+    def from_domains(
+        cls,
+        domains: Iterable[str],
+        bloom_bits_per_domain: int = DEFAULT_BLOOM_BITS_PER_DOMAIN,
+    ) -> "CompactDomainSet":
+        """
+        由網域建立記憶體中的集合
+
+        Args:
+            domains: 網域
+            bloom_bits_per_domain: 每個網域的 Bloom 位元數
+
+        Returns:
+            CompactDomainSet: 新的集合
+        """
+        return cls(pack_domains(domains, bloom_bits_per_domain))
+
+    @classmethod
+    def open(cls, path: str | os.PathLike) -> "CompactDomainSet":
+        """
+        以 mmap 開啟映像檔
+
+        Args:
+            path: 映像檔路徑
+
+        Returns:
+            CompactDomainSet: 新的集合
+        """
+        path = Path(path)
+        with path.open("rb") as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return cls(mapped, path)
+        except Exception:
+            mapped.close()
+            raise
+
+    # -------- 查詢 --------
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, domain: object) -> bool:
+        if not isinstance(domain, str) or not self._count:
+            return False
+        key = domain.encode()
+
+        if self._bloom_bits:
+            buffer = self._buffer
+            start = self._bloom_start
+            for position in _bloom_positions(key, self._bloom_bits, self._bloom_hashes):
+                if not buffer[start + (position >> 3)] & (1 << (position & 7)):
+                    return False
+
+        # 熱路徑: 直接以區域變數展開 _domain_at
+        buffer = self._buffer
+        offsets_start = self._offsets_start
+        blob_start = self._blob_start
+        unpack_span = _SPAN.unpack_from
+        low, high = 0, self._count
+        while low < high:
+            middle = (low + high) // 2
+            start, end = unpack_span(buffer, offsets_start + middle * 4)
+            current = buffer[blob_start + start : blob_start + end]
+            if current == key:
+                return True
+            if current < key:
+                low = middle + 1
+            else:
+                high = middle
+        return False
+
+    def __iter__(self) -> Iterator[str]:
+        for index in range(self._count):
+            yield self._domain_at(index).decode()
+
+    def _span(self, index: int) -> tuple[int, int]:
+        """第 index 個網域在 blob 中的起訖位置"""
+        return _SPAN.unpack_from(self._buffer, self._offsets_start + index * 4)
+
+    def _domain_at(self, index: int) -> bytes:
+        """第 index 個網域的位元組"""
+        start, end = self._span(index)
+        return self._buffer[self._blob_start + start : self._blob_start + end]
+
+    # -------- 指標 --------
+    @property
+    def nbytes(self) -> int:
+        """映像大小 (位元組)"""
+        return len(self._buffer)
+
+    @property
+    def bytes_per_domain(self) -> float:
+        """平均每個網域佔用的位元組"""
+        return self.nbytes / self._count if self._count else 0.0
+
+    @property
+    def is_mapped(self) -> bool:
+        """是否以 mmap 開啟"""
+        return isinstance(self._buffer, mmap.mmap)
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        取得儲存指標
+
+        Returns:
+            Dict[str, Any]: 指標資料
+        """
+        return {
+            "domains": self._count,
+            "bytes": self.nbytes,
+            "bytes_per_domain": self.bytes_per_domain,
+            "bloom_bytes": self._bloom_bits // 8,
+            "mapped": self.is_mapped,
+        }
+
+    def close(self):
+        """關閉 mmap (記憶體中的集合不需關閉)"""
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+
+
+def store_snapshot(data: bytes, path: str | os.PathLike) -> CompactDomainSet:
+    """
+    寫入映像檔並以 mmap 開啟
+
+    先寫入暫存檔再改名, 已開啟舊映像的程序不受影響. 無法寫入或替換檔案時
+    (例如 Windows 上舊映像仍被映射), 改為保存在記憶體中.
+
+    Args:
+        data: 映像位元組
+        path: 映像檔路徑
+
+    Returns:
+        CompactDomainSet: 新的集合
+    """
+    path = Path(path)
+    tmp_path = path.with_suffix(".tmp")
+    try:
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+        return CompactDomainSet.open(path)
+    except OSError as exc:
+        logger.warning(f"[反惡意連結]無法寫入威脅情資映像 {path}: {exc}")
+        return CompactDomainSet(data)
@@ -5,37 +5,34 @@
 - 管理黑名單快取和白名單過濾
 """
 
-import csv
-import io
-from collections import defaultdict
+import asyncio
+import datetime as dt
 from typing import Any
 
 import aiohttp
 import discord
-import tldextract
 from discord import app_commands
 from discord.ext import commands, tasks
 
 # 使用統一的核心模塊
 from ....core import create_error_handler, setup_module_logger
+from ....core.message_features import MessageFeatures, get_message_features
 from ...base import ProtectionCog, admin_only
+from ...write_buffer import ProtectionWriteBuffer
 from ..config.config import (
     DEFAULT_WHITELIST,
     DEFAULTS,
     THREAT_FEEDS,
-    URL_PATTERN,
-    extract_domain,
-    is_whitelisted,
+    AntiLinkConfig,
     normalize_domain,
     parse_domain_list,
 )
 from ..database.database import AntiLinkDatabase
 from ..panel.embeds.config_embed import ConfigEmbed
 from ..panel.main_view import AntiLinkMainView
-
-# 常數定義
-HTTP_OK_STATUS = 200
-MIN_CSV_COLUMNS = 2
+from .feed_ingest import fetch_threat_feed
+from .feed_store import CompactDomainSet, store_snapshot
+from .matcher import DomainTrie, GuildDomainMatcher, Verdict
 
 # 設置模塊日誌記錄器
 logger = setup_module_logger("anti_link")
@@ -54,6 +51,7 @@ class AntiLink(ProtectionCog):
     """
 
     module_name = "anti_link"
+    config_class = AntiLinkConfig
 
     def __init__(self, bot: commands.Bot):
         """
@@ -66,12 +64,17 @@ class AntiLink(ProtectionCog):
         self.db = AntiLinkDatabase(self)
 
         # 快取管理
-        self._remote_blacklist: set[str] = set()  # 遠端黑名單快取
+        self._remote_blacklist = CompactDomainSet.empty()  # 遠端黑名單 (唯讀映像)
+        self._remote_loaded = False  # 是否已由資料庫建立映像
         self._manual_blacklist: dict[int, set[str]] = {}  # 手動黑名單快取
         self._whitelist_cache: dict[int, set[str]] = {}  # 白名單快取
 
-        # 統計資料
-        self.stats: dict[int, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        # 網域比對器: 共用樹 (預設白名單) 與各伺服器比對器
+        self._shared_trie = DomainTrie.build(allow=DEFAULT_WHITELIST)
+        self._matchers: dict[int, GuildDomainMatcher] = {}
+
+        # 統計資料與操作日誌先寫入緩衝區, 定期一批寫入資料庫
+        self.write_buffer = ProtectionWriteBuffer(self.db, "反惡意連結")
 
     async def cog_load(self):
         """Cog 載入時的初始化"""
@@ -81,6 +84,7 @@ class AntiLink(ProtectionCog):
             await self._refresh_blacklist()
             # 啟動背景任務
             self._refresh_task.start()
+            self.write_buffer.start()
             logger.info("[反惡意連結]模組載入完成")
         except Exception as exc:
             logger.error(f"[反惡意連結]模組載入失敗: {exc}")
@@ -91,6 +95,8 @@ class AntiLink(ProtectionCog):
         try:
             # 停止背景任務
             self._refresh_task.cancel()
+            self._remote_blacklist.close()
+            await self.write_buffer.stop()
             logger.info("[反惡意連結]模組卸載完成")
         except Exception as exc:
             logger.error(f"[反惡意連結]模組卸載失敗: {exc}")
@@ -105,120 +111,60 @@ class AntiLink(ProtectionCog):
                 return
 
             # 檢查模組是否啟用
-            enabled = await self.get_config(
-                msg.guild.id, "enabled", DEFAULTS["enabled"]
-            )
-            if not enabled or enabled.lower() != "true":
+            cfg = await self.get_cfg_snapshot(msg.guild.id)
+            if not cfg.enabled:
                 return
 
-            whitelist_admins = await self.get_config(
-                msg.guild.id, "whitelist_admins", DEFAULTS["whitelist_admins"]
-            )
             if (
-                whitelist_admins
-                and whitelist_admins.lower() == "true"
+                cfg.whitelist_admins
                 and isinstance(msg.author, discord.Member)
                 and msg.author.guild_permissions.manage_messages
             ):
                 return
 
             # 檢測 URL
-            urls = await self._extract_urls(msg)
+            features = get_message_features(msg)
+            urls = self._extract_urls(cfg, features)
             if not urls:
                 return
 
-            # 取得白名單和黑名單
-            whitelist = await self._get_whitelist(msg.guild.id)
-            manual_blacklist = await self._get_manual_blacklist(msg.guild.id)
+            # 取得白名單和黑名單比對器
+            matcher = await self._get_matcher(msg.guild.id)
 
             # 檢查每個 URL
-            malicious_urls = []
-            for url in urls:
-                if await self._is_malicious_url(url, whitelist, manual_blacklist):
-                    malicious_urls.append(url)
+            malicious_urls = [
+                url
+                for url in urls
+                if self._is_malicious_url(features.domains.get(url, ""), matcher)
+            ]
 
             # 處理惡意連結
             if malicious_urls:
-                await self._handle_malicious_links(msg, malicious_urls)
+                await self._handle_malicious_links(msg, cfg, malicious_urls)
 
         except Exception as exc:
             error_handler.log_error(
                 exc, f"處理訊息事件 - {msg.author.id}", "MESSAGE_HANDLER_ERROR"
             )
 
-    async def _extract_urls(self, msg: discord.Message) -> list[str]:
-        """從訊息中提取所有 URL"""
-        urls = []
-
-        # 從訊息內容提取
-        if msg.content:
-            urls.extend(URL_PATTERN.findall(msg.content))
-
-        # 檢查嵌入連結
-        if msg.guild:
-            check_embeds = await self.get_config(
-                msg.guild.id, "check_embeds", DEFAULTS["check_embeds"]
-            )
-            if check_embeds and check_embeds.lower() == "true":
-                for embed in msg.embeds:
-                    if embed.url:
-                        urls.append(embed.url)
-                    if embed.author and embed.author.url:
-                        urls.append(embed.author.url)
-                    if embed.footer and embed.footer.icon_url:
-                        urls.append(embed.footer.icon_url)
-                    for field in embed.fields:
-                        if field.value:
-                            urls.extend(URL_PATTERN.findall(field.value))
-
-        return list(set(urls))  # 去重
-
-    async def _is_malicious_url(
-        self, url: str, whitelist: set[str], manual_blacklist: set[str]
-    ) -> bool:
-        """檢查 URL 是否為惡意連結"""
-        try:
-            domain = extract_domain(url)
-            if not domain:
-                return False
-
-            # 整合所有檢查邏輯
-            checks = [
-                lambda: is_whitelisted(domain, whitelist),
-                lambda: domain in manual_blacklist or domain in self._remote_blacklist,
-                lambda: self._check_registered_domain(domain, manual_blacklist),
-            ]
-            if checks[0]():
-                return False
-
-            # 黑名單檢查
-            if checks[1]():
-                return True
-
-            # 註冊網域檢查
-            return bool(checks[2]())
-
-        except Exception as exc:
-            logger.error(f"[反惡意連結]檢查 URL 失敗: {exc}")
+    def _extract_urls(
+        self, cfg: AntiLinkConfig, features: MessageFeatures
+    ) -> tuple[str, ...]:
+        """取得訊息中的所有 URL (嵌入連結依設定納入)"""
+        if features.embed_urls and cfg.check_embeds:
+            return features.all_urls
+        return features.urls
+
+    def _is_malicious_url(self, domain: str, matcher: GuildDomainMatcher) -> bool:
+        """檢查 URL 的網域是否為惡意網域"""
+        if not domain:
             return False
 
-    def _check_registered_domain(self, domain: str, manual_blacklist: set[str]) -> bool:
-        """檢查註冊網域是否在黑名單中"""
-        try:
-            registered_domain = tldextract.extract(domain).registered_domain
-            return (
-                registered_domain
-                and registered_domain != domain
-                and (
-                    registered_domain in manual_blacklist
-                    or registered_domain in self._remote_blacklist
-                )
-            )
-        except Exception:
-            return False
+        # 白名單優先, 其次為網域本身或上層網域的黑名單
+        return matcher.match(domain) is Verdict.DENY
 
     async def _handle_malicious_links(
-        self, msg: discord.Message, malicious_urls: list[str]
+        self, msg: discord.Message, cfg: AntiLinkConfig, malicious_urls: list[str]
     ):
         """處理惡意連結"""
         try:
@@ -234,13 +180,11 @@ class AntiLink(ProtectionCog):
                 logger.warning(f"[反惡意連結]無權刪除訊息: {msg.id}")
 
             # 記錄統計資料
-            await self._add_stat(msg.guild.id, "links_blocked", len(malicious_urls))
-            await self._add_stat(msg.guild.id, "messages_deleted")
+            self._add_stat(msg.guild.id, "links_blocked", len(malicious_urls))
+            self._add_stat(msg.guild.id, "messages_deleted")
 
             # 發送刪除訊息
-            delete_message = await self.get_config(
-                msg.guild.id, "delete_message", DEFAULTS["delete_message"]
-            )
+            delete_message = cfg.delete_message
             if delete_message:
                 try:
                     embed = discord.Embed(
@@ -252,9 +196,7 @@ class AntiLink(ProtectionCog):
 
             # 發送通知
             if msg.guild:
-                notify_channel_id = await self.get_config(
-                    msg.guild.id, "notify_channel", ""
-                )
+                notify_channel_id = cfg.notify_channel
                 if notify_channel_id:
                     try:
                         channel = msg.guild.get_channel(int(notify_channel_id))
@@ -267,11 +209,15 @@ class AntiLink(ProtectionCog):
                         pass
 
             # 記錄操作日誌
-            await self.db.add_action_log(
-                msg.guild.id,
-                msg.author.id,
-                "malicious_link_blocked",
-                f"阻止了 {len(malicious_urls)} 個惡意連結",
+            self.write_buffer.add_row(
+                "action_log",
+                (
+                    msg.guild.id,
+                    msg.author.id,
+                    "malicious_link_blocked",
+                    f"阻止了 {len(malicious_urls)} 個惡意連結",
+                    dt.datetime.now(),
+                ),
             )
 
             logger.info(
@@ -301,14 +247,45 @@ class AntiLink(ProtectionCog):
 
         return self._manual_blacklist[guild_id]
 
+    async def _get_matcher(self, guild_id: int) -> GuildDomainMatcher:
+        """取得伺服器網域比對器, 第一次使用時建立"""
+        matcher = self._matchers.get(guild_id)
+        if matcher is None:
+            whitelist = await self._get_whitelist(guild_id)
+            manual_blacklist = await self._get_manual_blacklist(guild_id)
+            matcher = GuildDomainMatcher.build(
+                self._shared_trie,
+                whitelist - DEFAULT_WHITELIST,
+                manual_blacklist,
+                self._remote_blacklist,
+            )
+            self._matchers[guild_id] = matcher
+
+        return matcher
+
+    def _set_remote_blacklist(self, feed: CompactDomainSet):
+        """替換遠端黑名單, 既有伺服器比對器一併切換後關閉舊映像"""
+        old_feed = self._remote_blacklist
+        self._remote_blacklist = feed
+        self._remote_loaded = True
+        for matcher in self._matchers.values():
+            matcher.feed = feed
+        old_feed.close()
+
     def _clear_cache(self, guild_id: int | None = None):
         """清理快取"""
         if guild_id:
             self._whitelist_cache.pop(guild_id, None)
             self._manual_blacklist.pop(guild_id, None)
+            self._matchers.pop(guild_id, None)
+            self._cache.pop(guild_id, None)
+            self.invalidate_cfg(guild_id)
         else:
             self._whitelist_cache.clear()
             self._manual_blacklist.clear()
+            self._matchers.clear()
+            self._cache.clear()
+            self.invalidate_cfg()
 
     # ───────── 威脅情資更新 ─────────
     async def _refresh_blacklist(self):
@@ -327,85 +304,80 @@ class AntiLink(ProtectionCog):
             async with aiohttp.ClientSession(
                 timeout=aiohttp.ClientTimeout(total=60)
             ) as session:
-                all_domains = set()
+                changed = False
 
                 for feed_name, feed_config in THREAT_FEEDS.items():
                     if not feed_config.get("enabled", True):
                         continue
 
                     try:
-                        domains = await self._fetch_threat_feed(
+                        if await self._update_threat_feed(
                             session, feed_name, feed_config
-                        )
-                        if domains:
-                            all_domains.update(domains)
-                            await self.db.update_blacklist_cache(domains, feed_name)
-                            logger.info(
-                                f"[反惡意連結]更新 {feed_name}: {len(domains)} 個網域"
-                            )
+                        ):
+                            changed = True
                     except Exception as exc:
                         logger.error(f"[反惡意連結]更新 {feed_name} 失敗: {exc}")
 
-                # 更新內存快取
-                self._remote_blacklist = await self.db.get_blacklist_cache()
+                # 所有來源皆未變更且已載入映像時不需重建
+                if not changed and self._remote_loaded:
+                    logger.info("[反惡意連結]威脅情資未變更")
+                    return
+
+                # 重建唯讀映像並以 mmap 載入
+                snapshot = await self.db.build_blacklist_snapshot()
+                self._set_remote_blacklist(
+                    await asyncio.to_thread(
+                        store_snapshot, snapshot, self.db.get_feed_snapshot_path()
+                    )
+                )
 
+                stats = self._remote_blacklist.get_stats()
                 logger.info(
-                    f"[反惡意連結]威脅情資更新完成: 總計 {len(self._remote_blacklist)} 個惡意網域"
+                    f"[反惡意連結]威脅情資更新完成: "
+                    f"總計 {stats['domains']} 個惡意網域, "
+                    f"映像 {stats['bytes']} bytes "
+                    f"({stats['bytes_per_domain']:.1f} bytes/網域)"
                 )
 
         except Exception as exc:
             error_handler.log_error(exc, "威脅情資更新", "BLACKLIST_UPDATE_ERROR")
 
-    async def _fetch_threat_feed(
+    async def _update_threat_feed(
         self,
         session: aiohttp.ClientSession,
         feed_name: str,
         feed_config: dict[str, Any],
-    ) -> set[str]:
-        """取得威脅情資"""
-        try:
-            url = feed_config["url"]
-            format_type = feed_config.get("format", "text")
-
-            async with session.get(url) as response:
-                if response.status != HTTP_OK_STATUS:
-                    logger.warning(
-                        f"[反惡意連結]{feed_name} 回應狀態: {response.status}"
-                    )
-                    return set()
-
-                content = await response.text()
-
-                domains = set()
-
-                if format_type == "text":
-                    for raw_line in content.split("\n"):
-                        line = raw_line.strip()
-                        if line and not line.startswith("#"):
-                            domain = extract_domain(line)
-                            if domain:
-                                domains.add(normalize_domain(domain))
+    ) -> bool:
+        """
+        更新單一威脅情資來源
 
-                elif format_type == "csv":
-                    reader = csv.reader(io.StringIO(content))
-                    for row in reader:
-                        if len(row) > MIN_CSV_COLUMNS and row[2]:  # 假設 URL 在第三列
-                            domain = extract_domain(row[2])
-                            if domain:
-                                domains.add(normalize_domain(domain))
+        Returns:
+            bool: 黑名單快取是否有變更
+        """
+        state = await self.db.get_feed_state(feed_name)
+        result = await fetch_threat_feed(session, feed_config, state)
+        if result is None:
+            return False
 
-                return domains
+        if result.unchanged:
+            await self.db.touch_blacklist_source(feed_name)
+            await self.db.save_feed_state(result.state)
+            logger.info(f"[反惡意連結]{feed_name} 未變更, 略過")
+            return False
 
-        except Exception as exc:
-            logger.error(f"[反惡意連結]取得 {feed_name} 失敗: {exc}")
-            return set()
+        added, removed = await self.db.apply_blacklist_diff(feed_name, result.domains)
+        await self.db.save_feed_state(result.state)
+        logger.info(
+            f"[反惡意連結]更新 {feed_name}: {len(result.domains)} 個網域 "
+            f"(新增 {added}, 移除 {removed}, {result.bytes_read} bytes)"
+        )
+        return bool(added or removed)
 
     # ───────── 統計管理 ─────────
-    async def _add_stat(self, guild_id: int, stat_type: str, count: int = 1):
-        """添加統計資料"""
+    def _add_stat(self, guild_id: int, stat_type: str, count: int = 1):
+        """添加統計資料 (寫入緩衝區, 定期寫入資料庫)"""
         try:
-            self.stats[guild_id][stat_type] += count
-            await self.db.add_stat(guild_id, stat_type, count)
+            self.write_buffer.add_stat(guild_id, stat_type, count)
         except Exception as exc:
             logger.error(f"[反惡意連結]添加統計失敗: {exc}")
 
@@ -540,18 +512,8 @@ class AntiLink(ProtectionCog):
     async def get_stats(self, guild_id: int) -> dict[str, int]:
         """取得統計資料"""
         try:
-            # 合併內存和資料庫統計
-            memory_stats = self.stats.get(guild_id, {})
-            db_stats = await self.db.get_stats(guild_id)
-
-            # 合併統計資料
-            combined_stats = defaultdict(int)
-            for key, value in memory_stats.items():
-                combined_stats[key] += value
-            for key, value in db_stats.items():
-                combined_stats[key] += value
-
-            return dict(combined_stats)
+            # 合併資料庫統計與尚未寫入的計數
+            return await self.write_buffer.read_stats(guild_id, self.db.get_stats)
 
         except Exception as exc:
             logger.error(f"[反惡意連結]取得統計失敗: {exc}")
@@ -574,8 +536,11 @@ class AntiLink(ProtectionCog):
                 new_whitelist = ",".join(sorted(all_domains))
                 await self.set_config(guild_id, "whitelist", new_whitelist)
 
-                # 清理快取
-                self._clear_cache(guild_id)
+                # 增量更新快取與比對器
+                if guild_id in self._whitelist_cache:
+                    self._whitelist_cache[guild_id] |= new_domains
+                if guild_id in self._matchers:
+                    self._matchers[guild_id].allow(new_domains)
 
             return len(new_domains)
 
@@ -609,8 +574,11 @@ class AntiLink(ProtectionCog):
                 new_blacklist = ",".join(sorted(all_domains))
                 await self.set_config(guild_id, "blacklist", new_blacklist)
 
-                # 清理快取
-                self._clear_cache(guild_id)
+                # 增量更新快取與比對器
+                if guild_id in self._manual_blacklist:
+                    self._manual_blacklist[guild_id] |= new_domains
+                if guild_id in self._matchers:
+                    self._matchers[guild_id].deny(new_domains)
 
             return len(new_domains)
 
@@ -656,6 +624,16 @@ class AntiLink(ProtectionCog):
         try:
             value_str = str(value) if value is not None else ""
             await self.db.set_config(guild_id, key, value_str)
+            self._cache.pop(guild_id, None)
+            self.invalidate_cfg(guild_id)
         except Exception as exc:
             logger.error(f"[反惡意連結]設置配置失敗: {exc}")
             raise
+
+    async def _load_cfg(self, gid: int) -> dict[str, str]:
+        """讀取伺服器的原始配置 (本模組的配置存放於獨立的資料庫)"""
+        return await self.db.get_all_config(gid)
+
+    async def _fetch_cfg_version(self, gid: int) -> tuple[int, str | None]:
+        """讀取伺服器配置版本 (配置數量與最後更新時間)"""
+        return await self.db.get_config_version(gid)
@@ -0,0 +1,235 @@
+"""
+反惡意連結網域比對器
+- 以反轉標籤的字典樹儲存白名單與黑名單 (com → example → www)
+- 一次走訪網域標籤即可判定 允許 / 拒絕 / 未知
+- 共用樹保存預設白名單, 伺服器樹保存自訂白名單與手動黑名單
+- 遠端威脅情資另存於精簡網域集合 (見 feed_store), 只在字典樹未命中時查詢
+"""
+
+from collections.abc import Container, Iterable
+from enum import Enum
+
+
+class Verdict(Enum):
+    """網域比對結果"""
+
+    ALLOW = "allow"  # 網域或其上層網域在白名單中
+    DENY = "deny"  # 網域或其上層網域在黑名單中
+    UNKNOWN = "unknown"  # 不在任何名單中
+
+
+# 節點中存放判定結果的鍵 (標籤一律為字串, 不會衝突)
+_VERDICT = None
+
+# 黑名單項目至少要有兩個標籤才會套用到子網域, 避免單一標籤 (如 localhost)
+# 誤傷所有同名後綴的網域
+_MIN_DENY_SUFFIX_LABELS = 2
+
+
+class DomainTrie:
+    """
+    反轉標籤字典樹
+
+    節點為 dict: 標籤 → 子節點, 另以 None 鍵存放該網域的判定結果.
+    同一網域同時在白名單與黑名單時白名單優先.
+    """
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self):
+        self._root: dict = {}
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def root(self) -> dict:
+        """根節點"""
+        return self._root
+
+    def add(self, domain: str, verdict: Verdict):
+        """
+        加入網域
+
+        Args:
+            domain: 已標準化的網域
+            verdict: ALLOW 或 DENY
+        """
+        if not domain:
+            return
+        node = self._root
+        for label in reversed(domain.split(".")):
+            node = node.setdefault(label, {})
+
+        current = node.get(_VERDICT)
+        if current is None:
+            self._size += 1
+        if current is not Verdict.ALLOW:
+            node[_VERDICT] = verdict
+
+    def update(self, domains: Iterable[str], verdict: Verdict):
+        """
+        批量加入網域
+
+        Args:
+            domains: 已標準化的網域
+            verdict: ALLOW 或 DENY
+        """
+        for domain in domains:
+            self.add(domain, verdict)
+
+    @classmethod
+    def build(
+        cls, allow: Iterable[str] = (), deny: Iterable[str] = ()
+    ) -> "DomainTrie":
+        """
+        由白名單與黑名單建立字典樹
+
+        Args:
+            allow: 白名單網域
+            deny: 黑名單網域
+
+        Returns:
+            DomainTrie: 新的字典樹
+        """
+        trie = cls()
+        trie.update(allow, Verdict.ALLOW)
+        trie.update(deny, Verdict.DENY)
+        return trie
+
+
+def match_domain(domain: str, *tries: DomainTrie) -> Verdict:
+    """
+    以一次標籤走訪同時比對多棵字典樹
+
+    規則與原本的名單檢查一致並擴充至所有上層網域:
+    - 網域本身或任一上層網域在白名單中 → ALLOW (優先)
+    - 網域本身在黑名單中, 或任一至少兩個標籤的上層網域在黑名單中 → DENY
+    - 其他 → UNKNOWN
+
+    Args:
+        domain: 已標準化的網域 (小寫、無 www. 與連接埠)
+        *tries: 要比對的字典樹
+
+    Returns:
+        Verdict: 比對結果
+    """
+    if not domain:
+        return Verdict.UNKNOWN
+
+    labels = domain.split(".")
+    label_count = len(labels)
+    nodes = [trie.root for trie in tries]
+    denied = False
+
+    for depth, label in enumerate(reversed(labels), 1):
+        next_nodes = []
+        for node in nodes:
+            child = node.get(label)
+            if child is None:
+                continue
+            verdict = child.get(_VERDICT)
+            if verdict is Verdict.ALLOW:
+                return Verdict.ALLOW
+            if verdict is Verdict.DENY and (
+                depth >= _MIN_DENY_SUFFIX_LABELS or depth == label_count
+            ):
+                denied = True
+            next_nodes.append(child)
+        if not next_nodes:
+            break
+        nodes = next_nodes
+
+    return Verdict.DENY if denied else Verdict.UNKNOWN
+
+
+def feed_contains(domain: str, feed: Container[str]) -> bool:
+    """
+    檢查網域本身或任一至少兩個標籤的上層網域是否在威脅情資中
+
+    Args:
+        domain: 已標準化的網域
+        feed: 威脅情資網域集合
+
+    Returns:
+        bool: 是否命中
+    """
+    if domain in feed:
+        return True
+
+    dot = domain.find(".")
+    while dot != -1:
+        suffix = domain[dot + 1 :]
+        if "." not in suffix:
+            break
+        if suffix in feed:
+            return True
+        dot = domain.find(".", dot + 1)
+    return False
+
+
+class GuildDomainMatcher:
+    """
+    單一伺服器的網域比對器
+
+    伺服器字典樹只保存自訂白名單與手動黑名單, 共用字典樹 (預設白名單) 與
+    遠端威脅情資由所有伺服器共用, 於比對時一併查詢.
+    """
+
+    __slots__ = ("feed", "guild_trie", "shared_trie")
+
+    def __init__(
+        self,
+        shared_trie: DomainTrie,
+        guild_trie: DomainTrie,
+        feed: Container[str] = frozenset(),
+    ):
+        self.shared_trie = shared_trie
+        self.guild_trie = guild_trie
+        self.feed = feed
+
+    @classmethod
+    def build(
+        cls,
+        shared_trie: DomainTrie,
+        whitelist: Iterable[str],
+        blacklist: Iterable[str],
+        feed: Container[str] = frozenset(),
+    ) -> "GuildDomainMatcher":
+        """
+        建立伺服器比對器
+
+        Args:
+            shared_trie: 共用字典樹
+            whitelist: 自訂白名單
+            blacklist: 手動黑名單
+            feed: 遠端威脅情資
+
+        Returns:
+            GuildDomainMatcher: 新的比對器
+        """
+        return cls(shared_trie, DomainTrie.build(whitelist, blacklist), feed)
+
+    def match(self, domain: str) -> Verdict:
+        """
+        比對網域
+
+        Args:
+            domain: 已標準化的網域
+
+        Returns:
+            Verdict: 比對結果
+        """
+        verdict = match_domain(domain, self.guild_trie, self.shared_trie)
+        if verdict is Verdict.UNKNOWN and domain and feed_contains(domain, self.feed):
+            return Verdict.DENY
+        return verdict
+
+    def allow(self, domains: Iterable[str]):
+        """增量加入白名單網域"""
+        self.guild_trie.update(domains, Verdict.ALLOW)
+
+    def deny(self, domains: Iterable[str]):
+        """增量加入黑名單網域"""
+        self.guild_trie.update(domains, Verdict.DENY)
@@ -46,7 +46,7 @@ class PreviewEmbed:
             status = "🟢 " if settings.get("enabled", False) else " "
             embed.add_field(name=" ", value=status, inline=True)
 
-            stats = await self.cog.db.get_stats(self.guild_id)
+            stats = await self.cog.get_stats(self.guild_id)
             total_blocked = stats.get("total_blocked", 0)
             embed.add_field(
                 name=" ",
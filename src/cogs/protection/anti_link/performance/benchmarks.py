@@ -0,0 +1,263 @@
+"""
+反惡意連結網域比對性能基準測試
+- 在合成的大量威脅情資網域上比較原本的集合/後綴掃描與反轉標籤字典樹
+- 比較威脅情資以 set[str] 與精簡映像保存時的記憶體用量
+- 驗證兩種比對方式的判定結果一致
+"""
+
+import logging
+import random
+import string
+import sys
+import time
+from typing import Any
+
+from ..config.config import DEFAULT_WHITELIST, is_whitelisted, tldextract
+from ..main.feed_store import CompactDomainSet
+from ..main.matcher import DomainTrie, GuildDomainMatcher, Verdict
+
+logger = logging.getLogger("anti_link")
+
+# 合成網域使用的頂級網域與子網域標籤
+_TLDS = ["com", "net", "org", "io", "xyz", "ru", "co.uk", "top", "info", "gg"]
+_SUBDOMAINS = ["www", "cdn", "login", "api", "free", "nitro", "gift", "auth"]
+
+
+class DomainMatchBenchmark:
+    """
+    網域比對基準測試
+
+    以相同的名單分別建立原本的集合檢查與 GuildDomainMatcher,
+    在同一批查詢網域上比較每次比對的平均耗時
+    """
+
+    def __init__(self, seed: int = 42):
+        """
+        初始化基準測試
+
+        Args:
+            seed: 隨機種子
+        """
+        self.random = random.Random(seed)
+        self.remote_blacklist: set[str] = set()
+        self.whitelist: set[str] = set()
+        self.manual_blacklist: set[str] = set()
+        self.feed: CompactDomainSet | None = None
+        self.matcher: GuildDomainMatcher | None = None
+
+    def setup(
+        self, feed_size: int, whitelist_size: int = 200, blacklist_size: int = 200
+    ) -> float:
+        """
+        生成合成名單並建立字典樹
+
+        Args:
+            feed_size: 遠端威脅情資網域數量
+            whitelist_size: 自訂白名單網域數量
+            blacklist_size: 手動黑名單網域數量
+
+        Returns:
+            float: 建立字典樹與威脅情資映像耗時(秒)
+        """
+        self.remote_blacklist = {self._random_domain() for _ in range(feed_size)}
+        self.whitelist = DEFAULT_WHITELIST | {
+            self._random_domain() for _ in range(whitelist_size)
+        }
+        self.manual_blacklist = {self._random_domain() for _ in range(blacklist_size)}
+
+        build_start = time.perf_counter()
+        self.feed = CompactDomainSet.from_domains(self.remote_blacklist)
+        self.matcher = GuildDomainMatcher.build(
+            DomainTrie.build(allow=DEFAULT_WHITELIST),
+            self.whitelist - DEFAULT_WHITELIST,
+            self.manual_blacklist,
+            self.feed,
+        )
+        return time.perf_counter() - build_start
+
+    def _random_domain(self) -> str:
+        """生成一個合成網域"""
+        length = self.random.randint(5, 14)
+        name = "".join(self.random.choices(string.ascii_lowercase, k=length))
+        return f"{name}.{self.random.choice(_TLDS)}"
+
+    def generate_queries(self, count: int) -> list[str]:
+        """
+        生成查詢網域: 白名單子網域、黑名單網域與子網域、未知網域各佔一部分
+
+        Args:
+            count: 查詢數量
+
+        Returns:
+            List[str]: 查詢網域
+        """
+        whitelist = sorted(self.whitelist)
+        blacklist = sorted(self.remote_blacklist | self.manual_blacklist)
+        queries = []
+        for index in range(count):
+            kind = index % 4
+            if kind == 0:
+                queries.append(
+                    f"{self.random.choice(_SUBDOMAINS)}.{self.random.choice(whitelist)}"
+                )
+            elif kind == 1:
+                queries.append(self.random.choice(blacklist))
+            elif kind == 2:
+                queries.append(
+                    f"{self.random.choice(_SUBDOMAINS)}.{self.random.choice(blacklist)}"
+                )
+            else:
+                queries.append(self._random_domain())
+        return queries
+
+    def legacy_is_malicious(self, domain: str) -> bool:
+        """原本的比對方式: 白名單後綴掃描、集合查詢與註冊網域檢查"""
+        if is_whitelisted(domain, self.whitelist):
+            return False
+        if domain in self.manual_blacklist or domain in self.remote_blacklist:
+            return True
+        if tldextract is None:
+            return False
+        registered_domain = tldextract.extract(domain).registered_domain
+        return bool(
+            registered_domain
+            and registered_domain != domain
+            and (
+                registered_domain in self.manual_blacklist
+                or registered_domain in self.remote_blacklist
+            )
+        )
+
+    def benchmark_match(self, queries: list[str], repeats: int = 3) -> dict[str, Any]:
+        """
+        比較原本的比對方式與字典樹比對
+
+        Args:
+            queries: 查詢網域
+            repeats: 重複次數
+
+        Returns:
+            Dict[str, Any]: 測試結果
+        """
+        assert self.matcher is not None
+        matcher = self.matcher
+
+        legacy_results: list[bool] = []
+        start = time.perf_counter()
+        for _ in range(repeats):
+            legacy_results = [self.legacy_is_malicious(domain) for domain in queries]
+        legacy_time = (time.perf_counter() - start) / repeats
+
+        trie_results: list[bool] = []
+        start = time.perf_counter()
+        for _ in range(repeats):
+            trie_results = [
+                matcher.match(domain) is Verdict.DENY for domain in queries
+            ]
+        trie_time = (time.perf_counter() - start) / repeats
+
+        mismatches = sum(
+            legacy != trie
+            for legacy, trie in zip(legacy_results, trie_results, strict=True)
+        )
+        per_query = len(queries) or 1
+        return {
+            "queries": len(queries),
+            "legacy_us": legacy_time / per_query * 1_000_000,
+            "trie_us": trie_time / per_query * 1_000_000,
+            "denied": sum(trie_results),
+            "mismatches": mismatches,
+            "improvement_ratio": legacy_time / trie_time if trie_time > 0 else 0.0,
+        }
+
+    def measure_memory(self) -> dict[str, Any]:
+        """
+        比較威脅情資以 set[str] 與精簡映像保存的記憶體用量
+
+        Returns:
+            Dict[str, Any]: 兩者的總位元組與每個網域的位元組
+        """
+        assert self.feed is not None
+        count = len(self.remote_blacklist) or 1
+        set_bytes = sys.getsizeof(self.remote_blacklist) + sum(
+            sys.getsizeof(domain) for domain in self.remote_blacklist
+        )
+        return {
+            "set_bytes": set_bytes,
+            "set_bytes_per_domain": set_bytes / count,
+            "compact_bytes": self.feed.nbytes,
+            "compact_bytes_per_domain": self.feed.bytes_per_domain,
+        }
+
+    def generate_report(
+        self,
+        feed_size: int,
+        build_time: float,
+        result: dict[str, Any],
+        memory: dict[str, Any],
+    ) -> str:
+        """
+        生成網域比對基準測試報告
+
+        Args:
+            feed_size: 遠端威脅情資網域數量
+            build_time: 建立字典樹與威脅情資映像耗時(秒)
+            result: benchmark_match 的結果
+            memory: measure_memory 的結果
+
+        Returns:
+            str: 格式化的報告文字
+        """
+        registered_check = "是" if tldextract is not None else "否 (未安裝 tldextract)"
+        report_lines = [
+            "=" * 60,
+            "反惡意連結網域比對性能基準測試報告 (集合掃描 vs 字典樹)",
+            "=" * 60,
+            "",
+            f"威脅情資網域數量: {feed_size}",
+            f"白名單網域數量: {len(self.whitelist)}",
+            f"手動黑名單網域數量: {len(self.manual_blacklist)}",
+            f"原本方式包含註冊網域檢查: {registered_check}",
+            f"建立字典樹與映像耗時: {build_time:.2f} 秒",
+            "",
+            f"set[str] 記憶體: {memory['set_bytes'] / 1024 / 1024:.1f} MiB "
+            f"({memory['set_bytes_per_domain']:.1f} bytes/網域)",
+            f"精簡映像: {memory['compact_bytes'] / 1024 / 1024:.1f} MiB "
+            f"({memory['compact_bytes_per_domain']:.1f} bytes/網域)",
+            "",
+            f"查詢數量: {result['queries']}",
+            f"原本方式每次比對: {result['legacy_us']:.2f} µs",
+            f"字典樹每次比對: {result['trie_us']:.2f} µs",
+            f"改善倍數: {result['improvement_ratio']:.1f}x",
+            f"判定為惡意: {result['denied']}",
+            f"判定不一致: {result['mismatches']}",
+            "",
+        ]
+        return "\n".join(report_lines)
+
+
+def run_match_benchmark(feed_size: int = 100_000, query_count: int = 20_000) -> str:
+    """
+    執行網域比對基準測試
+
+    Args:
+        feed_size: 遠端威脅情資網域數量
+        query_count: 查詢數量
+
+    Returns:
+        str: 測試報告
+    """
+    benchmark = DomainMatchBenchmark()
+    build_time = benchmark.setup(feed_size)
+    result = benchmark.benchmark_match(benchmark.generate_queries(query_count))
+
+    report = benchmark.generate_report(
+        feed_size, build_time, result, benchmark.measure_memory()
+    )
+    logger.info(f"\n{report}")
+    return report
+
+
+if __name__ == "__main__":
+    # 直接執行基準測試
+    print(run_match_benchmark())
@@ -5,9 +5,12 @@
 - 工具函數
 """
 
+from dataclasses import dataclass
 from difflib import SequenceMatcher
 from typing import Any
 
+from ...config_snapshot import ConfigSnapshot
+
 # ────────────────────────────
 # 預設配置值
 # ────────────────────────────
@@ -19,6 +22,8 @@ DEFAULTS = {
     "spam_similar_limit": 3,  # 相似訊息限制
     "spam_similar_window": 60,  # 相似窗口(秒)
     "spam_similar_threshold": 0.8,  # 相似度閾值
+    "spam_raid_limit": 0,  # 突襲限制(帳號數, 0 表示停用, 預設停用)
+    "spam_raid_window": 30,  # 突襲窗口(秒)
     "spam_sticker_limit": 5,  # 貼圖限制
     "spam_sticker_window": 30,  # 貼圖窗口(秒)
     "spam_timeout_minutes": 5,  # 違規超時(分鐘)
@@ -38,6 +43,8 @@ CH_NAMES = {
     "spam_similar_limit": "相似限制",
     "spam_similar_window": "相似窗口",
     "spam_similar_threshold": "相似度閾值",
+    "spam_raid_limit": "突襲限制",
+    "spam_raid_window": "突襲窗口",
     "spam_sticker_limit": "貼圖限制",
     "spam_sticker_window": "貼圖窗口",
     "spam_timeout_minutes": "超時分鐘",
@@ -109,6 +116,20 @@ CONFIG_CATEGORIES = {
                 "recommend": "0.7-0.8",
                 "type": "float",
             },
+            {
+                "key": "spam_raid_limit",
+                "name": "突襲限制",
+                "desc": "在指定時間內,此數量的帳號發送相似訊息即視為突襲(0 停用)",
+                "recommend": "5-10 個帳號",
+                "type": "int",
+            },
+            {
+                "key": "spam_raid_window",
+                "name": "突襲窗口",
+                "desc": "檢查多個帳號相似訊息的時間窗口(秒)",
+                "recommend": "30-60 秒",
+                "type": "int",
+            },
         ],
     },
     "sticker": {
@@ -167,6 +188,31 @@ CONFIG_CATEGORIES = {
     },
 }
 
+
+# ────────────────────────────
+# 具型別的配置快照
+# ────────────────────────────
+@dataclass(frozen=True, slots=True)
+class AntiSpamConfig(ConfigSnapshot):
+    """反垃圾訊息配置快照, 欄位與 DEFAULTS 一一對應"""
+
+    spam_freq_limit: int = DEFAULTS["spam_freq_limit"]
+    spam_freq_window: float = DEFAULTS["spam_freq_window"]
+    spam_identical_limit: int = DEFAULTS["spam_identical_limit"]
+    spam_identical_window: float = DEFAULTS["spam_identical_window"]
+    spam_similar_limit: int = DEFAULTS["spam_similar_limit"]
+    spam_similar_window: float = DEFAULTS["spam_similar_window"]
+    spam_similar_threshold: float = DEFAULTS["spam_similar_threshold"]
+    spam_raid_limit: int = DEFAULTS["spam_raid_limit"]
+    spam_raid_window: float = DEFAULTS["spam_raid_window"]
+    spam_sticker_limit: int = DEFAULTS["spam_sticker_limit"]
+    spam_sticker_window: float = DEFAULTS["spam_sticker_window"]
+    spam_timeout_minutes: int = DEFAULTS["spam_timeout_minutes"]
+    spam_notify_channel: str = DEFAULTS["spam_notify_channel"]
+    spam_response_message: str = DEFAULTS["spam_response_message"]
+    spam_response_enabled: bool = DEFAULTS["spam_response_enabled"] == "true"
+
+
 # ────────────────────────────
 # 配置項反向映射
 # ────────────────────────────
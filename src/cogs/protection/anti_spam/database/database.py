@@ -9,9 +9,27 @@ import logging
 from typing import Any
 
 from ...base import ProtectionCog
+from ...write_buffer import StatRow, drain_chunks
 
 logger = logging.getLogger("anti_spam")
 
+# 多列 VALUES 語句每段的列數 (5 欄 x 100 列, 低於 SQLite 參數上限)
+_BATCH_ROWS = 100
+
+# 寫入緩衝區沖刷時以多列 VALUES 累加統計與寫入日誌
+_UPSERT_STATS_SQL = """
+    INSERT INTO anti_spam_stats (guild_id, stat_type, count, last_updated)
+    VALUES {values}
+    ON CONFLICT(guild_id, stat_type) DO UPDATE SET
+        count = count + excluded.count,
+        last_updated = excluded.last_updated
+"""
+
+_INSERT_ACTION_LOGS_SQL = """
+    INSERT INTO anti_spam_action_log (guild_id, user_id, action, details, timestamp)
+    VALUES {values}
+"""
+
 
 class AntiSpamDatabase:
     """
@@ -152,9 +170,10 @@ class AntiSpamDatabase:
                 (guild_id, self.module_name),
             )
 
-            # 清除快取
+            # 清除快取並通知其他程序
             if guild_id in self.cog._cache:
                 del self.cog._cache[guild_id]
+            await self.cog.mark_cfg_changed(guild_id)
 
             logger.info(f"[反垃圾訊息]已重置伺服器 {guild_id} 的所有配置")
 
@@ -187,6 +206,42 @@ class AntiSpamDatabase:
         except Exception as exc:
             logger.error(f"[反垃圾訊息]增加統計失敗: {exc}")
 
+    async def write_batch(
+        self, stats: list[StatRow], rows: dict[str, list[tuple]]
+    ) -> None:
+        """
+        將寫入緩衝區累積的統計與操作日誌一批寫入資料庫
+
+        每張資料表以多列 VALUES 的單一語句寫入 (依 SQLite 參數上限切段),
+        統計以 ON CONFLICT 累加. bot.database 的每個語句各自提交, 因此每段
+        寫入成功後自列表移除; 失敗時拋出例外, 寫入緩衝區只重試剩餘的資料.
+
+        Args:
+            stats: (伺服器ID, 統計類型, 增加數量) 列表
+            rows: 日誌種類與欄位值, "action_log" 為
+                (伺服器ID, 用戶ID, 操作類型, 詳細資訊, 時間)
+        """
+        database = getattr(self.cog.bot, "database", None)
+        if not database:
+            return
+
+        async def write_stats(chunk: list[StatRow]):
+            values = ", ".join(["(?, ?, ?, CURRENT_TIMESTAMP)"] * len(chunk))
+            await database.execute(
+                _UPSERT_STATS_SQL.format(values=values),
+                tuple(value for row in chunk for value in row),
+            )
+
+        async def write_action_logs(chunk: list[tuple]):
+            values = ", ".join(["(?, ?, ?, ?, ?)"] * len(chunk))
+            await database.execute(
+                _INSERT_ACTION_LOGS_SQL.format(values=values),
+                tuple(value for row in chunk for value in row),
+            )
+
+        await drain_chunks(stats, _BATCH_ROWS, write_stats)
+        await drain_chunks(rows.get("action_log", []), _BATCH_ROWS, write_action_logs)
+
     async def get_stats(self, guild_id: int) -> dict[str, int]:
         """
         取得統計資料
@@ -0,0 +1,441 @@
+"""
+反垃圾訊息行為歷史
+- 每個 (伺服器, 用戶) 一組環形緩衝區, 事件依時間加入, 過期事件自最舊的一端移除
+- 每種檢查各自保留窗口起點與計數, 窗口只會向前移動, 每則訊息的成本為常數
+- 以時間輪在用戶閒置後移除其歷史, 不需定期掃描所有用戶
+"""
+
+from collections.abc import Hashable, Iterator
+from typing import Any
+
+from .sketch import Sketch
+
+# 每組歷史最多保留的事件數量, 超過時最舊的事件被覆寫
+DEFAULT_CAPACITY = 64
+_INITIAL_CAPACITY = 4
+
+# 用戶閒置多久後移除其歷史(秒)
+DEFAULT_IDLE_TTL = 600.0
+
+# 時間輪每格的秒數與格數, 涵蓋範圍須大於閒置時間
+DEFAULT_WHEEL_RESOLUTION = 10.0
+DEFAULT_WHEEL_SLOTS = 64
+
+
+class EventRing:
+    """
+    以絕對序號存取的環形緩衝區
+
+    head 為最舊事件的序號, tail 為下一個事件的序號, 序號 i 的事件存放於
+    i & mask. 容量從小開始依需要加倍 (保持 2 的次方), 事件數量不超過上限.
+    """
+
+    __slots__ = ("_items", "_mask", "head", "max_capacity", "tail")
+
+    def __init__(self, max_capacity: int = DEFAULT_CAPACITY):
+        """
+        初始化緩衝區
+
+        Args:
+            max_capacity: 事件數量上限
+        """
+        self.max_capacity = max_capacity
+        self._items: list[Any] = [None] * _INITIAL_CAPACITY
+        self._mask = len(self._items) - 1
+        self.head = 0
+        self.tail = 0
+
+    def __len__(self) -> int:
+        return self.tail - self.head
+
+    def __getitem__(self, seq: int) -> Any:
+        return self._items[seq & self._mask]
+
+    @property
+    def full(self) -> bool:
+        """是否已達容量上限"""
+        return self.tail - self.head >= self.max_capacity
+
+    def append(self, item: Any):
+        """
+        加入事件, 呼叫前須確認未達容量上限
+
+        Args:
+            item: 事件
+        """
+        if self.tail - self.head > self._mask:
+            self._grow()
+        self._items[self.tail & self._mask] = item
+        self.tail += 1
+
+    def release(self, seq: int):
+        """
+        移除序號小於 seq 的事件
+
+        Args:
+            seq: 保留的最舊序號
+        """
+        items = self._items
+        mask = self._mask
+        while self.head < seq:
+            items[self.head & mask] = None
+            self.head += 1
+
+    def _grow(self):
+        """容量加倍"""
+        size = len(self._items) * 2
+        items: list[Any] = [None] * size
+        mask = size - 1
+        for seq in range(self.head, self.tail):
+            items[seq & mask] = self._items[seq & self._mask]
+        self._items = items
+        self._mask = mask
+
+
+class SpamHistory:
+    """
+    單一用戶在單一伺服器的行為歷史
+
+    訊息事件共用一個環形緩衝區, 頻率、重複與相似檢查各自保留窗口起點;
+    重複檢查另外保留窗口內各內容雜湊的計數. 所有窗口起點之前的事件即可釋放.
+    """
+
+    __slots__ = (
+        "_hash_counts",
+        "_stickers",
+        "freq_start",
+        "identical_start",
+        "last_seen",
+        "messages",
+        "similar_start",
+        "sticker_start",
+    )
+
+    def __init__(self, now: float, capacity: int = DEFAULT_CAPACITY):
+        """
+        初始化歷史
+
+        Args:
+            now: 建立時間
+            capacity: 事件容量上限
+        """
+        self.messages = EventRing(capacity)
+        self.freq_start = 0
+        self.identical_start = 0
+        self.similar_start = 0
+        self._hash_counts: dict[Hashable, int] = {}
+        self._stickers: EventRing | None = None
+        self.sticker_start = 0
+        self.last_seen = now
+
+    # -------- 訊息 --------
+    def add_message(self, now: float, content_hash: str, sketch: Sketch | None):
+        """
+        記錄訊息
+
+        Args:
+            now: 訊息時間
+            content_hash: 內容雜湊
+            sketch: MinHash 草圖
+        """
+        messages = self.messages
+        if messages.full:
+            self._drop_oldest_message()
+        # 訊息事件: (時間, 內容雜湊, MinHash 草圖)
+        messages.append((now, content_hash, sketch))
+        self._hash_counts[content_hash] = self._hash_counts.get(content_hash, 0) + 1
+        self.last_seen = now
+
+    def _drop_oldest_message(self):
+        """容量已滿時, 將所有窗口起點移過最舊的事件"""
+        head = self.messages.head
+        self.freq_start = max(self.freq_start, head + 1)
+        self.similar_start = max(self.similar_start, head + 1)
+        if self.identical_start == head:
+            self._forget_hash(self.messages[head][1])
+            self.identical_start += 1
+        self.messages.release(head + 1)
+
+    def _forget_hash(self, content_hash: str):
+        """重複檢查窗口移除一筆內容雜湊"""
+        count = self._hash_counts[content_hash] - 1
+        if count:
+            self._hash_counts[content_hash] = count
+        else:
+            del self._hash_counts[content_hash]
+
+    def _advance(self, start: int, cutoff: float) -> int:
+        """窗口起點移過時間早於 cutoff 的事件"""
+        messages = self.messages
+        while start < messages.tail and messages[start][0] < cutoff:
+            start += 1
+        return start
+
+    def _release_messages(self):
+        """釋放所有窗口都不再需要的事件"""
+        self.messages.release(
+            min(self.freq_start, self.identical_start, self.similar_start)
+        )
+
+    def count_recent(self, now: float, window: float) -> int:
+        """
+        頻率窗口內的訊息數量
+
+        Args:
+            now: 目前時間
+            window: 窗口(秒)
+
+        Returns:
+            int: 訊息數量
+        """
+        self.freq_start = self._advance(self.freq_start, now - window)
+        self._release_messages()
+        return self.messages.tail - self.freq_start
+
+    def count_identical(self, now: float, window: float, content_hash: str) -> int:
+        """
+        重複窗口內與 content_hash 相同的訊息數量
+
+        Args:
+            now: 目前時間
+            window: 窗口(秒)
+            content_hash: 內容雜湊
+
+        Returns:
+            int: 訊息數量
+        """
+        messages = self.messages
+        start = self.identical_start
+        cutoff = now - window
+        while start < messages.tail and messages[start][0] < cutoff:
+            self._forget_hash(messages[start][1])
+            start += 1
+        self.identical_start = start
+        self._release_messages()
+        return self._hash_counts.get(content_hash, 0)
+
+    def recent_sketches(self, now: float, window: float) -> Iterator[Sketch]:
+        """
+        相似窗口內, 最新一則之前的訊息草圖
+
+        Args:
+            now: 目前時間
+            window: 窗口(秒)
+
+        Yields:
+            Sketch: 草圖
+        """
+        self.similar_start = self._advance(self.similar_start, now - window)
+        self._release_messages()
+        messages = self.messages
+        for seq in range(self.similar_start, messages.tail - 1):
+            sketch = messages[seq][2]
+            if sketch:
+                yield sketch
+
+    # -------- 貼圖 --------
+    def add_sticker(self, now: float):
+        """
+        記錄貼圖
+
+        Args:
+            now: 訊息時間
+        """
+        stickers = self._stickers
+        if stickers is None:
+            stickers = self._stickers = EventRing(self.messages.max_capacity)
+        if stickers.full:
+            self.sticker_start = max(self.sticker_start, stickers.head + 1)
+            stickers.release(stickers.head + 1)
+        stickers.append(now)
+        self.last_seen = now
+
+    def count_stickers(self, now: float, window: float) -> int:
+        """
+        貼圖窗口內的貼圖訊息數量
+
+        Args:
+            now: 目前時間
+            window: 窗口(秒)
+
+        Returns:
+            int: 貼圖訊息數量
+        """
+        stickers = self._stickers
+        if stickers is None:
+            return 0
+        start = self.sticker_start
+        cutoff = now - window
+        while start < stickers.tail and stickers[start] < cutoff:
+            start += 1
+        self.sticker_start = start
+        stickers.release(start)
+        return stickers.tail - start
+
+
+class TimingWheel:
+    """
+    閒置鍵的時間輪
+
+    每個鍵只排入一格. 該格到期時若鍵在期間內仍有活動, 依最後活動時間
+    重新排入, 否則交由呼叫端移除. 推進時間輪只處理經過的格子.
+    """
+
+    __slots__ = ("_current", "_slots", "resolution")
+
+    def __init__(
+        self,
+        resolution: float = DEFAULT_WHEEL_RESOLUTION,
+        slots: int = DEFAULT_WHEEL_SLOTS,
+    ):
+        """
+        初始化時間輪
+
+        Args:
+            resolution: 每格的秒數
+            slots: 格數
+        """
+        self.resolution = resolution
+        self._slots: list[set[Hashable]] = [set() for _ in range(slots)]
+        self._current: int | None = None
+
+    def _tick(self, timestamp: float) -> int:
+        return int(timestamp // self.resolution)
+
+    def schedule(self, key: Hashable, deadline: float, now: float):
+        """
+        排入鍵
+
+        Args:
+            key: 鍵
+            deadline: 到期時間
+            now: 目前時間
+        """
+        if self._current is None:
+            self._current = self._tick(now)
+        # 超出涵蓋範圍的到期時間先排入最遠的格子, 到期時再重新排入
+        tick = min(
+            max(self._tick(deadline), self._current + 1),
+            self._current + len(self._slots) - 1,
+        )
+        self._slots[tick % len(self._slots)].add(key)
+
+    def advance(self, now: float) -> list[Hashable]:
+        """
+        推進時間輪
+
+        Args:
+            now: 目前時間
+
+        Returns:
+            List[Hashable]: 到期的鍵
+        """
+        target = self._tick(now)
+        if self._current is None:
+            self._current = target
+            return []
+
+        expired: list[Hashable] = []
+        # 經過的格子超過一圈時, 每一格只需處理一次
+        start = max(self._current + 1, target - len(self._slots) + 1)
+        for tick in range(start, target + 1):
+            slot = self._slots[tick % len(self._slots)]
+            if slot:
+                expired.extend(slot)
+                slot.clear()
+        self._current = max(self._current, target)
+        return expired
+
+
+class SpamHistoryStore:
+    """
+    所有 (伺服器, 用戶) 的行為歷史
+
+    取得歷史時建立並排入時間輪; 推進時間輪時移除閒置超過 idle_ttl 的歷史.
+    """
+
+    def __init__(
+        self,
+        idle_ttl: float = DEFAULT_IDLE_TTL,
+        capacity: int = DEFAULT_CAPACITY,
+        resolution: float = DEFAULT_WHEEL_RESOLUTION,
+    ):
+        """
+        初始化歷史儲存
+
+        Args:
+            idle_ttl: 閒置多久後移除(秒)
+            capacity: 每組歷史的事件容量上限
+            resolution: 時間輪每格的秒數
+        """
+        self.idle_ttl = idle_ttl
+        self.capacity = capacity
+        self._histories: dict[tuple[int, int], SpamHistory] = {}
+        self._wheel = TimingWheel(
+            resolution, max(DEFAULT_WHEEL_SLOTS, int(idle_ttl // resolution) + 2)
+        )
+
+    def __len__(self) -> int:
+        return len(self._histories)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._histories
+
+    def get(self, guild_id: int, user_id: int, now: float) -> SpamHistory:
+        """
+        取得歷史, 不存在時建立
+
+        Args:
+            guild_id: 伺服器 ID
+            user_id: 用戶 ID
+            now: 目前時間
+
+        Returns:
+            SpamHistory: 行為歷史
+        """
+        key = (guild_id, user_id)
+        history = self._histories.get(key)
+        if history is None:
+            history = self._histories[key] = SpamHistory(now, self.capacity)
+            self._wheel.schedule(key, now + self.idle_ttl, now)
+        return history
+
+    def expire(self, now: float) -> int:
+        """
+        推進時間輪並移除閒置的歷史
+
+        Args:
+            now: 目前時間
+
+        Returns:
+            int: 移除的數量
+        """
+        removed = 0
+        for key in self._wheel.advance(now):
+            history = self._histories.get(key)
+            if history is None:
+                continue
+            deadline = history.last_seen + self.idle_ttl
+            if deadline <= now:
+                del self._histories[key]
+                removed += 1
+            else:
+                self._wheel.schedule(key, deadline, now)
+        return removed
+
+    def clear(self):
+        """清空所有歷史"""
+        self._histories.clear()
+        self._wheel = TimingWheel(self._wheel.resolution, len(self._wheel._slots))
+
+    def get_stats(self) -> dict[str, Any]:
+        """
+        取得歷史指標
+
+        Returns:
+            Dict[str, Any]: 指標資料
+        """
+        return {
+            "histories": len(self._histories),
+            "events": sum(len(h.messages) for h in self._histories.values()),
+        }
@@ -9,7 +9,6 @@ import contextlib
 import datetime as dt
 import time
 from collections import defaultdict
-from difflib import SequenceMatcher
 from typing import Any
 
 import discord
@@ -18,11 +17,21 @@ from discord.ext import commands, tasks
 
 # 使用統一的核心模塊
 from ....core import create_error_handler, setup_module_logger
+from ....core.message_features import get_message_features
 from ...base import ProtectionCog, admin_only
-from ..config.config import DEFAULTS
+from ...write_buffer import ProtectionWriteBuffer
+from ..config.config import DEFAULTS, AntiSpamConfig
 from ..database.database import AntiSpamDatabase
 from ..panel.embeds.settings_embed import create_settings_embed
 from ..panel.main_view import AntiSpamMainView
+from .history import SpamHistory, SpamHistoryStore
+from .sketch import (
+    NearDuplicateIndex,
+    Sketch,
+    has_min_shingles,
+    minhash,
+    similarity,
+)
 
 # 常數定義
 MAX_ACTION_LOGS = 100
@@ -32,14 +41,6 @@ logger = setup_module_logger("anti_spam")
 error_handler = create_error_handler("anti_spam", logger)
 
 
-# 相似度計算函數
-def _similar(a: str, b: str) -> float:
-    """計算兩個字串的相似度"""
-    if not a or not b:
-        return 0.0
-    return SequenceMatcher(None, a.lower(), b.lower()).ratio()
-
-
 class AntiSpam(ProtectionCog):
     """
     反垃圾訊息保護模組
@@ -47,11 +48,13 @@ class AntiSpam(ProtectionCog):
     負責檢測和處理各種類型的垃圾訊息行為,包括:
     - 高頻率訊息檢測
     - 重複/相似訊息檢測
+    - 多個帳號發送近似內容的突襲檢測
     - 貼圖濫用檢測
     - 違規行為處理和記錄
     """
 
     module_name = "anti_spam"
+    config_class = AntiSpamConfig
 
     def __init__(self, bot: commands.Bot):
         """
@@ -65,15 +68,13 @@ class AntiSpam(ProtectionCog):
 
         # 用戶行為追蹤
         self.violate: dict[int, int] = defaultdict(int)  # 用戶違規次數
-        self.message_history: dict[int, list[tuple[float, str]]] = defaultdict(
-            list
-        )  # 用戶訊息歷史
-        self.sticker_history: dict[int, list[float]] = defaultdict(list)  # 用戶貼圖歷史
+        self.history = SpamHistoryStore()  # (伺服器, 用戶) 訊息與貼圖歷史
+        self.raid_index: dict[int, NearDuplicateIndex] = defaultdict(
+            NearDuplicateIndex
+        )  # 伺服器跨用戶近似內容索引
 
-        # 統計資料
-        self.stats: dict[int, dict[str, int]] = defaultdict(
-            lambda: defaultdict(int)
-        )  # 伺服器統計資料
+        # 統計資料與操作日誌先寫入緩衝區, 定期一批寫入資料庫
+        self.write_buffer = ProtectionWriteBuffer(self.db, "反垃圾訊息")
         self.action_logs: dict[int, list[dict[str, Any]]] = defaultdict(
             list
         )  # 伺服器操作日誌
@@ -84,6 +85,7 @@ class AntiSpam(ProtectionCog):
             await self.db.init_db()
             # 啟動背景任務
             self._reset_task.start()
+            self.write_buffer.start()
             logger.info("[反垃圾訊息]模組載入完成")
         except Exception as exc:
             logger.error(f"[反垃圾訊息]模組載入失敗: {exc}")
@@ -94,6 +96,7 @@ class AntiSpam(ProtectionCog):
         try:
             # 停止背景任務
             self._reset_task.cancel()
+            await self.write_buffer.stop()
             logger.info("[反垃圾訊息]模組卸載完成")
         except Exception as exc:
             logger.error(f"[反垃圾訊息]模組卸載失敗: {exc}")
@@ -108,8 +111,8 @@ class AntiSpam(ProtectionCog):
                 return
 
             # 檢查模組是否啟用
-            enabled = await self.get_cfg(msg.guild.id, "enabled", "true")
-            if not enabled or enabled.lower() != "true":
+            cfg = await self.get_cfg_snapshot(msg.guild.id)
+            if not cfg.enabled:
                 return
 
             if (
@@ -120,42 +123,53 @@ class AntiSpam(ProtectionCog):
 
             # 記錄訊息到歷史
             now = time.time()
+            guild_id = msg.guild.id
             user_id = msg.author.id
+            features = get_message_features(msg)
+            sketch = minhash(features.normalized_content) if features.content else None
+
+            # 移除閒置用戶的歷史
+            self.history.expire(now)
+            history = self.history.get(guild_id, user_id, now)
 
             # 記錄一般訊息
-            if msg.content:
-                self.message_history[user_id].append((now, msg.content))
+            if features.content:
+                history.add_message(now, features.content_hash, sketch)
 
             # 記錄貼圖
             if msg.stickers:
-                self.sticker_history[user_id].append(now)
-
-            # 清理舊歷史記錄
-            self._cleanup_history(user_id, now)
+                history.add_sticker(now)
 
             # 檢測各種垃圾訊息行為
             violations = []
-            key = (user_id, msg.guild.id)
 
             # 檢查頻率限制
-            if await self._match_freq_limit(msg.guild.id, key, now):
+            if self._match_freq_limit(cfg, history, now):
                 violations.append("頻率限制")
 
             # 檢查重複訊息
-            if msg.content and await self._match_identical(msg.guild.id, key, now):
+            if features.content and self._match_identical(
+                cfg, history, now, features.content_hash
+            ):
                 violations.append("重複訊息")
 
             # 檢查相似訊息
-            if msg.content and await self._match_similar(msg.guild.id, key, now):
+            if sketch and self._match_similar(cfg, history, now, sketch):
                 violations.append("相似訊息")
 
+            # 檢查多個帳號的近似內容
+            if sketch and self._match_raid(
+                cfg, guild_id, user_id, now, features.normalized_content, sketch
+            ):
+                violations.append("突襲洗版")
+
             # 檢查貼圖濫用
-            if msg.stickers and await self._match_sticker(msg.guild.id, key, now):
+            if msg.stickers and self._match_sticker(cfg, history, now):
                 violations.append("貼圖濫用")
 
             # 處理違規行為
             if violations:
-                await self._handle_violation(msg, violations)
+                await self._handle_violation(msg, cfg, violations)
 
         except Exception as exc:
             error_handler.log_error(
@@ -163,113 +177,52 @@ class AntiSpam(ProtectionCog):
             )
 
     # ───────── 檢測邏輯 ─────────
-    async def _match_freq_limit(
-        self, guild_id: int, key: tuple[int, int], now: float
+    def _match_freq_limit(
+        self, cfg: AntiSpamConfig, history: SpamHistory, now: float
     ) -> bool:
         """檢查頻率限制"""
         try:
-            limit_str = await self.get_cfg(
-                guild_id, "spam_freq_limit", str(DEFAULTS["spam_freq_limit"])
-            )
-            window_str = await self.get_cfg(
-                guild_id, "spam_freq_window", str(DEFAULTS["spam_freq_window"])
-            )
-
-            limit = int(limit_str or DEFAULTS["spam_freq_limit"])
-            window = float(window_str or DEFAULTS["spam_freq_window"])
-
-            user_id = key[0]
-            recent_messages = [
-                t for t, _ in self.message_history[user_id] if now - t <= window
-            ]
-
-            return len(recent_messages) >= limit
+            count = history.count_recent(now, cfg.spam_freq_window)
+            return count >= cfg.spam_freq_limit
 
         except Exception as exc:
             logger.error(f"[反垃圾訊息]頻率檢查失敗: {exc}")
             return False
 
-    async def _match_identical(
-        self, guild_id: int, key: tuple[int, int], now: float
+    def _match_identical(
+        self, cfg: AntiSpamConfig, history: SpamHistory, now: float, content_hash: str
     ) -> bool:
         """檢查重複訊息"""
         try:
-            limit_str = await self.get_cfg(
-                guild_id, "spam_identical_limit", str(DEFAULTS["spam_identical_limit"])
-            )
-            window_str = await self.get_cfg(
-                guild_id,
-                "spam_identical_window",
-                str(DEFAULTS["spam_identical_window"]),
+            count = history.count_identical(
+                now, cfg.spam_identical_window, content_hash
             )
-
-            limit = int(limit_str or DEFAULTS["spam_identical_limit"])
-            window = float(window_str or DEFAULTS["spam_identical_window"])
-
-            user_id = key[0]
-            recent_messages = [
-                (t, content)
-                for t, content in self.message_history[user_id]
-                if now - t <= window
-            ]
-
-            if len(recent_messages) < limit:
-                return False
-
-            # 檢查是否有重複內容
-            content_counts = defaultdict(int)
-            for _, content in recent_messages:
-                content_counts[content] += 1
-                if content_counts[content] >= limit:
-                    return True
-
-            return False
+            return count >= cfg.spam_identical_limit
 
         except Exception as exc:
             logger.error(f"[反垃圾訊息]重複檢查失敗: {exc}")
             return False
 
-    async def _match_similar(
-        self, guild_id: int, key: tuple[int, int], now: float
+    def _match_similar(
+        self, cfg: AntiSpamConfig, history: SpamHistory, now: float, sketch: Sketch
     ) -> bool:
-        """檢查相似訊息"""
+        """檢查相似訊息 (以 MinHash 草圖與窗口內的訊息逐一比較)"""
         try:
-            limit_str = await self.get_cfg(
-                guild_id, "spam_similar_limit", str(DEFAULTS["spam_similar_limit"])
-            )
-            window_str = await self.get_cfg(
-                guild_id, "spam_similar_window", str(DEFAULTS["spam_similar_window"])
-            )
-            threshold_str = await self.get_cfg(
-                guild_id,
-                "spam_similar_threshold",
-                str(DEFAULTS["spam_similar_threshold"]),
-            )
+            limit = cfg.spam_similar_limit
+            threshold = cfg.spam_similar_threshold
 
-            limit = int(limit_str or DEFAULTS["spam_similar_limit"])
-            window = float(window_str or DEFAULTS["spam_similar_window"])
-            threshold = float(threshold_str or DEFAULTS["spam_similar_threshold"])
+            previous = list(history.recent_sketches(now, cfg.spam_similar_window))
 
-            user_id = key[0]
-            recent_messages = [
-                (t, content)
-                for t, content in self.message_history[user_id]
-                if now - t <= window
-            ]
-
-            if len(recent_messages) < limit:
+            if len(previous) + 1 < limit:
                 return False
 
-            # 檢查相似度
-            contents = [content for _, content in recent_messages]
-            similar_count = 0
-
-            for i in range(len(contents)):
-                for j in range(i + 1, len(contents)):
-                    if _similar(contents[i], contents[j]) >= threshold:
-                        similar_count += 1
-                        if similar_count >= limit:
-                            return True
+            # 與目前訊息相似的訊息數量 (含目前訊息)
+            similar_count = 1
+            for other in previous:
+                if similarity(sketch, other) >= threshold:
+                    similar_count += 1
+                    if similar_count >= limit:
+                        return True
 
             return False
 
@@ -277,59 +230,55 @@ class AntiSpam(ProtectionCog):
             logger.error(f"[反垃圾訊息]相似度檢查失敗: {exc}")
             return False
 
-    async def _match_sticker(
-        self, guild_id: int, key: tuple[int, int], now: float
+    def _match_raid(
+        self,
+        cfg: AntiSpamConfig,
+        guild_id: int,
+        user_id: int,
+        now: float,
+        text: str,
+        sketch: Sketch,
     ) -> bool:
-        """檢查貼圖濫用"""
+        """檢查多個帳號在短時間內發送近似內容"""
         try:
-            limit_str = await self.get_cfg(
-                guild_id, "spam_sticker_limit", str(DEFAULTS["spam_sticker_limit"])
-            )
-            window_str = await self.get_cfg(
-                guild_id, "spam_sticker_window", str(DEFAULTS["spam_sticker_window"])
-            )
+            limit = cfg.spam_raid_limit
+
+            # 0 表示停用
+            if limit <= 0:
+                return False
 
-            limit = int(limit_str or DEFAULTS["spam_sticker_limit"])
-            window = float(window_str or DEFAULTS["spam_sticker_window"])
+            # 常見短回覆在多個帳號間本來就相同, 不加入索引也不查詢
+            if not has_min_shingles(text):
+                return False
 
-            user_id = key[0]
-            recent_stickers = [
-                t for t in self.sticker_history[user_id] if now - t <= window
-            ]
+            index = self.raid_index[guild_id]
+            index.prune(now - cfg.spam_raid_window)
+            users = index.similar_users(sketch, cfg.spam_similar_threshold, limit)
+            users.add(user_id)
+            index.add(now, user_id, sketch)
 
-            return len(recent_stickers) >= limit
+            return len(users) >= limit
 
         except Exception as exc:
-            logger.error(f"[反垃圾訊息]貼圖檢查失敗: {exc}")
+            logger.error(f"[反垃圾訊息]突襲檢查失敗: {exc}")
             return False
 
-    def _cleanup_history(self, user_id: int, now: float):
-        """清理過期的歷史記錄"""
+    def _match_sticker(
+        self, cfg: AntiSpamConfig, history: SpamHistory, now: float
+    ) -> bool:
+        """檢查貼圖濫用"""
         try:
-            # 清理訊息歷史(保留最近 10 分鐘)
-            cutoff = now - 600  # 10 分鐘
-            self.message_history[user_id] = [
-                (t, content)
-                for t, content in self.message_history[user_id]
-                if t > cutoff
-            ]
-
-            # 清理貼圖歷史
-            self.sticker_history[user_id] = [
-                t for t in self.sticker_history[user_id] if t > cutoff
-            ]
-
-            # 如果歷史記錄為空,從字典中移除
-            if not self.message_history[user_id]:
-                del self.message_history[user_id]
-            if not self.sticker_history[user_id]:
-                del self.sticker_history[user_id]
+            count = history.count_stickers(now, cfg.spam_sticker_window)
+            return count >= cfg.spam_sticker_limit
 
         except Exception as exc:
-            logger.error(f"[反垃圾訊息]清理歷史失敗: {exc}")
+            logger.error(f"[反垃圾訊息]貼圖檢查失敗: {exc}")
+            return False
 
     # ───────── 違規處理 ─────────
-    async def _handle_violation(self, msg: discord.Message, violations: list[str]):
+    async def _handle_violation(
+        self, msg: discord.Message, cfg: AntiSpamConfig, violations: list[str]
+    ):
         """處理違規行為"""
         try:
             # 刪除違規訊息
@@ -350,35 +299,24 @@ class AntiSpam(ProtectionCog):
 
             # 記錄統計資料
             for violation in violations:
-                await self._add_stat(msg.guild.id, f"violation_{violation.lower()}")
+                self._add_stat(msg.guild.id, f"violation_{violation.lower()}")
 
             # 處理超時
-            timeout_str = await self.get_cfg(
-                msg.guild.id,
-                "spam_timeout_minutes",
-                str(DEFAULTS["spam_timeout_minutes"]),
-            )
-            timeout_minutes = int(timeout_str or DEFAULTS["spam_timeout_minutes"])
+            timeout_minutes = cfg.spam_timeout_minutes
 
             if timeout_minutes > 0 and isinstance(msg.author, discord.Member):
                 success = await self._timeout_member(msg.author, timeout_minutes)
                 if success:
-                    await self._add_stat(msg.guild.id, "timeouts")
+                    self._add_stat(msg.guild.id, "timeouts")
 
             # 發送回復訊息
-            response_enabled = await self.get_cfg(
-                msg.guild.id, "spam_response_enabled", DEFAULTS["spam_response_enabled"]
-            )
-            if response_enabled and response_enabled.lower() == "true":
-                response_message = await self.get_cfg(
-                    msg.guild.id,
-                    "spam_response_message",
-                    DEFAULTS["spam_response_message"],
+            if cfg.spam_response_enabled:
+                response = (
+                    cfg.spam_response_message or DEFAULTS["spam_response_message"]
                 )
                 with contextlib.suppress(discord.Forbidden):
                     await msg.channel.send(
-                        f"{msg.author.mention} {response_message or DEFAULTS['spam_response_message']}",
-                        delete_after=10,
+                        f"{msg.author.mention} {response}", delete_after=10
                     )
 
             # 發送管理員通知
@@ -397,10 +335,12 @@ class AntiSpam(ProtectionCog):
             if timeout_minutes > 0:
                 notify_text += f",用戶已被禁言 {timeout_minutes} 分鐘"
 
-            await self._send_notification(msg.guild, notify_text)
+            await self._send_notification(
+                msg.guild, cfg.spam_notify_channel, notify_text
+            )
 
             # 記錄操作日誌
-            await self._add_action_log(
+            self._add_action_log(
                 msg.guild.id,
                 msg.author.id,
                 "violation",
@@ -429,10 +369,11 @@ class AntiSpam(ProtectionCog):
             logger.error(f"[反垃圾訊息]超時處理失敗: {exc}")
             return False
 
-    async def _send_notification(self, guild: discord.Guild, message: str):
+    async def _send_notification(
+        self, guild: discord.Guild, notify_channel_id: str, message: str
+    ):
         """發送管理員通知"""
         try:
-            notify_channel_id = await self.get_cfg(guild.id, "spam_notify_channel", "")
             if not notify_channel_id:
                 return
 
@@ -453,22 +394,19 @@ class AntiSpam(ProtectionCog):
             logger.error(f"[反垃圾訊息]發送通知失敗: {exc}")
 
     # ───────── 統計和日誌 ─────────
-    async def _add_stat(self, guild_id: int, stat_type: str):
-        """添加統計資料"""
+    def _add_stat(self, guild_id: int, stat_type: str):
+        """添加統計資料 (寫入緩衝區, 定期寫入資料庫)"""
         try:
-            self.stats[guild_id][stat_type] += 1
-            # 同時記錄到資料庫
-            await self.db.add_stat(guild_id, stat_type)
+            self.write_buffer.add_stat(guild_id, stat_type)
         except Exception as exc:
             logger.error(f"[反垃圾訊息]添加統計失敗: {exc}")
 
-    async def _add_action_log(
-        self, guild_id: int, user_id: int, action: str, details: str
-    ):
+    def _add_action_log(self, guild_id: int, user_id: int, action: str, details: str):
         """添加操作日誌"""
         try:
+            now = dt.datetime.now()
             log_entry = {
-                "timestamp": dt.datetime.now().isoformat(),
+                "timestamp": now.isoformat(),
                 "user_id": user_id,
                 "action": action,
                 "details": details,
@@ -483,8 +421,17 @@ class AntiSpam(ProtectionCog):
                     -MAX_ACTION_LOGS:
                 ]
 
-            # 記錄到資料庫
-            await self.db.add_action_log(guild_id, user_id, action, details)
+            # 記錄到資料庫 (時間格式與 CURRENT_TIMESTAMP 相同)
+            self.write_buffer.add_row(
+                "action_log",
+                (
+                    guild_id,
+                    user_id,
+                    action,
+                    details,
+                    now.astimezone(dt.UTC).strftime("%Y-%m-%d %H:%M:%S"),
+                ),
+            )
 
         except Exception as exc:
             logger.error(f"[反垃圾訊息]添加操作日誌失敗: {exc}")
@@ -540,25 +487,15 @@ class AntiSpam(ProtectionCog):
             # 清理違規計數
             self.violate.clear()
 
-            # 清理過期的歷史記錄
+            # 清理過期的歷史記錄 (用戶歷史由時間輪在閒置後移除)
             now = time.time()
             cutoff = now - 3600  # 1 小時
+            self.history.expire(now)
 
-            for user_id in list(self.message_history.keys()):
-                self.message_history[user_id] = [
-                    (t, content)
-                    for t, content in self.message_history[user_id]
-                    if t > cutoff
-                ]
-                if not self.message_history[user_id]:
-                    del self.message_history[user_id]
-
-            for user_id in list(self.sticker_history.keys()):
-                self.sticker_history[user_id] = [
-                    t for t in self.sticker_history[user_id] if t > cutoff
-                ]
-                if not self.sticker_history[user_id]:
-                    del self.sticker_history[user_id]
+            for guild_id in list(self.raid_index.keys()):
+                self.raid_index[guild_id].prune(cutoff)
+                if not self.raid_index[guild_id]:
+                    del self.raid_index[guild_id]
 
             # 清理操作日誌(保留最近 7 天)
             cutoff_date = dt.datetime.now() - dt.timedelta(days=7)
@@ -585,18 +522,8 @@ class AntiSpam(ProtectionCog):
     async def get_stats(self, guild_id: int) -> dict[str, int]:
         """取得統計資料"""
         try:
-            # 合併內存和資料庫統計
-            memory_stats = self.stats.get(guild_id, {})
-            db_stats = await self.db.get_stats(guild_id)
-
-            # 合併統計資料
-            combined_stats = defaultdict(int)
-            for key, value in memory_stats.items():
-                combined_stats[key] += value
-            for key, value in db_stats.items():
-                combined_stats[key] += value
-
-            return dict(combined_stats)
+            # 合併資料庫統計與尚未寫入的計數
+            return await self.write_buffer.read_stats(guild_id, self.db.get_stats)
 
         except Exception as exc:
             logger.error(f"[反垃圾訊息]取得統計失敗: {exc}")
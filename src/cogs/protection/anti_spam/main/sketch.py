@@ -0,0 +1,270 @@
+"""
+反垃圾訊息近似重複偵測
+- 每則訊息在進入時轉為固定大小的 MinHash 草圖, 相似度估計只需比較草圖
+- 使用單次排列雜湊 (one permutation hashing) 與循環補值,
+  每則訊息只需對每個字元片段計算一次雜湊
+- 每個分桶只保存最小值的 8 位元 (b-bit MinHash), 草圖為 64 bytes 的 bytes,
+  估計時扣除隨機碰撞的機率
+- 跨用戶的 LSH 索引, 以分段雜湊找出多個帳號發送的近似內容 (突襲洗版)
+
+草圖只保存在記憶體中, 片段雜湊使用 Python 內建的字串雜湊,
+不同程序之間的草圖不可比較.
+"""
+
+from collections import deque
+from collections.abc import Iterator
+from operator import eq
+
+# 草圖大小 (分桶數量, 須為 2 的次方) 與字元片段長度
+SKETCH_SIZE = 64
+SHINGLE_SIZE = 2
+
+# LSH 分段: 32 段 x 每段 2 個值, 相似度閾值 0.8 (Jaccard 約 0.47) 的內容
+# 成為候選的機率約 99.9%, 閾值 0.6 (Jaccard 約 0.32) 約 97%
+LSH_BANDS = 32
+LSH_ROWS = SKETCH_SIZE // LSH_BANDS
+
+_BIN_BITS = SKETCH_SIZE.bit_length() - 1
+_BIN_MASK = SKETCH_SIZE - 1
+_HASH_MASK = (1 << 64) - 1
+_EMPTY = -1
+# 補值時依距離加上的偏移, 避免借用相同分桶的兩個空桶被誤判為一致
+_DENSIFY_OFFSET = 1 << 58
+# 取 8 位元前先以乘法雜湊混合, 使補值偏移也影響保存的位元
+_MIX = 0x9E3779B97F4A7C15
+# 兩個不相關的分桶在 8 位元下相同的機率
+_COLLISION = 1 / 256
+# 無關內容的 Dice 係數 (常見片段的偶然重疊) 多低於此轉折點,
+# 估計值在轉折點以下快速降為 0
+_KNEE = 0.4
+_KNEE_POWER = 8
+_KNEE_WEIGHT = _KNEE**_KNEE_POWER
+
+# 跨用戶比對所需的最少片段數量, 「gg」、「hi」等常見短回覆不列入突襲檢查
+RAID_MIN_SHINGLES = 8
+
+# 跨用戶查詢最多比較的候選數量, 常見片段使分桶變大時限制最壞情況
+DEFAULT_MAX_CANDIDATES = 256
+
+Sketch = bytes
+
+
+def shingles(text: str) -> set[str]:
+    """
+    將文字切為字元片段
+
+    Args:
+        text: 已標準化的文字
+
+    Returns:
+        Set[str]: 字元片段, 文字短於片段長度時為整段文字
+    """
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i : i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def has_min_shingles(text: str, minimum: int = RAID_MIN_SHINGLES) -> bool:
+    """
+    檢查文字是否有足夠的不同字元片段
+
+    Args:
+        text: 已標準化的文字
+        minimum: 最少片段數量
+
+    Returns:
+        bool: 不同片段數量是否達到 minimum
+    """
+    if len(text) - SHINGLE_SIZE + 1 < minimum:
+        return False
+    return len(shingles(text)) >= minimum
+
+
+def minhash(text: str) -> Sketch | None:
+    """
+    計算文字的 MinHash 草圖
+
+    每個片段雜湊一次, 低位元決定分桶, 其餘位元取各分桶的最小值;
+    空分桶向右借用最近的非空分桶並加上距離偏移.
+
+    Args:
+        text: 已標準化的文字
+
+    Returns:
+        Optional[Sketch]: 草圖, 文字為空時為 None
+    """
+    pieces = shingles(text)
+    if not pieces:
+        return None
+
+    bins = [_EMPTY] * SKETCH_SIZE
+    for piece in pieces:
+        value = hash(piece) & _HASH_MASK
+        index = value & _BIN_MASK
+        value >>= _BIN_BITS
+        current = bins[index]
+        if current == _EMPTY or value < current:
+            bins[index] = value
+
+    if _EMPTY in bins:
+        filled = bins[:]
+        for index in range(SKETCH_SIZE):
+            if bins[index] != _EMPTY:
+                continue
+            distance = 1
+            while bins[(index + distance) & _BIN_MASK] == _EMPTY:
+                distance += 1
+            borrowed = bins[(index + distance) & _BIN_MASK]
+            filled[index] = borrowed + distance * _DENSIFY_OFFSET
+        bins = filled
+
+    return bytes(((value * _MIX) & _HASH_MASK) >> 56 for value in bins)
+
+
+def jaccard(a: Sketch, b: Sketch) -> float:
+    """
+    以草圖估計 Jaccard 相似度
+
+    Args:
+        a: 草圖
+        b: 草圖
+
+    Returns:
+        float: 0-1 之間的估計值
+    """
+    matches = sum(map(eq, a, b)) / SKETCH_SIZE
+    return max(0.0, (matches - _COLLISION) / (1 - _COLLISION))
+
+
+def similarity(a: Sketch, b: Sketch) -> float:
+    """
+    以草圖估計相似度
+
+    先轉為 Dice 係數 D = 2J / (1 + J), 再換算為與 SequenceMatcher.ratio()
+    相近的尺度, 沿用原本的相似度閾值設定:
+    - 近似內容每個字元修改約影響 SHINGLE_SIZE 個片段,
+      因此 ratio ≈ 1 - (1 - D) / SHINGLE_SIZE
+    - 無關內容只共用常見片段, SequenceMatcher 的分數約 0.2,
+      D 低於 _KNEE 時以 D^p / (D^p + K^p) 壓低估計值
+
+    Args:
+        a: 草圖
+        b: 草圖
+
+    Returns:
+        float: 0-1 之間的估計值
+    """
+    estimate = jaccard(a, b)
+    dice = 2 * estimate / (1 + estimate)
+    ratio = 1 - (1 - dice) / SHINGLE_SIZE
+    weight = dice**_KNEE_POWER / (dice**_KNEE_POWER + _KNEE_WEIGHT)
+    return ratio * weight * (1 + _KNEE_WEIGHT)
+
+
+def band_keys(sketch: Sketch) -> Iterator[tuple[int, bytes]]:
+    """
+    草圖的 LSH 分段鍵
+
+    Args:
+        sketch: 草圖
+
+    Yields:
+        Tuple[int, bytes]: (分段編號, 分段內容)
+    """
+    for band in range(LSH_BANDS):
+        start = band * LSH_ROWS
+        yield band, sketch[start : start + LSH_ROWS]
+
+
+class NearDuplicateIndex:
+    """
+    單一伺服器的跨用戶近似重複索引
+
+    以 LSH 分段將草圖放入分桶, 查詢只比較共用至少一個分段的訊息,
+    由最新的條目開始比較, 突襲通常集中在最近的訊息.
+    條目依時間加入, 過期條目自最舊的一端移除, 分桶清空後一併刪除.
+    """
+
+    def __init__(self):
+        """初始化索引"""
+        self._buckets: dict[tuple[int, bytes], deque[tuple[float, int, Sketch]]] = {}
+        self._order: deque[tuple[float, list[tuple[int, bytes]]]] = deque()
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def add(self, now: float, user_id: int, sketch: Sketch):
+        """
+        加入訊息草圖
+
+        Args:
+            now: 訊息時間
+            user_id: 發送者 ID
+            sketch: 草圖
+        """
+        keys = list(band_keys(sketch))
+        entry = (now, user_id, sketch)
+        for key in keys:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = deque()
+            bucket.append(entry)
+        self._order.append((now, keys))
+
+    def prune(self, cutoff: float):
+        """
+        移除早於 cutoff 的條目
+
+        Args:
+            cutoff: 保留的最早時間
+        """
+        order = self._order
+        buckets = self._buckets
+        while order and order[0][0] < cutoff:
+            _, keys = order.popleft()
+            for key in keys:
+                bucket = buckets.get(key)
+                if bucket is None:
+                    continue
+                while bucket and bucket[0][0] < cutoff:
+                    bucket.popleft()
+                if not bucket:
+                    del buckets[key]
+
+    def similar_users(
+        self,
+        sketch: Sketch,
+        threshold: float,
+        limit: int | None = None,
+        max_candidates: int = DEFAULT_MAX_CANDIDATES,
+    ) -> set[int]:
+        """
+        找出發送過近似內容的用戶
+
+        Args:
+            sketch: 草圖
+            threshold: 相似度閾值
+            limit: 找到此數量的用戶後提前結束
+            max_candidates: 最多比較的候選數量
+
+        Returns:
+            Set[int]: 用戶 ID
+        """
+        users: set[int] = set()
+        checked: set[int] = set()
+        for key in band_keys(sketch):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                continue
+            for entry in reversed(bucket):
+                _, user_id, candidate = entry
+                if user_id in users or id(entry) in checked:
+                    continue
+                if len(checked) >= max_candidates:
+                    return users
+                checked.add(id(entry))
+                if similarity(sketch, candidate) >= threshold:
+                    users.add(user_id)
+                    if limit is not None and len(users) >= limit:
+                        return users
+        return users
@@ -174,12 +174,14 @@ def _format_config_value(key: str, value: str, guild: discord.Guild) -> str:
             "spam_freq_limit",
             "spam_identical_limit",
             "spam_similar_limit",
+            "spam_raid_limit",
             "spam_sticker_limit",
         ]
         window_keys = [
             "spam_freq_window",
             "spam_identical_window",
             "spam_similar_window",
+            "spam_raid_window",
             "spam_sticker_window",
         ]
 
@@ -0,0 +1,534 @@
+"""
+反垃圾訊息相似度檢測性能基準測試
+- 在合成的訊息歷史上比較原本的兩兩 SequenceMatcher 與 MinHash 草圖
+- 以 SequenceMatcher 的判定為基準, 計算草圖在各相似度閾值下的召回率與精確率
+- 測量跨用戶近似內容索引在大量訊息下的查詢耗時
+- 比較原本以列表保存的用戶歷史與環形緩衝區的每則訊息成本及記憶體用量
+"""
+
+import logging
+import random
+import string
+import time
+import tracemalloc
+from collections import defaultdict
+from difflib import SequenceMatcher
+from typing import Any
+
+from ....core.message_features import normalize_content
+from ..config.config import DEFAULTS
+from ..main.history import SpamHistoryStore
+from ..main.sketch import (
+    NearDuplicateIndex,
+    Sketch,
+    has_min_shingles,
+    minhash,
+    similarity,
+)
+
+logger = logging.getLogger("anti_spam")
+
+# 合成訊息常見的洗版詞彙, 其餘詞彙隨機生成
+_SPAM_WORDS = ["free", "nitro", "giveaway", "click", "gift", "免費", "領取", "限時"]
+
+# 相似度閾值掃描範圍, 對應設定面板可調整的常用區間
+SWEEP_THRESHOLDS = (0.6, 0.7, 0.8, 0.9)
+
+
+class SimilarityBenchmark:
+    """
+    相似度檢測基準測試
+
+    生成多組「原文 + 小幅改寫」的訊息, 模擬用戶在窗口內的訊息歷史,
+    分別以原本的兩兩比較與草圖比較判定相似訊息.
+    """
+
+    def __init__(self, seed: int = 42, threshold: float | None = None):
+        """
+        初始化基準測試
+
+        Args:
+            seed: 隨機種子
+            threshold: 相似度閾值, 預設沿用設定的預設值
+        """
+        self.random = random.Random(seed)
+        self.threshold = (
+            threshold if threshold is not None else DEFAULTS["spam_similar_threshold"]
+        )
+        self.vocabulary = _SPAM_WORDS + [
+            "".join(self.random.choices(string.ascii_lowercase, k=length))
+            for length in self.random.choices(range(2, 9), k=2000)
+        ]
+
+    def random_message(self, length: int) -> str:
+        """生成約 length 個詞的訊息"""
+        return " ".join(self.random.choices(self.vocabulary, k=length))
+
+    def mutate(self, text: str, rate: float) -> str:
+        """以 rate 的比例隨機替換、刪除或插入字元"""
+        chars = list(text)
+        edits = max(1, int(len(chars) * rate))
+        for _ in range(edits):
+            position = self.random.randrange(len(chars))
+            operation = self.random.random()
+            if operation < 0.4:
+                chars[position] = self.random.choice(string.ascii_lowercase)
+            elif operation < 0.7 and len(chars) > 1:
+                del chars[position]
+            else:
+                chars.insert(position, self.random.choice(string.ascii_lowercase))
+        return "".join(chars)
+
+    def generate_windows(
+        self, count: int, window_size: int, words: int = 12
+    ) -> list[list[str]]:
+        """
+        生成訊息窗口, 每個窗口混合近似重複與無關訊息
+
+        Args:
+            count: 窗口數量
+            window_size: 每個窗口的訊息數量
+            words: 每則訊息的詞數
+
+        Returns:
+            List[List[str]]: 已標準化的訊息窗口
+        """
+        windows = []
+        for _ in range(count):
+            base = self.random_message(words)
+            window = []
+            for _ in range(window_size):
+                kind = self.random.random()
+                if kind < 0.5:
+                    text = self.mutate(base, self.random.uniform(0.0, 0.15))
+                elif kind < 0.7:
+                    text = self.mutate(base, self.random.uniform(0.15, 0.4))
+                else:
+                    text = self.random_message(words)
+                window.append(normalize_content(text))
+            windows.append(window)
+        return windows
+
+    @staticmethod
+    def legacy_pairs(window: list[str], threshold: float) -> set[tuple[int, int]]:
+        """原本的方式: 兩兩計算 SequenceMatcher 相似度"""
+        pairs = set()
+        for i in range(len(window)):
+            for j in range(i + 1, len(window)):
+                if SequenceMatcher(None, window[i], window[j]).ratio() >= threshold:
+                    pairs.add((i, j))
+        return pairs
+
+    @staticmethod
+    def sketch_pairs(
+        sketches: list[Sketch | None], threshold: float
+    ) -> set[tuple[int, int]]:
+        """以草圖估計相似度的兩兩判定 (用於計算召回率)"""
+        pairs = set()
+        for i in range(len(sketches)):
+            for j in range(i + 1, len(sketches)):
+                a, b = sketches[i], sketches[j]
+                if a and b and similarity(a, b) >= threshold:
+                    pairs.add((i, j))
+        return pairs
+
+    def benchmark_accuracy(
+        self, windows: list[list[str]], threshold: float | None = None
+    ) -> dict[str, Any]:
+        """
+        以 SequenceMatcher 的判定為基準, 計算草圖的召回率與誤判率
+
+        Args:
+            windows: 訊息窗口
+            threshold: 相似度閾值, 預設為 self.threshold
+
+        Returns:
+            Dict[str, Any]: 測試結果
+        """
+        threshold = self.threshold if threshold is None else threshold
+        true_positive = false_positive = false_negative = 0
+        for window in windows:
+            expected = self.legacy_pairs(window, threshold)
+            actual = self.sketch_pairs([minhash(text) for text in window], threshold)
+            true_positive += len(expected & actual)
+            false_positive += len(actual - expected)
+            false_negative += len(expected - actual)
+
+        positives = true_positive + false_negative
+        flagged = true_positive + false_positive
+        return {
+            "threshold": threshold,
+            "pairs": positives,
+            "recall": true_positive / positives if positives else 1.0,
+            "precision": true_positive / flagged if flagged else 1.0,
+            "false_positive": false_positive,
+            "false_negative": false_negative,
+        }
+
+    def benchmark_threshold_sweep(
+        self,
+        windows: list[list[str]],
+        thresholds: tuple[float, ...] = SWEEP_THRESHOLDS,
+    ) -> list[dict[str, Any]]:
+        """
+        在可設定的閾值範圍內計算草圖的召回率與精確率
+
+        Args:
+            windows: 訊息窗口
+            thresholds: 要測試的相似度閾值
+
+        Returns:
+            List[Dict[str, Any]]: 每個閾值的 benchmark_accuracy 結果
+        """
+        return [self.benchmark_accuracy(windows, threshold) for threshold in thresholds]
+
+    def benchmark_latency(
+        self, windows: list[list[str]], limit: int = 10**9
+    ) -> dict[str, Any]:
+        """
+        比較每則新訊息的檢查耗時
+
+        原本的方式每則訊息對窗口內所有訊息兩兩比較; 草圖方式計算新訊息的草圖,
+        再與窗口內已保存的草圖逐一比較. limit 預設不提前結束, 測量最壞情況.
+
+        Args:
+            windows: 訊息窗口
+            limit: 相似訊息限制
+
+        Returns:
+            Dict[str, Any]: 測試結果
+        """
+        threshold = self.threshold
+
+        start = time.perf_counter()
+        for window in windows:
+            similar_count = 0
+            for i in range(len(window)):
+                for j in range(i + 1, len(window)):
+                    if SequenceMatcher(None, window[i], window[j]).ratio() >= threshold:
+                        similar_count += 1
+                        if similar_count >= limit:
+                            break
+        legacy_time = time.perf_counter() - start
+
+        stored = [[minhash(text) for text in window[:-1]] for window in windows]
+        start = time.perf_counter()
+        for window, previous in zip(windows, stored, strict=True):
+            sketch = minhash(window[-1])
+            similar_count = 1
+            for other in previous:
+                if sketch and other and similarity(sketch, other) >= threshold:
+                    similar_count += 1
+                    if similar_count >= limit:
+                        break
+        sketch_time = time.perf_counter() - start
+
+        per_message = len(windows) or 1
+        return {
+            "messages": len(windows),
+            "window_size": len(windows[0]) if windows else 0,
+            "legacy_ms": legacy_time / per_message * 1000,
+            "sketch_ms": sketch_time / per_message * 1000,
+            "improvement_ratio": legacy_time / sketch_time if sketch_time > 0 else 0.0,
+        }
+
+    def benchmark_raid_index(
+        self,
+        accounts: int = 2000,
+        waves: int = 20,
+        limit: int = 5,
+        rate: float = 20.0,
+        window: float | None = None,
+    ) -> dict[str, Any]:
+        """
+        模擬多波突襲: 每波由多個帳號發送同一原文的改寫, 混合一般訊息
+
+        Args:
+            accounts: 帳號 (訊息) 數量
+            waves: 突襲波數
+            limit: 突襲限制
+            rate: 每秒訊息數
+            window: 突襲窗口(秒), 預設沿用設定的預設值
+
+        Returns:
+            Dict[str, Any]: 測試結果
+        """
+        bases = [self.random_message(12) for _ in range(waves)]
+        messages = []
+        for account in range(accounts):
+            if self.random.random() < 0.6:
+                text = self.mutate(self.random.choice(bases), 0.05)
+            else:
+                text = self.random_message(12)
+            normalized = normalize_content(text)
+            if has_min_shingles(normalized):
+                messages.append((account, minhash(normalized)))
+
+        if window is None:
+            window = DEFAULTS["spam_raid_window"]
+        index = NearDuplicateIndex()
+        flagged = 0
+        peak_entries = 0
+        start = time.perf_counter()
+        for position, (user_id, sketch) in enumerate(messages):
+            if sketch is None:
+                continue
+            now = position / rate
+            index.prune(now - window)
+            users = index.similar_users(sketch, self.threshold, limit)
+            users.add(user_id)
+            index.add(now, user_id, sketch)
+            flagged += len(users) >= limit
+            peak_entries = max(peak_entries, len(index))
+        elapsed = time.perf_counter() - start
+
+        return {
+            "messages": len(messages),
+            "waves": waves,
+            "peak_entries": peak_entries,
+            "flagged": flagged,
+            "query_us": elapsed / (len(messages) or 1) * 1_000_000,
+        }
+
+    def generate_report(
+        self,
+        sweep: list[dict[str, Any]],
+        latency: dict[str, Any],
+        raid: dict[str, Any],
+    ) -> str:
+        """
+        生成相似度檢測基準測試報告
+
+        Args:
+            sweep: benchmark_threshold_sweep 的結果
+            latency: benchmark_latency 的結果
+            raid: benchmark_raid_index 的結果
+
+        Returns:
+            str: 格式化的報告文字
+        """
+        report_lines = [
+            "=" * 60,
+            "反垃圾訊息相似度檢測性能基準測試報告 (SequenceMatcher vs MinHash)",
+            "=" * 60,
+            "",
+            f"預設相似度閾值: {self.threshold}",
+        ]
+        for accuracy in sweep:
+            report_lines.append(
+                f"閾值 {accuracy['threshold']:.1f}: "
+                f"相似訊息對 {accuracy['pairs']:>4} / "
+                f"召回率 {accuracy['recall']:.1%} / "
+                f"精確率 {accuracy['precision']:.1%} / "
+                f"漏判 {accuracy['false_negative']} / "
+                f"誤判 {accuracy['false_positive']}"
+            )
+        report_lines += [
+            "",
+            f"窗口訊息數: {latency['window_size']}",
+            f"原本方式每則訊息: {latency['legacy_ms']:.3f} ms",
+            f"草圖方式每則訊息: {latency['sketch_ms']:.3f} ms",
+            f"改善倍數: {latency['improvement_ratio']:.1f}x",
+            "",
+            f"跨用戶索引訊息數: {raid['messages']} ({raid['waves']} 波突襲)",
+            f"窗口內最多訊息數: {raid['peak_entries']}",
+            f"判定為突襲: {raid['flagged']}",
+            f"每次查詢: {raid['query_us']:.1f} µs",
+            "",
+        ]
+        return "\n".join(report_lines)
+
+
+def run_similarity_benchmark(window_count: int = 200, window_size: int = 20) -> str:
+    """
+    執行相似度檢測基準測試
+
+    Args:
+        window_count: 訊息窗口數量
+        window_size: 每個窗口的訊息數量
+
+    Returns:
+        str: 測試報告
+    """
+    benchmark = SimilarityBenchmark()
+    windows = benchmark.generate_windows(window_count, window_size)
+
+    report = benchmark.generate_report(
+        benchmark.benchmark_threshold_sweep(windows),
+        benchmark.benchmark_latency(windows),
+        benchmark.benchmark_raid_index(),
+    )
+    logger.info(f"\n{report}")
+    return report
+
+
+class HistoryBenchmark:
+    """
+    用戶歷史基準測試
+
+    原本的方式每則訊息以列表推導式重建歷史並重新篩選各窗口;
+    環形緩衝區只移動窗口起點, 每則訊息的成本與歷史長度無關.
+    """
+
+    def __init__(self, seed: int = 42):
+        """
+        初始化基準測試
+
+        Args:
+            seed: 隨機種子
+        """
+        self.random = random.Random(seed)
+        self.freq_window = DEFAULTS["spam_freq_window"]
+        self.identical_window = DEFAULTS["spam_identical_window"]
+
+    @staticmethod
+    def legacy_message(history: list, now: float, content_hash: str, window: float):
+        """原本的方式: 加入、清理 10 分鐘前的歷史, 再篩選頻率與重複窗口"""
+        history.append((now, content_hash))
+        history[:] = [entry for entry in history if entry[0] > now - 600]
+        recent = [t for t, _ in history if now - t <= window]
+        counts: dict[str, int] = defaultdict(int)
+        for t, other in history:
+            if now - t <= window:
+                counts[other] += 1
+        return len(recent), counts[content_hash]
+
+    def benchmark_message_cost(
+        self, history_length: int, messages: int = 2000
+    ) -> dict[str, Any]:
+        """
+        在單一用戶已有 history_length 則近期訊息時, 測量每則新訊息的成本
+
+        Args:
+            history_length: 10 分鐘內的既有訊息數量
+            messages: 測量的訊息數量
+
+        Returns:
+            Dict[str, Any]: 測試結果
+        """
+        # 訊息平均分布, 10 分鐘內保持約 history_length 則
+        spacing = 600 / max(history_length, 1)
+        legacy: list = [(index * spacing, "old") for index in range(history_length)]
+        store = SpamHistoryStore()
+        ring = store.get(1, 1, 0.0)
+        for index in range(history_length):
+            ring.add_message(index * spacing, "old", None)
+
+        base = 600.0
+        start = time.perf_counter()
+        for index in range(messages):
+            now = base + index * spacing
+            self.legacy_message(legacy, now, "new", self.freq_window)
+        legacy_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for index in range(messages):
+            now = base + index * spacing
+            ring.add_message(now, "new", None)
+            ring.count_recent(now, self.freq_window)
+            ring.count_identical(now, self.identical_window, "new")
+        ring_time = time.perf_counter() - start
+
+        return {
+            "history_length": history_length,
+            "legacy_us": legacy_time / messages * 1_000_000,
+            "ring_us": ring_time / messages * 1_000_000,
+        }
+
+    def measure_memory(self, users: int = 100_000, messages: int = 3) -> dict[str, Any]:
+        """
+        測量 users 個活躍用戶各有 messages 則訊息時的記憶體用量
+
+        Args:
+            users: 用戶數量
+            messages: 每個用戶的訊息數量
+
+        Returns:
+            Dict[str, Any]: 總位元組與每個用戶的位元組
+        """
+        sketch = minhash(normalize_content(self.random_message()))
+        hashes = [f"{index:016x}" for index in range(messages)]
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        store = SpamHistoryStore()
+        for user_id in range(users):
+            history = store.get(1, 10**17 + user_id, 0.0)
+            for index in range(messages):
+                history.add_message(float(index), hashes[index], sketch)
+        used = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+
+        # 閒置後全部移除
+        removed = store.expire(store.idle_ttl + messages + 60)
+        return {
+            "users": users,
+            "bytes": used,
+            "bytes_per_user": used / users,
+            "expired": removed,
+        }
+
+    def random_message(self) -> str:
+        """生成一則訊息"""
+        return " ".join(
+            "".join(self.random.choices(string.ascii_lowercase, k=5)) for _ in range(8)
+        )
+
+    def generate_report(
+        self, costs: list[dict[str, Any]], memory: dict[str, Any]
+    ) -> str:
+        """
+        生成用戶歷史基準測試報告
+
+        Args:
+            costs: benchmark_message_cost 的結果
+            memory: measure_memory 的結果
+
+        Returns:
+            str: 格式化的報告文字
+        """
+        report_lines = [
+            "=" * 60,
+            "反垃圾訊息用戶歷史性能基準測試報告 (列表 vs 環形緩衝區)",
+            "=" * 60,
+            "",
+        ]
+        for cost in costs:
+            report_lines.append(
+                f"既有訊息 {cost['history_length']:>5} 則: "
+                f"原本方式 {cost['legacy_us']:.2f} µs / 環形緩衝區 "
+                f"{cost['ring_us']:.2f} µs"
+            )
+        report_lines += [
+            "",
+            f"活躍用戶: {memory['users']}",
+            f"歷史記憶體: {memory['bytes'] / 1024 / 1024:.1f} MiB "
+            f"({memory['bytes_per_user']:.0f} bytes/用戶)",
+            f"閒置後移除: {memory['expired']}",
+            "",
+        ]
+        return "\n".join(report_lines)
+
+
+def run_history_benchmark(users: int = 100_000) -> str:
+    """
+    執行用戶歷史基準測試
+
+    Args:
+        users: 測量記憶體時的活躍用戶數量
+
+    Returns:
+        str: 測試報告
+    """
+    benchmark = HistoryBenchmark()
+    costs = [benchmark.benchmark_message_cost(length) for length in (10, 100, 1000)]
+
+    report = benchmark.generate_report(costs, benchmark.measure_memory(users))
+    logger.info(f"\n{report}")
+    return report
+
+
+if __name__ == "__main__":
+    # 直接執行基準測試
+    print(run_similarity_benchmark())
+    print(run_history_benchmark())
@@ -12,7 +12,9 @@ import contextlib
 import datetime as dt
 import logging
 import logging.handlers
+import time
 import traceback
+from collections.abc import Hashable
 
 # ────────────────────────────
 # 日誌配置
@@ -23,6 +25,8 @@ from discord.ext import commands
 
 from src.core.config import get_settings
 
+from .config_snapshot import ConfigSnapshot
+
 # 使用配置系統獲取正確的日誌路徑
 _settings = get_settings()
 LOG_PATH = _settings.get_log_file_path("protection")
@@ -41,6 +45,9 @@ if not logger.hasHandlers():
     logger.addHandler(_log_handler)
     logger.addHandler(logging.StreamHandler())
 
+# 配置快照多久向資料庫確認一次版本(秒), 其他程序的修改最遲在此時間後生效
+CFG_RECHECK_INTERVAL = 30.0
+
 
 def friendly_trace(exc: BaseException, depth: int = 3) -> str:
     """生成友善的錯誤追蹤資訊
@@ -115,14 +122,16 @@ class ProtectionCog(commands.Cog):
 
     提供以下功能:
     - 資料庫配置管理(get_cfg / set_cfg)
+    - 具型別的配置快照(get_cfg_snapshot)
     - 日誌記錄(log)
     - 權限檢查
     - 快取機制
 
-    子類別需要覆寫 module_name 屬性
+    子類別需要覆寫 module_name 屬性, 使用配置快照時覆寫 config_class
     """
 
     module_name: str = "base"
+    config_class: type[ConfigSnapshot] = ConfigSnapshot
 
     def __init__(self, bot: commands.Bot):
         """初始化保護模組
@@ -132,6 +141,10 @@ class ProtectionCog(commands.Cog):
         """
         self.bot = bot
         self._cache: dict[int, dict[str, str]] = {}  # 配置快取
+        self._snapshots: dict[int, ConfigSnapshot] = {}  # 配置快照
+        self._snapshot_versions: dict[int, Hashable] = {}  # 快照建立時的配置版本
+        self._snapshot_checks: dict[int, float] = {}  # 下次確認版本的時間
+        self._cfg_epoch = 0  # 本程序清除快照的次數
 
     # ───────── 資料庫操作 ─────────
     async def _ensure_table(self):
@@ -144,9 +157,37 @@ class ProtectionCog(commands.Cog):
             value    TEXT,
             PRIMARY KEY (guild_id, module, key)
         );"""
+        version_sql = """
+        CREATE TABLE IF NOT EXISTS protection_config_version(
+            guild_id INTEGER,
+            module   TEXT,
+            version  INTEGER,
+            PRIMARY KEY (guild_id, module)
+        );"""
         database = getattr(self.bot, "database", None)
         if database:
             await database.execute(sql)
+            await database.execute(version_sql)
+
+    async def _load_cfg(self, gid: int) -> dict[str, str]:
+        """讀取伺服器的原始配置
+
+        Args:
+            gid: 伺服器 ID
+
+        Returns:
+            配置鍵名與字串值
+        """
+        await self._ensure_table()
+        database = getattr(self.bot, "database", None)
+        if not database:
+            # 沒有資料庫時配置只保存在記憶體
+            return self._cache.get(gid, {})
+        rows = await database.fetchall(
+            "SELECT key,value FROM protection_config WHERE guild_id=? AND module=?",
+            (gid, self.module_name),
+        )
+        return {r["key"]: r["value"] for r in rows}
 
     async def get_cfg(
         self, gid: int, key: str, default: str | None = None
@@ -162,16 +203,7 @@ class ProtectionCog(commands.Cog):
             配置值或預設值
         """
         if gid not in self._cache:
-            await self._ensure_table()
-            database = getattr(self.bot, "database", None)
-            if database:
-                rows = await database.fetchall(
-                    "SELECT key,value FROM protection_config WHERE guild_id=? AND module=?",
-                    (gid, self.module_name),
-                )
-                self._cache[gid] = {r["key"]: r["value"] for r in rows}
-            else:
-                self._cache[gid] = {}
+            self._cache[gid] = await self._load_cfg(gid)
         return self._cache[gid].get(key, default)
 
     async def set_cfg(self, gid: int, key: str, value: str):
@@ -189,7 +221,109 @@ class ProtectionCog(commands.Cog):
                 "INSERT OR REPLACE INTO protection_config VALUES (?,?,?,?)",
                 (gid, self.module_name, key, value),
             )
-        self._cache.setdefault(gid, {})[key] = value
+            # 資料庫為準, 下次使用時重新載入(一併取得其他程序的修改)
+            self._cache.pop(gid, None)
+        else:
+            self._cache.setdefault(gid, {})[key] = value
+        await self.mark_cfg_changed(gid)
+
+    # ───────── 配置快照 ─────────
+    async def get_cfg_snapshot(self, gid: int) -> ConfigSnapshot:
+        """取得伺服器的配置快照
+
+        第一次使用時建立; 之後每 CFG_RECHECK_INTERVAL 秒確認一次資料庫中的
+        配置版本, 版本改變(其他程序寫入)時重新載入.
+
+        Args:
+            gid: 伺服器 ID
+
+        Returns:
+            配置快照(config_class 實例)
+        """
+        snapshot = self._snapshots.get(gid)
+        if snapshot is not None and time.monotonic() < self._snapshot_checks[gid]:
+            return snapshot
+        return await self._refresh_snapshot(gid, snapshot)
+
+    async def _refresh_snapshot(
+        self, gid: int, snapshot: ConfigSnapshot | None
+    ) -> ConfigSnapshot:
+        """確認配置版本, 必要時重建快照"""
+        # 先延後下次確認的時間, 同時到達的訊息沿用目前的快照
+        self._snapshot_checks[gid] = time.monotonic() + CFG_RECHECK_INTERVAL
+        epoch = self._cfg_epoch
+        try:
+            version = await self._fetch_cfg_version(gid)
+        except Exception as exc:
+            friendly_log(f"讀取配置版本失敗(伺服器:{gid})", exc, logging.WARNING)
+            version = None
+        if snapshot is not None and version == self._snapshot_versions.get(gid):
+            return snapshot
+
+        # 重建時一律重新讀取, 原始配置快取可能早於其他程序的修改
+        raw = await self._load_cfg(gid)
+        snapshot = self.config_class.from_raw(raw)
+        # 載入期間本程序寫入過配置時不保存, 避免覆蓋較新的配置
+        if epoch == self._cfg_epoch:
+            self._cache[gid] = raw
+            self._snapshots[gid] = snapshot
+            self._snapshot_versions[gid] = version
+        return snapshot
+
+    async def _fetch_cfg_version(self, gid: int) -> Hashable:
+        """讀取伺服器配置版本, 子類別使用其他配置來源時覆寫
+
+        Args:
+            gid: 伺服器 ID
+
+        Returns:
+            可比較的版本值
+        """
+        database = getattr(self.bot, "database", None)
+        if not database:
+            return 0
+        await self._ensure_table()
+        rows = await database.fetchall(
+            "SELECT version FROM protection_config_version "
+            "WHERE guild_id=? AND module=?",
+            (gid, self.module_name),
+        )
+        return rows[0]["version"] if rows else 0
+
+    async def mark_cfg_changed(self, gid: int):
+        """配置寫入後呼叫: 遞增資料庫中的配置版本並清除本程序的快照
+
+        其他共用資料庫的程序在下次確認版本時重新載入.
+
+        Args:
+            gid: 伺服器 ID
+        """
+        database = getattr(self.bot, "database", None)
+        if database:
+            await database.execute(
+                "INSERT INTO protection_config_version VALUES (?,?,1) "
+                "ON CONFLICT(guild_id, module) DO UPDATE SET version=version+1",
+                (gid, self.module_name),
+            )
+        self.invalidate_cfg(gid)
+
+    def invalidate_cfg(self, gid: int | None = None):
+        """清除本程序的配置快照, 下次使用時重建
+
+        原始配置快取(_cache)由寫入配置的一方負責更新或清除.
+
+        Args:
+            gid: 伺服器 ID, 為 None 時清除全部
+        """
+        self._cfg_epoch += 1
+        if gid is None:
+            self._snapshots.clear()
+            self._snapshot_versions.clear()
+            self._snapshot_checks.clear()
+        else:
+            self._snapshots.pop(gid, None)
+            self._snapshot_versions.pop(gid, None)
+            self._snapshot_checks.pop(gid, None)
 
     # ───────── 日誌記錄 ─────────
     async def log(self, guild: discord.Guild, msg: str):
@@ -0,0 +1,75 @@
+"""
+群組保護模組配置快照
+- 將伺服器的字串配置一次解析為具型別的唯讀物件, 訊息熱路徑只讀取屬性
+- 欄位名稱即配置鍵名, 欄位型別決定解析方式, 缺少或無法解析的值使用欄位預設值
+- 快照由 ProtectionCog 依伺服器快取, 寫入配置或配置版本改變時重建
+"""
+
+import dataclasses
+from collections.abc import Callable, Mapping
+from functools import cache
+from typing import Any, Self
+
+
+def parse_bool(value: str) -> bool:
+    """
+    解析布林配置值, 與原本的 value.lower() == "true" 判斷一致
+
+    Args:
+        value: 配置值
+
+    Returns:
+        bool: 是否為 true
+    """
+    return value.strip().lower() == "true"
+
+
+# 欄位型別對應的解析函數, 未列出的型別保留原始字串
+_PARSERS: dict[Any, Callable[[str], Any]] = {
+    bool: parse_bool,
+    int: int,
+    float: float,
+    str: str,
+}
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class ConfigSnapshot:
+    """
+    伺服器配置快照的基礎類別
+
+    子類別以 @dataclass(frozen=True, slots=True) 宣告欄位, 欄位名稱須與
+    配置鍵名相同.
+    """
+
+    enabled: bool = True
+
+    @classmethod
+    def from_raw(cls, raw: Mapping[str, str | None]) -> Self:
+        """
+        由資料庫的原始配置建立快照
+
+        Args:
+            raw: 配置鍵名與字串值
+
+        Returns:
+            ConfigSnapshot: 快照
+        """
+        values: dict[str, Any] = {}
+        for name, parser in _field_parsers(cls):
+            value = raw.get(name)
+            if value is None:
+                continue
+            try:
+                values[name] = parser(value)
+            except (TypeError, ValueError):
+                continue
+        return cls(**values)
+
+
+@cache
+def _field_parsers(cls: type[ConfigSnapshot]) -> tuple[tuple[str, Callable], ...]:
+    """快照類別各欄位的名稱與解析函數"""
+    return tuple(
+        (field.name, _PARSERS.get(field.type, str)) for field in dataclasses.fields(cls)
+    )
@@ -0,0 +1,325 @@
+"""
+群組保護模組寫入緩衝
+- 違規統計在記憶體中依 (伺服器, 統計類型) 累加, 操作日誌依種類放入緩衝區
+- 背景定時沖刷, 或在待寫入日誌達到門檻時立即沖刷, 每次一批寫入資料庫
+- 統計查詢等待進行中的沖刷完成後, 合併資料庫數值與尚未寫入的計數, 違規後立即可讀
+- 沖刷失敗時將資料放回緩衝區, 下次重試; 待寫入日誌有上限, 超過時捨棄最舊的
+"""
+
+import asyncio
+import contextlib
+import logging
+from collections import deque
+from collections.abc import Awaitable, Callable, Mapping
+from typing import Any, Protocol
+
+logger = logging.getLogger("protection")
+
+# 定時沖刷間隔(秒)
+FLUSH_INTERVAL = 2.0
+# 待寫入日誌達到此數量時立即沖刷
+FLUSH_THRESHOLD = 5_000
+# 每種日誌最多保留的待寫入筆數
+MAX_PENDING_ROWS = 20_000
+
+# (伺服器ID, 統計類型, 增加數量)
+StatRow = tuple[int, str, int]
+
+
+class BatchWriter(Protocol):
+    """
+    以一批寫入統計與日誌的資料庫介面
+
+    失敗時拋出例外. 無法在單一交易中寫入的實作須將已提交的資料自 stats
+    與 rows 的列表前端移除, 寫入緩衝區只放回列表中剩餘的資料.
+    """
+
+    async def write_batch(
+        self, stats: list[StatRow], rows: dict[str, list[tuple]]
+    ) -> None: ...
+
+
+async def drain_chunks(
+    items: list[Any], size: int, write: Callable[[list[Any]], Awaitable[Any]]
+) -> None:
+    """
+    依固定大小分段寫入, 每段寫入成功後自列表前端移除
+
+    寫入失敗時列表只剩尚未寫入的部分.
+
+    Args:
+        items: 待寫入的列表 (原地移除)
+        size: 每段大小
+        write: 寫入一段的函數
+    """
+    while items:
+        chunk = items[:size]
+        await write(chunk)
+        del items[: len(chunk)]
+
+
+class ProtectionWriteBuffer:
+    """
+    保護模組統計與日誌寫入緩衝區
+
+    記錄方法皆為同步操作, 偵測流程不需等待資料庫; 由 db.write_batch
+    決定如何在一個交易中寫入整批資料.
+    """
+
+    def __init__(
+        self,
+        db: BatchWriter,
+        module_name: str,
+        flush_interval: float = FLUSH_INTERVAL,
+        flush_threshold: int = FLUSH_THRESHOLD,
+        max_rows: int = MAX_PENDING_ROWS,
+    ):
+        """
+        初始化寫入緩衝區
+
+        Args:
+            db: 提供 write_batch 的資料庫實例
+            module_name: 模組名稱 (用於日誌)
+            flush_interval: 定時沖刷間隔(秒)
+            flush_threshold: 觸發立即沖刷的待寫入日誌數
+            max_rows: 每種日誌最多保留的待寫入筆數
+        """
+        self.db = db
+        self.module_name = module_name
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.max_rows = max_rows
+
+        self._stats: dict[int, dict[str, int]] = {}
+        self._rows: dict[str, deque[tuple]] = {}
+        self._pending_rows = 0
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+        self._threshold_task: asyncio.Task | None = None
+
+        self.metrics = {
+            "stats_buffered": 0,
+            "rows_buffered": 0,
+            "flushes": 0,
+            "stats_written": 0,
+            "rows_written": 0,
+            "rows_dropped": 0,
+            "flush_failures": 0,
+        }
+
+    # -------- 生命週期 --------
+    def start(self) -> None:
+        """啟動背景定時沖刷任務"""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        """停止背景任務並沖刷所有剩餘資料"""
+        # 持有沖刷鎖時取消, 背景任務不會在寫入途中被中斷
+        async with self._flush_lock:
+            for task in (self._flush_task, self._threshold_task):
+                if task and not task.done():
+                    task.cancel()
+                    with contextlib.suppress(asyncio.CancelledError):
+                        await task
+        self._flush_task = None
+        self._threshold_task = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        """定時沖刷迴圈"""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as exc:
+                logger.error(f"[{self.module_name}]定時沖刷寫入緩衝失敗: {exc}")
+
+    # -------- 記錄 --------
+    def add_stat(self, guild_id: int, stat_type: str, count: int = 1) -> None:
+        """
+        累加統計計數
+
+        Args:
+            guild_id: 伺服器ID
+            stat_type: 統計類型
+            count: 增加數量
+        """
+        counters = self._stats.setdefault(guild_id, {})
+        counters[stat_type] = counters.get(stat_type, 0) + count
+        self.metrics["stats_buffered"] += count
+
+    def add_row(self, kind: str, row: tuple) -> None:
+        """
+        加入一筆日誌
+
+        Args:
+            kind: 日誌種類 (由 db.write_batch 決定寫入的資料表)
+            row: 欄位值
+        """
+        rows = self._rows.get(kind)
+        if rows is None:
+            rows = self._rows[kind] = deque(maxlen=self.max_rows)
+        if len(rows) == self.max_rows:
+            self.metrics["rows_dropped"] += 1
+        else:
+            self._pending_rows += 1
+        rows.append(row)
+        self.metrics["rows_buffered"] += 1
+
+        if self._pending_rows >= self.flush_threshold:
+            self._schedule_threshold_flush()
+
+    # -------- 查詢 --------
+    def pending_stats(self, guild_id: int) -> dict[str, int]:
+        """
+        尚未寫入資料庫的統計計數
+
+        Args:
+            guild_id: 伺服器ID
+
+        Returns:
+            Dict[str, int]: 統計類型與數量
+        """
+        return dict(self._stats.get(guild_id, {}))
+
+    def merge_stats(self, guild_id: int, stored: Mapping[str, int]) -> dict[str, int]:
+        """
+        合併資料庫中的統計與尚未寫入的計數
+
+        Args:
+            guild_id: 伺服器ID
+            stored: 資料庫中的統計
+
+        Returns:
+            Dict[str, int]: 合併後的統計
+        """
+        merged = dict(stored)
+        for stat_type, count in self.pending_stats(guild_id).items():
+            merged[stat_type] = merged.get(stat_type, 0) + count
+        return merged
+
+    async def read_stats(
+        self,
+        guild_id: int,
+        loader: Callable[[int], Awaitable[Mapping[str, int]]],
+    ) -> dict[str, int]:
+        """
+        讀取資料庫統計並合併尚未寫入的計數
+
+        持有沖刷鎖讀取, 避免讀到已寫入資料庫、但仍在緩衝區中的計數.
+
+        Args:
+            guild_id: 伺服器ID
+            loader: 讀取資料庫統計的函數
+
+        Returns:
+            Dict[str, int]: 合併後的統計
+        """
+        async with self._flush_lock:
+            stored = await loader(guild_id)
+            return self.merge_stats(guild_id, stored)
+
+    def pending_count(self) -> int:
+        """目前待寫入的日誌筆數"""
+        return self._pending_rows
+
+    async def discard_stats(self, guild_id: int) -> None:
+        """
+        捨棄伺服器尚未寫入的統計計數 (重置統計前呼叫)
+
+        等待進行中的沖刷完成, 避免重置後才寫入舊的計數.
+
+        Args:
+            guild_id: 伺服器ID
+        """
+        async with self._flush_lock:
+            self._stats.pop(guild_id, None)
+
+    # -------- 沖刷 --------
+    def _schedule_threshold_flush(self) -> None:
+        """達到門檻時排程一次沖刷(同一時間最多一個)"""
+        if self._threshold_task is None or self._threshold_task.done():
+            self._threshold_task = asyncio.create_task(self.flush())
+            # 確保異常不會被忽略
+            self._threshold_task.add_done_callback(
+                lambda t: t.cancelled() or t.exception()
+            )
+
+    async def flush(self) -> int:
+        """
+        將緩衝區的統計與日誌一批寫入資料庫
+
+        Returns:
+            int: 本次寫入的統計項目與日誌筆數
+        """
+        async with self._flush_lock:
+            if not self._stats and not self._pending_rows:
+                return 0
+
+            counters, self._stats = self._stats, {}
+            rows, self._rows = self._rows, {}
+            self._pending_rows = 0
+
+            stats = [
+                (guild_id, stat_type, count)
+                for guild_id, guild_counters in counters.items()
+                for stat_type, count in guild_counters.items()
+            ]
+            batch = {kind: list(entries) for kind, entries in rows.items() if entries}
+            stat_count = len(stats)
+            row_count = sum(len(entries) for entries in batch.values())
+
+            try:
+                await self.db.write_batch(stats, batch)
+            except Exception as exc:
+                self.metrics["flush_failures"] += 1
+                # 已提交的部分已自列表移除, 只放回尚未寫入的資料
+                self._restore(stats, batch)
+                logger.error(
+                    f"[{self.module_name}]寫入緩衝沖刷失敗, 將於下次重試: {exc}"
+                )
+                raise
+            except BaseException:
+                # 沖刷被取消時同樣放回, 由下次沖刷 (例如 stop) 寫入
+                self._restore(stats, batch)
+                raise
+
+            self.metrics["flushes"] += 1
+            self.metrics["stats_written"] += stat_count
+            self.metrics["rows_written"] += row_count
+            return stat_count + row_count
+
+    def _restore(self, stats: list[StatRow], rows: dict[str, list[tuple]]) -> None:
+        """沖刷失敗時將未寫入的資料合併回緩衝區, 日誌超過上限時保留較新的"""
+        for guild_id, stat_type, count in stats:
+            current = self._stats.setdefault(guild_id, {})
+            current[stat_type] = current.get(stat_type, 0) + count
+
+        for kind, old in rows.items():
+            if not old:
+                continue
+            current = self._rows.get(kind)
+            if current is None:
+                self._rows[kind] = deque(old, maxlen=self.max_rows)
+                self._pending_rows += len(self._rows[kind])
+                continue
+            merged = deque(old, maxlen=self.max_rows)
+            merged.extend(current)
+            self.metrics["rows_dropped"] += len(old) + len(current) - len(merged)
+            self._pending_rows += len(merged) - len(current)
+            self._rows[kind] = merged
+
+    def get_metrics(self) -> dict[str, Any]:
+        """
+        獲取緩衝區指標
+
+        Returns:
+            Dict[str, Any]: 指標資料
+        """
+        return {
+            **self.metrics,
+            "pending_rows": self._pending_rows,
+            "pending_guilds": len(self._stats),
+            "flush_interval": self.flush_interval,
+        }
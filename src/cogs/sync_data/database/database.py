@@ -217,7 +217,7 @@ class SyncDataDatabaseService:
         """
         try:
             pool = await self._get_pool()
-            async with pool.get_connection_context(self.db_path) as conn:
+            async with pool.get_connection_context(self.db_path, readonly=True) as conn:
                 cursor = await conn.execute(query, params)
                 row = await cursor.fetchone()
                 if row:
@@ -242,7 +242,7 @@ class SyncDataDatabaseService:
         """
         try:
             pool = await self._get_pool()
-            async with pool.get_connection_context(self.db_path) as conn:
+            async with pool.get_connection_context(self.db_path, readonly=True) as conn:
                 cursor = await conn.execute(query, params)
                 rows = await cursor.fetchall()
                 if rows:
@@ -266,7 +266,7 @@ class SyncDataDatabaseService:
         """
         try:
             pool = await self._get_pool()
-            async with pool.get_connection_context(self.db_path) as conn:
+            async with pool.get_connection_context(self.db_path, readonly=True) as conn:
                 cursor = await conn.execute(query, params)
                 row = await cursor.fetchone()
                 return row[0] if row else None
@@ -18,6 +18,7 @@ import aiohttp
 import discord
 from PIL import Image, ImageDraw, ImageFont
 
+from ...core.asset_cache import avatar_key, get_asset_cache
 from ..config.config import (
     DEFAULT_FONT_PATH,
 )
@@ -31,6 +32,7 @@ MIN_FONT_SIZE = 10
 MAX_FONT_SIZE = 100
 MIN_AVATAR_SIZE = 30
 MAX_AVATAR_SIZE = 200
+AVATAR_DOWNLOAD_SIZE = 256
 
 
 class TemplateStyle(Enum):
@@ -172,7 +174,8 @@ class AvatarDownloader:
 
     def __init__(self):
         self.session = None
-        self.cache = {}
+        # 頭像位元組快取 (與其他渲染器共用)
+        self.cache = get_asset_cache()
         self.retry_config = {"max_retries": 3, "backoff_factor": 2, "timeout": 10}
 
     async def get_session(self) -> aiohttp.ClientSession:
@@ -185,63 +188,54 @@ class AvatarDownloader:
         """
         獲取用戶頭像
 
+        頭像位元組存放於共用快取, 同一頭像同時被多次請求時只下載一次.
+
         Args:
             user: Discord 成員物件
 
         Returns:
             Image.Image: 處理後的頭像圖片
         """
-        cache_key = f"avatar_{user.id}_{user.avatar.key if user.avatar else 'default'}"
+        asset = user.display_avatar
+        avatar_data = await self.cache.get_or_fetch(
+            avatar_key(asset, AVATAR_DOWNLOAD_SIZE),
+            lambda: self.download_avatar_data(user),
+        )
 
-        if cache_key in self.cache:
-            return self.cache[cache_key].copy()
+        if avatar_data:
+            return self.process_avatar(avatar_data)
 
-        # 嘗試下載頭像
-        for attempt in range(self.retry_config["max_retries"]):
-            try:
-                # 嘗試不同格式和大小的頭像
-                avatar_urls = [
-                    user.display_avatar.replace(format="png", size=256).url,
-                    user.display_avatar.replace(format="jpg", size=256).url,
-                    user.display_avatar.replace(format="webp", size=256).url,
-                    user.display_avatar.replace(
-                        format="png", size=128
-                    ).url,  # 降級到更小尺寸
-                ]
-
-                for url in avatar_urls:
-                    try:
-                        avatar_data = await self.download_with_retry(url)
-
-                        if avatar_data:
-                            # 處理頭像
-                            avatar_image = self.process_avatar(avatar_data)
-
-                            # 緩存結果
-                            self.cache[cache_key] = avatar_image.copy()
-                            logger.info(f"成功下載並處理頭像:用戶 {user.id}")
-                            return avatar_image
-                    except Exception as e:
-                        logger.warning(f"嘗試下載頭像格式失敗 {url}: {e}")
-                        continue
+        # 所有格式都下載失敗,使用默認頭像
+        logger.error(f"無法獲取用戶頭像,使用默認頭像:用戶 {user.id}")
+        return self.get_default_avatar()
+
+    async def download_avatar_data(self, user: discord.Member) -> bytes | None:
+        """
+        依序嘗試不同格式和大小下載頭像
+
+        Args:
+            user: Discord 成員物件
+
+        Returns:
+            bytes | None: 頭像二進制數據,全部失敗時返回 None
+        """
+        avatar_urls = [
+            user.display_avatar.replace(format="png", size=AVATAR_DOWNLOAD_SIZE).url,
+            user.display_avatar.replace(format="jpg", size=AVATAR_DOWNLOAD_SIZE).url,
+            user.display_avatar.replace(format="webp", size=AVATAR_DOWNLOAD_SIZE).url,
+            user.display_avatar.replace(format="png", size=128).url,  # 降級到更小尺寸
+        ]
 
+        for url in avatar_urls:
+            try:
+                avatar_data = await self.download_with_retry(url)
+                if avatar_data:
+                    logger.info(f"成功下載頭像:用戶 {user.id}")
+                    return avatar_data
             except Exception as e:
-                logger.warning(f"頭像下載嘗試 {attempt + 1} 失敗: {e}")
-                if attempt == self.retry_config["max_retries"] - 1:
-                    # 最後一次嘗試失敗,使用默認頭像
-                    logger.error(f"所有頭像下載嘗試都失敗,使用默認頭像:用戶 {user.id}")
-                    default_avatar = self.get_default_avatar()
-                    self.cache[cache_key] = default_avatar.copy()
-                    return default_avatar
-
-                # 指數退避
-                await asyncio.sleep(self.retry_config["backoff_factor"] ** attempt)
+                logger.warning(f"嘗試下載頭像格式失敗 {url}: {e}")
 
-        # 如果所有嘗試都失敗,返回默認頭像
-        logger.error(f"無法獲取用戶頭像,使用默認頭像:用戶 {user.id}")
-        default_avatar = self.get_default_avatar()
-        self.cache[cache_key] = default_avatar.copy()
-        return default_avatar
+        return None
 
     async def download_with_retry(self, url: str) -> bytes | None:
         """
@@ -31,6 +31,7 @@ try:
         EventPriority,
         get_global_event_bus,
     )
+    from src.cogs.core.message_features import get_message_features
 except ImportError:
     # 如果無法導入舊模組,使用佔位符
     EventBus = None
@@ -40,6 +41,7 @@ except ImportError:
     ErrorHandler = None
     ErrorSeverity = None
     create_error_handler = None
+    get_message_features = None
 
 
 class ModuleLoadResult:
@@ -626,6 +628,14 @@ class ADRBot(commands.Bot):
         if message.author.bot:
             return
 
+        # Analyse the message once before any await; cog listeners are
+        # scheduled after this handler and reuse the cached features.
+        if get_message_features is not None:
+            try:
+                get_message_features(message)
+            except Exception as e:
+                self.logger.warning(f"Failed to analyse message features: {e}")
+
         # Process commands
         await self.process_commands(message)
 
@@ -3,7 +3,9 @@
 from __future__ import annotations
 
 import asyncio
+import bisect
 import time
+from collections import deque
 from contextlib import asynccontextmanager, suppress
 from dataclasses import dataclass
 from enum import Enum
@@ -26,6 +28,8 @@ if TYPE_CHECKING:
 CONNECTION_EXPIRY_SECONDS = 3600  # 1 hour in seconds
 SQL_PREVIEW_LENGTH = 100  # Maximum length for SQL preview in logs
 BETWEEN_VALUES_COUNT = 2  # Required number of values for BETWEEN operator
+# Upper bounds (seconds) of the connection wait-time histogram buckets
+WAIT_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
 
 
 class DatabaseError(Exception):
@@ -101,8 +105,20 @@ class DatabaseConnection:
         return time.time() - self._created_at > CONNECTION_EXPIRY_SECONDS
 
 
+# What a pool waiter receives: an open connection, or None when it was handed a
+# reserved slot to fill itself, plus whether the connection/slot is overflow
+type _Grant = tuple[DatabaseConnection | None, bool]
+
+
 class DatabasePool:
-    """Database connection pool with Python 3.12 compatibility."""
+    """Database connection pool with Python 3.12 compatibility.
+
+    Capacity is ``max_size`` pooled connections plus ``max_overflow``
+    temporary ones. When both are exhausted, callers wait in a FIFO queue
+    until a connection is released or their deadline expires. Connections
+    are created outside the pool lock: a capacity slot is reserved under the
+    lock and filled afterwards.
+    """
 
     def __init__(self, database_path: Path, settings: Settings):
         """Initialize database pool.
@@ -126,10 +142,22 @@ class DatabasePool:
         self._lock = asyncio.Lock()
         self._checked_out: set[DatabaseConnection] = set()
 
+        # Capacity slots in use (open or being created)
+        self._base_slots = 0
+        self._overflow_slots = 0
+        # FIFO queue of callers waiting for a connection or a free slot
+        self._waiters: deque[asyncio.Future[_Grant]] = deque()
+        self._closing_tasks: set[asyncio.Task[None]] = set()
+
         # Statistics
         self._total_connections = 0
         self._total_checkouts = 0
         self._failed_checkouts = 0
+        self._total_waits = 0
+        self._wait_timeouts = 0
+        self._total_wait_time = 0.0
+        self._max_queue_depth = 0
+        self._wait_histogram = [0] * (len(WAIT_TIME_BUCKETS) + 1)
 
     async def initialize(self) -> None:
         """Initialize the database pool."""
@@ -144,15 +172,13 @@ class DatabasePool:
         self.database_path.parent.mkdir(parents=True, exist_ok=True)
 
         # Create initial connections
-        async with self._lock:
-            for _ in range(min(2, self.max_size)):  # Start with 2 connections
-                try:
-                    conn = await self._create_connection()
-                    self._pool.append(conn)
-                except Exception as e:
-                    self.logger.error(
-                        "Failed to create initial connection", error=str(e)
-                    )
+        for _ in range(min(2, self.max_size)):  # Start with 2 connections
+            try:
+                conn = await self._create_connection()
+                self._pool.append(conn)
+                self._base_slots += 1
+            except Exception as e:
+                self.logger.error("Failed to create initial connection", error=str(e))
 
         self.logger.info(
             "Database pool initialized", initial_connections=len(self._pool)
@@ -197,9 +223,14 @@ class DatabasePool:
             raise ConnectionPoolError(f"Failed to create connection: {e}") from e
 
     @asynccontextmanager
-    async def get_connection(self) -> AsyncIterator[DatabaseConnection]:
+    async def get_connection(
+        self, timeout: float | None = None
+    ) -> AsyncIterator[DatabaseConnection]:
         """Get a connection from the pool.
 
+        Args:
+            timeout: Acquisition deadline in seconds, defaults to pool_timeout
+
         Yields:
             Database connection
 
@@ -208,12 +239,13 @@ class DatabasePool:
         """
         connection = None
         start_time = time.time()
+        timeout = self.timeout if timeout is None else timeout
 
         try:
             # Get connection with timeout
             connection = await asyncio.wait_for(
                 self._acquire_connection(),
-                timeout=self.timeout,
+                timeout=timeout,
             )
 
             self._total_checkouts += 1
@@ -231,12 +263,13 @@ class DatabasePool:
             self._failed_checkouts += 1
             self.logger.error(
                 "Connection acquisition timeout",
-                timeout=self.timeout,
+                timeout=timeout,
                 pool_size=len(self._pool),
                 checked_out=len(self._checked_out),
+                waiting=len(self._waiters),
             )
             raise ConnectionPoolError(
-                f"Connection acquisition timeout after {self.timeout}s"
+                f"Connection acquisition timeout after {timeout}s"
             ) from None
 
         except Exception as e:
@@ -250,60 +283,157 @@ class DatabasePool:
                 await self._release_connection(connection)
 
     async def _acquire_connection(self) -> DatabaseConnection:
-        """Acquire a connection from the pool."""
+        """Acquire a connection, waiting in FIFO order when the pool is exhausted."""
         async with self._lock:
-            # Try to get from pool
-            if self._pool:
-                connection = self._pool.pop()
-
-                # Check if connection is expired
-                if connection.is_expired:
-                    with suppress(Exception):
-                        await connection.close()
+            # Newcomers never overtake callers that are already queued
+            grant = None if self._waiters else self._take_locked()
+            if grant is None:
+                waiter: asyncio.Future[_Grant] = (
+                    asyncio.get_running_loop().create_future()
+                )
+                self._waiters.append(waiter)
+                self._max_queue_depth = max(self._max_queue_depth, len(self._waiters))
 
-                    # Create new connection
-                    connection = await self._create_connection()
+        if grant is None:
+            grant = await self._wait_for_grant(waiter)
 
+        connection, overflow = grant
+        if connection is not None:
+            if not connection.is_expired:
                 self._checked_out.add(connection)
                 return connection
 
-            # Try to create overflow connection
-            if len(self._overflow) < self.max_overflow:
-                connection = await self._create_connection()
-                self._overflow.append(connection)
-                self._checked_out.add(connection)
-                return connection
+            # Replace the expired connection, keeping its slot reserved
+            self._checked_out.discard(connection)
+            if overflow:
+                self._overflow.remove(connection)
+            with suppress(Exception):
+                await connection.close()
 
-            # Wait for connection to be returned
-            # This is a simplified implementation - in production you'd want
-            # a proper queuing mechanism
-            raise ConnectionPoolError(
-                "No connections available and max overflow reached"
-            )
+        return await self._fill_slot(overflow)
+
+    def _take_locked(self) -> _Grant | None:
+        """Take an idle connection or reserve a free slot (lock held).
+
+        Returns:
+            Grant, or None when the pool and overflow are exhausted
+        """
+        if self._pool:
+            return self._pool.pop(), False
+        if self._base_slots < self.max_size:
+            self._base_slots += 1
+            return None, False
+        if self._overflow_slots < self.max_overflow:
+            self._overflow_slots += 1
+            return None, True
+        return None
+
+    async def _wait_for_grant(self, waiter: asyncio.Future[_Grant]) -> _Grant:
+        """Wait in the queue until a connection or slot is handed over."""
+        self._total_waits += 1
+        start_time = time.monotonic()
+        try:
+            return await waiter
+        except BaseException:
+            self._wait_timeouts += 1
+            if waiter.done() and not waiter.cancelled():
+                # Granted just as the caller gave up: pass it on
+                self._pass_on(waiter.result())
+            else:
+                waiter.cancel()
+                with suppress(ValueError):
+                    self._waiters.remove(waiter)
+            raise
+        finally:
+            elapsed = time.monotonic() - start_time
+            self._total_wait_time += elapsed
+            self._wait_histogram[bisect.bisect_left(WAIT_TIME_BUCKETS, elapsed)] += 1
+
+    async def _fill_slot(self, overflow: bool) -> DatabaseConnection:
+        """Create a connection for a reserved slot, freeing the slot on failure."""
+        try:
+            connection = await self._create_connection()
+        except BaseException:
+            self._pass_on((None, overflow))
+            raise
+
+        if overflow:
+            self._overflow.append(connection)
+        self._checked_out.add(connection)
+        return connection
+
+    def _hand_off(self, grant: _Grant) -> bool:
+        """Hand a connection or slot to the oldest live waiter.
+
+        Returns:
+            True if a waiter took it
+        """
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(grant)
+                return True
+        return False
+
+    def _pass_on(self, grant: _Grant) -> None:
+        """Give back a connection or slot outside of the normal release path."""
+        connection, overflow = grant
+        if connection is not None:
+            closing = self._return_locked(connection)
+            if closing is not None:
+                task = asyncio.get_running_loop().create_task(closing.close())
+                self._closing_tasks.add(task)
+                task.add_done_callback(self._closing_tasks.discard)
+        elif not self._hand_off(grant):
+            if overflow:
+                self._overflow_slots -= 1
+            else:
+                self._base_slots -= 1
+
+    def _return_locked(
+        self, connection: DatabaseConnection
+    ) -> DatabaseConnection | None:
+        """Return a connection to a waiter or the idle pool.
+
+        Returns:
+            Overflow connection that should be closed, if any
+        """
+        self._checked_out.discard(connection)
+        overflow = connection in self._overflow
+        if self._hand_off((connection, overflow)):
+            return None
+
+        if overflow:
+            self._overflow.remove(connection)
+            self._overflow_slots -= 1
+            return connection
+
+        self._pool.append(connection)
+        return None
 
     async def _release_connection(self, connection: DatabaseConnection) -> None:
         """Release a connection back to the pool."""
         async with self._lock:
-            self._checked_out.discard(connection)
+            closing = self._return_locked(connection)
 
-            # If it's an overflow connection, close it
-            if connection in self._overflow:
-                self._overflow.remove(connection)
-                try:
-                    await connection.close()
-                except Exception as e:
-                    self.logger.warning(
-                        "Error closing overflow connection", error=str(e)
-                    )
-            else:
-                # Return to main pool
-                self._pool.append(connection)
+        # If it's an overflow connection nobody is waiting for, close it
+        if closing is not None:
+            try:
+                await closing.close()
+            except Exception as e:
+                self.logger.warning("Error closing overflow connection", error=str(e))
 
     async def close_all(self) -> None:
         """Close all connections in the pool."""
         self.logger.info("Closing all database connections")
 
         async with self._lock:
+            # Fail queued callers
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if not waiter.done():
+                    waiter.set_exception(ConnectionPoolError("Database pool closed"))
+
             # Close pool connections
             for connection in self._pool:
                 try:
@@ -332,6 +462,8 @@ class DatabasePool:
             self._pool.clear()
             self._overflow.clear()
             self._checked_out.clear()
+            self._base_slots = 0
+            self._overflow_slots = 0
 
         self.logger.info("All database connections closed")
 
@@ -341,6 +473,9 @@ class DatabasePool:
         Returns:
             Dictionary with pool statistics
         """
+        bucket_labels = [f"<={bound}s" for bound in WAIT_TIME_BUCKETS] + [
+            f">{WAIT_TIME_BUCKETS[-1]}s"
+        ]
         return {
             "pool_size": len(self._pool),
             "overflow_size": len(self._overflow),
@@ -350,6 +485,16 @@ class DatabasePool:
             "failed_checkouts": self._failed_checkouts,
             "max_size": self.max_size,
             "max_overflow": self.max_overflow,
+            "queue_depth": len(self._waiters),
+            "max_queue_depth": self._max_queue_depth,
+            "total_waits": self._total_waits,
+            "wait_timeouts": self._wait_timeouts,
+            "average_wait_time": (
+                self._total_wait_time / self._total_waits if self._total_waits else 0.0
+            ),
+            "wait_time_histogram": dict(
+                zip(bucket_labels, self._wait_histogram, strict=True)
+            ),
         }
 
 
@@ -0,0 +1,197 @@
+"""成就系統快取標籤索引單元測試.
+
+測試標籤反向索引:
+- 快取鍵與失效模式的標籤解析
+- LRU 淘汰與 TTL 過期時索引同步移除
+- 快取管理器、快取服務與同步管理器依標籤失效
+"""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.cogs.achievement.services.cache_manager import (
+    CacheConfig,
+    CacheManager,
+    CacheType,
+)
+from src.cogs.achievement.services.cache_service import AchievementCacheService
+from src.cogs.achievement.services.cache_sync_manager import (
+    CacheEvent,
+    CacheEventType,
+    CacheSyncManager,
+)
+from src.cogs.achievement.services.cache_tags import (
+    TaggedLRUCache,
+    TaggedTTLCache,
+    tags_for_key,
+    tags_for_pattern,
+)
+
+
+class FakeTimer:
+    """可手動推進的計時器."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTagParsing:
+    """測試標籤解析."""
+
+    def test_tags_for_key(self):
+        """測試標準鍵與一般鍵的標籤."""
+        assert tags_for_key("achievement:user_achievements:123:all") >= {
+            "kind:user_achievements",
+            "user:123",
+        }
+        assert tags_for_key("user:5:progress:9") == {"kind:user", "user:5"}
+        assert tags_for_key("achievement:42") == {
+            "kind:achievement",
+            "achievement:42",
+        }
+        assert tags_for_key("leaderboard:points") == {"kind:leaderboard"}
+
+    def test_tags_for_pattern(self):
+        """測試失效模式轉換為標籤,符合模式的鍵包含所有標籤."""
+        pattern_tags = tags_for_pattern("achievement:user_achievements:123:*")
+        assert pattern_tags <= tags_for_key("achievement:user_achievements:123:all")
+        assert not pattern_tags <= tags_for_key(
+            "achievement:user_achievements:1234:all"
+        )
+        assert tags_for_pattern("*") == frozenset()
+
+
+class TestTaggedCache:
+    """測試帶標籤索引的快取."""
+
+    def test_index_follows_lru_eviction(self):
+        """測試 LRU 淘汰的項目從索引移除."""
+        cache = TaggedLRUCache(maxsize=2)
+        cache["user:1:a"] = 1
+        cache["user:2:a"] = 2
+        cache["user:3:a"] = 3
+
+        assert "user:1:a" not in cache.tag_index
+        assert cache.tag_index.keys_with_any(["user:1"]) == set()
+        assert sorted(cache.invalidate_tags(["user:2", "user:3"])) == [
+            "user:2:a",
+            "user:3:a",
+        ]
+        assert len(cache) == len(cache.tag_index) == 0
+
+    def test_index_follows_ttl_expiry(self):
+        """測試 TTL 過期的項目從索引移除,失效不計入已過期項目."""
+        timer = FakeTimer()
+        cache = TaggedTTLCache(maxsize=10, ttl=10, timer=timer)
+        cache["user:1:a"] = 1
+        timer.now = 5
+        cache["user:1:b"] = 2
+
+        timer.now = 11
+        assert cache.invalidate_tags(["user:1"]) == ["user:1:b"]
+        assert len(cache.tag_index) == 0
+
+        cache["user:2:a"] = 3
+        timer.now = 30
+        cache.expire()
+        assert len(cache.tag_index) == 0
+
+    def test_overwrite_replaces_tags(self):
+        """測試覆寫項目時以新值的標籤取代原有標籤."""
+        cache = TaggedLRUCache(maxsize=10, tagger=lambda _key, value: {f"user:{value}"})
+        cache["k"] = 1
+        cache["k"] = 2
+
+        assert cache.tag_index.keys_with_any(["user:1"]) == set()
+        assert cache.invalidate_tags(["user:2"]) == ["k"]
+
+
+class TestCacheManagerTags:
+    """測試快取管理器依標籤失效."""
+
+    @pytest.mark.asyncio
+    async def test_invalidate_only_victims(self, tmp_path):
+        """測試用戶與成就失效只移除受影響項目,包含 L2."""
+        configs = {
+            CacheType.USER_ACHIEVEMENT: CacheConfig(
+                max_size=1000, ttl_seconds=60, enable_l2_cache=False
+            ),
+            CacheType.ACHIEVEMENT: CacheConfig(
+                max_size=1000, ttl_seconds=60, enable_l2_cache=True
+            ),
+        }
+        async with CacheManager(configs, str(tmp_path)) as manager:
+            for user_id in range(100):
+                await manager.set(
+                    CacheType.USER_ACHIEVEMENT,
+                    f"user_achievements:{user_id}",
+                    [{"user_id": user_id}],
+                )
+            await manager.set(
+                CacheType.ACHIEVEMENT, "achievement:list", {"achievement_id": 7}
+            )
+            await manager.set(CacheType.ACHIEVEMENT, "achievement:8", {"id": 8})
+
+            assert await manager.invalidate_by_user(12) == 1
+            assert await manager.get(CacheType.USER_ACHIEVEMENT, "user_achievements:1")
+
+            # 值中的 achievement_id 也是標籤,L1 與 L2 各移除一項
+            assert await manager.invalidate_by_achievement(7) == 2
+            assert await manager.get(CacheType.ACHIEVEMENT, "achievement:8") == {
+                "id": 8
+            }
+            assert len(manager._l1_caches[CacheType.USER_ACHIEVEMENT].tag_index) == 99
+
+
+class TestServiceTags:
+    """測試快取服務與同步管理器依標籤失效."""
+
+    def test_invalidate_patterns_uses_index(self):
+        """測試模式失效經由索引,帶萬用字元的模式也能符合."""
+        service = AchievementCacheService()
+        cache_type = "user_achievements"
+        key = service.get_cache_key(cache_type, 123)
+        service.set(cache_type, key, ["a"])
+        service.set(cache_type, service.get_cache_key(cache_type, 4), ["b"])
+
+        removed = service.invalidate_by_patterns(
+            cache_type, ["achievement:user_achievements:123:*"]
+        )
+
+        assert removed == 1
+        assert service.get(cache_type, key) is None
+        assert service.invalidate_by_tags(cache_type, ["user:4"]) == 1
+
+    @pytest.mark.asyncio
+    async def test_sync_manager_invalidates_by_tags(self):
+        """測試同步管理器展開標籤模板並呼叫 invalidate_by_tags."""
+        cache_service = MagicMock()
+        cache_service.invalidate_by_tags.return_value = 2
+        manager = CacheSyncManager(cache_service=cache_service)
+        event = CacheEvent(
+            event_id="granted_1",
+            event_type=CacheEventType.ACHIEVEMENT_GRANTED,
+            user_ids={1, 2},
+            achievement_ids={9},
+        )
+
+        plan = await manager._analyze_cache_impact(event)
+        assert plan.cache_tags_by_type["user_achievements"] == {
+            "user:1",
+            "user:2",
+            "kind:global_stats",
+            "kind:leaderboard",
+        }
+
+        await manager._execute_invalidation_plan(plan)
+        invalidated_tags = {
+            tag
+            for call in cache_service.invalidate_by_tags.call_args_list
+            if call.args[0] == "user_achievements"
+            for tag in call.args[1]
+        }
+        assert invalidated_tags == plan.cache_tags_by_type["user_achievements"]
@@ -0,0 +1,137 @@
+"""成就系統 L2 快取儲存單元測試.
+
+測試 SQLite 鍵值 L2 快取:
+- 逐鍵讀寫與跨實例持久化
+- 過期項目的批次清除
+- 序列化失敗處理
+- 讀取延遲不隨項目數量增加
+"""
+
+import time
+
+import pytest
+
+from src.cogs.achievement.services.cache_benchmark import benchmark_l2_get
+from src.cogs.achievement.services.cache_manager import (
+    CacheConfig,
+    CacheManager,
+    CacheType,
+)
+from src.cogs.achievement.services.l2_cache_store import L2CacheStore
+
+
+@pytest.fixture
+def l2_configs():
+    """只有成就快取啟用 L2 的配置."""
+    return {
+        CacheType.ACHIEVEMENT: CacheConfig(
+            max_size=100, ttl_seconds=60, enable_l2_cache=True
+        ),
+        CacheType.USER_PROGRESS: CacheConfig(
+            max_size=100, ttl_seconds=60, enable_l2_cache=False
+        ),
+    }
+
+
+class TestL2CacheStore:
+    """測試 L2 鍵值儲存."""
+
+    @pytest.mark.asyncio
+    async def test_round_trip_per_key(self, tmp_path):
+        """測試逐鍵寫入、讀取與刪除,不同快取類型互不影響."""
+        store = L2CacheStore(tmp_path / "l2.db")
+        try:
+            assert await store.set("achievement", "achievement:1", {"id": 1}, 60)
+            await store.set("stats", "achievement:1", {"id": 2}, 60)
+
+            assert await store.get("achievement", "achievement:1") == {"id": 1}
+            assert await store.get("stats", "achievement:1") == {"id": 2}
+            assert await store.get("achievement", "achievement:2") is None
+
+            assert await store.delete("achievement", "achievement:1")
+            assert not await store.delete("achievement", "achievement:1")
+            assert await store.get("stats", "achievement:1") == {"id": 2}
+        finally:
+            await store.close()
+
+    @pytest.mark.asyncio
+    async def test_expired_entries_purged_in_batches(self, tmp_path):
+        """測試過期項目讀取為 None,並依批次清除."""
+        store = L2CacheStore(tmp_path / "l2.db", purge_batch_size=10)
+        try:
+            await store.set_many("achievement", [(f"old:{i}", i) for i in range(25)], 0)
+            await store.set("achievement", "fresh", "value", 60)
+
+            assert await store.get("achievement", "old:1") is None
+            assert await store.count("achievement") == 26
+
+            assert await store.purge_expired() == 25
+            assert await store.count() == 1
+            assert await store.get("achievement", "fresh") == "value"
+        finally:
+            await store.close()
+
+    @pytest.mark.asyncio
+    async def test_unpicklable_value_is_skipped(self, tmp_path):
+        """測試無法序列化的值不寫入,其他項目照常寫入."""
+        store = L2CacheStore(tmp_path / "l2.db")
+        try:
+            written = await store.set_many(
+                "achievement", [("bad", lambda x: x), ("good", 1)], 60
+            )
+
+            assert written == 1
+            assert await store.get("achievement", "bad") is None
+            assert store.get_stats()["errors"] == 1
+        finally:
+            await store.close()
+
+    @pytest.mark.asyncio
+    async def test_get_latency_is_flat(self):
+        """測試讀取延遲不隨項目數量線性增加."""
+        results = await benchmark_l2_get(sizes=(1_000, 100_000), samples=500)
+
+        small, large = results
+        assert large["median_us"] < small["median_us"] * 3
+        # 原本方式載入整個檔案,延遲隨數量增加
+        assert large["legacy_us"] > small["legacy_us"] * 10
+
+
+class TestCacheManagerL2:
+    """測試快取管理器使用 L2 鍵值儲存."""
+
+    @pytest.mark.asyncio
+    async def test_l2_survives_restart(self, tmp_path, l2_configs):
+        """測試 L1 清空或重新啟動後可從 L2 取回,停用 L2 的類型不寫入."""
+        async with CacheManager(l2_configs, str(tmp_path)) as manager:
+            await manager.set(CacheType.ACHIEVEMENT, "achievement:1", {"id": 1})
+            await manager.set(CacheType.USER_PROGRESS, "user_progress:1", {"id": 1})
+
+        async with CacheManager(l2_configs, str(tmp_path)) as manager:
+            assert await manager.get(CacheType.ACHIEVEMENT, "achievement:1") == {
+                "id": 1
+            }
+            assert await manager.get(CacheType.USER_PROGRESS, "user_progress:1") is None
+            assert (tmp_path / "l2_cache.db").exists()
+
+    @pytest.mark.asyncio
+    async def test_invalidation_and_cleanup(self, tmp_path, l2_configs):
+        """測試模式失效與過期清理作用於 L2."""
+        async with CacheManager(l2_configs, str(tmp_path)) as manager:
+            await manager.set(CacheType.ACHIEVEMENT, "achievement:1", "a")
+            await manager.set(CacheType.ACHIEVEMENT, "achievement:2", "b")
+            await manager.set(CacheType.ACHIEVEMENT, "short", "c", ttl=1)
+
+            assert await manager.invalidate_by_achievement(1) == 2
+            manager._l1_caches[CacheType.ACHIEVEMENT].clear()
+            assert await manager.get(CacheType.ACHIEVEMENT, "achievement:1") is None
+            assert await manager.get(CacheType.ACHIEVEMENT, "achievement:2") == "b"
+
+            store = manager._l2_stores[CacheType.ACHIEVEMENT]
+            original_time = time.time
+            try:
+                time.time = lambda: original_time() + 2
+                await manager._cleanup_expired_l2_cache()
+            finally:
+                time.time = original_time
+            assert await store.count() == 1
@@ -0,0 +1,138 @@
+"""
+活躍度排行榜快照測試模塊
+測試排名、百分位查詢與快照刷新
+"""
+
+import time
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.cogs.activity_meter.main.calculator import ActivityCalculator
+from src.cogs.activity_meter.service.batch_service import BatchCalculationService
+from src.cogs.activity_meter.service.leaderboard import GuildActivitySnapshot
+
+GUILD_ID = 1001
+
+
+@pytest.fixture
+def snapshot():
+    """建立測試用排行榜快照"""
+    return GuildActivitySnapshot(
+        GUILD_ID,
+        user_ids=[10, 20, 30, 40, 50],
+        scores=[50.0, 80.0, 50.0, 10.0, 95.0],
+        last_msgs=[100, 200, 300, 400, 500],
+    )
+
+
+class TestGuildActivitySnapshot:
+    """🏆 排行榜快照測試類"""
+
+    def test_user_rank_and_percentile(self, snapshot):
+        """測試用戶排名與百分位"""
+        top = snapshot.get_user_rank(50)
+        assert top["rank"] == 1
+        assert top["total"] == 5
+        assert top["percentile"] == 100.0
+
+        last = snapshot.get_user_rank(40)
+        assert last["rank"] == 5
+        assert last["percentile"] == 20.0
+
+    def test_ties_share_rank(self, snapshot):
+        """測試同分用戶共享同一排名"""
+        assert snapshot.get_user_rank(10)["rank"] == 3
+        assert snapshot.get_user_rank(30)["rank"] == 3
+
+    def test_unknown_user(self, snapshot):
+        """測試不在快照中的用戶"""
+        assert snapshot.get_user_rank(999) is None
+
+        live = snapshot.get_user_rank(999, 60.0)
+        assert live["rank"] == 3
+        assert live["total"] == 6
+        assert snapshot.get_user_rank(999, 0.0)["rank"] == 6
+
+    def test_live_score_ignores_stale_entry(self, snapshot):
+        """測試即時分數排名時略過用戶在快照中的舊分數"""
+        # 用戶 20 快照中為 80 分, 衰減後降為 60 分, 不應被自己的舊分數擠下
+        live = snapshot.get_user_rank(20, 60.0)
+        assert live["rank"] == 2
+        assert live["total"] == 5
+
+        assert snapshot.get_user_rank(50, 10.0)["rank"] == 4
+        assert snapshot.get_user_rank(40, 99.0)["rank"] == 1
+
+    def test_empty_snapshot(self):
+        """測試空快照"""
+        empty = GuildActivitySnapshot(GUILD_ID, [], [], [])
+        assert len(empty) == 0
+        assert empty.get_user_rank(1) is None
+
+        live = empty.get_user_rank(1, 10.0)
+        assert live["rank"] == 1
+        assert live["total"] == 1
+        assert live["percentile"] == 100.0
+
+
+class TestBatchServiceSnapshot:
+    """📊 批量計算服務快照測試類"""
+
+    @pytest.fixture
+    def mock_db(self):
+        """建立模擬資料庫"""
+        now = int(time.time())
+        db = AsyncMock()
+        db.get_all_user_activities.return_value = [
+            {"user_id": 1, "score": 90.0, "last_msg_time": now},
+            {"user_id": 2, "score": 40.0, "last_msg_time": now},
+            {"user_id": 3, "score": 70.0, "last_msg_time": now},
+        ]
+        return db
+
+    @pytest.mark.asyncio
+    async def test_snapshot_is_cached(self, mock_db):
+        """測試快照在有效時間內重複使用"""
+        service = BatchCalculationService(mock_db, max_workers=1)
+        try:
+            first = await service.get_user_rank(GUILD_ID, 3)
+            second = await service.get_user_rank(GUILD_ID, 1)
+
+            assert first["rank"] == 2
+            assert second["rank"] == 1
+            mock_db.get_all_user_activities.assert_awaited_once_with(GUILD_ID)
+            assert service.stats["snapshot_hits"] == 1
+        finally:
+            await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_decay_is_applied_to_snapshot(self, mock_db):
+        """測試快照使用衰減後的分數排序"""
+        now = int(time.time())
+        mock_db.get_all_user_activities.return_value = [
+            {"user_id": 1, "score": 90.0, "last_msg_time": now - 86400 * 7},
+            {"user_id": 2, "score": 40.0, "last_msg_time": now},
+        ]
+        service = BatchCalculationService(mock_db, max_workers=1)
+        try:
+            decayed = await service.get_user_rank(GUILD_ID, 1)
+            fresh = await service.get_user_rank(GUILD_ID, 2)
+
+            expected = ActivityCalculator().decay(90.0, 86400 * 7)
+            assert fresh["rank"] == 1
+            assert decayed["rank"] == 2
+            assert decayed["score"] == pytest.approx(expected, abs=0.01)
+        finally:
+            await service.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_user_rank_handles_errors(self, mock_db):
+        """測試查詢失敗時回傳 None"""
+        mock_db.get_all_user_activities.side_effect = RuntimeError("locked")
+        service = BatchCalculationService(mock_db, max_workers=1)
+        try:
+            assert await service.get_user_rank(GUILD_ID, 1, 50.0) is None
+            assert await service.get_user_rank(GUILD_ID, 1) is None
+        finally:
+            await service.shutdown()
@@ -92,7 +92,7 @@ class TestActivityDatabase:
         mock_pool = MagicMock()
 
         @asynccontextmanager
-        async def mock_get_connection_context(db_path):
+        async def mock_get_connection_context(db_path, readonly=False):
             yield activity_test_db
 
         mock_pool.get_connection_context = mock_get_connection_context
@@ -110,7 +110,7 @@ class TestActivityDatabase:
         mock_pool = MagicMock()
 
         @asynccontextmanager
-        async def mock_get_connection_context(db_path):
+        async def mock_get_connection_context(db_path, readonly=False):
             yield activity_test_db
 
         mock_pool.get_connection_context = mock_get_connection_context
@@ -0,0 +1,51 @@
+"""
+活躍度熱點分數快取測試模塊
+測試 LRU 淘汰、批量寫入與伺服器失效
+"""
+
+from src.cogs.activity_meter.database.score_cache import HotScoreCache
+
+
+class TestHotScoreCache:
+    """🔥 熱點分數快取測試類"""
+
+    def test_get_after_put(self):
+        """測試寫入後可立即讀取"""
+        cache = HotScoreCache(max_size=10)
+
+        cache.put(1, 2, 42.0, 1000)
+
+        assert cache.get(1, 2) == (42.0, 1000)
+        assert cache.get(1, 3) is None
+        stats = cache.get_stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    def test_lru_eviction(self):
+        """測試超過容量時淘汰最久未使用的項目"""
+        cache = HotScoreCache(max_size=2)
+        cache.put(1, 1, 1.0, 1)
+        cache.put(1, 2, 2.0, 2)
+
+        # 存取 (1, 1) 使其成為最近使用
+        cache.get(1, 1)
+        cache.put(1, 3, 3.0, 3)
+
+        assert cache.get(1, 2) is None
+        assert cache.get(1, 1) == (1.0, 1)
+        assert cache.get(1, 3) == (3.0, 3)
+        assert len(cache) == 2
+        assert cache.get_stats()["evictions"] == 1
+
+    def test_put_many_and_invalidate_guild(self):
+        """測試批量寫入與依伺服器失效"""
+        cache = HotScoreCache(max_size=10)
+        cache.put_many([(1, 1, 5.0, 10), (1, 2, 6.0, 11), (2, 1, 7.0, 12)])
+
+        removed = cache.invalidate(1)
+
+        assert removed == 2
+        assert cache.get(1, 1) is None
+        assert cache.get(2, 1) == (7.0, 12)
+        assert cache.invalidate(2, 1) == 1
+        assert len(cache) == 0
@@ -0,0 +1,136 @@
+"""
+活躍度寫入緩衝測試模塊
+測試訊息聚合、讀取自己的寫入、批量沖刷與失敗重試
+"""
+
+import asyncio
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.cogs.activity_meter.main.calculator import ActivityCalculator
+from src.cogs.activity_meter.service.write_buffer import ActivityWriteBuffer
+
+GUILD_ID = 1001
+USER_ID = 2002
+YMD = "20250101"
+
+
+@pytest.fixture
+def mock_db():
+    """建立模擬資料庫"""
+    db = AsyncMock()
+    db.get_user_activity.return_value = (10.0, 0)
+    return db
+
+
+@pytest.fixture
+def buffer(mock_db):
+    """建立測試用寫入緩衝區"""
+    return ActivityWriteBuffer(
+        mock_db, ActivityCalculator(), flush_interval=60, max_pending=100
+    )
+
+
+class TestActivityWriteBuffer:
+    """🗃️ 活躍度寫入緩衝測試類"""
+
+    @pytest.mark.asyncio
+    async def test_messages_are_aggregated_without_writes(self, buffer, mock_db):
+        """測試訊息在沖刷前只讀取一次資料庫且不寫入"""
+        now = 1_700_000_000
+        for offset in range(5):
+            await buffer.record_message(GUILD_ID, USER_ID, now + offset, YMD)
+
+        mock_db.get_user_activity.assert_awaited_once_with(GUILD_ID, USER_ID)
+        mock_db.bulk_update_user_activities.assert_not_awaited()
+        mock_db.bulk_increment_daily_messages.assert_not_awaited()
+        assert buffer.pending_count() == 1
+
+    @pytest.mark.asyncio
+    async def test_read_your_writes(self, buffer, mock_db):
+        """測試查詢會讀取到尚未寫回的分數"""
+        now = 1_700_000_000
+        mock_db.get_user_activity.return_value = (10.0, now - 120)
+        score = await buffer.record_message(GUILD_ID, USER_ID, now, YMD)
+
+        result = await buffer.get_user_activity(GUILD_ID, USER_ID)
+
+        assert result == (score, now)
+        assert score > 10.0
+
+    @pytest.mark.asyncio
+    async def test_flush_writes_aggregated_counts(self, buffer, mock_db):
+        """測試沖刷時使用批量 API 並合併每日計數"""
+        now = 1_700_000_000
+        for offset in range(3):
+            await buffer.record_message(GUILD_ID, USER_ID, now + offset, YMD)
+
+        flushed = await buffer.flush()
+
+        assert flushed == 1
+        updates = mock_db.bulk_update_user_activities.await_args.args[0]
+        assert len(updates) == 1
+        assert updates[0][:2] == (GUILD_ID, USER_ID)
+        mock_db.bulk_increment_daily_messages.assert_awaited_once_with([
+            (YMD, GUILD_ID, USER_ID, 3)
+        ])
+        assert buffer.pending_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_cooldown_only_counts_messages(self, buffer, mock_db):
+        """測試冷卻期內的訊息只累加計數, 不產生分數更新"""
+        now = 1_700_000_000
+        mock_db.get_user_activity.return_value = (10.0, now)
+
+        await buffer.record_message(GUILD_ID, USER_ID, now + 1, YMD)
+        await buffer.flush()
+
+        mock_db.bulk_update_user_activities.assert_awaited_once_with([])
+        mock_db.bulk_increment_daily_messages.assert_awaited_once_with([
+            (YMD, GUILD_ID, USER_ID, 1)
+        ])
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_retried(self, buffer, mock_db):
+        """測試沖刷失敗時資料會保留並於下次重試"""
+        now = 1_700_000_000
+        await buffer.record_message(GUILD_ID, USER_ID, now, YMD)
+        mock_db.bulk_increment_daily_messages.side_effect = RuntimeError("locked")
+
+        with pytest.raises(RuntimeError):
+            await buffer.flush()
+
+        await buffer.record_message(GUILD_ID, USER_ID, now + 1, YMD)
+        mock_db.bulk_increment_daily_messages.side_effect = None
+        await buffer.flush()
+
+        mock_db.bulk_increment_daily_messages.assert_awaited_with([
+            (YMD, GUILD_ID, USER_ID, 2)
+        ])
+        assert buffer.get_stats()["flush_failures"] == 1
+
+    @pytest.mark.asyncio
+    async def test_threshold_triggers_flush(self, mock_db):
+        """測試待寫入用戶數達到門檻時自動沖刷"""
+        buffer = ActivityWriteBuffer(
+            mock_db, ActivityCalculator(), flush_interval=60, max_pending=2
+        )
+        now = 1_700_000_000
+        await buffer.record_message(GUILD_ID, 1, now, YMD)
+        await buffer.record_message(GUILD_ID, 2, now, YMD)
+        await asyncio.sleep(0)
+
+        mock_db.bulk_increment_daily_messages.assert_awaited_once()
+        assert buffer.pending_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_stop_flushes_remaining(self, buffer, mock_db):
+        """測試關閉時會沖刷剩餘資料"""
+        buffer.start()
+        await buffer.record_message(GUILD_ID, USER_ID, 1_700_000_000, YMD)
+
+        await buffer.stop()
+
+        mock_db.bulk_increment_daily_messages.assert_awaited_once()
+        assert buffer.pending_count() == 0
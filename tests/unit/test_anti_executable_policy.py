@@ -0,0 +1,143 @@
+"""
+反可執行檔案檢測策略測試模塊
+測試白名單自動機、副檔名合併與策略快取的失效
+"""
+
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.cogs.protection.anti_executable.main.detector import ExecutableDetector
+from src.cogs.protection.anti_executable.main.main import AntiExecutable
+from src.cogs.protection.anti_executable.main.policy import (
+    ExtensionPolicy,
+    SubstringMatcher,
+)
+
+
+class TestSubstringMatcher:
+    """🔤 白名單自動機測試類"""
+
+    @pytest.mark.parametrize(
+        "text",
+        ["", "a", "setup.exe", "ushers", "hishe", "xhex", "report_she.pdf", "abcabd"],
+    )
+    def test_matches_like_substring_search(self, text):
+        """測試結果與逐一子字串比對相同 (包含共用前後綴的模式)"""
+        patterns = ["he", "she", "his", "hers", "abd", "setup"]
+        matcher = SubstringMatcher(patterns)
+
+        assert matcher.search(text) == any(pattern in text for pattern in patterns)
+
+    def test_empty(self):
+        """測試空白名單不符合任何檔名, 空字串模式符合所有檔名"""
+        assert not SubstringMatcher().search("file.exe")
+        assert SubstringMatcher([""]).search("file.exe")
+        assert len(SubstringMatcher(["a", "a", "b"])) == 2
+
+
+class TestExtensionPolicy:
+    """📜 檢測策略測試類"""
+
+    def test_merges_extensions(self):
+        """測試自訂與嚴格模式副檔名合併到同一集合"""
+        default = ExtensionPolicy.build({})
+        strict = ExtensionPolicy.build({
+            "strict_mode": True,
+            "custom_extensions": [" .Apk", ""],
+        })
+
+        assert default.is_dangerous_extension("virus.exe")
+        assert not default.is_dangerous_extension("report.pdf")
+        assert not default.is_dangerous_extension("noextension")
+        assert strict.is_dangerous_extension("report.pdf")
+        assert strict.is_dangerous_extension("game.apk")
+        assert "" not in strict.extensions
+
+    def test_multi_part_extension(self):
+        """測試嚴格模式的多段副檔名 (tar.gz 之外的 gz 本身也是危險副檔名)"""
+        policy = ExtensionPolicy.build({"strict_mode": True})
+
+        assert "tar.gz" in policy.extensions
+        assert policy.is_dangerous_extension("backup.tar.gz")
+        assert policy.is_dangerous_extension("archive.tgz")
+
+    def test_precomputed_extension(self):
+        """測試沿用共用訊息特徵已解析的副檔名, 結果與由檔名解析相同"""
+        policy = ExtensionPolicy.build({"strict_mode": True})
+
+        assert policy.is_dangerous_extension("virus.exe", "exe")
+        assert policy.is_dangerous_extension("backup.tar.gz", "gz")
+        assert not policy.is_dangerous_extension("noextension", "")
+        assert not policy.is_dangerous_extension("file.", "")
+
+    def test_whitelist_overrides_extension(self):
+        """測試符合白名單的檔名不視為危險, 白名單不分大小寫"""
+        policy = ExtensionPolicy.build({}, whitelist={"Installer_Official"})
+
+        assert not policy.is_dangerous("installer_official.exe")
+        assert policy.is_dangerous("installer.exe")
+
+
+class TestPolicyCache:
+    """🗂️ 策略快取測試類"""
+
+    @pytest.fixture
+    def cog(self):
+        """建立使用模擬資料庫的模組"""
+        cog = AntiExecutable(SimpleNamespace())
+        cog.db = AsyncMock()
+        cog.db.get_settings.return_value = {"enabled": True, "strict_mode": False}
+        cog.db.get_whitelist.return_value = set()
+        cog.db.update_settings.return_value = True
+        cog.db.add_to_whitelist.return_value = True
+        return cog
+
+    @pytest.mark.asyncio
+    async def test_policy_is_cached(self, cog):
+        """測試策略建立一次後, 檢查附件與連結不再讀取設定"""
+        detector = ExecutableDetector(cog)
+        for _ in range(10):
+            links = await detector.find_dangerous_links(
+                ["https://example.com/a.exe", "https://example.com/a.png"], 1
+            )
+            assert links == ["https://example.com/a.exe"]
+
+        assert cog.db.get_settings.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_changes_rebuild_policy(self, cog):
+        """測試更新設定與白名單後策略立即重建"""
+        detector = ExecutableDetector(cog)
+        url = "https://example.com/files/tool.pdf"
+        assert await detector.find_dangerous_links([url], 1) == []
+
+        cog.db.get_settings.return_value = {"enabled": True, "strict_mode": True}
+        await cog.update_settings(1, {"strict_mode": True})
+        assert await detector.find_dangerous_links([url], 1) == [url]
+
+        cog.db.get_whitelist.return_value = {"tool"}
+        await cog.add_to_whitelist(1, "tool")
+        assert await detector.find_dangerous_links([url], 1) == []
+
+    @pytest.mark.asyncio
+    async def test_attachments_use_shared_features(self, cog):
+        """測試檢查附件沿用共用訊息特徵的檔名與副檔名, 危險副檔名不需下載"""
+        cog.sniffer = AsyncMock()
+        cog.sniffer.check_many.return_value = [False]
+        detector = ExecutableDetector(cog)
+        attachments = [
+            SimpleNamespace(filename="Photo.PNG", size=1024),
+            SimpleNamespace(filename="Setup.EXE", size=1024),
+        ]
+        features = SimpleNamespace(
+            attachment_names=("photo.png", "setup.exe"),
+            attachment_extensions=("png", "exe"),
+        )
+
+        found = await detector.find_dangerous_attachment(attachments, 1, features)
+
+        assert found is attachments[1]
+        cog.sniffer.check_many.assert_not_awaited()
+        assert await detector.find_dangerous_attachment(attachments, 1) is found
@@ -0,0 +1,154 @@
+"""
+反可執行檔案特徵擷取測試模塊
+測試共用連線、並行上限、判定結果快取與單一期限
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from src.cogs.protection.anti_executable.main.sniffer import (
+    SignatureSniffer,
+    match_signature,
+)
+
+FILES = {
+    "app.png": b"MZ\x90\x00" + b"\x00" * 60,
+    "photo.png": b"\x89PNG\r\n\x1a\n" + b"\x00" * 60,
+}
+
+
+class FileServer:
+    """本機附件伺服器, 支援 Range 並記錄連線與並行數量"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.requests = 0
+        self.active = 0
+        self.peak = 0
+        self.peers: set[tuple] = set()
+        self.base_url = ""
+        self._runner: web.AppRunner | None = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        self.requests += 1
+        self.peers.add(request.transport.get_extra_info("peername"))
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            name = request.match_info["name"]
+            if name == "slow.png":
+                await asyncio.sleep(2)
+            elif self.delay:
+                await asyncio.sleep(self.delay)
+            body = FILES.get(name)
+            if body is None:
+                return web.Response(status=404)
+            if request.headers.get("Range") == "bytes=0-15":
+                return web.Response(status=206, body=body[:16])
+            return web.Response(body=body)
+        finally:
+            self.active -= 1
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/{name}", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def attachment(self, attachment_id: int, name: str) -> SimpleNamespace:
+        return SimpleNamespace(id=attachment_id, url=f"{self.base_url}/{name}")
+
+
+@pytest_asyncio.fixture
+async def server():
+    """本機附件伺服器"""
+    file_server = FileServer(delay=0.05)
+    await file_server.start()
+    yield file_server
+    await file_server.stop()
+
+
+@pytest_asyncio.fixture
+async def sniffer():
+    """並行上限為 2 的擷取器"""
+    file_sniffer = SignatureSniffer(max_concurrency=2, cache_size=4, deadline=2.0)
+    yield file_sniffer
+    await file_sniffer.close()
+
+
+def test_match_signature():
+    """測試魔術數字比對"""
+    assert match_signature(FILES["app.png"])
+    assert not match_signature(FILES["photo.png"])
+    assert not match_signature(b"")
+
+
+class TestSignatureSniffer:
+    """🔍 檔案特徵擷取測試類"""
+
+    @pytest.mark.asyncio
+    async def test_parallel_on_shared_connections(self, server, sniffer):
+        """測試多個附件並行擷取, 連線數不超過並行上限且重複使用"""
+        attachments = [
+            server.attachment(index, "app.png" if index == 5 else "photo.png")
+            for index in range(8)
+        ]
+
+        verdicts = await sniffer.check_many(attachments)
+
+        assert verdicts == [index == 5 for index in range(8)]
+        assert server.requests == 8
+        assert server.peak == 2
+        assert len(server.peers) <= 2
+
+    @pytest.mark.asyncio
+    async def test_verdicts_are_cached(self, server, sniffer):
+        """測試相同附件只下載一次, 快取數量有上限"""
+        app = server.attachment(1, "app.png")
+        assert await sniffer.is_executable(app)
+        assert await sniffer.is_executable(app)
+        assert server.requests == 1
+
+        await sniffer.check_many([
+            server.attachment(i, "photo.png") for i in range(2, 8)
+        ])
+        assert sniffer.get_stats()["cached"] == 4
+        assert sniffer.get_cached(1) is None
+
+    @pytest.mark.asyncio
+    async def test_failures_are_not_cached(self, server, sniffer):
+        """測試下載失敗視為未偵測到且不快取"""
+        missing = server.attachment(1, "missing.png")
+
+        assert await sniffer.check_many([missing, missing]) == [False, False]
+        assert sniffer.get_cached(1) is None
+        assert sniffer.stats["fetch_failures"] == 2
+
+    @pytest.mark.asyncio
+    async def test_single_deadline(self, server, sniffer):
+        """測試所有附件共用一個期限, 逾時的附件為 False"""
+        attachments = [
+            server.attachment(1, "slow.png"),
+            server.attachment(2, "app.png"),
+        ]
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        verdicts = await sniffer.check_many(attachments, deadline=0.5)
+
+        assert loop.time() - started < 1.5
+        assert verdicts == [False, True]
+        assert sniffer.stats["timeouts"] == 1
+        assert sniffer.get_cached(1) is None
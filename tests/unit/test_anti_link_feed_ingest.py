@@ -0,0 +1,243 @@
+"""
+反惡意連結威脅情資串流擷取測試模塊
+測試逐行解析、條件式請求、內容雜湊比對與差異更新
+"""
+
+import hashlib
+from unittest.mock import MagicMock, patch
+
+import aiohttp
+import aiosqlite
+import pytest
+import pytest_asyncio
+from aiohttp import web
+
+from src.cogs.protection.anti_link.database.database import AntiLinkDatabase
+from src.cogs.protection.anti_link.main.feed_ingest import (
+    FeedState,
+    fetch_threat_feed,
+    parse_feed_line,
+)
+
+# 約 3 MB 的合成情資
+FEED_DOMAINS = [f"malicious-{index:06d}.example" for index in range(120_000)]
+FEED_BODY = (
+    "# synthetic feed\n" + "\n".join(f"http://{d}/login" for d in FEED_DOMAINS)
+).encode()
+
+
+class FeedServer:
+    """本機情資伺服器, 支援 ETag 條件式請求"""
+
+    def __init__(self, body: bytes, etag: bool = True):
+        self.body = body
+        self.etag = etag
+        self.requests = 0
+        self.not_modified = 0
+        self.url = ""
+        self._runner: web.AppRunner | None = None
+
+    async def handle(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        etag = f'"{hashlib.sha256(self.body).hexdigest()[:16]}"'
+        if self.etag and request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return web.Response(status=304)
+
+        response = web.StreamResponse(headers={"ETag": etag} if self.etag else {})
+        await response.prepare(request)
+        for start in range(0, len(self.body), 256 * 1024):
+            await response.write(self.body[start : start + 256 * 1024])
+        await response.write_eof()
+        return response
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/feed.txt", self.handle)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/feed.txt"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+@pytest_asyncio.fixture
+async def server():
+    """提供 ETag 的本機情資伺服器"""
+    feed_server = FeedServer(FEED_BODY)
+    await feed_server.start()
+    yield feed_server
+    await feed_server.stop()
+
+
+class TestParseFeedLine:
+    """📄 情資逐行解析測試類"""
+
+    @pytest.mark.parametrize(
+        ("line", "format_type", "expected"),
+        [
+            ("http://WWW.Evil.com:8080/x\n", "text", "evil.com"),
+            ("evil.com", "text", "evil.com"),
+            ("# comment", "text", None),
+            ("   ", "text", None),
+            ('1,2024-01-01,"http://phish.io/a",online', "csv", "phish.io"),
+            ("1,2024-01-01", "csv", None),
+            ("evil.com", "json", None),
+        ],
+    )
+    def test_parse(self, line, format_type, expected):
+        """測試文字與 CSV 格式的解析"""
+        assert parse_feed_line(line, format_type) == expected
+
+
+class TestFetchThreatFeed:
+    """🌐 情資串流擷取測試類"""
+
+    @pytest.mark.asyncio
+    async def test_streams_multi_mb_feed(self, server):
+        """測試串流擷取數 MB 的情資並記錄 ETag 與內容雜湊"""
+        config = {"url": server.url, "format": "text"}
+        async with aiohttp.ClientSession() as session:
+            result = await fetch_threat_feed(session, config, FeedState("local"))
+
+        assert result.domains == set(FEED_DOMAINS)
+        assert result.bytes_read == len(FEED_BODY)
+        assert result.state.etag
+        assert result.state.content_hash == hashlib.sha256(FEED_BODY).hexdigest()
+
+    @pytest.mark.asyncio
+    async def test_not_modified_skips_download(self, server):
+        """測試帶 ETag 的條件式請求收到 304 時不下載內容"""
+        config = {"url": server.url, "format": "text"}
+        async with aiohttp.ClientSession() as session:
+            first = await fetch_threat_feed(session, config, FeedState("local"))
+            second = await fetch_threat_feed(session, config, first.state)
+
+        assert second.unchanged
+        assert second.bytes_read == 0
+        assert server.not_modified == 1
+
+    @pytest.mark.asyncio
+    async def test_same_hash_skips_parse(self):
+        """測試伺服器不支援 ETag 時以內容雜湊判定未變更"""
+        feed_server = FeedServer(FEED_BODY, etag=False)
+        await feed_server.start()
+        try:
+            config = {"url": feed_server.url, "format": "text"}
+            async with aiohttp.ClientSession() as session:
+                first = await fetch_threat_feed(session, config, FeedState("local"))
+                with patch(
+                    "src.cogs.protection.anti_link.main.feed_ingest.parse_feed_stream"
+                ) as parse:
+                    second = await fetch_threat_feed(session, config, first.state)
+        finally:
+            await feed_server.stop()
+
+        assert second.unchanged
+        assert second.bytes_read == len(FEED_BODY)
+        parse.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_error_status_returns_none(self, server):
+        """測試非 200 回應時回傳 None"""
+        config = {"url": server.url.replace("feed.txt", "missing"), "format": "text"}
+        async with aiohttp.ClientSession() as session:
+            assert await fetch_threat_feed(session, config, FeedState("local")) is None
+
+
+class TestBlacklistDiff:
+    """🗃️ 黑名單差異更新測試類"""
+
+    @pytest_asyncio.fixture
+    async def db(self, tmp_path):
+        """使用暫存目錄的資料庫"""
+        settings = MagicMock()
+        settings.database.sqlite_path = tmp_path
+        with patch(
+            "src.cogs.protection.anti_link.database.database.get_settings",
+            return_value=settings,
+        ):
+            database = AntiLinkDatabase(MagicMock())
+        await database.init_db()
+        return database
+
+    @pytest.mark.asyncio
+    async def test_apply_diff(self, db):
+        """測試只新增與移除有差異的網域, 且不影響其他來源"""
+        await db.update_blacklist_cache({"other.com"}, "other")
+
+        assert await db.apply_blacklist_diff("feed", {"a.com", "b.com"}) == (2, 0)
+        assert await db.apply_blacklist_diff("feed", {"b.com", "c.com"}) == (1, 1)
+        assert await db.apply_blacklist_diff("feed", {"b.com", "c.com"}) == (0, 0)
+
+        assert await db.get_blacklist_cache("feed") == {"b.com", "c.com"}
+        assert await db.get_blacklist_cache() == {"b.com", "c.com", "other.com"}
+
+    @pytest.mark.asyncio
+    async def test_overlapping_sources(self, db):
+        """測試多個來源列出同一網域時, 一個來源移除後仍保持封鎖"""
+        await db.apply_blacklist_diff("urlhaus", {"evil.com", "a.com"})
+        await db.apply_blacklist_diff("openphish", {"evil.com", "b.com"})
+
+        assert await db.apply_blacklist_diff("urlhaus", {"a.com"}) == (0, 1)
+        assert await db.get_blacklist_cache() == {"evil.com", "a.com", "b.com"}
+        assert await db.get_blacklist_cache("openphish") == {"evil.com", "b.com"}
+
+        assert await db.apply_blacklist_diff("openphish", {"b.com"}) == (0, 1)
+        assert await db.get_blacklist_cache() == {"a.com", "b.com"}
+
+    @pytest.mark.asyncio
+    async def test_migrates_domain_keyed_table(self, tmp_path):
+        """測試舊的網域主鍵表轉為 (網域, 來源) 主鍵並清除擷取狀態"""
+        async with aiosqlite.connect(tmp_path / "anti_link.db") as conn:
+            await conn.execute("""
+                CREATE TABLE blacklist_cache (
+                    domain TEXT PRIMARY KEY,
+                    source TEXT,
+                    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            await conn.execute(
+                "INSERT INTO blacklist_cache (domain, source) VALUES (?, ?)",
+                ("evil.com", "urlhaus"),
+            )
+            await conn.execute(
+                "CREATE TABLE feed_state (source TEXT PRIMARY KEY, etag TEXT,"
+                " last_modified TEXT, content_hash TEXT, updated_at TIMESTAMP)"
+            )
+            await conn.execute(
+                "INSERT INTO feed_state (source, content_hash) VALUES ('urlhaus', 'x')"
+            )
+            await conn.commit()
+
+        settings = MagicMock()
+        settings.database.sqlite_path = tmp_path
+        with patch(
+            "src.cogs.protection.anti_link.database.database.get_settings",
+            return_value=settings,
+        ):
+            database = AntiLinkDatabase(MagicMock())
+        await database.init_db()
+
+        assert await database.get_blacklist_cache("urlhaus") == {"evil.com"}
+        assert await database.get_feed_state("urlhaus") == FeedState("urlhaus")
+        assert await database.apply_blacklist_diff("openphish", {"evil.com"}) == (
+            1,
+            0,
+        )
+
+    @pytest.mark.asyncio
+    async def test_feed_state_roundtrip(self, db):
+        """測試保存與讀取情資擷取狀態"""
+        assert await db.get_feed_state("feed") == FeedState("feed")
+
+        state = FeedState("feed", '"abc"', "Mon, 01 Jan 2024 00:00:00 GMT", "f00d")
+        await db.save_feed_state(state)
+
+        assert await db.get_feed_state("feed") == state
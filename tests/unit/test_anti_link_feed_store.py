@@ -0,0 +1,128 @@
+"""
+反惡意連結威脅情資精簡儲存測試模塊
+測試映像打包、二分搜尋、Bloom 過濾器、mmap 載入與比對器整合
+"""
+
+import pytest
+
+from src.cogs.protection.anti_link.main.feed_store import (
+    CompactDomainSet,
+    DomainSnapshotBuilder,
+    pack_domains,
+    store_snapshot,
+)
+from src.cogs.protection.anti_link.main.matcher import (
+    DomainTrie,
+    GuildDomainMatcher,
+    Verdict,
+)
+
+DOMAINS = {"evil.com", "phish.co.uk", "bad.example.org", "xn--80ak6aa92e.com"}
+
+
+class TestCompactDomainSet:
+    """🗜️ 精簡網域集合測試類"""
+
+    @pytest.mark.parametrize("bloom_bits", [0, 10])
+    def test_membership(self, bloom_bits):
+        """測試有無 Bloom 過濾器時的查詢結果一致"""
+        feed = CompactDomainSet.from_domains(DOMAINS, bloom_bits)
+
+        assert len(feed) == len(DOMAINS)
+        assert all(domain in feed for domain in DOMAINS)
+        assert "example.org" not in feed
+        assert "evil.co" not in feed
+        assert "zzz.com" not in feed
+        assert None not in feed
+
+    def test_iter_is_sorted_and_deduplicated(self):
+        """測試迭代結果已排序且去重"""
+        feed = CompactDomainSet.from_domains([*DOMAINS, "evil.com", ""])
+
+        assert list(feed) == sorted(DOMAINS)
+
+    def test_empty(self):
+        """測試空集合"""
+        feed = CompactDomainSet.empty()
+
+        assert len(feed) == 0
+        assert "evil.com" not in feed
+        assert feed.bytes_per_domain == 0.0
+
+    def test_builder_requires_sorted_input(self):
+        """測試建立器拒絕未排序的網域"""
+        builder = DomainSnapshotBuilder()
+        builder.add("b.com")
+
+        with pytest.raises(ValueError):
+            builder.add("a.com")
+
+    def test_rejects_corrupt_snapshot(self):
+        """測試拒絕格式錯誤或被截斷的映像"""
+        data = pack_domains(DOMAINS)
+
+        with pytest.raises(ValueError):
+            CompactDomainSet(b"XXXX" + data[4:])
+        with pytest.raises(ValueError):
+            CompactDomainSet(data[:-1])
+
+    def test_store_snapshot_uses_mmap(self, tmp_path):
+        """測試寫入映像檔後以 mmap 開啟, 並可替換為新映像"""
+        path = tmp_path / "feed.bin"
+
+        feed = store_snapshot(pack_domains(DOMAINS), path)
+        assert feed.is_mapped
+        assert "phish.co.uk" in feed
+
+        newer = store_snapshot(pack_domains({"new.com"}), path)
+        feed.close()
+        assert "new.com" in newer
+        assert "evil.com" not in newer
+        assert newer.get_stats()["bytes"] == path.stat().st_size
+        newer.close()
+
+    def test_bytes_per_domain_is_compact(self):
+        """測試每個網域的平均位元組約為網域長度加上位移與 Bloom 位元"""
+        domains = {f"domain-{index:06d}.example" for index in range(1000)}
+        feed = CompactDomainSet.from_domains(domains)
+
+        # 網域 21 bytes + 位移 4 bytes + Bloom 1.25 bytes
+        assert feed.bytes_per_domain < 27
+
+
+class TestMatcherWithFeed:
+    """🛡️ 比對器威脅情資整合測試類"""
+
+    @pytest.fixture
+    def matcher(self) -> GuildDomainMatcher:
+        """共用樹為預設白名單, 威脅情資為精簡集合"""
+        return GuildDomainMatcher.build(
+            DomainTrie.build(allow={"discord.com"}),
+            whitelist={"safe.evil.com"},
+            blacklist=set(),
+            feed=CompactDomainSet.from_domains(DOMAINS | {"discord.com", "gg"}),
+        )
+
+    @pytest.mark.parametrize(
+        ("domain", "expected"),
+        [
+            ("evil.com", Verdict.DENY),
+            ("cdn.login.evil.com", Verdict.DENY),
+            ("x.phish.co.uk", Verdict.DENY),
+            ("safe.evil.com", Verdict.ALLOW),
+            ("discord.com", Verdict.ALLOW),
+            ("gg", Verdict.DENY),
+            ("discord.gg", Verdict.UNKNOWN),
+            ("example.org", Verdict.UNKNOWN),
+        ],
+    )
+    def test_match(self, matcher, domain, expected):
+        """測試白名單優先, 威脅情資套用至網域本身與上層網域"""
+        assert matcher.match(domain) is expected
+
+    def test_feed_swap(self, matcher):
+        """測試替換威脅情資"""
+        matcher.feed = CompactDomainSet.from_domains({"fresh.io"})
+
+        assert matcher.match("a.fresh.io") is Verdict.DENY
+        assert matcher.match("evil.com") is Verdict.UNKNOWN
@@ -0,0 +1,98 @@
+"""
+反惡意連結網域比對器測試模塊
+測試反轉標籤字典樹的白名單優先、上層網域比對與增量更新
+"""
+
+import pytest
+
+from src.cogs.protection.anti_link.main.matcher import (
+    DomainTrie,
+    GuildDomainMatcher,
+    Verdict,
+    match_domain,
+)
+
+
+@pytest.fixture
+def matcher() -> GuildDomainMatcher:
+    """共用樹含預設白名單與遠端黑名單, 伺服器樹含自訂名單"""
+    shared = DomainTrie.build(
+        allow={"discord.com", "youtube.com"},
+        deny={"evil.com", "phish.co.uk", "localhost"},
+    )
+    return GuildDomainMatcher.build(
+        shared, whitelist={"good.evil.com"}, blacklist={"spam.net"}
+    )
+
+
+class TestDomainTrie:
+    """🌲 網域字典樹測試類"""
+
+    def test_size_counts_unique_domains(self):
+        """測試重複網域只計算一次"""
+        trie = DomainTrie.build(allow={"a.com"}, deny={"a.com", "b.com"})
+
+        assert len(trie) == 2
+
+    def test_allow_wins_on_conflict(self):
+        """測試同一網域同時在白名單與黑名單時白名單優先, 不受加入順序影響"""
+        trie = DomainTrie()
+        trie.add("a.com", Verdict.DENY)
+        trie.add("a.com", Verdict.ALLOW)
+        trie.add("a.com", Verdict.DENY)
+
+        assert match_domain("a.com", trie) is Verdict.ALLOW
+
+    def test_empty_domain_is_unknown(self):
+        """測試空網域為未知"""
+        assert match_domain("", DomainTrie.build(deny={"a.com"})) is Verdict.UNKNOWN
+
+
+class TestGuildDomainMatcher:
+    """🛡️ 伺服器網域比對器測試類"""
+
+    @pytest.mark.parametrize(
+        ("domain", "expected"),
+        [
+            ("discord.com", Verdict.ALLOW),
+            ("cdn.discord.com", Verdict.ALLOW),
+            ("evil.com", Verdict.DENY),
+            ("login.evil.com", Verdict.DENY),
+            ("phish.co.uk", Verdict.DENY),
+            ("www2.phish.co.uk", Verdict.DENY),
+            ("spam.net", Verdict.DENY),
+            ("a.spam.net", Verdict.DENY),
+            ("notevil.com", Verdict.UNKNOWN),
+            ("example.org", Verdict.UNKNOWN),
+        ],
+    )
+    def test_match(self, matcher, domain, expected):
+        """測試網域本身與子網域的判定"""
+        assert matcher.match(domain) is expected
+
+    def test_whitelist_precedes_parent_blacklist(self, matcher):
+        """測試自訂白名單的子網域優先於上層網域的黑名單"""
+        assert matcher.match("good.evil.com") is Verdict.ALLOW
+        assert matcher.match("cdn.good.evil.com") is Verdict.ALLOW
+        assert matcher.match("bad.evil.com") is Verdict.DENY
+
+    def test_single_label_deny_only_matches_itself(self, matcher):
+        """測試單一標籤的黑名單只比對完全相同的網域"""
+        assert matcher.match("localhost") is Verdict.DENY
+        assert matcher.match("printer.localhost") is Verdict.UNKNOWN
+
+    def test_incremental_updates(self, matcher):
+        """測試增量加入白名單與黑名單"""
+        matcher.deny({"new-phish.io"})
+        matcher.allow({"spam.net"})
+
+        assert matcher.match("x.new-phish.io") is Verdict.DENY
+        assert matcher.match("a.spam.net") is Verdict.ALLOW
+
+    def test_shared_trie_swap(self, matcher):
+        """測試替換共用字典樹後使用新的遠端黑名單"""
+        matcher.shared_trie = DomainTrie.build(deny={"fresh-feed.com"})
+
+        assert matcher.match("fresh-feed.com") is Verdict.DENY
+        assert matcher.match("evil.com") is Verdict.UNKNOWN
+        assert matcher.match("spam.net") is Verdict.DENY
@@ -0,0 +1,156 @@
+"""
+反垃圾訊息行為歷史測試模塊
+測試環形緩衝區、窗口計數、容量上限與時間輪閒置移除
+"""
+
+from src.cogs.protection.anti_spam.main.history import (
+    EventRing,
+    SpamHistory,
+    SpamHistoryStore,
+    TimingWheel,
+)
+from src.cogs.protection.anti_spam.performance.benchmarks import HistoryBenchmark
+
+
+class TestEventRing:
+    """🔁 環形緩衝區測試類"""
+
+    def test_grow_and_release(self):
+        """測試加倍擴充後序號仍對應原本的事件"""
+        ring = EventRing(max_capacity=16)
+        for seq in range(3):
+            ring.append(seq)
+        ring.release(2)
+        for seq in range(3, 12):
+            ring.append(seq)
+
+        assert len(ring) == 10
+        assert [ring[seq] for seq in range(ring.head, ring.tail)] == list(range(2, 12))
+
+    def test_full(self):
+        """測試容量上限"""
+        ring = EventRing(max_capacity=3)
+        for seq in range(3):
+            ring.append(seq)
+
+        assert ring.full
+        ring.release(1)
+        assert not ring.full
+
+
+class TestSpamHistory:
+    """🕒 用戶行為歷史測試類"""
+
+    def test_window_counts(self):
+        """測試頻率與重複窗口只計算窗口內的訊息"""
+        history = SpamHistory(0.0)
+        for now, content_hash in [(0.0, "a"), (5.0, "a"), (12.0, "b"), (14.0, "a")]:
+            history.add_message(now, content_hash, None)
+
+        assert history.count_recent(14.0, 10) == 3
+        assert history.count_identical(14.0, 30, "a") == 3
+        assert history.count_identical(20.0, 10, "a") == 1
+        assert history.count_identical(20.0, 10, "b") == 1
+        assert history.count_recent(30.0, 10) == 0
+
+    def test_expired_events_are_released(self):
+        """測試所有窗口都不再需要的事件被釋放"""
+        history = SpamHistory(0.0)
+        for now in range(10):
+            history.add_message(float(now), "a", None)
+
+        history.count_recent(100.0, 10)
+        history.count_identical(100.0, 10, "a")
+        list(history.recent_sketches(100.0, 10))
+
+        assert len(history.messages) == 0
+
+    def test_recent_sketches_excludes_latest(self):
+        """測試相似檢查只取得目前訊息之前且有草圖的訊息"""
+        history = SpamHistory(0.0)
+        history.add_message(0.0, "a", b"old")
+        history.add_message(50.0, "b", b"mid")
+        history.add_message(55.0, "c", None)
+        history.add_message(60.0, "d", b"new")
+
+        assert list(history.recent_sketches(60.0, 30)) == [b"mid"]
+
+    def test_capacity_keeps_counts_consistent(self):
+        """測試超過容量時最舊的事件被覆寫, 計數保持一致"""
+        history = SpamHistory(0.0, capacity=8)
+        for now in range(100):
+            history.add_message(float(now), "same" if now % 2 else "other", None)
+
+        assert len(history.messages) == 8
+        assert history.count_recent(99.0, 1000) == 8
+        assert history.count_identical(99.0, 1000, "same") == 4
+        assert history.count_identical(99.0, 1000, "other") == 4
+
+    def test_stickers(self):
+        """測試貼圖窗口計數"""
+        history = SpamHistory(0.0)
+        assert history.count_stickers(0.0, 30) == 0
+
+        for now in (0.0, 10.0, 20.0, 40.0):
+            history.add_sticker(now)
+
+        assert history.count_stickers(40.0, 30) == 3
+        assert history.count_stickers(50.0, 30) == 2
+
+
+class TestSpamHistoryStore:
+    """🗄️ 行為歷史儲存測試類"""
+
+    def test_keyed_by_guild_and_user(self):
+        """測試同一用戶在不同伺服器的歷史分開保存"""
+        store = SpamHistoryStore()
+        store.get(1, 10, 0.0).add_message(0.0, "a", None)
+        store.get(2, 10, 0.0).add_message(0.0, "a", None)
+
+        assert store.get(1, 10, 1.0) is not store.get(2, 10, 1.0)
+        assert store.get(1, 10, 1.0).count_recent(1.0, 10) == 1
+        assert len(store) == 2
+
+    def test_idle_histories_expire(self):
+        """測試閒置的歷史被移除, 仍有活動的歷史保留"""
+        store = SpamHistoryStore(idle_ttl=60, resolution=10)
+        store.get(1, 1, 0.0).add_message(0.0, "a", None)
+        store.get(1, 2, 0.0).add_message(0.0, "a", None)
+
+        store.expire(50.0)
+        store.get(1, 2, 50.0).add_message(50.0, "b", None)
+
+        assert store.expire(80.0) == 1
+        assert (1, 1) not in store
+        assert (1, 2) in store
+
+        assert store.expire(200.0) == 1
+        assert len(store) == 0
+
+    def test_expire_after_long_gap(self):
+        """測試長時間沒有訊息後推進時間輪仍會移除所有閒置歷史"""
+        store = SpamHistoryStore(idle_ttl=60, resolution=10)
+        for user_id in range(20):
+            store.get(1, user_id, float(user_id)).add_message(float(user_id), "a", None)
+
+        assert store.expire(100_000.0) == 20
+
+
+class TestTimingWheel:
+    """⏱️ 時間輪測試類"""
+
+    def test_far_deadline_is_rescheduled(self):
+        """測試超出涵蓋範圍的到期時間先排入最遠的格子"""
+        wheel = TimingWheel(resolution=1, slots=4)
+        wheel.schedule("key", 100.0, 0.0)
+
+        assert wheel.advance(2.0) == []
+        assert wheel.advance(3.0) == ["key"]
+
+
+def test_history_memory_is_bounded():
+    """測試每個活躍用戶的歷史記憶體有上限, 閒置後全部移除"""
+    result = HistoryBenchmark().measure_memory(users=5000)
+
+    assert result["bytes_per_user"] < 2048
+    assert result["expired"] == 5000
@@ -0,0 +1,158 @@
+"""
+反垃圾訊息近似重複偵測測試模塊
+測試 MinHash 草圖、相似度估計、跨用戶索引與基準測試的召回率
+"""
+
+import pytest
+
+from src.cogs.protection.anti_spam.main.sketch import (
+    SKETCH_SIZE,
+    NearDuplicateIndex,
+    has_min_shingles,
+    minhash,
+    shingles,
+    similarity,
+)
+from src.cogs.protection.anti_spam.performance.benchmarks import (
+    SWEEP_THRESHOLDS,
+    SimilarityBenchmark,
+)
+
+BASE = "free nitro giveaway click here to claim your gift before it expires"
+NEAR = "free nitro giveaway click here to claim ur gift before it expire"
+OTHER = "does anyone know when the next community event starts this week"
+
+# 彼此無關的一般聊天訊息
+CHAT = [
+    "anyone up for some ranked games tonight",
+    "does anyone know when the next community event starts this week",
+    "i just finished my homework finally",
+    "can someone help me with python decorators",
+    "good morning everyone how are you doing",
+    "the new update broke my graphics drivers again",
+    "please remember to read the rules channel",
+    "今天晚上有人要一起玩遊戲嗎",
+    "有人知道這個錯誤訊息是什麼意思嗎",
+    "我剛剛看完那部電影真的很好看",
+]
+
+
+class TestMinHash:
+    """🔢 MinHash 草圖測試類"""
+
+    def test_shingles(self):
+        """測試字元片段切分與短文字"""
+        assert shingles("abcd") == {"ab", "bc", "cd"}
+        assert shingles("a") == {"a"}
+        assert shingles("") == set()
+
+    def test_min_shingles(self):
+        """測試常見短回覆的片段數量不足以進行跨用戶比對"""
+        for text in ("gg", "hi", "lol lol", "早安", "hahahahahahaha"):
+            assert not has_min_shingles(text)
+        assert has_min_shingles(BASE)
+
+    def test_sketch_size_and_empty(self):
+        """測試草圖大小固定, 空文字沒有草圖"""
+        assert len(minhash(BASE)) == SKETCH_SIZE
+        assert len(minhash("嗨")) == SKETCH_SIZE
+        assert minhash("") is None
+
+    def test_similarity(self):
+        """測試相同、近似與無關內容的相似度估計"""
+        sketch = minhash(BASE)
+
+        assert similarity(sketch, minhash(BASE)) == 1.0
+        assert similarity(sketch, minhash(NEAR)) >= 0.8
+        assert similarity(sketch, minhash(OTHER)) < 0.8
+
+    def test_cjk_similarity(self):
+        """測試中文內容的近似判定"""
+        sketch = minhash("限時免費領取 nitro 點擊連結立即參加活動")
+        near = minhash("限時免費領取nitro 點擊連結立刻參加活動")
+        other = minhash("今天晚上有人要一起玩遊戲嗎")
+
+        assert similarity(sketch, near) >= 0.8
+        assert similarity(sketch, other) < 0.8
+
+    def test_unrelated_chat_scores_low(self):
+        """測試無關的聊天訊息估計值接近 0, 最低閾值下最多偶爾一對被判定為相似"""
+        sketches = [minhash(text) for text in CHAT]
+        scores = [
+            similarity(sketches[i], sketches[j])
+            for i in range(len(sketches))
+            for j in range(i + 1, len(sketches))
+        ]
+
+        assert sum(scores) / len(scores) < 0.1
+        assert sum(score >= min(SWEEP_THRESHOLDS) for score in scores) <= 2
+        assert max(scores) < 0.8
+
+
+class TestNearDuplicateIndex:
+    """🕸️ 跨用戶近似重複索引測試類"""
+
+    def test_similar_users(self):
+        """測試找出發送近似內容的其他用戶"""
+        index = NearDuplicateIndex()
+        index.add(0.0, 1, minhash(BASE))
+        index.add(1.0, 2, minhash(NEAR))
+        index.add(2.0, 3, minhash(OTHER))
+
+        assert index.similar_users(minhash(BASE), 0.8) == {1, 2}
+        assert index.similar_users(minhash(BASE), 0.8, limit=1) in ({1}, {2})
+
+    def test_prune_removes_expired_entries(self):
+        """測試過期條目與空分桶被移除"""
+        index = NearDuplicateIndex()
+        index.add(0.0, 1, minhash(BASE))
+        index.add(10.0, 2, minhash(NEAR))
+
+        index.prune(5.0)
+        assert len(index) == 1
+        assert index.similar_users(minhash(BASE), 0.8) == {2}
+
+        index.prune(11.0)
+        assert len(index) == 0
+        assert not index._buckets
+
+    def test_max_candidates(self):
+        """測試候選數量上限"""
+        index = NearDuplicateIndex()
+        for user_id in range(10):
+            index.add(float(user_id), user_id, minhash(BASE))
+
+        assert len(index.similar_users(minhash(BASE), 0.8, max_candidates=3)) == 3
+
+
+class TestSimilarityBenchmark:
+    """📊 相似度基準測試類"""
+
+    @pytest.fixture
+    def benchmark(self) -> SimilarityBenchmark:
+        return SimilarityBenchmark(seed=7)
+
+    def test_recall_against_sequence_matcher(self, benchmark):
+        """測試草圖在預設閾值下相對於 SequenceMatcher 的召回率與精確率"""
+        result = benchmark.benchmark_accuracy(benchmark.generate_windows(10, 20))
+
+        assert result["pairs"] > 0
+        assert result["recall"] >= 0.8
+        assert result["precision"] >= 0.85
+
+    def test_threshold_sweep(self, benchmark):
+        """測試可設定閾值範圍內的召回率與精確率"""
+        sweep = benchmark.benchmark_threshold_sweep(benchmark.generate_windows(10, 20))
+
+        assert [result["threshold"] for result in sweep] == list(SWEEP_THRESHOLDS)
+        for result in sweep:
+            assert result["pairs"] > 0
+            assert result["recall"] >= 0.55
+            assert result["precision"] >= 0.7
+
+    def test_raid_waves_are_flagged(self, benchmark):
+        """測試多個帳號發送近似內容時被判定為突襲"""
+        result = benchmark.benchmark_raid_index(accounts=300, waves=3)
+
+        assert result["flagged"] > 0
+        assert result["peak_entries"] <= 300
@@ -0,0 +1,148 @@
+"""
+共用資源位元組快取測試模塊
+測試位元組上限 LRU、single-flight、磁碟層與指標
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from src.cogs.core.asset_cache import AssetCache, attachment_key, avatar_key
+
+
+class CountingFetcher:
+    """記錄下載次數的下載函數"""
+
+    def __init__(self, data: bytes | None = b"avatar", delay: float = 0):
+        self.data = data
+        self.delay = delay
+        self.calls = 0
+
+    async def __call__(self) -> bytes | None:
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.data
+
+
+class TestAssetCache:
+    """🖼️ 資源快取測試類"""
+
+    def test_keys(self):
+        """測試快取鍵包含資源雜湊與尺寸"""
+        asset = SimpleNamespace(key="a_1234")
+        attachment = SimpleNamespace(id=42, size=1024)
+
+        assert avatar_key(asset, 256) == "asset:a_1234:256"
+        assert avatar_key(asset, 128) != avatar_key(asset, 256)
+        assert attachment_key(attachment) == "attachment:42:1024"
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_fetch_once(self):
+        """測試相同鍵的並發未命中只下載一次"""
+        cache = AssetCache()
+        fetch = CountingFetcher(delay=0.01)
+
+        results = await asyncio.gather(
+            *(cache.get_or_fetch("asset:a:256", fetch) for _ in range(10))
+        )
+
+        assert results == [b"avatar"] * 10
+        assert fetch.calls == 1
+        stats = cache.get_stats()
+        assert stats["misses"] == 1
+        assert stats["coalesced"] == 9
+        assert stats["inflight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_cancelled_owner_does_not_cancel_waiters(self):
+        """測試發起下載的呼叫者被取消時, 其他等待者仍取得結果"""
+        cache = AssetCache()
+        fetch = CountingFetcher(delay=0.02)
+
+        owner = asyncio.create_task(cache.get_or_fetch("k", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get_or_fetch("k", fetch))
+        await asyncio.sleep(0)
+        owner.cancel()
+
+        assert await waiter == b"avatar"
+        assert owner.cancelled()
+        assert fetch.calls == 1
+        assert cache.get("k") == b"avatar"
+        assert cache.get_stats()["inflight"] == 0
+
+    @pytest.mark.asyncio
+    async def test_hit_after_fetch(self):
+        """測試下載後再次取得為命中"""
+        cache = AssetCache()
+        fetch = CountingFetcher()
+
+        await cache.get_or_fetch("k", fetch)
+        assert await cache.get_or_fetch("k", fetch) == b"avatar"
+
+        assert fetch.calls == 1
+        assert cache.get_stats()["hits"] == 1
+        assert cache.get_stats()["hit_rate"] == 0.5
+
+    @pytest.mark.asyncio
+    async def test_failures_are_not_cached(self):
+        """測試下載失敗不被快取, 例外會傳給所有等待者"""
+        cache = AssetCache()
+        missing = CountingFetcher(data=None)
+
+        assert await cache.get_or_fetch("k", missing) is None
+        assert await cache.get_or_fetch("k", missing) is None
+        assert missing.calls == 2
+
+        async def broken():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("HTTP 500")
+
+        results = await asyncio.gather(
+            cache.get_or_fetch("x", broken),
+            cache.get_or_fetch("x", broken),
+            return_exceptions=True,
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert cache.get_stats()["fetch_failures"] == 3
+
+    @pytest.mark.asyncio
+    async def test_byte_budget_evicts_least_recently_used(self):
+        """測試超過位元組上限時淘汰最久未使用的項目"""
+        cache = AssetCache(max_bytes=10)
+
+        await cache.get_or_fetch("a", CountingFetcher(b"aaaa"))
+        await cache.get_or_fetch("b", CountingFetcher(b"bbbb"))
+        cache.get("a")
+        await cache.get_or_fetch("c", CountingFetcher(b"cccc"))
+
+        assert cache.get("a") == b"aaaa"
+        assert cache.get("b") is None
+        stats = cache.get_stats()
+        assert stats["bytes"] == 8
+        assert stats["evictions"] == 1
+
+    @pytest.mark.asyncio
+    async def test_disk_tier_survives_new_instance(self, tmp_path):
+        """測試磁碟層在重新建立快取後仍可命中"""
+        fetch = CountingFetcher()
+        await AssetCache(disk_path=tmp_path).get_or_fetch("k", fetch)
+
+        cache = AssetCache(disk_path=tmp_path)
+        assert await cache.get_or_fetch("k", fetch) == b"avatar"
+
+        assert fetch.calls == 1
+        assert cache.get_stats()["disk_hits"] == 1
+
+    @pytest.mark.asyncio
+    async def test_disk_tier_budget(self, tmp_path):
+        """測試磁碟層超過上限時刪除最舊檔案"""
+        cache = AssetCache(disk_path=tmp_path, max_disk_bytes=12)
+
+        for key in ("a", "b", "c", "d"):
+            await cache.get_or_fetch(key, CountingFetcher(b"12345"))
+
+        assert len(list(tmp_path.glob("*.bin"))) == 2
+        assert cache.get_stats()["disk_bytes"] == 10
@@ -0,0 +1,141 @@
+"""
+資料庫連接池讀寫分離測試模塊
+測試單一寫入連接、WAL 讀取連接、等待式借出與逾時
+"""
+
+import asyncio
+
+import pytest
+import pytest_asyncio
+
+from src.cogs.core.database_pool import DatabaseConnectionPool, PoolConfiguration
+
+
+@pytest_asyncio.fixture
+async def pool():
+    """建立測試用連接池(1 個寫入連接 + 2 個讀取連接)"""
+    config = PoolConfiguration(
+        max_connections=3,
+        min_connections=1,
+        health_check_interval=60,
+        enable_prewarming=False,
+    )
+    pool = DatabaseConnectionPool(config)
+    await pool.initialize()
+    yield pool
+    await pool.close()
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """測試資料庫路徑"""
+    return str(tmp_path / "pool.db")
+
+
+class TestDatabaseConnectionPoolReadWrite:
+    """🔀 連接池讀寫分離測試類"""
+
+    @pytest.mark.asyncio
+    async def test_writes_share_single_writer(self, pool, db_path):
+        """測試所有寫入都使用同一個寫入連接"""
+        async with pool.get_connection_context(db_path) as first:
+            assert first.is_writer
+        async with pool.get_connection_context(db_path) as second:
+            assert second is first
+
+    @pytest.mark.asyncio
+    async def test_reads_use_reader_connections(self, pool, db_path):
+        """測試讀取使用讀取連接, 且可與寫入同時進行"""
+        async with pool.get_connection_context(db_path) as writer:
+            await writer.execute("CREATE TABLE t (v INTEGER)")
+            await writer.commit()
+
+            async with (
+                pool.get_connection_context(db_path, readonly=True) as r1,
+                pool.get_connection_context(db_path, readonly=True) as r2,
+            ):
+                assert not r1.is_writer
+                assert not r2.is_writer
+                assert r1 is not r2
+
+        status = await pool.get_pool_status()
+        assert status["databases"][db_path]["reader_connections"] == 2
+
+    @pytest.mark.asyncio
+    async def test_reader_rejects_writes(self, pool, db_path):
+        """測試讀取連接無法寫入"""
+        async with pool.get_connection_context(db_path) as writer:
+            await writer.execute("CREATE TABLE t (v INTEGER)")
+            await writer.commit()
+
+        async with pool.get_connection_context(db_path, readonly=True) as reader:
+            with pytest.raises(Exception, match="readonly"):
+                await reader.execute("INSERT INTO t VALUES (1)")
+
+    @pytest.mark.asyncio
+    async def test_writer_checkout_waits_instead_of_failing(self, pool, db_path):
+        """測試寫入連接被佔用時等待歸還而非立即失敗"""
+        async with pool.get_connection_context(db_path) as writer:
+            await writer.execute("CREATE TABLE t (v INTEGER)")
+            await writer.commit()
+
+        async def insert(value):
+            async with pool.get_connection_context(db_path, timeout=5) as conn:
+                await conn.execute("INSERT INTO t VALUES (?)", (value,))
+                await asyncio.sleep(0)
+                await conn.commit()
+
+        await asyncio.gather(*(insert(i) for i in range(20)))
+
+        async with pool.get_connection_context(db_path, readonly=True) as reader:
+            cursor = await reader.execute("SELECT COUNT(*) FROM t")
+            assert (await cursor.fetchone())[0] == 20
+
+        metrics = (await pool.get_pool_status())["metrics"]
+        assert metrics["checkout_waits"] > 0
+        assert metrics["checkout_timeouts"] == 0
+
+    @pytest.mark.asyncio
+    async def test_checkout_timeout(self, pool, db_path):
+        """測試等待逾時時拋出錯誤"""
+        async with pool.get_connection_context(db_path):
+            # 另一個任務等待寫入連接
+            with pytest.raises(RuntimeError, match="逾時"):
+                await asyncio.create_task(pool.get_connection(db_path, timeout=0.05))
+
+            status = await pool.get_pool_status()
+            assert status["databases"][db_path]["waiting_requests"] == 0
+            assert status["metrics"]["checkout_timeouts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_nested_writer_checkout_in_same_task(self, pool, db_path):
+        """測試同一任務巢狀取得寫入連接時沿用同一連接而非死結"""
+        async with pool.get_connection_context(db_path, timeout=1) as outer:
+            await outer.execute("CREATE TABLE t (v INTEGER)")
+            async with pool.get_connection_context(db_path, timeout=1) as inner:
+                assert inner is outer
+                await inner.execute("INSERT INTO t VALUES (1)")
+                await inner.commit()
+
+            # 內層歸還後仍由外層持有
+            assert outer.in_use
+            with pytest.raises(RuntimeError, match="逾時"):
+                await asyncio.create_task(pool.get_connection(db_path, timeout=0.05))
+
+        assert not outer.in_use
+        async with pool.get_connection_context(db_path, readonly=True) as reader:
+            cursor = await reader.execute("SELECT COUNT(*) FROM t")
+            assert (await cursor.fetchone())[0] == 1
+
+    @pytest.mark.asyncio
+    async def test_writer_released_to_other_task_after_nesting(self, pool, db_path):
+        """測試巢狀歸還後其他任務可取得寫入連接"""
+        async with pool.get_connection_context(db_path) as outer:
+            async with pool.get_connection_context(db_path):
+                pass
+
+        async def checkout():
+            async with pool.get_connection_context(db_path, timeout=1) as conn:
+                return conn
+
+        assert await asyncio.create_task(checkout()) is outer
@@ -4,12 +4,17 @@
 包括L1內存快取、L2持久化快取、智能快取策略等核心功能.
 """
 
+import asyncio
 import os
+import pickle
+import sqlite3
 import tempfile
 import time
 
 import pytest
+import pytest_asyncio
 
+from src.cogs.core.cache_benchmark import benchmark_l1_get
 from src.cogs.core.cache_manager import (
     CacheAnalyzer,
     CacheEntry,
@@ -17,12 +22,14 @@ from src.cogs.core.cache_manager import (
     CacheOperation,
     CacheStats,
     CacheStrategy,
+    GlobalCacheManager,
     MemoryCacheBackend,
     MultiLevelCache,
     PersistentCacheBackend,
     SmartCacheStrategy,
     cache_delete,
     cache_get,
+    cache_get_or_set,
     cache_key,
     cache_set,
     cached,
@@ -459,6 +466,62 @@ class TestMemoryCacheBackend:
         assert stats["sets"] >= 1
 
 
+class TestMemoryCacheFastPath:
+    """測試內存快取同步讀取路徑與增量統計."""
+
+    @pytest.mark.asyncio
+    async def test_total_size_is_incremental(self):
+        """測試總大小在覆寫、刪除與淘汰後與條目大小總和一致."""
+        backend = MemoryCacheBackend(max_size=3, size_estimator=len)
+
+        for i in range(4):
+            await backend.set(f"key{i}", CacheEntry(f"key{i}", "x" * (i + 1)))
+        await backend.set("key3", CacheEntry("key3", "x" * 10))
+        await backend.delete("key2")
+
+        assert backend.stats.evictions == 1
+        assert backend.stats.entry_count == 2
+        assert backend.stats.total_size == 2 + 10
+        assert backend.stats.total_size == sum(e.size for e in backend._cache.values())
+
+    @pytest.mark.asyncio
+    async def test_get_nowait_and_sampled_analyzer(self):
+        """測試同步讀取不需要鎖, 命中依抽樣記錄並以權重補償."""
+        backend = MemoryCacheBackend(max_size=10, analyzer_sample_every=16)
+        await backend.set("hot", CacheEntry("hot", "value"))
+        history_before = len(backend.analyzer.access_history)
+        hot_before = backend.analyzer.hot_keys["hot"]
+
+        async with backend._lock:
+            for _ in range(32):
+                assert backend.get_nowait("hot").value == "value"
+        assert backend.get_nowait("missing") is None
+
+        assert backend.stats.hits == 32
+        assert backend.analyzer.hot_keys["hot"] == hot_before + 32
+        # 兩次抽樣命中加一次未命中
+        assert len(backend.analyzer.access_history) == history_before + 3
+        assert "missing" in backend.analyzer.cold_keys
+
+    def test_size_estimate_does_not_serialize(self):
+        """測試大小估算不序列化值, 無法序列化的值也能估算."""
+        small = CacheEntry("small", list(range(10)))
+        large = CacheEntry("large", list(range(10_000)))
+        unpicklable = CacheEntry("lock", {"lock": time.sleep})
+
+        assert large.size > small.size * 100
+        assert unpicklable.size > 0
+
+    @pytest.mark.asyncio
+    async def test_throughput_at_100k_gets_per_second(self):
+        """測試每秒 100,000 次 L1 命中讀取時不超出單核."""
+        result = await benchmark_l1_get(entries=1_000, rate=100_000)
+
+        assert result["hit_rate"] == 1.0
+        assert result["cpu_share"] < 1.0
+        assert result["get_nowait_us"] < 10
+
+
 class TestPersistentCacheBackend:
     """測試持久化快取後端功能."""
 
@@ -592,6 +655,94 @@ class TestPersistentCacheBackend:
         assert retrieved_entry.value == complex_value
 
 
+class TestPersistentCacheBatching:
+    """測試持久化快取後端的批次寫入與過期清除."""
+
+    @pytest_asyncio.fixture
+    async def backend(self, tmp_path):
+        """創建持久化快取後端."""
+        backend = PersistentCacheBackend(db_path=str(tmp_path / "cache.db"))
+        yield backend
+        await backend.close()
+
+    @staticmethod
+    def _query(backend, sql, parameters=()):
+        with sqlite3.connect(backend.db_path) as conn:
+            return conn.execute(sql, parameters).fetchone()
+
+    @pytest.mark.asyncio
+    async def test_access_stats_are_coalesced(self, backend):
+        """測試命中時的訪問統計合併後一次寫入."""
+        await backend.set("key", CacheEntry("key", "value"))
+        for _ in range(3):
+            assert (await backend.get("key")).value == "value"
+
+        sql = "SELECT access_count, hit_count FROM cache_entries WHERE key = ?"
+        assert self._query(backend, sql, ("key",)) == (0, 0)
+        assert (await backend.get("key")).access_count == 4
+
+        assert await backend.flush_access_stats() == 1
+        assert self._query(backend, sql, ("key",)) == (4, 4)
+
+    @pytest.mark.asyncio
+    async def test_entry_count_tracked_in_memory(self, backend):
+        """測試條目數量在覆寫、刪除與淘汰後與資料表一致."""
+        backend.max_size = 10
+        for i in range(12):
+            await backend.set(f"key{i}", CacheEntry(f"key{i}", i))
+        await backend.set("key11", CacheEntry("key11", "new"))
+        await backend.delete("key11")
+
+        # 寫入 key10 與 key11 時各淘汰一個最舊的條目
+        assert backend.stats.evictions == 2
+        count = self._query(backend, "SELECT COUNT(*) FROM cache_entries")[0]
+        assert await backend.size() == count == 9
+
+    @pytest.mark.asyncio
+    async def test_purge_expired_in_batches(self, backend):
+        """測試過期條目依 expires_at 批次清除."""
+        backend.PURGE_BATCH_SIZE = 10
+        for i in range(25):
+            await backend.set(f"old{i}", CacheEntry(f"old{i}", i, ttl=0.01))
+        await backend.set("fresh", CacheEntry("fresh", "value", ttl=60))
+        time.sleep(0.02)
+
+        assert await backend.purge_expired() == 25
+        assert await backend.size() == 1
+        assert (await backend.get("fresh")).value == "value"
+
+        plan = self._query(
+            backend,
+            "EXPLAIN QUERY PLAN SELECT rowid FROM cache_entries WHERE expires_at < ?",
+            (time.time(),),
+        )
+        assert "idx_expires_at" in plan[3]
+
+    @pytest.mark.asyncio
+    async def test_legacy_table_is_migrated(self, tmp_path):
+        """測試舊版資料表加上 expires_at 欄位並可清除過期條目."""
+        db_path = str(tmp_path / "legacy.db")
+        with sqlite3.connect(db_path) as conn:
+            conn.execute(
+                "CREATE TABLE cache_entries (key TEXT PRIMARY KEY, value BLOB, "
+                "timestamp REAL, access_count INTEGER, last_access REAL, ttl REAL, "
+                "size INTEGER, metadata TEXT, hit_count INTEGER DEFAULT 0, "
+                "load_time REAL DEFAULT 0.0)"
+            )
+            conn.execute(
+                "INSERT INTO cache_entries VALUES (?, ?, ?, 0, 0, 10, 1, '{}', 0, 0)",
+                ("old", pickle.dumps(1), time.time() - 100),
+            )
+
+        backend = PersistentCacheBackend(db_path=db_path)
+        try:
+            assert await backend.size() == 1
+            assert await backend.purge_expired() == 1
+            assert await backend.size() == 0
+        finally:
+            await backend.close()
+
+
 class TestMultiLevelCache:
     """測試多級快取管理器功能."""
 
@@ -776,6 +927,16 @@ class TestMultiLevelCache:
         assert await cache_manager.get("key3") == "value3"
 
 
+@pytest_asyncio.fixture
+async def isolated_global_cache(tmp_path, monkeypatch):
+    """全域快取管理器使用暫存目錄中的預設資料庫, 結束後釋放."""
+    await dispose_global_cache_manager()
+    monkeypatch.chdir(tmp_path)
+    yield
+    await dispose_global_cache_manager()
+
+
+@pytest.mark.usefixtures("isolated_global_cache")
 class TestCacheUtilities:
     """測試快取工具函數."""
 
@@ -865,6 +1026,116 @@ class TestCacheUtilities:
         assert call_count == 1
 
 
+class TestSingleFlight:
+    """測試並發未命中合併、過期後回傳舊值與提前過期."""
+
+    @pytest_asyncio.fixture
+    async def cache(self, tmp_path, monkeypatch):
+        """以暫存資料庫的多級快取作為全域快取."""
+        cache = MultiLevelCache(
+            db_path=str(tmp_path / "cache.db"), enable_preloading=False
+        )
+        monkeypatch.setattr(GlobalCacheManager, "_instance", cache)
+        yield cache
+        await cache.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_concurrent_misses_share_one_call(self, cache):
+        """測試並發未命中只執行一次函數, 錯誤傳給所有等待者且不緩存."""
+        calls = 0
+        fail = True
+
+        @cached(ttl=60.0, key_func=lambda board: f"leaderboard:{board}")
+        async def leaderboard(board):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.05)
+            if fail:
+                raise RuntimeError("database is locked")
+            return [board, calls]
+
+        results = await asyncio.gather(
+            *(leaderboard("points") for _ in range(50)), return_exceptions=True
+        )
+        assert calls == 1
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+        fail = False
+        results = await asyncio.gather(*(leaderboard("points") for _ in range(50)))
+        assert calls == 2
+        assert all(r == ["points", 2] for r in results)
+        assert await leaderboard("points") == ["points", 2]
+        assert cache._inflight == {}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_load(self, cache):
+        """測試單一呼叫者取消時, 其他等待者仍取得共用載入的結果."""
+
+        async def load():
+            await asyncio.sleep(0.05)
+            return "value"
+
+        first = asyncio.create_task(cache_get_or_set("key", load, 60))
+        second = asyncio.create_task(cache_get_or_set("key", load, 60))
+        await asyncio.sleep(0.01)
+        first.cancel()
+
+        assert await second == "value"
+        assert await cache.get("key") == "value"
+
+    @pytest.mark.asyncio
+    async def test_stale_while_revalidate(self, cache):
+        """測試過了新鮮時間後立即回傳舊值, 並只在背景重新載入一次."""
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.02)
+            return calls
+
+        assert await cache.get_or_set("stats", load, ttl=0.05, stale_ttl=60) == 1
+        await asyncio.sleep(0.06)
+
+        results = await asyncio.gather(
+            *(
+                cache.get_or_set("stats", load, ttl=0.05, stale_ttl=60)
+                for _ in range(20)
+            )
+        )
+        assert results == [1] * 20
+
+        await asyncio.gather(*cache._inflight.values())
+        assert calls == 2
+        assert await cache.get_or_set("stats", load, ttl=0.05, stale_ttl=60) == 2
+
+    @pytest.mark.asyncio
+    async def test_early_expiration(self, cache):
+        """測試 XFetch 依載入耗時提前在背景重新載入, 係數為 0 時不提前."""
+        calls = 0
+
+        async def load():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return calls
+
+        await cache.get_or_set("achievements", load, ttl=60)
+        await cache.get_or_set("achievements", load, ttl=60)
+        assert calls == 1
+
+        # 載入約 10 毫秒, 係數夠大時 60 秒的新鮮時間也會提前重新載入
+        assert (
+            await cache.get_or_set(
+                "achievements", load, ttl=60, early_expiration_beta=1e9
+            )
+            == 1
+        )
+        await asyncio.gather(*cache._inflight.values())
+        assert calls == 2
+
+
+@pytest.mark.usefixtures("isolated_global_cache")
 class TestGlobalCacheManager:
     """測試全域快取管理器."""
 
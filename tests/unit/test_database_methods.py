@@ -25,7 +25,7 @@ class TestDatabaseMethods:
         mock_pool = MagicMock()
 
         @asynccontextmanager
-        async def mock_get_connection_context(db_path):
+        async def mock_get_connection_context(db_path, readonly=False):
             yield activity_test_db
 
         mock_pool.get_connection_context = mock_get_connection_context
@@ -74,7 +74,7 @@ class TestDatabaseMethods:
         mock_pool = MagicMock()
 
         @asynccontextmanager
-        async def mock_get_connection_context_error(db_path):
+        async def mock_get_connection_context_error(db_path, readonly=False):
             raise Exception("數據庫連接失敗")
 
         mock_pool.get_connection_context = mock_get_connection_context_error
@@ -177,7 +177,7 @@ class TestDatabaseMethods:
         mock_pool = MagicMock()
 
         @asynccontextmanager
-        async def mock_get_connection_context_error(db_path):
+        async def mock_get_connection_context_error(db_path, readonly=False):
             raise Exception("數據庫連接失敗")
 
         mock_pool.get_connection_context = mock_get_connection_context_error
@@ -241,7 +241,7 @@ class TestDatabaseIntegration:
         mock_pool = MagicMock()
 
         @asynccontextmanager
-        async def mock_get_connection_context(db_path):
+        async def mock_get_connection_context(db_path, readonly=False):
             yield test_database
 
         mock_pool.get_connection_context = mock_get_connection_context
@@ -283,7 +283,7 @@ class TestDatabaseIntegration:
         mock_pool = MagicMock()
 
         @asynccontextmanager
-        async def mock_get_connection_context(db_path):
+        async def mock_get_connection_context(db_path, readonly=False):
             yield test_database
 
         mock_pool.get_connection_context = mock_get_connection_context
@@ -4,6 +4,7 @@
 包括連接管理、查詢建構器、BaseRepository 等核心功能.
 """
 
+import asyncio
 import tempfile
 from pathlib import Path
 from unittest.mock import MagicMock
@@ -678,6 +679,96 @@ class TestDatabasePool:
         assert pool._total_connections >= 0
 
 
+class TestDatabasePoolQueue:
+    """測試資料庫連接池的等待佇列."""
+
+    def setup_method(self):
+        """設置測試環境."""
+        self.temp_db = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        self.db_path = Path(self.temp_db.name)
+        self.temp_db.close()
+
+        # 單一連接且不允許溢出, 第二個請求必須排隊
+        self.settings = Settings()
+        self.settings.database.pool_size = 1
+        self.settings.database.max_overflow = 0
+
+    def teardown_method(self):
+        """清理測試環境."""
+        self.db_path.unlink(missing_ok=True)
+
+    @pytest.mark.asyncio
+    async def test_exhausted_pool_waits_for_release(self):
+        """測試連接池耗盡時等待釋放而非立即失敗."""
+        pool = DatabasePool(self.db_path, self.settings)
+
+        try:
+            async with pool.get_connection() as first:
+
+                async def second_checkout():
+                    async with pool.get_connection(timeout=5) as second:
+                        return second
+
+                task = asyncio.create_task(second_checkout())
+                await asyncio.sleep(0.01)
+                assert pool.get_stats()["queue_depth"] == 1
+
+            # 釋放後由等待者直接接手同一個連接
+            assert await task is first
+            stats = pool.get_stats()
+            assert stats["queue_depth"] == 0
+            assert stats["total_waits"] == 1
+            assert sum(stats["wait_time_histogram"].values()) == 1
+        finally:
+            await pool.close_all()
+
+    @pytest.mark.asyncio
+    async def test_waiters_are_served_in_fifo_order(self):
+        """測試等待者依先來先服務順序取得連接."""
+        pool = DatabasePool(self.db_path, self.settings)
+        order = []
+
+        async def worker(name):
+            async with pool.get_connection(timeout=5):
+                order.append(name)
+                await asyncio.sleep(0.01)
+
+        try:
+            async with pool.get_connection():
+                tasks = []
+                for name in range(4):
+                    tasks.append(asyncio.create_task(worker(name)))
+                    await asyncio.sleep(0)
+                await asyncio.sleep(0.01)
+                assert pool.get_stats()["max_queue_depth"] == 4
+
+            await asyncio.gather(*tasks)
+            assert order == [0, 1, 2, 3]
+        finally:
+            await pool.close_all()
+
+    @pytest.mark.asyncio
+    async def test_wait_deadline_raises_pool_error(self):
+        """測試等待逾時時拋出連接池錯誤並離開佇列."""
+        pool = DatabasePool(self.db_path, self.settings)
+
+        try:
+            async with pool.get_connection():
+                with pytest.raises(ConnectionPoolError):
+                    async with pool.get_connection(timeout=0.05):
+                        pass
+
+                stats = pool.get_stats()
+                assert stats["queue_depth"] == 0
+                assert stats["wait_timeouts"] == 1
+
+            # 逾時的等待者不應佔用已釋放的連接
+            async with pool.get_connection(timeout=1):
+                pass
+        finally:
+            await pool.close_all()
+
+
 class TestBaseRepository:
     """測試基礎儲存庫功能."""
 
@@ -0,0 +1,186 @@
+"""
+共用訊息特徵分析測試模塊
+測試 URL/網域/附件/計數的分析結果與訊息特徵快取
+"""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from src.cogs.core.message_features import (
+    MessageFeatureCache,
+    extract_message_features,
+    get_message_feature_cache,
+    normalize_content,
+    url_domain,
+)
+from src.cogs.message_listener.main.processor import SmartBatchProcessor
+
+
+def make_message(content: str = "", message_id: int = 1, **overrides) -> MagicMock:
+    """建立測試用訊息"""
+    message = MagicMock()
+    message.id = message_id
+    message.content = content
+    message.edited_at = None
+    message.guild.id = 10
+    message.channel.id = 20
+    message.author.id = 30
+    message.author.bot = False
+    message.embeds = []
+    message.attachments = []
+    message.mentions = []
+    message.role_mentions = []
+    message.mention_everyone = False
+    message.stickers = []
+    for key, value in overrides.items():
+        setattr(message, key, value)
+    return message
+
+
+class TestExtractMessageFeatures:
+    """🔎 訊息特徵分析測試類"""
+
+    def test_urls_and_domains(self):
+        """測試內容 URL 去重並解析網域"""
+        message = make_message(
+            "看 https://WWW.Example.com:8443/a 和 https://evil.io/x.exe "
+            "https://evil.io/x.exe"
+        )
+
+        features = extract_message_features(message)
+
+        assert features.urls == (
+            "https://WWW.Example.com:8443/a",
+            "https://evil.io/x.exe",
+        )
+        assert features.domains["https://WWW.Example.com:8443/a"] == "example.com"
+        assert features.domains["https://evil.io/x.exe"] == "evil.io"
+
+    def test_embed_urls(self):
+        """測試嵌入連結與內容連結分開保存"""
+        embed = SimpleNamespace(
+            url="https://embed.example/a",
+            author=SimpleNamespace(url=None),
+            footer=SimpleNamespace(icon_url="https://cdn.example/icon.png"),
+            fields=[SimpleNamespace(value="詳見 https://field.example/b")],
+        )
+        message = make_message("https://embed.example/a", embeds=[embed])
+
+        features = extract_message_features(message)
+
+        assert features.urls == ("https://embed.example/a",)
+        assert features.all_urls == (
+            "https://embed.example/a",
+            "https://cdn.example/icon.png",
+            "https://field.example/b",
+        )
+        assert features.domains["https://field.example/b"] == "field.example"
+
+    def test_attachments_and_counts(self):
+        """測試附件副檔名與各種計數"""
+        message = make_message(
+            "Hello",
+            attachments=[
+                SimpleNamespace(filename="Setup.EXE"),
+                SimpleNamespace(filename="README"),
+            ],
+            mentions=[object(), object()],
+            role_mentions=[object()],
+            mention_everyone=True,
+            stickers=[object()],
+        )
+
+        features = extract_message_features(message)
+
+        assert features.attachment_names == ("setup.exe", "readme")
+        assert features.attachment_extensions == ("exe", "")
+        assert features.mention_count == 2
+        assert features.role_mention_count == 1
+        assert features.mentions_everyone
+        assert features.sticker_count == 1
+        assert features.content_length == 5
+
+    def test_content_normalization_and_hashes(self):
+        """測試小寫、標準化內容與雜湊"""
+        first = extract_message_features(
+            make_message("\uff28\uff45\uff4c\uff4c\uff4f   World")
+        )
+        second = extract_message_features(make_message("hello world"))
+
+        assert first.content_lower == "\uff48\uff45\uff4c\uff4c\uff4f   world"
+        assert first.normalized_content == "hello world"
+        assert first.normalized_hash == second.normalized_hash
+        assert first.content_hash != second.content_hash
+
+    def test_features_are_immutable(self):
+        """測試分析結果不可修改"""
+        features = extract_message_features(make_message("https://a.example/x"))
+
+        with pytest.raises(AttributeError):
+            features.content = "changed"
+        with pytest.raises(TypeError):
+            features.domains["https://a.example/x"] = "b.example"
+
+
+class TestMessageFeatureCache:
+    """🗂️ 訊息特徵快取測試類"""
+
+    def test_same_message_analysed_once(self):
+        """測試同一則訊息只分析一次"""
+        cache = MessageFeatureCache()
+        message = make_message("hi")
+
+        assert cache.get(message) is cache.get(message)
+        assert cache.get_stats()["misses"] == 1
+        assert cache.get_stats()["hits"] == 1
+
+    def test_edited_message_is_reanalysed(self):
+        """測試訊息編輯後重新分析"""
+        cache = MessageFeatureCache()
+        message = make_message("before")
+        before = cache.get(message)
+
+        message.content = "after"
+        message.edited_at = 1
+        after = cache.get(message)
+
+        assert before.content == "before"
+        assert after.content == "after"
+
+    def test_bounded_size(self):
+        """測試超過上限時淘汰最舊的訊息"""
+        cache = MessageFeatureCache(max_size=2)
+        for message_id in range(3):
+            cache.get(make_message("x", message_id=message_id))
+
+        assert cache.get_stats()["entries"] == 2
+
+
+def test_helpers():
+    """測試網域與內容標準化輔助函數"""
+    assert url_domain("http://www.Discord.gg:443/abc") == "discord.gg"
+    assert url_domain("example.com/path") == "example.com"
+    assert normalize_content("  A\tB\n\nC  ") == "a b c"
+
+
+def test_batch_processor_uses_shared_features():
+    """測試訊息監聽的批量調整沿用共用訊息特徵, 每則訊息只分析一次"""
+    cache = get_message_feature_cache()
+    misses = cache.get_stats()["misses"]
+    messages = [
+        make_message("see https://a.example/x and https://b.example", message_id=901),
+        make_message(
+            "hi", message_id=902, attachments=[SimpleNamespace(filename="a.png")]
+        ),
+    ]
+    processor = SmartBatchProcessor()
+
+    processor.calculate_optimal_batch_size(messages)
+    processor.calculate_optimal_batch_size(messages)
+
+    assert cache.get_stats()["misses"] == misses + 2
+    features = [cache.get(message) for message in messages]
+    assert processor._analyze_content_complexity(features)["urls"] == 1.0
+    assert processor._analyze_media_complexity(features)["attachments"] == 0.5
@@ -0,0 +1,127 @@
+"""
+訊息全文索引測試模塊
+測試關鍵字轉換與觸發器維持 FTS5 索引同步
+"""
+
+import sqlite3
+
+import pytest
+
+from src.cogs.message_listener.database.database import SAVE_MESSAGE_SQL
+from src.cogs.message_listener.database.fulltext import (
+    FTS_REBUILD_SQL,
+    FTS_SCHEMA,
+    FTS_TABLE,
+    build_fts_query,
+)
+
+
+@pytest.fixture
+def conn():
+    """建立含訊息表與全文索引的記憶體資料庫"""
+    connection = sqlite3.connect(":memory:")
+    connection.execute("""
+        CREATE TABLE messages (
+            message_id INTEGER PRIMARY KEY,
+            channel_id INTEGER NOT NULL,
+            guild_id INTEGER NOT NULL,
+            author_id INTEGER NOT NULL,
+            content TEXT,
+            timestamp REAL,
+            attachments TEXT,
+            deleted INTEGER DEFAULT 0
+        )
+    """)
+    for statement in FTS_SCHEMA:
+        connection.execute(statement)
+    yield connection
+    connection.close()
+
+
+def save(conn, message_id: int, content: str):
+    """以正式寫入語句儲存訊息"""
+    conn.execute(SAVE_MESSAGE_SQL, (message_id, 1, 1, 1, content, 0.0, "[]"))
+
+
+def match(conn, keyword: str) -> list[int]:
+    """以全文索引搜尋, 回傳依相關度排序的訊息 ID"""
+    query, _ = build_fts_query(keyword)
+    rows = conn.execute(
+        f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ? ORDER BY rank",
+        (query,),
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def assert_index_consistent(conn):
+    """檢查外部內容索引與 messages 表一致"""
+    conn.execute(
+        f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('integrity-check', 1)"
+    )
+
+
+class TestBuildFtsQuery:
+    """🔤 關鍵字轉換測試類"""
+
+    def test_terms_are_quoted(self):
+        """測試每個詞都被引號包住, 避免 FTS5 語法錯誤"""
+        assert build_fts_query("hello AND world") == ('"hello" "AND" "world"', [])
+
+    def test_phrase_and_prefix(self):
+        """測試片語與前綴查詢"""
+        assert build_fts_query('"天氣 很好" deploy*') == ('"天氣 很好" "deploy"*', [])
+
+    def test_short_terms_fall_back_to_like(self):
+        """測試短詞改以 LIKE 過濾"""
+        assert build_fts_query("好 公告事項 ab") == ('"公告事項"', ["好", "ab"])
+
+    def test_blank_keyword(self):
+        """測試空白關鍵字"""
+        assert build_fts_query('  "" * ') == (None, [])
+
+
+class TestFulltextIndex:
+    """🔍 全文索引同步測試類"""
+
+    def test_insert_is_searchable(self, conn):
+        """測試新訊息可被搜尋, 中文可做子字串比對"""
+        save(conn, 1, "今天伺服器維護公告")
+        save(conn, 2, "hello world")
+
+        assert match(conn, "伺服器") == [1]
+        assert match(conn, "HELLO") == [2]
+        assert match(conn, '"伺服器維護" 公告*') == [1]
+
+    def test_replace_updates_index(self, conn):
+        """測試 INSERT OR REPLACE 覆寫訊息後索引同步"""
+        save(conn, 1, "original content")
+        save(conn, 1, "edited message")
+
+        assert match(conn, "original") == []
+        assert match(conn, "edited") == [1]
+        assert_index_consistent(conn)
+
+    def test_delete_removes_from_index(self, conn):
+        """測試刪除訊息後從索引移除"""
+        save(conn, 1, "expired message")
+        save(conn, 2, "fresh message")
+        conn.execute("DELETE FROM messages WHERE message_id = 1")
+
+        assert match(conn, "message") == [2]
+        assert_index_consistent(conn)
+
+    def test_rebuild_backfills_existing_rows(self):
+        """測試既有資料庫建立索引後回填"""
+        connection = sqlite3.connect(":memory:")
+        connection.execute(
+            "CREATE TABLE messages (message_id INTEGER PRIMARY KEY, content TEXT)"
+        )
+        connection.execute("INSERT INTO messages VALUES (7, 'legacy message')")
+
+        for statement in FTS_SCHEMA:
+            connection.execute(statement)
+        assert match(connection, "legacy") == []
+
+        connection.execute(FTS_REBUILD_SQL)
+        assert match(connection, "legacy") == [7]
+        connection.close()
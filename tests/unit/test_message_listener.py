@@ -58,7 +58,7 @@ async def mock_pool(test_db):
     mock_pool = MagicMock()
 
     @asynccontextmanager
-    async def mock_get_connection_context(db_path):
+    async def mock_get_connection_context(db_path, readonly=False):
         yield test_db
 
     mock_pool.get_connection_context = mock_get_connection_context
@@ -640,7 +640,7 @@ class TestMessageListenerDB:
         mock_connection.execute.return_value = mock_cursor
 
         @asynccontextmanager
-        async def mock_connection_context(db_path):
+        async def mock_connection_context(db_path, readonly=False):
             yield mock_connection
 
         mock_pool = Mock()
@@ -691,7 +691,7 @@ class TestMessageListenerDB:
         mock_connection.execute = mock_connection_execute
 
         @asynccontextmanager
-        async def mock_connection_context(db_path):
+        async def mock_connection_context(db_path, readonly=False):
             yield mock_connection
 
         mock_pool = Mock()
@@ -998,7 +998,7 @@ class TestMessageListenerErrorHandling:
         mock_pool = MagicMock()
 
         @asynccontextmanager
-        async def failing_connection_context(db_path):
+        async def failing_connection_context(db_path, readonly=False):
             raise Exception("資料庫連接失敗")
             yield  # 永不到達
 
@@ -0,0 +1,143 @@
+"""
+訊息渲染程序池測試模塊
+測試渲染規格繪製、程序池渲染與退回執行緒渲染
+"""
+
+import io
+from concurrent.futures.process import BrokenProcessPool
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from PIL import Image
+
+from src.cogs.message_listener.main.render_worker import (
+    AvatarSpec,
+    MessageRenderSpec,
+    RenderProcessPool,
+    RenderSpec,
+    render_spec,
+)
+from src.cogs.message_listener.main.renderer import EnhancedMessageRenderer
+
+
+def png_bytes(size: tuple[int, int], color=(255, 0, 0, 255)) -> bytes:
+    """建立測試用 PNG 位元組"""
+    output = io.BytesIO()
+    Image.new("RGBA", size, color).save(output, format="PNG")
+    return output.getvalue()
+
+
+@pytest.fixture
+def spec() -> RenderSpec:
+    """兩則訊息的渲染規格, 第二則為回覆並附帶圖片"""
+    return RenderSpec(
+        messages=[
+            MessageRenderSpec("使用者A", "今天 12:00", "第一行\n第二行", "1_online"),
+            MessageRenderSpec(
+                "使用者B",
+                "今天 12:01",
+                "",
+                "2_None",
+                reply_text="回覆 @使用者A:第一行",
+                attachments=[png_bytes((1600, 400))],
+            ),
+        ],
+        avatars={
+            "1_online": AvatarSpec(png_bytes((256, 256)), "online"),
+            "2_None": AvatarSpec(None),
+        },
+    )
+
+
+class TestRenderSpec:
+    """🖼️ 渲染規格繪製測試類"""
+
+    def test_renders_png(self, spec):
+        """測試依規格繪製 PNG, 附件縮放至內容區寬度"""
+        image = Image.open(io.BytesIO(render_spec(spec)))
+
+        assert image.format == "PNG"
+        assert image.width == 800
+        # 附件 1600x400 縮放為 718x179, 圖片高度需容納附件
+        assert 179 < image.height < 2000
+
+    def test_invalid_avatar_uses_default(self, spec):
+        """測試頭像無法解碼時使用預設頭像"""
+        spec.avatars["1_online"] = AvatarSpec(b"not an image", "online")
+
+        assert render_spec(spec).startswith(b"\x89PNG")
+
+
+class TestRenderProcessPool:
+    """⚙️ 渲染程序池測試類"""
+
+    @pytest.mark.asyncio
+    async def test_zero_workers_render_in_thread(self, spec):
+        """測試工作程序數為 0 時在執行緒中渲染"""
+        pool = RenderProcessPool(workers=0)
+
+        result = await pool.render(spec)
+
+        assert result == render_spec(spec)
+        assert pool.get_stats()["thread_renders"] == 1
+        assert not pool.using_processes
+
+    @pytest.mark.asyncio
+    async def test_renders_in_worker_process(self, spec):
+        """測試在工作程序中渲染"""
+        pool = RenderProcessPool(workers=1)
+        try:
+            result = await pool.render(spec)
+        finally:
+            pool.shutdown()
+
+        assert result.startswith(b"\x89PNG")
+        assert pool.get_stats()["process_renders"] == 1
+
+    @pytest.mark.asyncio
+    async def test_broken_pool_falls_back_to_thread(self, spec):
+        """測試程序池故障時退回執行緒渲染, 之後不再使用程序池"""
+        pool = RenderProcessPool(workers=2)
+
+        with patch.object(pool, "_get_executor", side_effect=BrokenProcessPool()):
+            await pool.render(spec)
+            await pool.render(spec)
+
+        stats = pool.get_stats()
+        assert stats["pool_failures"] == 1
+        assert stats["thread_renders"] == 2
+        assert not stats["using_processes"]
+
+
+class TestRendererWithPool:
+    """📨 渲染器程序池模式測試類"""
+
+    @pytest.mark.asyncio
+    async def test_render_messages_uses_pool(self):
+        """測試設定程序池時渲染器產生規格並寫出圖片"""
+        pool = RenderProcessPool(workers=0)
+        renderer = EnhancedMessageRenderer(render_pool=pool)
+
+        author = MagicMock()
+        author.id = 1
+        author.global_name = "使用者"
+        author.display_avatar.replace.return_value.url = "https://cdn/avatar.png"
+        message = MagicMock()
+        message.author = author
+        message.content = "哈囉 <:wave:123>"
+        message.created_at = datetime(2024, 1, 1, tzinfo=UTC)
+        message.attachments = []
+        message.reference = None
+
+        with patch.object(
+            renderer, "_download_bytes", AsyncMock(return_value=png_bytes((64, 64)))
+        ):
+            spec = await renderer.build_render_spec([message, message])
+            path = await renderer.render_messages([message])
+
+        assert len(spec.avatars) == 1
+        assert spec.messages[0].content == "哈囉 :wave:"
+        with open(path, "rb") as file:
+            assert file.read().startswith(b"\x89PNG")
+        assert pool.get_stats()["thread_renders"] == 1
@@ -0,0 +1,216 @@
+"""
+訊息過期清理測試模塊
+測試分批刪除、進度回報、全文索引同步與複合索引
+"""
+
+import time
+from contextlib import asynccontextmanager
+from unittest.mock import MagicMock
+
+import pytest
+import pytest_asyncio
+
+from src.cogs.core.database_pool import DatabaseConnectionPool, PoolConfiguration
+from src.cogs.message_listener.database.database import MessageListenerDB
+from src.cogs.message_listener.database.fulltext import (
+    FTS_REBUILD_SQL,
+    FTS_SCHEMA,
+    FTS_TABLE,
+)
+from src.cogs.message_listener.database.retention import AUTO_VACUUM_INCREMENTAL
+
+DAY = 86400
+
+
+@pytest_asyncio.fixture
+async def db(test_db):
+    """建立使用記憶體資料庫的訊息資料庫, 含 11 則過期與 6 則未過期訊息"""
+    pool = MagicMock()
+
+    @asynccontextmanager
+    async def get_connection_context(db_path, readonly=False):
+        yield test_db
+
+    pool.get_connection_context = get_connection_context
+
+    database = MessageListenerDB(":memory:")
+    database._pool = pool
+    await test_db.execute("""
+        CREATE TABLE messages (
+            message_id INTEGER PRIMARY KEY,
+            channel_id INTEGER NOT NULL,
+            guild_id INTEGER NOT NULL,
+            author_id INTEGER NOT NULL,
+            content TEXT,
+            timestamp REAL,
+            attachments TEXT,
+            deleted INTEGER DEFAULT 0
+        )
+    """)
+    await test_db.execute("CREATE INDEX idx_timestamp ON messages (timestamp)")
+
+    now = time.time()
+    rows = [(i, 1, 1, 1, f"old message {i}", now - 40 * DAY, None) for i in range(10)]
+    rows += [(i, 1, 1, 1, f"new message {i}", now - DAY, None) for i in range(10, 15)]
+    # 未過期訊息夾在過期訊息之間, 不得被區間刪除誤刪
+    rows.append((5_000, 1, 1, 1, "new message between", now, None))
+    rows.append((10_000, 1, 1, 1, "old message last", now - 40 * DAY, None))
+    await test_db.executemany(
+        "INSERT INTO messages (message_id, channel_id, guild_id, author_id,"
+        " content, timestamp, attachments) VALUES (?, ?, ?, ?, ?, ?, ?)",
+        rows,
+    )
+    await test_db.commit()
+    return database
+
+
+async def remaining_ids(test_db) -> list[int]:
+    cursor = await test_db.execute("SELECT message_id FROM messages ORDER BY 1")
+    return [row[0] for row in await cursor.fetchall()]
+
+
+class TestPurgeOldMessages:
+    """🧹 過期訊息清理測試類"""
+
+    @pytest.mark.asyncio
+    async def test_deletes_only_expired_messages_in_chunks(self, db, test_db):
+        """測試分批刪除且只刪除過期訊息"""
+        result = await db.purge_old_messages(days=30, chunk_size=3, pause=0)
+
+        assert await remaining_ids(test_db) == [*range(10, 15), 5_000]
+        assert result.total == 11
+        assert result.deleted == 11
+        assert result.chunks == 6
+        assert result.done
+        assert result.percent == 100.0
+
+    @pytest.mark.asyncio
+    async def test_reports_progress_after_each_chunk(self, db):
+        """測試每批完成後回報進度, 同步與協程回呼皆可"""
+        seen = []
+
+        async def on_progress(progress):
+            seen.append((progress.deleted, progress.done))
+
+        await db.purge_old_messages(
+            days=30, chunk_size=4, pause=0, progress=on_progress
+        )
+        sync_seen = []
+        await db.purge_old_messages(
+            days=30, pause=0, progress=lambda p: sync_seen.append(p.deleted)
+        )
+
+        assert seen == [
+            (4, False),
+            (8, False),
+            (10, False),
+            (10, False),
+            (11, False),
+            (11, True),
+        ]
+        assert sync_seen == [0]
+
+    @pytest.mark.asyncio
+    async def test_nothing_to_purge(self, db, test_db):
+        """測試沒有過期訊息時不刪除任何資料"""
+        result = await db.purge_old_messages(days=365, pause=0)
+
+        assert result.deleted == 0
+        assert result.chunks == 0
+        assert result.done
+        assert len(await remaining_ids(test_db)) == 17
+
+    @pytest.mark.asyncio
+    async def test_purge_keeps_fulltext_index_in_sync(self, db, test_db):
+        """測試分批刪除時全文索引同步移除"""
+        for statement in FTS_SCHEMA:
+            await test_db.execute(statement)
+        await test_db.execute(FTS_REBUILD_SQL)
+        await test_db.commit()
+
+        await db.purge_old_messages(days=30, chunk_size=5, pause=0)
+
+        cursor = await test_db.execute(
+            f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH ?", ('"old"',)
+        )
+        assert await cursor.fetchall() == []
+        await test_db.execute(
+            f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rank) VALUES ('integrity-check', 1)"
+        )
+
+
+class TestRetentionSchema:
+    """🗂️ 清理相關結構測試類"""
+
+    @pytest_asyncio.fixture
+    async def pooled_db(self, tmp_path):
+        """建立使用真實連接池(WAL)與新資料庫檔案的訊息資料庫"""
+        pool = DatabaseConnectionPool(
+            PoolConfiguration(
+                max_connections=3,
+                min_connections=1,
+                health_check_interval=60,
+                enable_prewarming=False,
+            )
+        )
+        await pool.initialize()
+        database = MessageListenerDB(str(tmp_path / "message.db"))
+        database._pool = pool
+
+        await database.init_db()
+        yield database
+
+        database._cleanup_task.cancel()
+        await database.close()
+        await pool.close()
+
+    @pytest.mark.asyncio
+    async def test_init_db_creates_composite_index(self, pooled_db):
+        """測試初始化建立複合索引並在新資料庫啟用 incremental auto_vacuum"""
+        pool = pooled_db._pool
+        async with pool.get_connection_context(pooled_db.db_path) as conn:
+            cursor = await conn.execute(
+                "EXPLAIN QUERY PLAN SELECT message_id FROM messages"
+                " WHERE guild_id = ? AND channel_id = ? AND timestamp >= ?",
+                (1, 1, 0.0),
+            )
+            plan = " ".join(str(row[-1]) for row in await cursor.fetchall())
+            cursor = await conn.execute(
+                "SELECT name FROM sqlite_master WHERE name = 'idx_guild_id'"
+            )
+            assert await cursor.fetchone() is None
+
+            cursor = await conn.execute("PRAGMA journal_mode")
+            assert (await cursor.fetchone())[0] == "wal"
+            cursor = await conn.execute("PRAGMA auto_vacuum")
+            assert (await cursor.fetchone())[0] == AUTO_VACUUM_INCREMENTAL
+
+        assert "idx_guild_channel_timestamp" in plan
+        assert pooled_db.incremental_vacuum
+
+    @pytest.mark.asyncio
+    async def test_purge_returns_pages(self, pooled_db):
+        """測試經由連接池清理後以 incremental_vacuum 歸還空閒頁面"""
+        pool = pooled_db._pool
+        old = time.time() - 40 * DAY
+        async with pool.get_connection_context(pooled_db.db_path) as conn:
+            await conn.executemany(
+                "INSERT INTO messages (message_id, channel_id, guild_id, author_id,"
+                " content, timestamp) VALUES (?, 1, 1, 1, ?, ?)",
+                [(i, "x" * 500, old) for i in range(2_000)],
+            )
+            await conn.commit()
+            cursor = await conn.execute("PRAGMA page_count")
+            pages_before = (await cursor.fetchone())[0]
+
+        result = await pooled_db.purge_old_messages(days=30, pause=0)
+
+        async with pool.get_connection_context(pooled_db.db_path) as conn:
+            cursor = await conn.execute("PRAGMA freelist_count")
+            assert (await cursor.fetchone())[0] == 0
+            cursor = await conn.execute("PRAGMA page_count")
+            pages_after = (await cursor.fetchone())[0]
+
+        assert result.deleted == 2_000
+        assert result.vacuumed_pages > 0
+        assert pages_after < pages_before
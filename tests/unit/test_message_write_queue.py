@@ -0,0 +1,120 @@
+"""
+訊息群組提交寫入佇列測試模塊
+測試批量寫入、背壓、關閉時寫完資料與失敗重試
+"""
+
+import asyncio
+
+import pytest
+
+from src.cogs.message_listener.database.write_queue import MessageWriteQueue
+
+
+class RecordingWriter:
+    """記錄每次批量寫入內容的寫入器"""
+
+    def __init__(self, failures: int = 0, delay: float = 0):
+        self.batches: list[list[tuple]] = []
+        self.failures = failures
+        self.delay = delay
+
+    async def __call__(self, rows: list[tuple]):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("database is locked")
+        self.batches.append(list(rows))
+
+    @property
+    def rows(self) -> list[tuple]:
+        return [row for batch in self.batches for row in batch]
+
+
+class TestMessageWriteQueue:
+    """📥 訊息寫入佇列測試類"""
+
+    @pytest.mark.asyncio
+    async def test_rows_are_coalesced_into_batches(self):
+        """測試同一時間窗口內的訊息合併為少數批次"""
+        writer = RecordingWriter()
+        queue = MessageWriteQueue(writer, batch_size=50, flush_interval=0.05)
+        queue.start()
+        try:
+            for i in range(120):
+                await queue.enqueue((i,))
+            await queue.flush()
+        finally:
+            await queue.stop()
+
+        assert writer.rows == [(i,) for i in range(120)]
+        assert len(writer.batches) == 3
+        assert all(len(batch) <= 50 for batch in writer.batches)
+        assert queue.get_stats()["rows_written"] == 120
+
+    @pytest.mark.asyncio
+    async def test_stop_writes_pending_rows(self):
+        """測試停止時寫完佇列中所有訊息"""
+        writer = RecordingWriter(delay=0.01)
+        queue = MessageWriteQueue(writer, batch_size=10, flush_interval=1.0)
+        queue.start()
+        for i in range(35):
+            await queue.enqueue((i,))
+
+        await queue.stop()
+
+        assert not queue.running
+        assert sorted(writer.rows) == [(i,) for i in range(35)]
+        assert queue.pending_count() == 0
+
+    @pytest.mark.asyncio
+    async def test_backpressure_when_queue_is_full(self):
+        """測試佇列已滿時 enqueue 等待而非丟棄"""
+        writer = RecordingWriter(delay=0.02)
+        queue = MessageWriteQueue(
+            writer, batch_size=2, flush_interval=0.01, max_queue_size=2
+        )
+        queue.start()
+        try:
+            for i in range(10):
+                await queue.enqueue((i,))
+        finally:
+            await queue.stop()
+
+        assert writer.rows == [(i,) for i in range(10)]
+        assert queue.get_stats()["backpressure_waits"] > 0
+        assert queue.get_stats()["rows_dropped"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_is_retried(self):
+        """測試批量寫入失敗後重試成功"""
+        writer = RecordingWriter(failures=2)
+        queue = MessageWriteQueue(writer, flush_interval=0.01, max_retries=3)
+        queue.start()
+        try:
+            await queue.enqueue((1,))
+            await queue.flush()
+        finally:
+            await queue.stop()
+
+        stats = queue.get_stats()
+        assert writer.rows == [(1,)]
+        assert stats["write_failures"] == 2
+        assert stats["rows_dropped"] == 0
+
+    @pytest.mark.asyncio
+    async def test_batch_dropped_after_retries_exhausted(self):
+        """測試重試次數耗盡後放棄該批次, 寫入器繼續運作"""
+        writer = RecordingWriter(failures=2)
+        queue = MessageWriteQueue(writer, flush_interval=0.01, max_retries=1)
+        queue.start()
+        try:
+            await queue.enqueue((1,))
+            await queue.flush()
+            await queue.enqueue((2,))
+            await queue.flush()
+        finally:
+            await queue.stop()
+
+        assert writer.rows == [(2,)]
+        assert queue.get_stats()["rows_dropped"] == 1
@@ -0,0 +1,154 @@
+"""
+群組保護配置快照測試模塊
+測試字串配置解析、快照快取、寫入後失效與跨程序的版本確認
+"""
+
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+from src.cogs.protection import base
+from src.cogs.protection.anti_link.config.config import AntiLinkConfig
+from src.cogs.protection.anti_spam.config.config import DEFAULTS, AntiSpamConfig
+from src.cogs.protection.base import ProtectionCog
+
+
+class SharedDatabase:
+    """以同一個 SQLite 連線模擬多個程序共用的資料庫"""
+
+    def __init__(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.queries = 0
+
+    async def execute(self, sql: str, parameters: tuple = ()):
+        self.conn.execute(sql, parameters)
+
+    async def fetchall(self, sql: str, parameters: tuple = ()):
+        self.queries += 1
+        return self.conn.execute(sql, parameters).fetchall()
+
+
+class SpamCog(ProtectionCog):
+    module_name = "anti_spam"
+    config_class = AntiSpamConfig
+
+
+def make_cog(database: SharedDatabase | None) -> SpamCog:
+    return SpamCog(SimpleNamespace(database=database))
+
+
+class TestConfigSnapshot:
+    """🧾 配置解析測試類"""
+
+    def test_from_raw_parses_types(self):
+        """測試依欄位型別解析字串配置"""
+        cfg = AntiSpamConfig.from_raw({
+            "enabled": "False",
+            "spam_freq_limit": "8",
+            "spam_similar_threshold": "0.7",
+            "spam_notify_channel": "123",
+            "unknown_key": "ignored",
+        })
+
+        assert cfg.enabled is False
+        assert cfg.spam_freq_limit == 8
+        assert cfg.spam_similar_threshold == 0.7
+        assert cfg.spam_notify_channel == "123"
+
+    def test_invalid_values_use_defaults(self):
+        """測試無法解析的值使用欄位預設值"""
+        cfg = AntiSpamConfig.from_raw({"spam_freq_limit": "abc", "spam_raid_limit": ""})
+
+        assert cfg.spam_freq_limit == DEFAULTS["spam_freq_limit"]
+        assert cfg.spam_raid_limit == DEFAULTS["spam_raid_limit"]
+
+    def test_fields_cover_defaults(self):
+        """測試快照欄位涵蓋所有預設配置"""
+        cfg = AntiSpamConfig()
+
+        for key, value in DEFAULTS.items():
+            expected = value == "true" if value in ("true", "false") else value
+            assert getattr(cfg, key) == expected
+
+    def test_snapshot_is_immutable(self):
+        """測試快照唯讀且沒有 __dict__"""
+        cfg = AntiLinkConfig()
+
+        with pytest.raises(AttributeError):
+            cfg.enabled = False  # type: ignore[misc]
+        assert not hasattr(cfg, "__dict__")
+
+
+class TestProtectionCogSnapshot:
+    """🗂️ 保護模組配置快照快取測試類"""
+
+    @pytest.mark.asyncio
+    async def test_snapshot_is_cached(self):
+        """測試快照建立一次後不再查詢資料庫"""
+        database = SharedDatabase()
+        cog = make_cog(database)
+
+        first = await cog.get_cfg_snapshot(1)
+        queries = database.queries
+        for _ in range(100):
+            assert await cog.get_cfg_snapshot(1) is first
+
+        assert database.queries == queries
+
+    @pytest.mark.asyncio
+    async def test_set_cfg_invalidates(self):
+        """測試寫入配置後快照立即更新, 原始配置仍可讀取"""
+        cog = make_cog(SharedDatabase())
+        await cog.set_cfg(1, "spam_freq_limit", "2")
+        assert (await cog.get_cfg_snapshot(1)).spam_freq_limit == 2
+
+        await cog.set_cfg(1, "spam_freq_window", "20")
+        cfg = await cog.get_cfg_snapshot(1)
+
+        assert (cfg.spam_freq_limit, cfg.spam_freq_window) == (2, 20)
+        assert await cog.get_cfg(1, "spam_freq_limit") == "2"
+
+    @pytest.mark.asyncio
+    async def test_without_database(self):
+        """測試沒有資料庫時配置保存在記憶體"""
+        cog = make_cog(None)
+        await cog.set_cfg(1, "spam_freq_limit", "2")
+        await cog.set_cfg(1, "spam_freq_window", "20")
+        cfg = await cog.get_cfg_snapshot(1)
+
+        assert (cfg.spam_freq_limit, cfg.spam_freq_window) == (2, 20)
+
+    @pytest.mark.asyncio
+    async def test_other_process_changes(self, monkeypatch):
+        """測試其他程序寫入後, 確認版本時重新載入"""
+        clock = [1000.0]
+        monkeypatch.setattr(base.time, "monotonic", lambda: clock[0])
+        database = SharedDatabase()
+        reader = make_cog(database)
+        writer = make_cog(database)
+
+        assert (await reader.get_cfg_snapshot(1)).spam_freq_limit == 5
+        await writer.set_cfg(1, "spam_freq_limit", "9")
+
+        # 確認間隔內沿用目前的快照
+        assert (await reader.get_cfg_snapshot(1)).spam_freq_limit == 5
+
+        clock[0] += base.CFG_RECHECK_INTERVAL
+        assert (await reader.get_cfg_snapshot(1)).spam_freq_limit == 9
+
+    @pytest.mark.asyncio
+    async def test_unchanged_version_keeps_snapshot(self, monkeypatch):
+        """測試版本未改變時只查詢版本, 沿用原本的快照"""
+        clock = [1000.0]
+        monkeypatch.setattr(base.time, "monotonic", lambda: clock[0])
+        database = SharedDatabase()
+        cog = make_cog(database)
+
+        first = await cog.get_cfg_snapshot(1)
+        queries = database.queries
+        clock[0] += base.CFG_RECHECK_INTERVAL
+
+        assert await cog.get_cfg_snapshot(1) is first
+        assert database.queries == queries + 1
@@ -0,0 +1,307 @@
+"""
+群組保護寫入緩衝測試模塊
+測試統計累加、讀取尚未寫入的計數、批量沖刷、失敗重試與每秒 1,000 次違規的負載
+"""
+
+import asyncio
+import sqlite3
+import time
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import aiosqlite
+import pytest
+import pytest_asyncio
+
+from src.cogs.protection.anti_link.database.database import AntiLinkDatabase
+from src.cogs.protection.anti_spam.database.database import AntiSpamDatabase
+from src.cogs.protection.write_buffer import ProtectionWriteBuffer
+
+GUILD_ID = 1001
+USER_ID = 2002
+
+
+class SharedDatabase:
+    """以 SQLite 連線模擬 bot.database"""
+
+    def __init__(self):
+        self.conn = sqlite3.connect(":memory:")
+        self.conn.row_factory = sqlite3.Row
+        self.statements = 0
+
+    async def execute(self, sql: str, parameters: tuple = ()):
+        self.statements += 1
+        self.conn.execute(sql, parameters)
+
+    async def fetchall(self, sql: str, parameters: tuple = ()):
+        return self.conn.execute(sql, parameters).fetchall()
+
+
+@pytest.fixture
+def mock_db():
+    """建立模擬資料庫"""
+    return AsyncMock()
+
+
+@pytest.fixture
+def buffer(mock_db):
+    """建立測試用寫入緩衝區"""
+    return ProtectionWriteBuffer(mock_db, "測試", flush_interval=60, max_rows=3)
+
+
+@pytest_asyncio.fixture
+async def link_db(tmp_path):
+    """使用暫存目錄的反惡意連結資料庫"""
+    settings = MagicMock()
+    settings.database.sqlite_path = tmp_path
+    with patch(
+        "src.cogs.protection.anti_link.database.database.get_settings",
+        return_value=settings,
+    ):
+        database = AntiLinkDatabase(MagicMock())
+    await database.init_db()
+    return database
+
+
+class TestProtectionWriteBuffer:
+    """🗃️ 保護模組寫入緩衝測試類"""
+
+    @pytest.mark.asyncio
+    async def test_counts_are_aggregated(self, buffer, mock_db):
+        """測試計數在沖刷前累加且可立即讀取"""
+        for _ in range(5):
+            buffer.add_stat(GUILD_ID, "links_blocked")
+        buffer.add_stat(GUILD_ID, "links_blocked", 3)
+
+        mock_db.write_batch.assert_not_awaited()
+        assert buffer.merge_stats(GUILD_ID, {"links_blocked": 2, "other": 1}) == {
+            "links_blocked": 10,
+            "other": 1,
+        }
+
+        await buffer.flush()
+
+        mock_db.write_batch.assert_awaited_once_with(
+            [(GUILD_ID, "links_blocked", 8)], {}
+        )
+        assert buffer.pending_stats(GUILD_ID) == {}
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_retried(self, buffer, mock_db):
+        """測試沖刷失敗時資料放回緩衝區, 日誌超過上限時保留較新的"""
+        buffer.add_stat(GUILD_ID, "timeouts")
+        buffer.add_row("action_log", (1,))
+        buffer.add_row("action_log", (2,))
+        mock_db.write_batch.side_effect = OSError("database is locked")
+
+        with pytest.raises(OSError):
+            await buffer.flush()
+        buffer.add_stat(GUILD_ID, "timeouts")
+        buffer.add_row("action_log", (3,))
+        buffer.add_row("action_log", (4,))
+
+        assert buffer.pending_stats(GUILD_ID) == {"timeouts": 2}
+        assert buffer.pending_count() == 3
+        assert buffer.get_metrics()["rows_dropped"] == 1
+
+        mock_db.write_batch.side_effect = None
+        await buffer.flush()
+
+        mock_db.write_batch.assert_awaited_with(
+            [(GUILD_ID, "timeouts", 2)], {"action_log": [(2,), (3,), (4,)]}
+        )
+
+    @pytest.mark.asyncio
+    async def test_stop_waits_for_inflight_flush(self, buffer, mock_db):
+        """測試停止時不中斷進行中的沖刷, 資料不會遺失"""
+        written = []
+        started = asyncio.Event()
+
+        async def slow_write(stats, rows):
+            started.set()
+            await asyncio.sleep(0.01)
+            written.append((list(stats), rows))
+
+        mock_db.write_batch.side_effect = slow_write
+        buffer.add_stat(GUILD_ID, "timeouts")
+        buffer.add_row("action_log", (1,))
+        buffer._schedule_threshold_flush()
+        await started.wait()
+        buffer.add_stat(GUILD_ID, "timeouts")
+
+        await buffer.stop()
+
+        assert written == [
+            ([(GUILD_ID, "timeouts", 1)], {"action_log": [(1,)]}),
+            ([(GUILD_ID, "timeouts", 1)], {}),
+        ]
+        assert buffer.pending_stats(GUILD_ID) == {}
+
+    @pytest.mark.asyncio
+    async def test_cancelled_flush_restores_data(self, buffer, mock_db):
+        """測試沖刷被取消時資料放回緩衝區"""
+        started = asyncio.Event()
+
+        async def blocked_write(stats, rows):
+            started.set()
+            await asyncio.Event().wait()
+
+        mock_db.write_batch.side_effect = blocked_write
+        buffer.add_stat(GUILD_ID, "timeouts")
+        buffer.add_row("action_log", (1,))
+        task = asyncio.create_task(buffer.flush())
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert buffer.pending_stats(GUILD_ID) == {"timeouts": 1}
+        assert buffer.pending_count() == 1
+
+    @pytest.mark.asyncio
+    async def test_discard_stats(self, buffer):
+        """測試重置統計時捨棄尚未寫入的計數"""
+        buffer.add_stat(GUILD_ID, "timeouts")
+        buffer.add_stat(GUILD_ID + 1, "timeouts")
+
+        await buffer.discard_stats(GUILD_ID)
+
+        assert buffer.pending_stats(GUILD_ID) == {}
+        assert buffer.pending_stats(GUILD_ID + 1) == {"timeouts": 1}
+
+
+class TestWriteBatch:
+    """💾 批量寫入測試類"""
+
+    @pytest.mark.asyncio
+    async def test_anti_spam_write_batch(self):
+        """測試反垃圾訊息以多列語句累加統計並寫入日誌"""
+        shared = SharedDatabase()
+        db = AntiSpamDatabase(SimpleNamespace(bot=SimpleNamespace(database=shared)))
+        await db._create_stats_table()
+        await db._create_action_log_table()
+        buffer = ProtectionWriteBuffer(db, "反垃圾訊息")
+
+        for round_index in range(2):
+            for user_id in range(150):
+                buffer.add_stat(GUILD_ID, f"violation_{user_id % 3}")
+                buffer.add_row(
+                    "action_log",
+                    (GUILD_ID, user_id, "violation", "", "2025-01-01 00:00:00"),
+                )
+            await buffer.flush()
+            # 統計一個語句, 150 筆日誌依每段 100 列分為兩個語句
+            assert shared.statements == 2 + 3 * (round_index + 1)
+
+        assert await db.get_stats(GUILD_ID) == {
+            "violation_0": 100,
+            "violation_1": 100,
+            "violation_2": 100,
+        }
+        assert len(await db.get_action_logs(GUILD_ID, limit=1000)) == 300
+
+    @pytest.mark.asyncio
+    async def test_anti_spam_partial_failure_is_not_rewritten(self):
+        """測試部分語句已提交後失敗時, 重試只寫入尚未寫入的資料"""
+        shared = SharedDatabase()
+        db = AntiSpamDatabase(SimpleNamespace(bot=SimpleNamespace(database=shared)))
+        await db._create_stats_table()
+        await db._create_action_log_table()
+        buffer = ProtectionWriteBuffer(db, "反垃圾訊息")
+
+        for user_id in range(150):
+            buffer.add_stat(GUILD_ID, "violation")
+            buffer.add_row(
+                "action_log",
+                (GUILD_ID, user_id, "violation", "", "2025-01-01 00:00:00"),
+            )
+
+        # 統計與第一段日誌已提交, 第二段日誌失敗
+        execute = shared.execute
+        calls = 0
+
+        async def flaky_execute(sql, parameters=()):
+            nonlocal calls
+            calls += 1
+            if calls == 3:
+                raise sqlite3.OperationalError("database is locked")
+            await execute(sql, parameters)
+
+        shared.execute = flaky_execute
+        with pytest.raises(sqlite3.OperationalError):
+            await buffer.flush()
+
+        assert buffer.pending_stats(GUILD_ID) == {}
+        assert buffer.pending_count() == 50
+
+        await buffer.flush()
+
+        assert await db.get_stats(GUILD_ID) == {"violation": 150}
+        logs = await db.get_action_logs(GUILD_ID, limit=1000)
+        assert sorted(log["user_id"] for log in logs) == list(range(150))
+
+    @pytest.mark.asyncio
+    async def test_anti_link_write_batch(self, link_db):
+        """測試反惡意連結在一個交易中寫入統計與日誌"""
+        await link_db.add_stat(GUILD_ID, "links_blocked", 2)
+        buffer = ProtectionWriteBuffer(link_db, "反惡意連結")
+        buffer.add_stat(GUILD_ID, "links_blocked", 3)
+        buffer.add_row("action_log", (GUILD_ID, USER_ID, "blocked", "", "2025"))
+
+        await buffer.flush()
+
+        assert await link_db.get_stats(GUILD_ID) == {"links_blocked": 5}
+        assert len(await link_db.get_action_logs(GUILD_ID)) == 1
+
+
+class TestViolationLoad:
+    """🚨 違規寫入負載測試類"""
+
+    @pytest.mark.asyncio
+    async def test_thousand_violations_per_second(self, link_db):
+        """測試每秒 1,000 次違規時記錄不等待資料庫, 統計即時且最終全部寫入"""
+        rate, seconds, ticks_per_second = 1000, 2, 20
+        per_tick = rate // ticks_per_second
+        buffer = ProtectionWriteBuffer(link_db, "反惡意連結", flush_interval=0.25)
+        buffer.start()
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        record_time = 0.0
+        for tick in range(seconds * ticks_per_second):
+            tick_started = time.perf_counter()
+            for index in range(per_tick):
+                user_id = tick * per_tick + index
+                buffer.add_stat(GUILD_ID, "links_blocked")
+                buffer.add_stat(GUILD_ID, "messages_deleted")
+                buffer.add_row(
+                    "action_log",
+                    (GUILD_ID, user_id, "malicious_link_blocked", "", "2025"),
+                )
+            record_time += time.perf_counter() - tick_started
+
+            recorded = (tick + 1) * per_tick
+            stats = await buffer.read_stats(GUILD_ID, link_db.get_stats)
+            assert stats["links_blocked"] == recorded
+
+            next_tick = started + (tick + 1) / ticks_per_second
+            await asyncio.sleep(max(0.0, next_tick - loop.time()))
+
+        await buffer.stop()
+        total = rate * seconds
+
+        # 記錄違規只操作記憶體, 每次遠低於 1 毫秒
+        assert record_time / total < 1e-3
+        # 每次沖刷一批寫入, 而不是每次違規一個交易
+        assert buffer.get_metrics()["flushes"] <= seconds * 4 + 2
+        assert buffer.get_metrics()["rows_written"] == total
+
+        assert await link_db.get_stats(GUILD_ID) == {
+            "links_blocked": total,
+            "messages_deleted": total,
+        }
+        async with (
+            aiosqlite.connect(link_db._get_db_path()) as db,
+            db.execute("SELECT COUNT(*) FROM action_logs") as cursor,
+        ):
+            assert (await cursor.fetchone())[0] == total